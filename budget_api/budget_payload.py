@@ -0,0 +1,173 @@
+# =============================================================================
+# budget_payload.py - 구조화된 가계부 데이터 (선택적 요청 형식)
+# =============================================================================
+# 앱의 Hive Budget / SubBudget / Expense 박스를 그대로 전송하는 형식
+# 서버가 한 번의 순회로 집계한 뒤, 짧고 결정적인(canonical) 프롬프트 텍스트로 렌더링
+# → 요청 크기/프롬프트 길이 감소, 같은 데이터는 항상 같은 텍스트 (캐시 키 안정)
+#
+# 기존 자유 형식 data(마크다운) 요청도 그대로 지원
+# =============================================================================
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+# 고정지출 예산 판단 키워드 (markdown_export_service.dart _isFixedExpenseBudget 과 동일)
+FIXED_EXPENSE_KEYWORDS = ("정기", "고정", "fixed", "recurring", "subscription", "월세", "보험", "통신", "구독")
+
+# 렌더링 시 원본 그대로 포함할 최근 지출 건수
+RECENT_EXPENSE_COUNT = 20
+
+
+# =============================================================================
+# 요청 모델 (Dart 모델 필드명과 동일)
+# =============================================================================
+class BudgetItem(BaseModel):
+    id: str
+    name: str = Field(max_length=100)
+    amount: int
+    isRecurring: bool = False
+    order: int = 0
+
+
+class SubBudgetItem(BaseModel):
+    id: str
+    budgetId: str
+    name: str = Field(max_length=100)
+    amount: int
+
+
+class ExpenseItem(BaseModel):
+    budgetId: str
+    subBudgetId: Optional[str] = None
+    amount: int
+    date: date
+    memo: Optional[str] = Field(default=None, max_length=200)
+
+
+class BudgetPayload(BaseModel):
+    startDate: date
+    endDate: date
+    today: Optional[date] = None  # 클라이언트 기준 오늘 (미지정 시 서버 KST 날짜)
+    currency: str = Field(default="₩", max_length=5)
+    budgets: List[BudgetItem] = Field(max_length=200)
+    subBudgets: List[SubBudgetItem] = Field(default_factory=list, max_length=1000)
+    expenses: List[ExpenseItem] = Field(default_factory=list, max_length=50000)
+
+    # 기간이 뒤집히면 일수/남은 일수가 음수 → 렌더링/로컬 분석 전에 거부 (422)
+    @model_validator(mode='after')
+    def validate_period(self) -> "BudgetPayload":
+        if self.startDate > self.endDate:
+            raise ValueError('startDate must not be after endDate.')
+        return self
+
+
+# =============================================================================
+# 집계
+# =============================================================================
+@dataclass
+class BudgetAggregates:
+    """단일 순회 집계 결과"""
+    total_budget: int = 0
+    total_expense: int = 0
+    by_budget: Dict[str, int] = field(default_factory=dict)  # budgetId → 지출
+    by_sub_budget: Dict[str, int] = field(default_factory=dict)  # subBudgetId → 지출
+    by_day: Dict[date, int] = field(default_factory=dict)  # 날짜 → 지출
+    expense_count: int = 0
+    recent: List[ExpenseItem] = field(default_factory=list)  # 최근 지출 (최신순)
+
+
+def is_fixed_budget(budget: BudgetItem) -> bool:
+    """고정지출 예산 여부 (isRecurring 또는 이름 키워드)"""
+    name = budget.name.lower()
+    return budget.isRecurring or any(keyword in name for keyword in FIXED_EXPENSE_KEYWORDS)
+
+
+def aggregate_budget(payload: BudgetPayload) -> BudgetAggregates:
+    """예산/지출 집계 (지출 목록을 한 번만 순회)"""
+    agg = BudgetAggregates()
+    agg.total_budget = sum(budget.amount for budget in payload.budgets)
+    by_budget = dict.fromkeys((budget.id for budget in payload.budgets), 0)
+    by_sub_budget = dict.fromkeys((sub.id for sub in payload.subBudgets), 0)
+    by_day: Dict[date, int] = {}
+
+    for expense in payload.expenses:
+        if expense.budgetId in by_budget:
+            by_budget[expense.budgetId] += expense.amount
+        if expense.subBudgetId in by_sub_budget:
+            by_sub_budget[expense.subBudgetId] += expense.amount
+        by_day[expense.date] = by_day.get(expense.date, 0) + expense.amount
+
+    agg.by_budget = by_budget
+    agg.by_sub_budget = by_sub_budget
+    agg.by_day = dict(sorted(by_day.items()))
+    agg.total_expense = sum(by_budget.values())
+    agg.expense_count = len(payload.expenses)
+    # 날짜 → 금액 내림차순 → 메모 순 정렬로 결정적 결과 보장
+    agg.recent = sorted(
+        payload.expenses,
+        key=lambda e: (e.date, e.amount, e.budgetId, e.memo or ""),
+        reverse=True,
+    )[:RECENT_EXPENSE_COUNT]
+    return agg
+
+
+# =============================================================================
+# 렌더링 (canonical 프롬프트 텍스트)
+# =============================================================================
+def _pct(used: int, total: int) -> str:
+    return f"{used / total * 100:.1f}%" if total else "0%"
+
+
+def render_budget_payload(payload: BudgetPayload, today: date, agg: Optional[BudgetAggregates] = None) -> str:
+    """
+    집계 결과를 짧은 고정 형식 텍스트로 렌더링
+
+    같은 payload/today 에 대해 항상 같은 문자열을 반환 (정렬 순서 고정)
+    """
+    agg = agg or aggregate_budget(payload)
+    reference = min(max(payload.today or today, payload.startDate), payload.endDate)
+    days_total = (payload.endDate - payload.startDate).days + 1
+    days_left = (payload.endDate - reference).days
+    left = agg.total_budget - agg.total_expense
+
+    lines = [
+        f"period: {payload.startDate}~{payload.endDate} ({days_total}d, today {reference}, {days_left}d left)",
+        f"currency: {payload.currency}",
+        f"total: budget {agg.total_budget:,} / spent {agg.total_expense:,} / left {left:,} "
+        f"({_pct(agg.total_expense, agg.total_budget)}), {agg.expense_count} expenses",
+        "budgets (name [type]: budget / spent / left / usage):",
+    ]
+
+    subs_by_budget: Dict[str, List[SubBudgetItem]] = {}
+    for sub in sorted(payload.subBudgets, key=lambda s: s.name):
+        subs_by_budget.setdefault(sub.budgetId, []).append(sub)
+
+    for budget in sorted(payload.budgets, key=lambda b: (b.order, b.name)):
+        spent = agg.by_budget.get(budget.id, 0)
+        kind = "fixed" if is_fixed_budget(budget) else "variable"
+        lines.append(
+            f"- {budget.name} [{kind}]: {budget.amount:,} / {spent:,} / "
+            f"{budget.amount - spent:,} / {_pct(spent, budget.amount)}"
+        )
+        for sub in subs_by_budget.get(budget.id, []):
+            sub_spent = agg.by_sub_budget.get(sub.id, 0)
+            lines.append(f"  - {sub.name}: {sub.amount:,} / {sub_spent:,} / {sub.amount - sub_spent:,}")
+
+    if agg.by_day:
+        lines.append("daily spending (date amount):")
+        lines.append(", ".join(f"{day.strftime('%m-%d')} {amount:,}" for day, amount in agg.by_day.items()))
+
+    if agg.recent:
+        names = {budget.id: budget.name for budget in payload.budgets}
+        sub_names = {sub.id: sub.name for sub in payload.subBudgets}
+        lines.append(f"recent expenses (latest {len(agg.recent)}):")
+        for expense in agg.recent:
+            category = names.get(expense.budgetId, "-")
+            if expense.subBudgetId in sub_names:
+                category += f"/{sub_names[expense.subBudgetId]}"
+            memo = f" {expense.memo}" if expense.memo else ""
+            lines.append(f"- {expense.date} {category}{memo}: {expense.amount:,}")
+
+    return "\n".join(lines)
@@ -0,0 +1,175 @@
+# =============================================================================
+# circuit_breaker.py - 업스트림(Gemini) 서킷 브레이커
+# =============================================================================
+# 상태 전이:
+#   closed    → open      : 롤링 윈도우 내 에러율 또는 느린 호출 비율이 임계값 초과
+#   open      → half_open : cooldown 경과 후
+#   half_open → closed    : 제한된 시험 요청이 모두 성공
+#   half_open → open      : 시험 요청 중 하나라도 실패
+# open 상태에서는 업스트림 호출 없이 즉시 실패 (fast-fail)
+# =============================================================================
+import logging
+import time
+from collections import deque
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 업스트림 호출이 차단됨"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    롤링 에러율/지연 기반 서킷 브레이커 (단일 이벤트 루프 전제)
+
+    사용법:
+        if not breaker.allow_request():
+            raise CircuitOpenError(breaker.retry_after())
+        ...
+        breaker.record(success=True, latency=1.2)
+    """
+
+    def __init__(
+        self,
+        name: str = "gemini",
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate_threshold: float = 0.8,
+        cooldown_seconds: float = 30.0,
+        half_open_max_calls: int = 2,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._calls: deque = deque()  # (timestamp, failed, slow)
+        self._failures = 0
+        self._slow = 0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._transitions = 0
+        self._rejected = 0
+
+    # -------------------------------------------------------------------------
+    # 내부 상태 관리
+    # -------------------------------------------------------------------------
+    def _prune(self, now: float) -> None:
+        """윈도우 밖의 기록 제거 (카운터 동시 갱신)"""
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            _, failed, slow = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _transition(self, state: str, now: float) -> None:
+        if state == self.state:
+            return
+        logger.warning("%s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        self._transitions += 1
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        if state == OPEN:
+            self._opened_at = now
+        elif state == CLOSED:
+            # 새 윈도우로 시작 (과거 장애 기록으로 즉시 재개방 방지)
+            self._calls.clear()
+            self._failures = 0
+            self._slow = 0
+
+    def _current_state(self, now: float) -> str:
+        """cooldown 경과 시 open → half_open 전이 반영"""
+        if self.state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+            self._transition(HALF_OPEN, now)
+        return self.state
+
+    # -------------------------------------------------------------------------
+    # 공개 API
+    # -------------------------------------------------------------------------
+    def allow_request(self) -> bool:
+        """업스트림 호출 허용 여부 (half_open에서는 시험 요청 슬롯 예약)"""
+        now = time.monotonic()
+        state = self._current_state(now)
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+            self._half_open_in_flight += 1
+            return True
+        self._rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        """다음 시험 요청까지 남은 시간(초)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at))
+
+    def record(self, success: bool, latency: float) -> None:
+        """호출 결과 기록 (allow_request가 True였던 호출마다 정확히 한 번)"""
+        now = time.monotonic()
+        slow = latency >= self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if not success or slow:
+                self._transition(OPEN, now)
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self._transition(CLOSED, now)
+            return
+
+        if self.state == OPEN:
+            return  # open 이전에 출발한 요청의 뒤늦은 결과는 무시
+
+        self._calls.append((now, int(not success), int(slow)))
+        self._failures += int(not success)
+        self._slow += int(slow)
+        self._prune(now)
+
+        total = len(self._calls)
+        if total < self.min_calls:
+            return
+        if (self._failures / total >= self.error_rate_threshold
+                or self._slow / total >= self.slow_rate_threshold):
+            self._transition(OPEN, now)
+
+    def release(self) -> None:
+        """결과 없이 끝난 호출(클라이언트 취소 등)의 half_open 슬롯 반환"""
+        if self.state == HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """헬스체크/메트릭용 상태 요약"""
+        now = time.monotonic()
+        state = self._current_state(now)
+        self._prune(now)
+        total = len(self._calls)
+        return {
+            "state": state,
+            "window_calls": total,
+            "error_rate": round(self._failures / total, 3) if total else 0.0,
+            "slow_rate": round(self._slow / total, 3) if total else 0.0,
+            "retry_after": round(self.retry_after(), 1),
+            "transitions": self._transitions,
+            "rejected": self._rejected,
+        }
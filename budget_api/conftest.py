@@ -0,0 +1,83 @@
+# =============================================================================
+# conftest.py - pytest 공통 설정
+# =============================================================================
+# main 은 import 시점에 환경변수를 읽으므로 테스트 모듈보다 먼저 기본값을 설정
+# (분당 요청 제한은 기본 비활성 - 제한기 테스트는 각자 인스턴스를 만들어 사용)
+# DB 는 세션마다 새 임시 SQLite 파일 (개발용 usage.db / .env 의 DATABASE_URL 을 건드리지 않음)
+# =============================================================================
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-gemini-key")
+os.environ.setdefault("ADMIN_API_KEY", "test-admin-key")
+os.environ.setdefault("IP_RATE_LIMIT_PER_MINUTE", "0")
+os.environ.setdefault("DEVICE_RATE_LIMIT_PER_MINUTE", "0")
+
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="budget_api_test_")
+os.environ["DATABASE_URL"] = ""  # load_dotenv 는 이미 있는 키를 덮어쓰지 않음
+os.environ["SQLITE_PATH"] = os.path.join(TEST_DATA_DIR, "usage.db")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+# Gemini 가 돌려주는 분석 결과 (AnalyzeResponse 형식)
+ANALYSIS = {
+    "oneLiner": "식비 비중이 높아요",
+    "summary": "이번 달 지출 요약",
+    "insights": ["식비가 가장 큽니다"],
+    "warnings": [],
+    "suggestions": ["외식을 줄여보세요"],
+    "spendingPlan": "하루 2만원 이내로 사용하세요",
+    "pattern": {"mainCategory": "식비", "spendingTrend": "stable", "savingPotential": 10, "riskLevel": "low"},
+}
+
+
+def gemini_body(analysis=None, total_tokens: int = 100) -> dict:
+    """generateContent 응답 본문"""
+    text = json.dumps(ANALYSIS if analysis is None else analysis, ensure_ascii=False)
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}]}}],
+        "usageMetadata": {"totalTokenCount": total_tokens},
+    }
+
+
+def new_device_id() -> str:
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def mock_gemini(monkeypatch):
+    """main 의 Gemini 호출을 MockTransport 로 교체 → 호출된 요청 목록 반환"""
+    import main
+
+    def install(handler=None):
+        calls = []
+
+        def respond(request):
+            calls.append(request)
+            return handler(request) if handler else httpx.Response(200, json=gemini_body())
+
+        monkeypatch.setattr(main.gemini_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+        return calls
+
+    return install
+
+
+@pytest.fixture
+def client():
+    """main.app TestClient (startup/shutdown 이벤트 포함)"""
+    import main
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as test_client:
+        yield test_client
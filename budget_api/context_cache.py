@@ -0,0 +1,205 @@
+# =============================================================================
+# context_cache.py - Gemini 컨텍스트 캐시 (고정 프롬프트 접두부 재사용)
+# =============================================================================
+# 요청마다 바뀌는 것은 가계부 데이터뿐이고, 시스템 프롬프트 + 분석 지시/JSON 스키마는
+# (언어, 톤) 조합별로 고정 → cachedContents API로 접두부를 한 번만 업로드하고
+# generateContent 에는 cachedContent 이름 + 데이터(가변 접미부)만 전송
+#
+# - 서버 시작 시 모든 (언어, 톤) 조합 캐시 생성, 백그라운드에서 TTL 만료 전 갱신
+# - 캐시가 없거나 만료/삭제된 경우 호출자는 전체 프롬프트로 투명하게 폴백
+# - 생성 실패(예: 최소 토큰 수 미달) 시 일정 시간 동안 해당 조합 재시도 안 함
+# - start() 에 넘긴 조합만 캐시 (language/tone 은 요청 문자열 → 임의 조합마다 유료 캐시 생성 방지)
+# =============================================================================
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from gemini_client import GeminiClient
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]  # (language, tone)
+# (language, tone) → (system_prompt, 고정 지시문)
+PrefixBuilder = Callable[[str, str], Tuple[str, str]]
+
+
+@dataclass
+class CacheEntry:
+    name: str  # "cachedContents/..."
+    expires_at: float  # time.monotonic() 기준
+
+
+class ContextCacheManager:
+    """
+    (언어, 톤)별 cachedContents 관리
+
+    사용법:
+        cache = ContextCacheManager(client, api_base, model, builder)
+        await cache.start(keys)              # 서버 시작 시
+        name = cache.get(language, tone)     # None이면 전체 프롬프트 사용
+        cache.invalidate(language, tone)     # 캐시 관련 오류 응답 시
+    """
+
+    def __init__(
+        self,
+        client: GeminiClient,
+        api_base: str,
+        model: str,
+        prefix_builder: PrefixBuilder,
+        ttl_seconds: int = 3600,
+        refresh_margin: float = 300.0,
+        failure_backoff: float = 600.0,
+    ):
+        self.client = client
+        self.api_base = api_base.rstrip("/")
+        self.model = model
+        self.prefix_builder = prefix_builder
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.failure_backoff = failure_backoff
+        self._entries: Dict[CacheKey, CacheEntry] = {}
+        self._failed_until: Dict[CacheKey, float] = {}
+        self._creating: Dict[CacheKey, asyncio.Task] = {}
+        self._keys: Tuple[CacheKey, ...] = ()
+        self._refresher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------------------------------------------------
+    # 조회 (핫 패스, 네트워크 호출 없음)
+    # -------------------------------------------------------------------------
+    def get(self, language: str, tone: str) -> Optional[str]:
+        """유효한 캐시 이름 반환 (없으면 None + 백그라운드 생성 예약, 설정에 없는 조합은 항상 None)"""
+        key = (language, tone)
+        if key not in self._keys:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at - time.monotonic() > self.refresh_margin / 2:
+            self.hits += 1
+            return entry.name
+        self.misses += 1
+        self._schedule_create(key)
+        return None
+
+    def invalidate(self, language: str, tone: str) -> None:
+        """서버 측에서 캐시가 사라진 경우 (만료/삭제) 항목 제거 후 재생성 예약"""
+        key = (language, tone)
+        if key not in self._keys:
+            return
+        self._entries.pop(key, None)
+        self._schedule_create(key)
+
+    # -------------------------------------------------------------------------
+    # 생성 / 갱신
+    # -------------------------------------------------------------------------
+    def _schedule_create(self, key: CacheKey) -> None:
+        if key in self._creating or time.monotonic() < self._failed_until.get(key, 0.0):
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._create(key))
+        except RuntimeError:
+            return  # 이벤트 루프 밖 (테스트 등)
+        self._creating[key] = task
+        task.add_done_callback(lambda _: self._creating.pop(key, None))
+
+    async def _create(self, key: CacheKey) -> None:
+        language, tone = key
+        system_prompt, instructions = self.prefix_builder(language, tone)
+        body = {
+            "model": f"models/{self.model}",
+            "displayName": f"budget-analysis-{language}-{tone}",
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": instructions}]}],
+            "ttl": f"{self.ttl_seconds}s",
+        }
+        try:
+            response = await self.client.call("POST", f"{self.api_base}/cachedContents", body)
+        except httpx.RequestError as e:
+            logger.warning("create %s failed: %s", key, e)
+            self._failed_until[key] = time.monotonic() + self.failure_backoff
+            return
+
+        if response.status_code != 200:
+            # 예: 최소 토큰 수 미달(400), 모델 미지원 → 한동안 전체 프롬프트 사용
+            logger.warning("create %s rejected: HTTP %d", key, response.status_code)
+            self._failed_until[key] = time.monotonic() + self.failure_backoff
+            return
+
+        name = response.json().get("name")
+        if name:
+            previous = self._entries.get(key)
+            self._entries[key] = CacheEntry(name=name, expires_at=time.monotonic() + self.ttl_seconds)
+            if previous is not None and previous.name != name:
+                await self._delete(previous.name)
+
+    async def _extend(self, key: CacheKey, entry: CacheEntry) -> None:
+        """TTL 연장 (실패 시 재생성)"""
+        try:
+            response = await self.client.call(
+                "PATCH", f"{self.api_base}/{entry.name}", {"ttl": f"{self.ttl_seconds}s"}
+            )
+            if response.status_code == 200:
+                entry.expires_at = time.monotonic() + self.ttl_seconds
+                return
+        except httpx.RequestError:
+            pass
+        self._entries.pop(key, None)
+        await self._create(key)
+
+    async def _delete(self, name: str) -> None:
+        try:
+            await self.client.call("DELETE", f"{self.api_base}/{name}")
+        except httpx.RequestError:
+            pass  # 어차피 TTL로 만료됨
+
+    async def _refresh_loop(self) -> None:
+        """만료가 임박한 캐시를 주기적으로 연장, 누락된 캐시는 재생성"""
+        interval = max(10.0, self.refresh_margin / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key in self._keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._schedule_create(key)
+                elif entry.expires_at - now <= self.refresh_margin:
+                    await self._extend(key, entry)
+
+    async def start(self, keys: Iterable[CacheKey]) -> None:
+        """모든 조합 캐시 생성 + 갱신 루프 시작"""
+        self._keys = tuple(keys)
+        await asyncio.gather(*(self._create(key) for key in self._keys))
+        self._refresher = asyncio.create_task(self._refresh_loop())
+        logger.info("%d/%d prefixes cached", len(self._entries), len(self._keys))
+
+    async def stop(self) -> None:
+        """갱신 루프 종료 (캐시는 TTL로 자연 만료)"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+        for task in list(self._creating.values()):
+            task.cancel()
+
+    def snapshot(self) -> dict:
+        """메트릭용 상태 요약"""
+        return {
+            "cached": len(self._entries),
+            "keys": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def is_cache_error(response: httpx.Response) -> bool:
+    """cachedContent 관련 오류 응답 여부 (만료/삭제/권한) → 전체 프롬프트로 재시도"""
+    if response.status_code not in (400, 403, 404):
+        return False
+    try:
+        message = str(response.json().get("error", {}).get("message", ""))
+    except ValueError:
+        return False
+    return "cache" in message.lower()
@@ -5,7 +5,9 @@
 # 환경변수 DATABASE_URL이 있으면 PostgreSQL, 없으면 SQLite 사용
 # =============================================================================
 import os
+import json
 import sqlite3
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -14,6 +16,30 @@ from typing import Optional, List, Dict, Any
 # 시간대 설정
 KST = ZoneInfo("Asia/Seoul")
 
+# 기존 DB에 추가되는 analysis_logs 컬럼 (컬럼명, 타입) - init_db에서 없으면 ALTER TABLE
+ANALYSIS_LOG_COLUMNS = [
+    ("model", "TEXT"),  # 실제 응답한 Gemini 모델
+    ("total_ms", "INTEGER"),  # 서버 전체 처리 시간
+    ("upstream_ms", "INTEGER"),  # Gemini 호출 시간 (재시도/폴백 포함)
+    ("ttfb_ms", "INTEGER"),  # 최종 응답 첫 바이트까지 시간
+    ("prompt_tokens", "INTEGER"),  # usageMetadata.promptTokenCount
+    ("output_tokens", "INTEGER"),  # usageMetadata.candidatesTokenCount
+    ("cached_tokens", "INTEGER"),  # usageMetadata.cachedContentTokenCount
+    ("request_bytes", "INTEGER"),  # Gemini 요청 본문 크기
+    ("response_bytes", "INTEGER"),  # Gemini 응답 본문 크기
+]
+# save_analysis_log(metrics=...) 로 기록 가능한 성능/토큰 컬럼
+LOG_METRIC_COLUMNS = [column for column, _ in ANALYSIS_LOG_COLUMNS if column != "model"]
+
+# analysis_jobs 에 나중에 추가된 컬럼 (기존 DB 마이그레이션 대상)
+ANALYSIS_JOB_COLUMNS = [
+    ("request_body", "TEXT"),  # 원본 요청 JSON (작업 실행 시 그대로 재생)
+    ("owner", "TEXT"),  # 작업을 가져간 워커
+    ("lease_until", "DOUBLE PRECISION"),  # 임대 만료 시각 (epoch 초), 지나면 다른 워커가 가져갈 수 있음
+]
+_JOB_COLUMNS = ["id", "device_id", "language", "tone", "request_data", "status", "result_data",
+                "status_code", "error_message", "created_at", "updated_at", "request_body", "owner", "lease_until"]
+
 # =============================================================================
 # 추상 베이스 클래스
 # =============================================================================
@@ -44,9 +70,11 @@ class DatabaseInterface(ABC):
         request_data: str,
         response_data: Optional[str] = None,
         status_code: int = 200,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        model: Optional[str] = None,
+        metrics: Optional[Dict[str, int]] = None
     ) -> None:
-        """분석 요청/응답 로그 저장"""
+        """분석 요청/응답 로그 저장 (metrics: LOG_METRIC_COLUMNS 중 측정된 값)"""
         pass
 
     @abstractmethod
@@ -64,6 +92,131 @@ class DatabaseInterface(ABC):
         """오래된 데이터 정리"""
         pass
 
+    @abstractmethod
+    def create_job(
+        self,
+        job_id: str,
+        device_id: str,
+        language: str,
+        tone: str,
+        request_data: str,
+        request_body: Optional[str] = None
+    ) -> None:
+        """비동기 분석 작업 생성 (status=queued, request_body: 재생할 원본 요청 JSON)"""
+        pass
+
+    @abstractmethod
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        result_data: Optional[str] = None,
+        status_code: Optional[int] = None,
+        error_message: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> bool:
+        """비동기 분석 작업 상태/결과 갱신 (owner 지정 시 그 워커가 임대 중일 때만) → 갱신 여부"""
+        pass
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """비동기 분석 작업 조회"""
+        pass
+
+    @abstractmethod
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        작업을 원자적으로 가져감 (queued 또는 임대가 만료된 running → running, owner, lease_until)
+
+        다른 워커가 먼저 가져갔거나 이미 끝난 작업이면 None
+        """
+        pass
+
+    @abstractmethod
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """실행 중인 작업의 임대 연장 (owner 가 아직 임대 중일 때만) → 연장 여부"""
+        pass
+
+    @abstractmethod
+    def get_claimable_jobs(self) -> List[str]:
+        """가져갈 수 있는 작업 ID 목록 (queued + 임대 만료된 running, 생성 순) - 복구용"""
+        pass
+
+    @abstractmethod
+    def get_logs_for_reanalysis(
+        self,
+        log_ids: Optional[List[int]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        status_code: Optional[int] = 200,
+        limit: int = 1000
+    ) -> List[int]:
+        """재분석 대상 로그 ID 목록 (ID 목록 또는 created_at 범위, request_data 있는 로그만)"""
+        pass
+
+    @abstractmethod
+    def get_log_request(self, log_id: int) -> Optional[Dict[str, Any]]:
+        """로그의 원본 요청 정보 (id, device_id, language, tone, request_data)"""
+        pass
+
+    @abstractmethod
+    def create_reanalysis_batch(self, batch_id: str, log_ids: List[int], model: str, concurrency: int) -> None:
+        """재분석 배치 생성 (status=running)"""
+        pass
+
+    @abstractmethod
+    def update_reanalysis_batch(self, batch_id: str, status: str, succeeded: int, failed: int) -> None:
+        """재분석 배치 진행 상황(체크포인트) 갱신"""
+        pass
+
+    @abstractmethod
+    def get_reanalysis_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """재분석 배치 조회 (log_ids는 JSON 문자열)"""
+        pass
+
+    @abstractmethod
+    def get_unfinished_reanalysis_batches(self) -> List[str]:
+        """미완료(running) 재분석 배치 ID 목록 - 재시작 복구용"""
+        pass
+
+    @abstractmethod
+    def save_reanalysis_result(
+        self,
+        batch_id: str,
+        log_id: int,
+        model: str,
+        status_code: int,
+        response_data: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """재분석 결과 저장 (usage 테이블은 건드리지 않음) → 이미 결과가 있는 로그면 False"""
+        pass
+
+    @abstractmethod
+    def get_reanalyzed_log_ids(self, batch_id: str) -> List[int]:
+        """배치에서 이미 결과가 저장된 로그 ID 목록 (재개 시 건너뜀)"""
+        pass
+
+    @abstractmethod
+    def count_reanalysis_results(self, batch_id: str) -> Dict[str, int]:
+        """배치에 저장된 결과 수 {"succeeded", "failed"} (여러 프로세스가 함께 실행해도 정확)"""
+        pass
+
+    @abstractmethod
+    def get_log_metrics(self, since: str) -> List[Dict[str, Any]]:
+        """since(YYYY-MM-DD HH:MM:SS) 이후 로그의 성능/토큰 메트릭 조회 (요청/응답 본문 제외)"""
+        pass
+
+    @abstractmethod
+    def add_spend_tokens(self, window_key: str, tokens: int) -> int:
+        """전역 토큰 사용량 윈도우(예: day:2025-01-01)에 tokens 를 더하고 누적값 반환 (0이면 조회만)"""
+        pass
+
+    @abstractmethod
+    def claim_rate_tokens(self, limit_key: str, window_start: int, count: int, limit: int) -> int:
+        """요청 제한 윈도우에서 최대 count 개 토큰을 가져가고 실제로 받은 수 반환 (윈도우 한도 limit)"""
+        pass
+
 
 def get_today_kst() -> str:
     """KST 기준 오늘 날짜 반환 (YYYY-MM-DD)"""
@@ -75,6 +228,21 @@ def get_now_kst() -> str:
     return datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
 
 
+_LOG_BASE_COLUMNS = ["device_id", "language", "tone", "request_data", "response_data",
+                     "status_code", "error_message", "model", "created_at"]
+
+
+def _log_columns(base_values: tuple, metrics: Optional[Dict[str, int]]) -> tuple:
+    """INSERT 컬럼/값 목록 (허용된 메트릭 컬럼만 추가 - SQL 인젝션 방지)"""
+    columns = list(_LOG_BASE_COLUMNS)
+    values = list(base_values)
+    for column in LOG_METRIC_COLUMNS:
+        if metrics and metrics.get(column) is not None:
+            columns.append(column)
+            values.append(int(metrics[column]))
+    return columns, tuple(values)
+
+
 # =============================================================================
 # SQLite 구현 (로컬/개발용)
 # =============================================================================
@@ -115,10 +283,102 @@ class SQLiteDatabase(DatabaseInterface):
                 response_data TEXT,
                 status_code INTEGER,
                 error_message TEXT,
+                model TEXT,
+                total_ms INTEGER,
+                upstream_ms INTEGER,
+                ttfb_ms INTEGER,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                cached_tokens INTEGER,
+                request_bytes INTEGER,
+                response_bytes INTEGER,
                 created_at TEXT NOT NULL
             )
         """)
 
+        # 비동기 분석 작업 테이블 (재시작 후에도 유지)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                device_id TEXT NOT NULL,
+                language TEXT,
+                tone TEXT,
+                request_data TEXT,
+                status TEXT NOT NULL,
+                result_data TEXT,
+                status_code INTEGER,
+                error_message TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                request_body TEXT,
+                owner TEXT,
+                lease_until DOUBLE PRECISION
+            )
+        """)
+
+        # 관리자 재분석 배치 테이블 (진행 상황 체크포인트)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reanalysis_batches (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                model TEXT,
+                concurrency INTEGER,
+                log_ids TEXT,
+                total INTEGER DEFAULT 0,
+                succeeded INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # 재분석 결과 테이블 (analysis_logs / usage와 분리)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reanalysis_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT NOT NULL,
+                log_id INTEGER NOT NULL,
+                model TEXT,
+                status_code INTEGER,
+                response_data TEXT,
+                error_message TEXT,
+                created_at TEXT NOT NULL,
+                UNIQUE(batch_id, log_id)
+            )
+        """)
+
+        # 기존 DB 마이그레이션: 새 analysis_logs 컬럼 추가
+        cursor.execute("PRAGMA table_info(analysis_logs)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in ANALYSIS_LOG_COLUMNS:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE analysis_logs ADD COLUMN {column} {column_type}")
+        cursor.execute("PRAGMA table_info(analysis_jobs)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in ANALYSIS_JOB_COLUMNS:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} {column_type}")
+
+        # 전역 Gemini 토큰 사용량 (시간/일 윈도우별, 여러 워커가 증분을 합산)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spend_counters (
+                window_key TEXT PRIMARY KEY,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # 분산 요청 제한 카운터 (키 + 윈도우 시작 시각별, 노드들이 토큰을 묶음으로 가져감)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                limit_key TEXT NOT NULL,
+                window_start INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (limit_key, window_start)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_window ON rate_limit_counters(window_start)")
+
         conn.commit()
         conn.close()
 
@@ -159,17 +419,22 @@ class SQLiteDatabase(DatabaseInterface):
         request_data: str,
         response_data: Optional[str] = None,
         status_code: int = 200,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        model: Optional[str] = None,
+        metrics: Optional[Dict[str, int]] = None
     ) -> None:
-        """분석 요청/응답 로그 저장"""
+        """분석 요청/응답 로그 저장 (metrics: LOG_METRIC_COLUMNS 중 측정된 값)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         created_at = get_now_kst()
-        cursor.execute("""
-            INSERT INTO analysis_logs
-            (device_id, language, tone, request_data, response_data, status_code, error_message, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (device_id, language, tone, request_data, response_data, status_code, error_message, created_at))
+        columns, values = _log_columns(
+            (device_id, language, tone, request_data, response_data, status_code, error_message, model, created_at),
+            metrics
+        )
+        cursor.execute(
+            f"INSERT INTO analysis_logs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            values
+        )
         conn.commit()
         conn.close()
 
@@ -229,6 +494,15 @@ class SQLiteDatabase(DatabaseInterface):
         """)
         by_date = cursor.fetchall()
 
+        # 모델별 요청 수 / 성공 수
+        cursor.execute("""
+            SELECT model, COUNT(*) as count, SUM(CASE WHEN status_code = 200 THEN 1 ELSE 0 END)
+            FROM analysis_logs
+            GROUP BY model
+            ORDER BY count DESC
+        """)
+        by_model = cursor.fetchall()
+
         conn.close()
 
         return {
@@ -236,7 +510,8 @@ class SQLiteDatabase(DatabaseInterface):
             "success_count": success,
             "error_count": total - success,
             "by_device": [{"device_id": d[0], "count": d[1]} for d in by_device],
-            "by_date": [{"date": d[0], "count": d[1]} for d in by_date]
+            "by_date": [{"date": d[0], "count": d[1]} for d in by_date],
+            "by_model": [{"model": m[0], "count": m[1], "success": m[2] or 0} for m in by_model]
         }
 
     def cleanup_old_data(self, days: int = 7) -> None:
@@ -245,8 +520,306 @@ class SQLiteDatabase(DatabaseInterface):
         cursor = conn.cursor()
         cutoff = (datetime.now(KST) - timedelta(days=days)).strftime("%Y-%m-%d")
         cursor.execute("DELETE FROM usage WHERE date < ?", (cutoff,))
+        cursor.execute("DELETE FROM analysis_jobs WHERE created_at < ?", (cutoff,))
+        cursor.execute("DELETE FROM spend_counters WHERE updated_at < ?", (cutoff,))
+        # 요청 제한 윈도우는 1분 단위 → 1시간 지난 것은 필요 없음
+        cursor.execute("DELETE FROM rate_limit_counters WHERE window_start < ?", (int(time.time()) - 3600,))
+        conn.commit()
+        conn.close()
+
+    def create_job(
+        self,
+        job_id: str,
+        device_id: str,
+        language: str,
+        tone: str,
+        request_data: str,
+        request_body: Optional[str] = None
+    ) -> None:
+        """비동기 분석 작업 생성 (status=queued, request_body: 재생할 원본 요청 JSON)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = get_now_kst()
+        cursor.execute("""
+            INSERT INTO analysis_jobs
+            (id, device_id, language, tone, request_data, request_body, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+        """, (job_id, device_id, language, tone, request_data, request_body, now, now))
+        conn.commit()
+        conn.close()
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        result_data: Optional[str] = None,
+        status_code: Optional[int] = None,
+        error_message: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> bool:
+        """비동기 분석 작업 상태/결과 갱신 (owner 지정 시 그 워커가 임대 중일 때만) → 갱신 여부"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        sql = """
+            UPDATE analysis_jobs
+            SET status = ?, result_data = ?, status_code = ?, error_message = ?, updated_at = ?,
+                lease_until = NULL
+            WHERE id = ?
+        """
+        params: List[Any] = [status, result_data, status_code, error_message, get_now_kst(), job_id]
+        if owner is not None:
+            sql += " AND owner = ?"
+            params.append(owner)
+        cursor.execute(sql, tuple(params))
+        updated = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return updated
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """비동기 분석 작업 조회"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(zip(_JOB_COLUMNS, row)) if row else None
+
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        작업을 원자적으로 가져감 (queued 또는 임대가 만료된 running → running, owner, lease_until)
+
+        다른 워커가 먼저 가져갔거나 이미 끝난 작업이면 None
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = time.time()
+        # 조건부 UPDATE 한 번 → 여러 워커가 동시에 시도해도 한 곳만 성공 (lease_until 이 NULL 인 running 은 이전 버전 행)
+        cursor.execute("""
+            UPDATE analysis_jobs
+            SET status = 'running', owner = ?, lease_until = ?, updated_at = ?
+            WHERE id = ? AND (status = 'queued'
+                             OR (status = 'running' AND (lease_until IS NULL OR lease_until < ?)))
+        """, (owner, now + lease_seconds, get_now_kst(), job_id, now))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return self.get_job(job_id) if claimed else None
+
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """실행 중인 작업의 임대 연장 (owner 가 아직 임대 중일 때만) → 연장 여부"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE analysis_jobs SET lease_until = ?
+            WHERE id = ? AND owner = ? AND status = 'running'
+        """, (time.time() + lease_seconds, job_id, owner))
+        renewed = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return renewed
+
+    def get_claimable_jobs(self) -> List[str]:
+        """가져갈 수 있는 작업 ID 목록 (queued + 임대 만료된 running, 생성 순) - 복구용"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id FROM analysis_jobs
+            WHERE status = 'queued'
+               OR (status = 'running' AND (lease_until IS NULL OR lease_until < ?))
+            ORDER BY created_at
+        """, (time.time(),))
+        rows = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def get_logs_for_reanalysis(
+        self,
+        log_ids: Optional[List[int]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        status_code: Optional[int] = 200,
+        limit: int = 1000
+    ) -> List[int]:
+        """재분석 대상 로그 ID 목록 (ID 목록 또는 created_at 범위, request_data 있는 로그만)"""
+        conditions = ["request_data IS NOT NULL"]
+        params: List[Any] = []
+        if log_ids:
+            conditions.append(f"id IN ({', '.join(['?'] * len(log_ids))})")
+            params.extend(log_ids)
+        if start:
+            conditions.append("created_at >= ?")
+            params.append(start)
+        if end:
+            conditions.append("created_at < ?")
+            params.append(end)
+        if status_code is not None:
+            conditions.append("status_code = ?")
+            params.append(status_code)
+        params.append(limit)
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id FROM analysis_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT ?
+        """, tuple(params))
+        rows = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def get_log_request(self, log_id: int) -> Optional[Dict[str, Any]]:
+        """로그의 원본 요청 정보 (id, device_id, language, tone, request_data)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, device_id, language, tone, request_data
+            FROM analysis_logs WHERE id = ?
+        """, (log_id,))
+        row = cursor.fetchone()
+        conn.close()
+        columns = ['id', 'device_id', 'language', 'tone', 'request_data']
+        return dict(zip(columns, row)) if row else None
+
+    def create_reanalysis_batch(self, batch_id: str, log_ids: List[int], model: str, concurrency: int) -> None:
+        """재분석 배치 생성 (status=running)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = get_now_kst()
+        cursor.execute("""
+            INSERT INTO reanalysis_batches
+            (id, status, model, concurrency, log_ids, total, succeeded, failed, created_at, updated_at)
+            VALUES (?, 'running', ?, ?, ?, ?, 0, 0, ?, ?)
+        """, (batch_id, model, concurrency, json.dumps(log_ids), len(log_ids), now, now))
+        conn.commit()
+        conn.close()
+
+    def update_reanalysis_batch(self, batch_id: str, status: str, succeeded: int, failed: int) -> None:
+        """재분석 배치 진행 상황(체크포인트) 갱신"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE reanalysis_batches
+            SET status = ?, succeeded = ?, failed = ?, updated_at = ?
+            WHERE id = ?
+        """, (status, succeeded, failed, get_now_kst(), batch_id))
+        conn.commit()
+        conn.close()
+
+    def get_reanalysis_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """재분석 배치 조회 (log_ids는 JSON 문자열)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, status, model, concurrency, log_ids, total, succeeded, failed, created_at, updated_at
+            FROM reanalysis_batches WHERE id = ?
+        """, (batch_id,))
+        row = cursor.fetchone()
+        conn.close()
+        columns = ['id', 'status', 'model', 'concurrency', 'log_ids', 'total',
+                   'succeeded', 'failed', 'created_at', 'updated_at']
+        return dict(zip(columns, row)) if row else None
+
+    def get_unfinished_reanalysis_batches(self) -> List[str]:
+        """미완료(running) 재분석 배치 ID 목록 - 재시작 복구용"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM reanalysis_batches WHERE status = 'running' ORDER BY created_at")
+        rows = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def save_reanalysis_result(
+        self,
+        batch_id: str,
+        log_id: int,
+        model: str,
+        status_code: int,
+        response_data: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """재분석 결과 저장 (usage 테이블은 건드리지 않음) → 이미 결과가 있는 로그면 False"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO reanalysis_results
+            (batch_id, log_id, model, status_code, response_data, error_message, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(batch_id, log_id) DO NOTHING
+        """, (batch_id, log_id, model, status_code, response_data, error_message, get_now_kst()))
+        inserted = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return inserted
+
+    def get_reanalyzed_log_ids(self, batch_id: str) -> List[int]:
+        """배치에서 이미 결과가 저장된 로그 ID 목록 (재개 시 건너뜀)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT log_id FROM reanalysis_results WHERE batch_id = ?", (batch_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def count_reanalysis_results(self, batch_id: str) -> Dict[str, int]:
+        """배치에 저장된 결과 수 {"succeeded", "failed"} (여러 프로세스가 함께 실행해도 정확)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(SUM(CASE WHEN status_code = 200 THEN 1 ELSE 0 END), 0), COUNT(*)
+            FROM reanalysis_results WHERE batch_id = ?
+        """, (batch_id,))
+        succeeded, total = cursor.fetchone()
+        conn.close()
+        return {"succeeded": succeeded, "failed": total - succeeded}
+
+    def get_log_metrics(self, since: str) -> List[Dict[str, Any]]:
+        """since(YYYY-MM-DD HH:MM:SS) 이후 로그의 성능/토큰 메트릭 조회 (요청/응답 본문 제외)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        columns = ["language", "tone", "model", "status_code", *LOG_METRIC_COLUMNS]
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM analysis_logs WHERE created_at >= ?",
+            (since,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def add_spend_tokens(self, window_key: str, tokens: int) -> int:
+        """전역 토큰 사용량 윈도우(예: day:2025-01-01)에 tokens 를 더하고 누적값 반환 (0이면 조회만)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO spend_counters (window_key, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(window_key) DO UPDATE SET tokens = spend_counters.tokens + excluded.tokens,
+                updated_at = excluded.updated_at
+        """, (window_key, tokens, get_now_kst()))
+        conn.commit()
+        cursor.execute("SELECT tokens FROM spend_counters WHERE window_key = ?", (window_key,))
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else tokens
+
+    def claim_rate_tokens(self, limit_key: str, window_start: int, count: int, limit: int) -> int:
+        """요청 제한 윈도우에서 최대 count 개 토큰을 가져가고 실제로 받은 수 반환 (윈도우 한도 limit)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO rate_limit_counters (limit_key, window_start, count) VALUES (?, ?, ?)
+            ON CONFLICT(limit_key, window_start) DO UPDATE SET count = rate_limit_counters.count + excluded.count
+        """, (limit_key, window_start, count))
+        # 커밋 전(쓰기 잠금 유지 중)에 조회 → 다른 워커의 증분과 섞이지 않음
+        cursor.execute(
+            "SELECT count FROM rate_limit_counters WHERE limit_key = ? AND window_start = ?",
+            (limit_key, window_start)
+        )
+        total = cursor.fetchone()[0]
         conn.commit()
         conn.close()
+        return max(0, min(count, limit - (total - count)))
 
 
 # =============================================================================
@@ -291,14 +864,102 @@ class PostgreSQLDatabase(DatabaseInterface):
                 response_data TEXT,
                 status_code INTEGER,
                 error_message TEXT,
+                model TEXT,
+                total_ms INTEGER,
+                upstream_ms INTEGER,
+                ttfb_ms INTEGER,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                cached_tokens INTEGER,
+                request_bytes INTEGER,
+                response_bytes INTEGER,
                 created_at TEXT NOT NULL
             )
         """)
 
+        # 비동기 분석 작업 테이블 (재시작 후에도 유지)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                device_id TEXT NOT NULL,
+                language TEXT,
+                tone TEXT,
+                request_data TEXT,
+                status TEXT NOT NULL,
+                result_data TEXT,
+                status_code INTEGER,
+                error_message TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                request_body TEXT,
+                owner TEXT,
+                lease_until DOUBLE PRECISION
+            )
+        """)
+
+        # 관리자 재분석 배치 테이블 (진행 상황 체크포인트)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reanalysis_batches (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                model TEXT,
+                concurrency INTEGER,
+                log_ids TEXT,
+                total INTEGER DEFAULT 0,
+                succeeded INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # 재분석 결과 테이블 (analysis_logs / usage와 분리)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reanalysis_results (
+                id SERIAL PRIMARY KEY,
+                batch_id TEXT NOT NULL,
+                log_id INTEGER NOT NULL,
+                model TEXT,
+                status_code INTEGER,
+                response_data TEXT,
+                error_message TEXT,
+                created_at TEXT NOT NULL,
+                UNIQUE(batch_id, log_id)
+            )
+        """)
+
+        # 기존 DB 마이그레이션: 새 analysis_logs 컬럼 추가
+        for column, column_type in ANALYSIS_LOG_COLUMNS:
+            cursor.execute(f"ALTER TABLE analysis_logs ADD COLUMN IF NOT EXISTS {column} {column_type}")
+        for column, column_type in ANALYSIS_JOB_COLUMNS:
+            cursor.execute(f"ALTER TABLE analysis_jobs ADD COLUMN IF NOT EXISTS {column} {column_type}")
+
+        # 전역 Gemini 토큰 사용량 (시간/일 윈도우별, 여러 워커가 증분을 합산)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spend_counters (
+                window_key TEXT PRIMARY KEY,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # 분산 요청 제한 카운터 (키 + 윈도우 시작 시각별, 노드들이 토큰을 묶음으로 가져감)
+        # UNLOGGED: WAL 기록 없음 → 쓰기 비용 최소 (장애 시 비워져도 1분 윈도우라 무방)
+        cursor.execute("""
+            CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_counters (
+                limit_key TEXT NOT NULL,
+                window_start BIGINT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (limit_key, window_start)
+            )
+        """)
+
         # 인덱스 생성 (성능 최적화)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_device_date ON usage(device_id, date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_device_id ON analysis_logs(device_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_created_at ON analysis_logs(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON analysis_jobs(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_window ON rate_limit_counters(window_start)")
 
         conn.commit()
         cursor.close()
@@ -342,17 +1003,22 @@ class PostgreSQLDatabase(DatabaseInterface):
         request_data: str,
         response_data: Optional[str] = None,
         status_code: int = 200,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        model: Optional[str] = None,
+        metrics: Optional[Dict[str, int]] = None
     ) -> None:
-        """분석 요청/응답 로그 저장"""
+        """분석 요청/응답 로그 저장 (metrics: LOG_METRIC_COLUMNS 중 측정된 값)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         created_at = get_now_kst()
-        cursor.execute("""
-            INSERT INTO analysis_logs
-            (device_id, language, tone, request_data, response_data, status_code, error_message, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (device_id, language, tone, request_data, response_data, status_code, error_message, created_at))
+        columns, values = _log_columns(
+            (device_id, language, tone, request_data, response_data, status_code, error_message, model, created_at),
+            metrics
+        )
+        cursor.execute(
+            f"INSERT INTO analysis_logs ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            values
+        )
         conn.commit()
         cursor.close()
         conn.close()
@@ -365,7 +1031,8 @@ class PostgreSQLDatabase(DatabaseInterface):
         if device_id:
             cursor.execute("""
                 SELECT id, device_id, language, tone, request_data, response_data,
-                       status_code, error_message, created_at
+                       status_code, error_message, model, total_ms, upstream_ms, ttfb_ms,
+                       prompt_tokens, output_tokens, cached_tokens, request_bytes, response_bytes, created_at
                 FROM analysis_logs
                 WHERE device_id = %s
                 ORDER BY created_at DESC
@@ -374,14 +1041,15 @@ class PostgreSQLDatabase(DatabaseInterface):
         else:
             cursor.execute("""
                 SELECT id, device_id, language, tone, request_data, response_data,
-                       status_code, error_message, created_at
+                       status_code, error_message, model, total_ms, upstream_ms, ttfb_ms,
+                       prompt_tokens, output_tokens, cached_tokens, request_bytes, response_bytes, created_at
                 FROM analysis_logs
                 ORDER BY created_at DESC
                 LIMIT %s
             """, (limit,))
 
         columns = ['id', 'device_id', 'language', 'tone', 'request_data',
-                   'response_data', 'status_code', 'error_message', 'created_at']
+                   'response_data', 'status_code', 'error_message', 'model', *LOG_METRIC_COLUMNS, 'created_at']
         rows = cursor.fetchall()
         cursor.close()
         conn.close()
@@ -419,6 +1087,15 @@ class PostgreSQLDatabase(DatabaseInterface):
         """)
         by_date = cursor.fetchall()
 
+        # 모델별 요청 수 / 성공 수
+        cursor.execute("""
+            SELECT model, COUNT(*) as count, SUM(CASE WHEN status_code = 200 THEN 1 ELSE 0 END)
+            FROM analysis_logs
+            GROUP BY model
+            ORDER BY count DESC
+        """)
+        by_model = cursor.fetchall()
+
         cursor.close()
         conn.close()
 
@@ -427,7 +1104,8 @@ class PostgreSQLDatabase(DatabaseInterface):
             "success_count": success,
             "error_count": total - success,
             "by_device": [{"device_id": d[0], "count": d[1]} for d in by_device],
-            "by_date": [{"date": str(d[0]), "count": d[1]} for d in by_date]
+            "by_date": [{"date": str(d[0]), "count": d[1]} for d in by_date],
+            "by_model": [{"model": m[0], "count": m[1], "success": m[2] or 0} for m in by_model]
         }
 
     def cleanup_old_data(self, days: int = 7) -> None:
@@ -436,9 +1114,322 @@ class PostgreSQLDatabase(DatabaseInterface):
         cursor = conn.cursor()
         cutoff = (datetime.now(KST) - timedelta(days=days)).strftime("%Y-%m-%d")
         cursor.execute("DELETE FROM usage WHERE date < %s", (cutoff,))
+        cursor.execute("DELETE FROM analysis_jobs WHERE created_at < %s", (cutoff,))
+        cursor.execute("DELETE FROM spend_counters WHERE updated_at < %s", (cutoff,))
+        # 요청 제한 윈도우는 1분 단위 → 1시간 지난 것은 필요 없음
+        cursor.execute("DELETE FROM rate_limit_counters WHERE window_start < %s", (int(time.time()) - 3600,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def create_job(
+        self,
+        job_id: str,
+        device_id: str,
+        language: str,
+        tone: str,
+        request_data: str,
+        request_body: Optional[str] = None
+    ) -> None:
+        """비동기 분석 작업 생성 (status=queued, request_body: 재생할 원본 요청 JSON)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = get_now_kst()
+        cursor.execute("""
+            INSERT INTO analysis_jobs
+            (id, device_id, language, tone, request_data, request_body, status, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, 'queued', %s, %s)
+        """, (job_id, device_id, language, tone, request_data, request_body, now, now))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def update_job(
+        self,
+        job_id: str,
+        status: str,
+        result_data: Optional[str] = None,
+        status_code: Optional[int] = None,
+        error_message: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> bool:
+        """비동기 분석 작업 상태/결과 갱신 (owner 지정 시 그 워커가 임대 중일 때만) → 갱신 여부"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        sql = """
+            UPDATE analysis_jobs
+            SET status = %s, result_data = %s, status_code = %s, error_message = %s, updated_at = %s,
+                lease_until = NULL
+            WHERE id = %s
+        """
+        params: List[Any] = [status, result_data, status_code, error_message, get_now_kst(), job_id]
+        if owner is not None:
+            sql += " AND owner = %s"
+            params.append(owner)
+        cursor.execute(sql, tuple(params))
+        updated = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return updated
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """비동기 분석 작업 조회"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM analysis_jobs WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        return dict(zip(_JOB_COLUMNS, row)) if row else None
+
+    def claim_job(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        작업을 원자적으로 가져감 (queued 또는 임대가 만료된 running → running, owner, lease_until)
+
+        다른 워커가 먼저 가져갔거나 이미 끝난 작업이면 None
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = time.time()
+        # 조건부 UPDATE 한 번 → 여러 워커가 동시에 시도해도 한 곳만 성공 (lease_until 이 NULL 인 running 은 이전 버전 행)
+        cursor.execute("""
+            UPDATE analysis_jobs
+            SET status = 'running', owner = %s, lease_until = %s, updated_at = %s
+            WHERE id = %s AND (status = 'queued'
+                             OR (status = 'running' AND (lease_until IS NULL OR lease_until < %s)))
+        """, (owner, now + lease_seconds, get_now_kst(), job_id, now))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return self.get_job(job_id) if claimed else None
+
+    def renew_job_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """실행 중인 작업의 임대 연장 (owner 가 아직 임대 중일 때만) → 연장 여부"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE analysis_jobs SET lease_until = %s
+            WHERE id = %s AND owner = %s AND status = 'running'
+        """, (time.time() + lease_seconds, job_id, owner))
+        renewed = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return renewed
+
+    def get_claimable_jobs(self) -> List[str]:
+        """가져갈 수 있는 작업 ID 목록 (queued + 임대 만료된 running, 생성 순) - 복구용"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id FROM analysis_jobs
+            WHERE status = 'queued'
+               OR (status = 'running' AND (lease_until IS NULL OR lease_until < %s))
+            ORDER BY created_at
+        """, (time.time(),))
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def get_logs_for_reanalysis(
+        self,
+        log_ids: Optional[List[int]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        status_code: Optional[int] = 200,
+        limit: int = 1000
+    ) -> List[int]:
+        """재분석 대상 로그 ID 목록 (ID 목록 또는 created_at 범위, request_data 있는 로그만)"""
+        conditions = ["request_data IS NOT NULL"]
+        params: List[Any] = []
+        if log_ids:
+            conditions.append(f"id IN ({', '.join(['%s'] * len(log_ids))})")
+            params.extend(log_ids)
+        if start:
+            conditions.append("created_at >= %s")
+            params.append(start)
+        if end:
+            conditions.append("created_at < %s")
+            params.append(end)
+        if status_code is not None:
+            conditions.append("status_code = %s")
+            params.append(status_code)
+        params.append(limit)
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id FROM analysis_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT %s
+        """, tuple(params))
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def get_log_request(self, log_id: int) -> Optional[Dict[str, Any]]:
+        """로그의 원본 요청 정보 (id, device_id, language, tone, request_data)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, device_id, language, tone, request_data
+            FROM analysis_logs WHERE id = %s
+        """, (log_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        columns = ['id', 'device_id', 'language', 'tone', 'request_data']
+        return dict(zip(columns, row)) if row else None
+
+    def create_reanalysis_batch(self, batch_id: str, log_ids: List[int], model: str, concurrency: int) -> None:
+        """재분석 배치 생성 (status=running)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        now = get_now_kst()
+        cursor.execute("""
+            INSERT INTO reanalysis_batches
+            (id, status, model, concurrency, log_ids, total, succeeded, failed, created_at, updated_at)
+            VALUES (%s, 'running', %s, %s, %s, %s, 0, 0, %s, %s)
+        """, (batch_id, model, concurrency, json.dumps(log_ids), len(log_ids), now, now))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def update_reanalysis_batch(self, batch_id: str, status: str, succeeded: int, failed: int) -> None:
+        """재분석 배치 진행 상황(체크포인트) 갱신"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE reanalysis_batches
+            SET status = %s, succeeded = %s, failed = %s, updated_at = %s
+            WHERE id = %s
+        """, (status, succeeded, failed, get_now_kst(), batch_id))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def get_reanalysis_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """재분석 배치 조회 (log_ids는 JSON 문자열)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, status, model, concurrency, log_ids, total, succeeded, failed, created_at, updated_at
+            FROM reanalysis_batches WHERE id = %s
+        """, (batch_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        columns = ['id', 'status', 'model', 'concurrency', 'log_ids', 'total',
+                   'succeeded', 'failed', 'created_at', 'updated_at']
+        return dict(zip(columns, row)) if row else None
+
+    def get_unfinished_reanalysis_batches(self) -> List[str]:
+        """미완료(running) 재분석 배치 ID 목록 - 재시작 복구용"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM reanalysis_batches WHERE status = 'running' ORDER BY created_at")
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def save_reanalysis_result(
+        self,
+        batch_id: str,
+        log_id: int,
+        model: str,
+        status_code: int,
+        response_data: Optional[str] = None,
+        error_message: Optional[str] = None
+    ) -> bool:
+        """재분석 결과 저장 (usage 테이블은 건드리지 않음) → 이미 결과가 있는 로그면 False"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO reanalysis_results
+            (batch_id, log_id, model, status_code, response_data, error_message, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT(batch_id, log_id) DO NOTHING
+        """, (batch_id, log_id, model, status_code, response_data, error_message, get_now_kst()))
+        inserted = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return inserted
+
+    def get_reanalyzed_log_ids(self, batch_id: str) -> List[int]:
+        """배치에서 이미 결과가 저장된 로그 ID 목록 (재개 시 건너뜀)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT log_id FROM reanalysis_results WHERE batch_id = %s", (batch_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def count_reanalysis_results(self, batch_id: str) -> Dict[str, int]:
+        """배치에 저장된 결과 수 {"succeeded", "failed"} (여러 프로세스가 함께 실행해도 정확)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(SUM(CASE WHEN status_code = 200 THEN 1 ELSE 0 END), 0), COUNT(*)
+            FROM reanalysis_results WHERE batch_id = %s
+        """, (batch_id,))
+        succeeded, total = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        return {"succeeded": succeeded, "failed": total - succeeded}
+
+    def get_log_metrics(self, since: str) -> List[Dict[str, Any]]:
+        """since(YYYY-MM-DD HH:MM:SS) 이후 로그의 성능/토큰 메트릭 조회 (요청/응답 본문 제외)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        columns = ["language", "tone", "model", "status_code", *LOG_METRIC_COLUMNS]
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM analysis_logs WHERE created_at >= %s",
+            (since,)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def add_spend_tokens(self, window_key: str, tokens: int) -> int:
+        """전역 토큰 사용량 윈도우(예: day:2025-01-01)에 tokens 를 더하고 누적값 반환 (0이면 조회만)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO spend_counters (window_key, tokens, updated_at) VALUES (%s, %s, %s)
+            ON CONFLICT(window_key) DO UPDATE SET tokens = spend_counters.tokens + excluded.tokens,
+                updated_at = excluded.updated_at
+            RETURNING tokens
+        """, (window_key, tokens, get_now_kst()))
+        result = cursor.fetchone()
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return result[0] if result else tokens
+
+    def claim_rate_tokens(self, limit_key: str, window_start: int, count: int, limit: int) -> int:
+        """요청 제한 윈도우에서 최대 count 개 토큰을 가져가고 실제로 받은 수 반환 (윈도우 한도 limit)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        # 행 잠금 하나로 원자적 증가 → 이전 누적값 = 결과 - count
+        cursor.execute("""
+            INSERT INTO rate_limit_counters (limit_key, window_start, count) VALUES (%s, %s, %s)
+            ON CONFLICT(limit_key, window_start) DO UPDATE SET count = rate_limit_counters.count + excluded.count
+            RETURNING count
+        """, (limit_key, window_start, count))
+        total = cursor.fetchone()[0]
         conn.commit()
         cursor.close()
         conn.close()
+        return max(0, min(count, limit - (total - count)))
 
 
 # =============================================================================
@@ -449,7 +1440,7 @@ def create_database() -> DatabaseInterface:
     환경변수에 따라 적절한 데이터베이스 인스턴스 생성
 
     - DATABASE_URL이 있으면 PostgreSQL 사용
-    - 없으면 SQLite 사용 (기본값)
+    - 없으면 SQLite 사용 (기본값, SQLITE_PATH 또는 이 파일 옆 usage.db)
 
     사용법:
         db = create_database()
@@ -464,6 +1455,6 @@ def create_database() -> DatabaseInterface:
         return PostgreSQLDatabase(database_url)
     else:
         # SQLite 사용 (기본값)
-        db_path = os.path.join(os.path.dirname(__file__), "usage.db")
+        db_path = os.getenv("SQLITE_PATH") or os.path.join(os.path.dirname(__file__), "usage.db")
         print(f"[DB] Using SQLite: {db_path}")
         return SQLiteDatabase(db_path)
@@ -0,0 +1,217 @@
+# =============================================================================
+# device_rotation.py - IP/네트워크별 하루 고유 기기 수 추정 (HyperLogLog, 키당 고정 메모리)
+# =============================================================================
+# 일일 한도는 클라이언트가 만드는 device_id 기준이라 UUID 를 바꿔가며 보내면 Gemini 호출이 무제한
+# → 요청마다 device_id 를 IP, 네트워크(IPv4 /24, IPv6 /64) 키의 스케치에 추가하고
+#   키별 "오늘 본 고유 기기 수" 추정치가 임계값을 넘으면 표시(flag) 또는 제한(throttle)
+#
+# HyperLogLog (정밀도 p, 레지스터 m = 2^p 개, 각 1바이트):
+#   device_id 의 64비트 해시 → 앞 p 비트로 레지스터 선택, 나머지 비트의 선행 0 개수 + 1 의 최댓값 저장
+#   추정 = α·m² / Σ 2^-레지스터 (작은 값은 빈 레지스터 수로 선형 계수 보정)
+#   - 표준 오차 약 1.04/√m (p=8: 6.5%, p=10: 3.3%), 임계값 수준(수십)에서는 선형 계수라 거의 정확
+#   - (IP, device_id) 쌍을 저장하지 않음, 같은 기기를 여러 번 추가해도 추정치 불변
+#   - Σ 2^-레지스터 와 빈 레지스터 수를 갱신 때마다 유지 → 추정치 계산 O(1)
+#
+# 메모리: 키 수 상한(max_keys, LRU) × m 바이트, KST 날짜가 바뀌면 전체 초기화
+#
+# 키는 신뢰 프록시 기준 클라이언트 주소 (middleware.client_ip_from_scope, 위조한 X-Forwarded-For 무시)
+# 스케치는 워커(프로세스) 메모리 → uvicorn --workers N 이면 워커마다 자기가 받은 요청만 셈
+#   (한 IP 의 기기가 워커들에 나뉘므로 임계값이 사실상 최대 N배, snapshot 의 "scope": "worker")
+# =============================================================================
+import hashlib
+import heapq
+import ipaddress
+import logging
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FLAG = "flag"
+THROTTLE = "throttle"
+
+_STATUS_RANK = {None: 0, FLAG: 1, THROTTLE: 2}
+_SKETCH, _STATUS, _LEVEL = 0, 1, 2
+
+
+def device_hash(device_id: str) -> int:
+    """기기 식별자 → 64비트 해시 (워커/재시작 간 동일)"""
+    return int.from_bytes(hashlib.blake2b(device_id.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    고유 원소 수 추정 스케치 (m = 2^precision 바이트)
+
+    사용법:
+        sketch = HyperLogLog(precision=8)
+        sketch.add(device_hash(device_id))
+        sketch.estimate()                   # 지금까지 추가한 고유 해시 수 추정
+    """
+
+    __slots__ = ("precision", "registers", "_inverse_sum", "_zeros")
+
+    def __init__(self, precision: int = 8):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._inverse_sum = float(1 << precision)  # Σ 2^-레지스터 (모두 0 이면 m)
+        self._zeros = 1 << precision
+
+    def add(self, hash64: int) -> bool:
+        """해시 추가, 레지스터가 바뀌었으면 True (추정치가 변했을 수 있음)"""
+        rest_bits = 64 - self.precision
+        index = hash64 >> rest_bits
+        rank = rest_bits - (hash64 & ((1 << rest_bits) - 1)).bit_length() + 1
+        old = self.registers[index]
+        if rank <= old:
+            return False
+        self.registers[index] = rank
+        self._inverse_sum += 2.0 ** -rank - 2.0 ** -old
+        if old == 0:
+            self._zeros -= 1
+        return True
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        raw = alpha * m * m / self._inverse_sum
+        if raw <= 2.5 * m and self._zeros:
+            return round(m * math.log(m / self._zeros))  # 작은 범위: 선형 계수
+        return round(raw)
+
+
+def network_keys(ip: str) -> List[Tuple[str, str]]:
+    """클라이언트 IP → [(단계, 키)] - IPv4 는 주소 + /24, IPv6 는 주소 + /64"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return []  # 주소가 아니면 (unknown 등) 추적하지 않음
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    prefix = 24 if address.version == 4 else 64
+    host_bits = address.max_prefixlen - prefix
+    network = type(address)(int(address) >> host_bits << host_bits)
+    return [("ip", f"ip:{address}"), ("network", f"net:{network}/{prefix}")]
+
+
+class DeviceRotationTracker:
+    """
+    IP/네트워크 키별 하루 고유 기기 수 추적 (단일 이벤트 루프 전제, 워커별 집계)
+
+    사용법:
+        tracker = DeviceRotationTracker(thresholds={"ip": (10, 50), "network": (50, 0)})
+        status, key, devices = tracker.observe(ip, device_id, today)
+        if status == "throttle": ...        # 429 등
+        tracker.top(20)                     # 관리자 화면
+
+    thresholds: 단계("ip" / "network") → (flag 기준, throttle 기준), 0 이면 해당 동작 없음
+    """
+
+    def __init__(
+        self,
+        thresholds: Dict[str, Tuple[int, int]],
+        precision: int = 8,
+        max_keys: int = 50_000,
+    ):
+        self.thresholds = thresholds
+        self.precision = precision
+        self.max_keys = max_keys
+        self.day: Optional[str] = None
+        self._keys: "OrderedDict[str, List[Any]]" = OrderedDict()  # 키 → [스케치, 상태, 단계]
+        self.observed = 0
+        self.flagged = 0
+        self.throttled = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return any(flag > 0 or throttle > 0 for flag, throttle in self.thresholds.values())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _classify(self, level: str, devices: int) -> Optional[str]:
+        flag, throttle = self.thresholds.get(level, (0, 0))
+        if throttle > 0 and devices >= throttle:
+            return THROTTLE
+        if flag > 0 and devices >= flag:
+            return FLAG
+        return None
+
+    def _entry(self, key: str, level: str) -> List[Any]:
+        entry = self._keys.get(key)
+        if entry is None:
+            if len(self._keys) >= self.max_keys:
+                self._keys.popitem(last=False)
+                self.evicted += 1
+            entry = self._keys[key] = [HyperLogLog(self.precision), None, level]
+        else:
+            self._keys.move_to_end(key)
+        return entry
+
+    def observe(self, ip: str, device_id: str, day: str) -> Tuple[Optional[str], Optional[str], int]:
+        """
+        기기를 IP/네트워크 스케치에 추가 → (가장 높은 상태, 해당 키, 추정 기기 수)
+
+        상태가 처음 바뀐 키는 로그로 남김 (하루에 키당 상태별 한 번)
+        """
+        if not self.enabled:
+            return None, None, 0
+        if day != self.day:  # KST 날짜 변경: 어제 스케치 폐기
+            self._keys.clear()
+            self.day = day
+
+        hash64 = device_hash(device_id)
+        worst: Tuple[Optional[str], Optional[str], int] = (None, None, 0)
+        for level, key in network_keys(ip):
+            entry = self._entry(key, level)
+            sketch: HyperLogLog = entry[_SKETCH]
+            sketch.add(hash64)
+            devices = sketch.estimate()
+            status = self._classify(level, devices)
+            if _STATUS_RANK[status] > _STATUS_RANK[entry[_STATUS]]:
+                entry[_STATUS] = status
+                if status == THROTTLE:
+                    self.throttled += 1
+                else:
+                    self.flagged += 1
+                logger.warning("%s: %s ~%d devices today", status, key, devices)
+            if _STATUS_RANK[status] > _STATUS_RANK[worst[0]]:
+                worst = (status, key, devices)
+        self.observed += 1
+        return worst
+
+    def top(self, limit: int = 20, level: Optional[str] = None) -> List[Dict[str, Any]]:
+        """오늘 고유 기기 수가 가장 많은 키 (추정치 내림차순)"""
+        entries = (
+            (entry[_SKETCH].estimate(), key, entry)
+            for key, entry in self._keys.items()
+            if level is None or entry[_LEVEL] == level
+        )
+        return [
+            {"key": key, "level": entry[_LEVEL], "devices": devices, "status": entry[_STATUS]}
+            for devices, key, entry in heapq.nlargest(limit, entries, key=lambda item: item[0])
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약 (이 워커에서 센 값 - 추정 기기 수도 워커별)"""
+        return {
+            "scope": "worker",
+            "day": self.day,
+            "precision": self.precision,
+            "keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "bytes_per_key": 1 << self.precision,
+            "thresholds": {level: {"flag": flag, "throttle": throttle}
+                           for level, (flag, throttle) in self.thresholds.items()},
+            "observed": self.observed,
+            "flagged": self.flagged,
+            "throttled": self.throttled,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,217 @@
+# =============================================================================
+# distributed_limiter.py - 여러 API 노드가 공유하는 요청 제한 (DB 카운터 + 로컬 선할당)
+# =============================================================================
+# 메모리/공유 메모리 제한은 호스트 단위라 nginx 뒤에 노드가 여러 대면 한도가 노드 수만큼 늘어남
+# → 기존 DB(PostgreSQL 권장, UNLOGGED rate_limit_counters)에 1분 고정 윈도우 카운터를 두고
+#   노드마다 토큰을 batch 개씩 묶어 가져가 로컬에서 소비
+#
+#   acquire(key) (이벤트 루프에서 사용):
+#     노드 로컬 토큰 버킷이 거부   → 거부 (DB 호출 없음, 이 노드만으로 이미 한도 초과)
+#     로컬에 남은 토큰 있음       → 1개 소비 (DB 호출 없음)
+#     이번 윈도우 소진 확인됨     → 거부 (DB 호출 없음, 남용 클라이언트도 윈도우당 한 번만 DB 접근)
+#     그 외                       → DB 에서 최대 batch 개 선할당 (upsert 한 번, 스레드에서 실행)
+#                                   같은 키의 동시 요청은 진행 중인 선할당 하나를 함께 기다림
+#
+#   - 노드당 DB 왕복은 키·윈도우마다 약 batch 요청에 한 번
+#   - 선할당 자체도 노드 전체 초당 claims_per_second 회로 제한
+#     → 위조한 키를 계속 바꿔 보내도 DB 쓰기는 이 속도를 넘지 않음 (넘는 요청은 로컬 버킷으로 판단)
+#   - 선할당하고 못 쓴 토큰은 윈도우가 끝나면 버려짐 (batch 가 클수록 다른 노드가 먼저 소진될 수 있음)
+#   - 고정 윈도우라 경계 직전/직후에 최대 2배까지 몰릴 수 있음
+#   - DB 오류 시 노드 로컬 토큰 버킷으로 대체 (제한이 완전히 풀리지 않도록)
+#   allow(key) 는 같은 판단을 동기로 (DB 를 직접 호출하므로 이벤트 루프 밖에서만)
+# =============================================================================
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from database import DatabaseInterface
+from rate_limiter import TokenBucketLimiter
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+_WINDOW, _REMAINING, _EXHAUSTED = 0, 1, 2
+
+
+class DistributedRateLimiter:
+    """
+    DB 카운터 기반 요청 제한 (TokenBucketLimiter 와 같은 인터페이스, 단일 이벤트 루프 전제)
+
+    사용법:
+        limiter = DistributedRateLimiter(db, "ip", rate_per_minute=10, batch=5)
+        if not await limiter.acquire(ip):
+            retry = limiter.retry_after(ip)     # 현재 윈도우가 끝날 때까지 남은 초
+    """
+
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        name: str,
+        rate_per_minute: int,
+        batch: int = 5,
+        max_keys: int = 100_000,
+        claims_per_second: int = 100,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.db = db
+        self.name = name  # DB 키 접두사 (ip / device 가 같은 테이블 공유)
+        self.limit = rate_per_minute
+        self.batch = max(1, min(batch, rate_per_minute or 1))
+        self.max_keys = max_keys
+        self.claims_per_second = claims_per_second
+        self.clock = clock
+        self._local: "OrderedDict[str, List[Any]]" = OrderedDict()  # 키 → [윈도우, 남은 토큰, 소진 여부]
+        # 노드 로컬 키별 토큰 버킷 (DB 앞 사전 확인 + 선할당 불가/DB 오류 시 대체)
+        self._bucket = TokenBucketLimiter(rate_per_minute, max_keys=max_keys)
+        # 노드 전체 DB 선할당 횟수 제한 (0이면 제한 없음)
+        self._claim_budget = TokenBucketLimiter(claims_per_second * 60, burst=claims_per_second, max_keys=1)
+        self._claims: Dict[str, "asyncio.Future[bool]"] = {}  # 키 → 진행 중인 선할당
+        self.allowed = 0
+        self.limited = 0
+        self.db_claims = 0
+        self.db_errors = 0
+        self.local_decisions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def _window(self) -> int:
+        return int(self.clock()) // WINDOW_SECONDS * WINDOW_SECONDS
+
+    def _entry(self, key: str, window: int) -> List[Any]:
+        entry = self._local.get(key)
+        if entry is None:
+            if len(self._local) >= self.max_keys:
+                self._local.popitem(last=False)
+            entry = self._local[key] = [window, 0, False]
+        else:
+            self._local.move_to_end(key)
+            if entry[_WINDOW] != window:  # 새 윈도우: 지난 선할당분은 버림
+                entry[:] = [window, 0, False]
+        return entry
+
+    def _precheck(self, key: str) -> Optional[bool]:
+        """DB 없이 결정되면 결과, 아니면 None"""
+        if self.limit <= 0:
+            return True
+        if not self._bucket.allow(key):
+            self.limited += 1
+            return False
+        return None
+
+    @staticmethod
+    def _needs_claim(entry: List[Any]) -> bool:
+        return entry[_REMAINING] <= 0 and not entry[_EXHAUSTED]
+
+    def _apply(self, entry: List[Any], window: int, granted: int) -> None:
+        self.db_claims += 1
+        if entry[_WINDOW] == window:  # 기다리는 동안 윈도우가 바뀌었으면 버림
+            entry[_REMAINING] += granted
+            entry[_EXHAUSTED] = granted < self.batch  # 한도에 닿음 → 이번 윈도우는 더 묻지 않음
+
+    def _claim_failed(self, error: Exception) -> None:
+        self.db_errors += 1
+        logger.warning("Counter claim failed, using local limiter: %s", error)
+
+    def _local_decision(self) -> bool:
+        """DB 를 쓰지 않고 로컬 버킷 결과(이미 허용)로 판단"""
+        self.local_decisions += 1
+        self.allowed += 1
+        return True
+
+    def _take(self, entry: List[Any]) -> bool:
+        if entry[_REMAINING] <= 0:
+            self.limited += 1
+            return False
+        entry[_REMAINING] -= 1
+        self.allowed += 1
+        return True
+
+    async def _claim(self, key: str, entry: List[Any]) -> bool:
+        """DB 선할당 (스레드에서 실행) → 결과를 entry 에 반영, DB 오류면 False"""
+        window = entry[_WINDOW]
+        try:
+            granted = await asyncio.to_thread(
+                self.db.claim_rate_tokens, f"{self.name}:{key}", window, self.batch, self.limit
+            )
+        except Exception as e:  # DB 일시 오류: 이 노드의 토큰 버킷으로 대체
+            self._claim_failed(e)
+            return False
+        finally:
+            self._claims.pop(key, None)
+        self._apply(entry, window, granted)
+        return True
+
+    async def acquire(self, key: str) -> bool:
+        """토큰이 있으면 소비하고 True, 없으면 False (모든 노드 합산, DB 호출은 스레드에서)"""
+        decided = self._precheck(key)
+        if decided is not None:
+            return decided
+        entry = self._entry(key, self._window())
+
+        while self._needs_claim(entry):
+            claim = self._claims.get(key)
+            if claim is None:
+                if not self._claim_budget.allow(""):
+                    return self._local_decision()
+                claim = self._claims[key] = asyncio.ensure_future(self._claim(key, entry))
+            # 기다리던 요청이 취소돼도 선할당은 끝까지 (다른 요청이 함께 기다림)
+            if not await asyncio.shield(claim):
+                return self._local_decision()
+        return self._take(entry)
+
+    def allow(self, key: str) -> bool:
+        """acquire 의 동기 버전 (DB 를 직접 호출하므로 이벤트 루프 밖에서만)"""
+        decided = self._precheck(key)
+        if decided is not None:
+            return decided
+        entry = self._entry(key, self._window())
+
+        if self._needs_claim(entry):
+            if not self._claim_budget.allow(""):
+                return self._local_decision()
+            window = entry[_WINDOW]
+            try:
+                granted = self.db.claim_rate_tokens(f"{self.name}:{key}", window, self.batch, self.limit)
+            except Exception as e:
+                self._claim_failed(e)
+                return self._local_decision()
+            self._apply(entry, window, granted)
+        return self._take(entry)
+
+    def is_limited(self, key: str) -> bool:
+        """DB 호출/토큰 소비 없이 지금 거부될지 확인 (로컬 버킷 소진 또는 이번 윈도우 소진이 확인된 키)"""
+        if self.limit <= 0:
+            return False
+        if self._bucket.is_limited(key):
+            return True
+        entry = self._local.get(key)
+        return entry is not None and entry[_WINDOW] == self._window() and entry[_EXHAUSTED] and entry[_REMAINING] <= 0
+
+    def retry_after(self, key: str) -> int:
+        """현재 윈도우가 끝날 때까지 남은 시간(초, 최소 1)"""
+        now = self.clock()
+        return max(1, math.ceil(WINDOW_SECONDS - now % WINDOW_SECONDS))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약 (allowed/limited/db_claims 는 이 노드에서 센 값)"""
+        return {
+            "backend": "database",
+            "rate_per_minute": self.limit,
+            "batch": self.batch,
+            "keys": len(self._local),
+            "max_keys": self.max_keys,
+            "claims_per_second": self.claims_per_second,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "db_claims": self.db_claims,
+            "db_errors": self.db_errors,
+            "local_decisions": self.local_decisions,
+        }
@@ -0,0 +1,295 @@
+# =============================================================================
+# gemini_client.py - Gemini API 호출 레이어 (재시도 / 백오프 / 헤지 요청)
+# =============================================================================
+# - 429/5xx 등 일시적 오류는 지수 백오프 + 지터로 재시도
+# - Retry-After 헤더 (또는 Gemini RetryInfo.retryDelay) 준수
+# - 선택적 헤지 요청: p95 지연 이후 두 번째 요청을 병렬 발송, 먼저 끝난 응답 사용
+# - 요청당 재시도 예산(retry budget)으로 추가 호출 수 제한
+# - 서킷 브레이커 연동: open 상태면 호출 없이 CircuitOpenError 발생
+# generateContent는 부작용이 없는 호출이므로 재시도/중복 발송이 안전함
+# =============================================================================
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
+
+import httpx
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# 재시도 대상 HTTP 상태 코드 (Rate Limit / 일시적 서버 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 요청 본문: dict 또는 미리 인코딩된 JSON bytes
+Payload = Union[dict, bytes]
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    재시도 대기 시간(초) 추출
+
+    1. Retry-After 헤더 (초 단위 숫자 또는 HTTP-date)
+    2. Gemini 에러 본문의 RetryInfo.retryDelay (예: "13s")
+    """
+    header = response.headers.get("Retry-After")
+    if header:
+        header = header.strip()
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(header)
+                return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    try:
+        details = response.json().get("error", {}).get("details", [])
+    except (ValueError, AttributeError):
+        return None
+    for detail in details if isinstance(details, list) else []:
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return max(0.0, float(delay[:-1]))
+            except ValueError:
+                continue
+    return None
+
+
+class LatencyTracker:
+    """최근 성공 호출 지연 시간(초) 롤링 윈도우 - 헤지 지연 계산용"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """백분위 지연 (샘플이 없으면 None)"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class GeminiClient:
+    """
+    Gemini generateContent 호출 래퍼
+
+    사용법:
+        client = GeminiClient(api_key)
+        response = await client.generate(url, payload)
+
+    반환값은 마지막 httpx.Response 이며, 모든 시도가 네트워크 오류로 끝나면
+    마지막 httpx.RequestError 를 그대로 발생시킴 (기존 에러 처리와 호환)
+    breaker가 open 상태면 CircuitOpenError 발생
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        retry_after_max: float = 20.0,
+        hedge_enabled: bool = False,
+        hedge_min_delay: float = 2.0,
+        hedge_min_samples: int = 20,
+        retry_budget: int = 3,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.retry_budget = retry_budget
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """커넥션 재사용을 위한 공유 AsyncClient (지연 생성)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def aclose(self) -> None:
+        """공유 클라이언트 종료 (서버 종료 시 호출)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    async def call(self, method: str, url: str, payload: Optional[dict] = None) -> httpx.Response:
+        """단순 API 호출 (재시도 없음) - cachedContents 관리 등 보조 요청용"""
+        return await self._get_client().request(
+            method,
+            url,
+            headers={"x-goog-api-key": self.api_key},
+            json=payload,
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """헤지 요청 발송 지연 (p95 기반, 샘플 부족 또는 비활성 시 None)"""
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(95))
+
+    def _backoff(self, attempt: int) -> float:
+        """지수 백오프 + Full Jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _post(self, url: str, payload: Payload) -> httpx.Response:
+        """
+        단일 POST 시도 (성공 시 지연 시간 기록)
+
+        응답 헤더 수신 시점(TTFB)과 본문 수신 완료 시점을
+        response.extensions["timing"] = {"ttfb": 초, "elapsed": 초} 로 기록
+        """
+        started = time.monotonic()
+        client = self._get_client()
+        headers = {"x-goog-api-key": self.api_key}  # 헤더로 API 키 전송 (보안 강화)
+        if isinstance(payload, bytes):
+            # 미리 인코딩된 본문은 그대로 전송 (재시도/헤지 시에도 재인코딩 없음)
+            headers["Content-Type"] = "application/json"
+            request = client.build_request("POST", url, headers=headers, content=payload)
+        else:
+            request = client.build_request("POST", url, headers=headers, json=payload)
+
+        response = await client.send(request, stream=True)
+        ttfb = time.monotonic() - started
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        elapsed = time.monotonic() - started
+        response.extensions["timing"] = {"ttfb": ttfb, "elapsed": elapsed}
+        if response.status_code == 200:
+            self.latency.record(elapsed)
+        return response
+
+    async def _attempt(self, url: str, payload: Payload, budget: list) -> httpx.Response:
+        """
+        한 번의 논리적 시도 (선택적 헤지 포함)
+
+        먼저 도착한 '최종' 응답(200 또는 재시도 불가 상태)을 반환하고
+        나머지 진행 중인 요청은 취소함
+        """
+        delay = self.hedge_delay()
+        tasks = {asyncio.ensure_future(self._post(url, payload))}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        last_response: Optional[httpx.Response] = None
+
+        try:
+            while tasks:
+                timeout = delay if (delay is not None and not hedged and budget[0] > 0) else None
+                done, tasks = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # p95 이내에 응답이 없으면 헤지 요청 발송 (예산 1 소모)
+                    budget[0] -= 1
+                    hedged = True
+                    tasks.add(asyncio.ensure_future(self._post(url, payload)))
+                    continue
+
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    response = task.result()
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        return response
+                    last_response = response
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    async def generate(self, url: str, payload: Payload, breaker: Optional[CircuitBreaker] = None) -> httpx.Response:
+        """
+        서킷 브레이커 + 재시도/백오프/헤지를 적용한 generateContent 호출
+
+        breaker 를 지정하면 기본 breaker 대신 사용 (모델별 브레이커)
+        """
+        breaker = breaker or self.breaker
+        if breaker is None:
+            return await self._generate(url, payload)
+
+        if not breaker.allow_request():
+            raise CircuitOpenError(breaker.retry_after())
+
+        started = time.monotonic()
+        recorded = False
+        try:
+            response = await self._generate(url, payload)
+            # 429/5xx만 업스트림 장애로 간주 (4xx는 요청 자체의 문제)
+            breaker.record(
+                success=response.status_code not in RETRYABLE_STATUS_CODES,
+                latency=time.monotonic() - started,
+            )
+            recorded = True
+            return response
+        except httpx.RequestError:
+            breaker.record(success=False, latency=time.monotonic() - started)
+            recorded = True
+            raise
+        finally:
+            if not recorded:
+                breaker.release()
+
+    async def _generate(self, url: str, payload: Payload) -> httpx.Response:
+        """재시도/백오프/헤지를 적용한 generateContent 호출"""
+        deadline = time.monotonic() + self.timeout
+        budget = [self.retry_budget]  # 재시도 + 헤지 공용 예산
+        attempt = 0
+
+        while True:
+            try:
+                response = await self._attempt(url, payload, budget)
+                error: Optional[httpx.RequestError] = None
+            except httpx.RequestError as e:
+                response, error = None, e
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+
+            # 재시도 가능 여부 판단 (횟수 / 예산)
+            if attempt >= self.max_retries or budget[0] <= 0:
+                break
+
+            wait = self._backoff(attempt)
+            if response is not None:
+                retry_after = parse_retry_after(response)
+                if retry_after is not None:
+                    if retry_after > self.retry_after_max:
+                        break  # 서버가 요구하는 대기 시간이 너무 길면 즉시 실패
+                    wait = retry_after + random.uniform(0, self.backoff_base)
+
+            # 전체 제한 시간을 넘기는 재시도는 하지 않음
+            if time.monotonic() + wait >= deadline:
+                break
+
+            await asyncio.sleep(wait)
+            budget[0] -= 1
+            attempt += 1
+
+        if response is not None:
+            return response
+        raise error
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# =============================================================================
+# gemini_stub.py - 로컬 Gemini API 스텁 서버 (부하 테스트 / 장애 재현용)
+# =============================================================================
+# generateContent / streamGenerateContent / cachedContents 를 흉내 냄
+# 지연 분포, 5xx 에러율, 429 비율, 깨진 출력(잘린 JSON / 코드 펜스) 비율 설정 가능
+#
+# 실행:
+#   python gemini_stub.py --port 8090 --latency lognormal:1.2,0.4 --error-rate 0.02 --rate-limit-rate 0.05
+#   GEMINI_API_BASE=http://127.0.0.1:8090/v1beta uvicorn main:app --port 3000
+#
+# 실행 중 설정 변경: POST /stub/config {"error_rate": 0.5}   조회: GET /stub/config
+# =============================================================================
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    latency: str = "lognormal:1.0,0.35"  # fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA (초)
+    error_rate: float = 0.0  # 500/503 비율
+    rate_limit_rate: float = 0.0  # 429 비율
+    malformed_rate: float = 0.0  # 깨진 출력 비율 (잘린 JSON / 코드 펜스 + 설명문)
+    retry_delay: float = 2.0  # 429 응답의 RetryInfo.retryDelay (초)
+    stream_chunks: int = 4  # streamGenerateContent 분할 수
+    seed: Optional[int] = None
+
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    """지연 분포 문자열 → 샘플(초)"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return median * rng.lognormvariate(0, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+# 분석 결과 샘플 (AnalyzeResponse 형태)
+SAMPLE_RESULT = {
+    "oneLiner": "이번 달은 카페가 월급을 나눠 가졌네요.",
+    "summary": "예산의 68%를 사용했으며 식비 비중이 가장 큽니다. 남은 기간 지출 속도를 조금 줄이면 예산 내 유지가 가능합니다.",
+    "insights": ["식비가 전체 지출의 42%를 차지합니다.", "주말 지출이 평일보다 1.8배 많습니다.", "고정지출은 안정적입니다."],
+    "warnings": ["카페 지출이 지난달보다 35% 증가했습니다."],
+    "suggestions": ["주 2회는 도시락을 준비해보세요.", "카페 지출 한도를 주 2만원으로 정해보세요."],
+    "spendingPlan": "남은 12일간 하루 평균 2만5천원 이내로 지출하면 예산 내 유지가 가능합니다.",
+    "pattern": {"mainCategory": "식비", "spendingTrend": "increasing", "savingPotential": 85000, "riskLevel": "medium"},
+}
+
+
+def _prompt_tokens(body: dict) -> int:
+    text = json.dumps(body.get("contents", []), ensure_ascii=False)
+    return max(1, len(text) // 3)
+
+
+def _candidate(text: str, finish_reason: str = "STOP") -> dict:
+    return {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": finish_reason, "index": 0}
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Gemini Stub")
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "malformed": 0}
+    caches = {}
+
+    def pick_outcome() -> str:
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            return "rate_limited"
+        if roll < config.rate_limit_rate + config.error_rate:
+            return "error"
+        if roll < config.rate_limit_rate + config.error_rate + config.malformed_rate:
+            return "malformed"
+        return "ok"
+
+    def error_response(outcome: str) -> JSONResponse:
+        stats["rate_limited" if outcome == "rate_limited" else "errors"] += 1
+        if outcome == "rate_limited":
+            return JSONResponse(status_code=429, content={"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Resource has been exhausted (stub)",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{config.retry_delay:g}s"}],
+            }})
+        status = rng.choice([500, 503])
+        return JSONResponse(status_code=status, content={"error": {
+            "code": status, "status": "UNAVAILABLE", "message": "The model is overloaded (stub)",
+        }})
+
+    def result_text(outcome: str) -> tuple:
+        text = json.dumps(SAMPLE_RESULT, ensure_ascii=False)
+        if outcome != "malformed":
+            return text, "STOP"
+        stats["malformed"] += 1
+        if rng.random() < 0.5:
+            return text[: rng.randint(len(text) // 3, len(text) - 5)], "MAX_TOKENS"
+        return f"```json\n{text}\n```\n위 분석은 참고용입니다.", "STOP"
+
+    async def handle(body: dict) -> tuple:
+        """(outcome, 응답 텍스트, finishReason, usageMetadata) - 지연 포함"""
+        stats["requests"] += 1
+        await asyncio.sleep(sample_latency(config.latency, rng))
+        outcome = pick_outcome()
+        text, finish = result_text(outcome) if outcome in ("ok", "malformed") else ("", "")
+        prompt_tokens = _prompt_tokens(body)
+        if body.get("cachedContent") in caches:
+            prompt_tokens += caches[body["cachedContent"]]["tokens"]
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": max(1, len(text) // 3),
+            "totalTokenCount": prompt_tokens + max(1, len(text) // 3),
+        }
+        if body.get("cachedContent") in caches:
+            usage["cachedContentTokenCount"] = caches[body["cachedContent"]]["tokens"]
+        return outcome, text, finish, usage
+
+    @app.post("/v1beta/models/{target}")
+    async def models(target: str, request: Request):
+        model, _, method = target.partition(":")
+        body = await request.json()
+        if body.get("cachedContent") and body["cachedContent"] not in caches:
+            return JSONResponse(status_code=403, content={"error": {
+                "code": 403, "message": f"CachedContent not found (or permission denied): {body['cachedContent']}",
+            }})
+        outcome, text, finish, usage = await handle(body)
+        if outcome in ("error", "rate_limited"):
+            return error_response(outcome)
+
+        if method == "generateContent":
+            return {"candidates": [_candidate(text, finish)], "usageMetadata": usage, "modelVersion": model}
+
+        if method == "streamGenerateContent":
+            sse = request.query_params.get("alt") == "sse"
+            size = max(1, -(-len(text) // max(1, config.stream_chunks)))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+            async def stream():
+                if not sse:
+                    yield "["
+                for index, piece in enumerate(pieces):
+                    last = index == len(pieces) - 1
+                    chunk = {"candidates": [_candidate(piece, finish if last else None)], "modelVersion": model}
+                    if last:
+                        chunk["usageMetadata"] = usage
+                    data = json.dumps(chunk, ensure_ascii=False)
+                    if sse:
+                        yield f"data: {data}\r\n\r\n"
+                    else:
+                        yield data + ("" if last else ",")
+                    await asyncio.sleep(0.01)
+                if not sse:
+                    yield "]"
+
+            return StreamingResponse(stream(), media_type="text/event-stream" if sse else "application/json")
+
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"Unknown method {method}"}})
+
+    @app.post("/v1beta/cachedContents")
+    async def create_cache(request: Request):
+        body = await request.json()
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        caches[name] = {"tokens": _prompt_tokens(body) + 200, "created": time.time()}
+        return {"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": caches[name]["tokens"]}}
+
+    @app.patch("/v1beta/cachedContents/{cache_id}")
+    async def update_cache(cache_id: str):
+        name = f"cachedContents/{cache_id}"
+        if name not in caches:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "CachedContent not found"}})
+        return {"name": name}
+
+    @app.delete("/v1beta/cachedContents/{cache_id}")
+    async def delete_cache(cache_id: str):
+        caches.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    @app.get("/stub/config")
+    async def get_config():
+        return {"config": asdict(config), "stats": stats, "caches": len(caches)}
+
+    @app.post("/stub/config")
+    async def set_config(request: Request):
+        """실행 중 설정 변경 (장애 주입 시나리오용), stats 초기화는 {"reset": true}"""
+        updates = await request.json()
+        if updates.pop("reset", False):
+            for key in stats:
+                stats[key] = 0
+            caches.clear()
+        for key, value in updates.items():
+            if not hasattr(config, key):
+                continue
+            current = getattr(config, key)
+            if isinstance(current, float):
+                value = float(value)
+            elif isinstance(current, int):
+                value = int(value)
+            setattr(config, key, value)
+        return {"config": asdict(config)}
+
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local Gemini API stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", default=StubConfig.latency,
+                        help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--retry-delay", type=float, default=2.0)
+    parser.add_argument("--stream-chunks", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    stub_config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        retry_delay=args.retry_delay,
+        stream_chunks=args.stream_chunks,
+        seed=args.seed,
+    )
+    sample_latency(stub_config.latency, random.Random())  # 잘못된 분포 문자열 조기 검출
+    uvicorn.run(create_app(stub_config), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,318 @@
+# =============================================================================
+# ip_filter.py - CIDR 허용/차단 목록 (이진 radix 트리 최장 접두사 매칭 + 핫 리로드)
+# =============================================================================
+# 남용 네트워크 차단과 헬스 체커/내부 도구의 요청 제한 면제를 IP 대역으로 설정
+#
+#   목록 파일 (JSON, 선택)
+#     {"format": 1, "version": "...", "allow": ["10.0.0.0/8", ...], "deny": ["203.0.113.0/24", "2001:db8::/32"]}
+#   + 환경변수 목록 (고정, 파일과 합쳐짐)
+#
+#   조회 (IPv4 / IPv6 각각 트리 하나)
+#     주소 비트를 위에서부터 따라 내려가며 규칙이 달린 마지막 노드 = 가장 긴 접두사
+#     → 규칙 수와 무관하게 O(접두사 길이), 등록된 가장 긴 접두사보다 깊이 내려가지 않음
+#     더 구체적인 규칙이 이김 (예: deny 10.0.0.0/8 + allow 10.1.2.0/24 → 10.1.2.x 허용)
+#     같은 대역이 양쪽에 있으면 deny
+#     IPv4-mapped IPv6 (::ffff:a.b.c.d) 는 IPv4 로 조회
+#
+#   핫 리로드
+#     파일의 (mtime, 크기)를 주기적으로 확인하거나 관리자 API 로 강제 리로드
+#     새 트리를 완전히 만든 뒤 참조 하나만 교체, 파일이 깨져 있으면 기존 규칙 유지
+#
+#   클라이언트 주소 (TrustedProxies)
+#     X-Forwarded-For 는 클라이언트가 임의로 채워 보낼 수 있음 (nginx 는 $proxy_add_x_forwarded_for 로 뒤에 덧붙임)
+#     → 직접 연결한 상대가 신뢰 프록시일 때만 헤더를 보고, 오른쪽부터 신뢰 프록시가 아닌 첫 주소를 사용
+# =============================================================================
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACCESS_LIST_FORMAT = 1
+
+ALLOW = "allow"
+DENY = "deny"
+
+_ZERO, _ONE, _ACTION = 0, 1, 2
+
+
+class AccessListError(ValueError):
+    """목록 파일/CIDR 형식 오류"""
+
+
+def parse_networks(entries: Iterable[str], source: str) -> List[Any]:
+    """CIDR 문자열 목록 → ip_network 목록 (호스트 비트는 무시, 접두사 없으면 단일 주소)"""
+    networks = []
+    for entry in entries:
+        if not isinstance(entry, str):
+            raise AccessListError(f"'{source}' entries must be strings")
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError as e:
+            raise AccessListError(f"Invalid CIDR in '{source}': {entry} ({e})") from e
+    return networks
+
+
+def read_access_list(path: str) -> Tuple[str, List[Any], List[Any]]:
+    """목록 파일 → (버전, 허용 대역, 차단 대역)"""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        raise AccessListError(f"Cannot read access list {path}: {e}") from e
+
+    if not isinstance(data, dict) or data.get("format") != ACCESS_LIST_FORMAT:
+        raise AccessListError(f"Unsupported access list format (expected format={ACCESS_LIST_FORMAT})")
+    lists = []
+    for action in (ALLOW, DENY):
+        entries = data.get(action, [])
+        if not isinstance(entries, list):
+            raise AccessListError(f"'{action}' must be a list of CIDR strings")
+        lists.append(parse_networks(entries, action))
+    return str(data.get("version", "")), lists[0], lists[1]
+
+
+class CidrTrie:
+    """
+    주소 비트 단위 radix 트리 (노드 = [0 자식, 1 자식, 규칙])
+
+    사용법:
+        trie = CidrTrie(32)
+        trie.insert(int(net.network_address), net.prefixlen, "deny")
+        trie.lookup(int(ipaddress.IPv4Address("10.1.2.3")))   # 가장 긴 접두사의 규칙 또는 None
+    """
+
+    __slots__ = ("bits", "root", "prefixes", "nodes")
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.root: List[Any] = [None, None, None]
+        self.prefixes = 0
+        self.nodes = 1
+
+    def insert(self, address: int, prefix_len: int, action: str) -> None:
+        node = self.root
+        for shift in range(self.bits - 1, self.bits - 1 - prefix_len, -1):
+            bit = (address >> shift) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+                self.nodes += 1
+            node = child
+        if node[_ACTION] is None:
+            self.prefixes += 1
+        if node[_ACTION] != DENY:  # 같은 대역이 양쪽에 있으면 차단 우선
+            node[_ACTION] = action
+
+    def lookup(self, address: int) -> Optional[str]:
+        node = self.root
+        best = node[_ACTION]
+        for shift in range(self.bits - 1, -1, -1):
+            node = node[(address >> shift) & 1]
+            if node is None:
+                break
+            if node[_ACTION] is not None:
+                best = node[_ACTION]
+        return best
+
+
+class AccessRules:
+    """한 번 컴파일된 규칙 집합 (교체만 하고 수정하지 않음)"""
+
+    __slots__ = ("v4", "v6", "allow", "deny")
+
+    def __init__(self, allow: Iterable[Any], deny: Iterable[Any]):
+        self.v4 = CidrTrie(32)
+        self.v6 = CidrTrie(128)
+        self.allow = self.deny = 0
+        for action, networks in ((ALLOW, allow), (DENY, deny)):
+            for network in networks:
+                trie = self.v4 if network.version == 4 else self.v6
+                trie.insert(int(network.network_address), network.prefixlen, action)
+                if action == ALLOW:
+                    self.allow += 1
+                else:
+                    self.deny += 1
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """IP 문자열 → "allow" / "deny" / None (규칙 없음, 주소가 아니면 None)"""
+        if not (self.v4.prefixes or self.v6.prefixes):
+            return None
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6:
+            if address.ipv4_mapped is None:
+                return self.v6.lookup(int(address))
+            address = address.ipv4_mapped
+        return self.v4.lookup(int(address))
+
+
+class TrustedProxies:
+    """
+    신뢰 프록시 대역 → 요청의 실제 클라이언트 주소
+
+    사용법:
+        proxies = TrustedProxies(["127.0.0.1", "::1"])
+        proxies.client_ip(peer, x_forwarded_for, x_real_ip)
+
+    직접 연결한 상대(peer)가 신뢰 프록시가 아니면 헤더는 모두 무시하고 peer
+    신뢰 프록시면 X-Forwarded-For 를 오른쪽부터 훑어 신뢰 프록시가 아닌 첫 주소
+    (모두 신뢰 프록시면 가장 왼쪽), 헤더가 없으면 프록시가 덮어쓴 X-Real-IP, 그것도 없으면 peer
+    """
+
+    def __init__(self, networks: Iterable[str] = ()):
+        self.networks = parse_networks(networks, "TRUSTED_PROXIES")
+        self.rules = AccessRules(self.networks, ())
+
+    def is_trusted(self, ip: str) -> bool:
+        return self.rules.lookup(ip) == ALLOW
+
+    def client_ip(self, peer: str, forwarded: Optional[str] = None, real_ip: Optional[str] = None) -> str:
+        if not self.is_trusted(peer):
+            return peer
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            for hop in reversed(hops):
+                if not self.is_trusted(hop):
+                    return hop
+            if hops:
+                return hops[0]
+        if real_ip and real_ip.strip():
+            return real_ip.strip()
+        return peer
+
+
+class IpAccessList:
+    """
+    목록 파일 + 고정 목록 → 현재 규칙 (원자적 교체)
+
+    사용법:
+        access = IpAccessList(path, allow=["10.0.0.0/8"], deny=[])
+        access.load()                       # 시작 시 (파일이 없으면 고정 목록만)
+        access.lookup(ip)                   # 요청마다 → "allow" / "deny" / None
+        await access.start()                # 파일 변경 감시 루프
+        await access.reload()               # 관리자 강제 리로드
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        allow: Iterable[str] = (),
+        deny: Iterable[str] = (),
+        poll_seconds: float = 5.0,
+    ):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.static_allow = parse_networks(allow, "IP_ALLOW_CIDRS")
+        self.static_deny = parse_networks(deny, "IP_DENY_CIDRS")
+        self.rules = AccessRules(self.static_allow, self.static_deny)
+        self.version = "static"
+        self.load_ms = 0.0
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.allowed = 0
+        self.denied = 0
+        self._stat: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        if not self.path:
+            return None
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> Dict[str, Any]:
+        """목록 파일을 읽어 규칙 교체 (형식 오류 시 AccessListError, 기존 규칙 유지)"""
+        started = time.perf_counter()
+        file_stat = self._file_stat()
+        version, allow, deny = "static", [], []
+        if file_stat is not None:
+            try:
+                version, allow, deny = read_access_list(self.path)
+            except AccessListError as e:
+                self._stat = file_stat  # 같은 깨진 파일로 반복 시도하지 않음
+                self.errors += 1
+                self.last_error = str(e)
+                raise
+
+        self.rules = AccessRules(self.static_allow + allow, self.static_deny + deny)
+        self.version = version
+        self.load_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.loaded_at = time.time()
+        self.reloads += 1
+        self.last_error = None
+        self._stat = file_stat
+        return self.snapshot()
+
+    def lookup(self, ip: str) -> Optional[str]:
+        action = self.rules.lookup(ip)
+        if action == ALLOW:
+            self.allowed += 1
+        elif action == DENY:
+            self.denied += 1
+        return action
+
+    def changed(self) -> bool:
+        """마지막 로드 이후 목록 파일이 바뀌었는지 (생성/삭제 포함)"""
+        return self._file_stat() != self._stat
+
+    async def reload(self) -> Dict[str, Any]:
+        """목록 다시 읽기 (트리 생성은 스레드에서, 동시 리로드는 하나씩)"""
+        async with self._lock:
+            return await asyncio.to_thread(self.load)
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            if not self.changed():
+                continue
+            try:
+                info = await self.reload()
+                logger.info("Reloaded version=%s allow=%d deny=%d (%sms)",
+                            info["version"], info["allow"], info["deny"], info["load_ms"])
+            except AccessListError as e:
+                logger.warning("Reload failed, keeping previous rules: %s", e)
+
+    async def start(self) -> None:
+        """파일 변경 감시 시작 (파일 미설정이거나 poll_seconds <= 0 이면 관리자 리로드만)"""
+        if self.path and self.poll_seconds > 0:
+            self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭/관리자 API 용 상태 요약 (allowed/denied 는 이 워커에서 센 값)"""
+        rules = self.rules
+        return {
+            "path": self.path,
+            "version": self.version,
+            "allow": rules.allow,
+            "deny": rules.deny,
+            "trie_nodes": rules.v4.nodes + rules.v6.nodes,
+            "load_ms": self.load_ms,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "allowed": self.allowed,
+            "denied": self.denied,
+        }
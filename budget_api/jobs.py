@@ -0,0 +1,147 @@
+# =============================================================================
+# jobs.py - 비동기 분석 작업 워커 풀
+# =============================================================================
+# POST /api/analyze/jobs 는 작업을 DB에 저장하고 즉시 job_id 반환
+# 프로세스 내 워커 N개가 큐에서 작업을 꺼내 분석 파이프라인을 실행
+# 작업 상태는 DB(analysis_jobs)에 저장되므로 재시작 후 미완료 작업을 다시 큐에 넣음
+#
+# 상태: queued → running → done / error
+#
+# uvicorn 워커가 여러 개여도 작업은 한 번만 실행:
+#   - 실행 전 claim_job (조건부 UPDATE) 으로 원자적으로 가져감 → 실패하면 다른 워커가 실행 중
+#   - 실행 중에는 임대(lease_until)를 주기적으로 연장, 프로세스가 죽으면 임대 만료 후 다른 워커가 복구
+#   - 결과 저장도 owner 조건부 → 임대를 잃은 워커의 늦은 결과는 버림
+# =============================================================================
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple
+
+from database import DatabaseInterface
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+# 작업 실행 함수: job row → (status_code, 결과 JSON 문자열 또는 에러 메시지)
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Tuple[int, str]]]
+
+
+class JobWorkerPool:
+    """
+    asyncio 기반 프로세스 내 워커 풀
+
+    사용법:
+        pool = JobWorkerPool(db, handler, workers=2)
+        await pool.start()          # 서버 시작 시 (미완료 작업 복구 포함)
+        pool.submit(job_id)         # 큐가 가득 차면 False
+        await pool.stop()           # 서버 종료 시
+
+    lease_seconds: 작업 임대 시간 (lease_seconds/3 마다 연장, 같은 주기로 만료된 작업 복구)
+    """
+
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        handler: JobHandler,
+        workers: int = 2,
+        max_queue: int = 100,
+        lease_seconds: float = 120.0,
+    ):
+        self.db = db
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.lease_seconds = lease_seconds
+        # 프로세스 식별자 (uvicorn 워커/호스트마다 다름)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[str] = set()  # 이 프로세스 큐에 들어 있는 작업 (중복 등록 방지)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """워커 시작 + 가져갈 수 있는 작업(대기 중 / 임대 만료) 재등록"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._recover()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_loop()))
+        logger.info("%d workers started as %s (recovered queue: %d)", self.workers, self.owner, self.queue_size)
+
+    async def stop(self) -> None:
+        """워커 종료 (진행 중 작업은 running 상태로 남아 임대 만료 후 재실행)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: str) -> bool:
+        """작업 큐에 등록 (큐가 가득 차면 False, 이미 큐에 있으면 True)"""
+        if self._queue is None:
+            return False
+        if job_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(job_id)
+        return True
+
+    def _recover(self) -> None:
+        """대기 중 / 임대 만료 작업을 큐에 등록 (큐가 가득 차면 queued 로 두고 다음 주기에 재시도)"""
+        for job_id in self.db.get_claimable_jobs():
+            if not self.submit(job_id):
+                break
+
+    async def _recover_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                self._recover()
+            except Exception:
+                logger.exception("job recovery failed")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.db.renew_job_lease(job_id, self.owner, self.lease_seconds):
+                logger.warning("lost lease on job %s", job_id)
+                return
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception:
+                # 워커는 어떤 예외에도 종료되지 않음
+                logger.exception("worker %d failed on job %s", index, job_id)
+                self.db.update_job(job_id, JOB_ERROR, status_code=500, error_message="Internal error", owner=self.owner)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.db.claim_job(job_id, self.owner, self.lease_seconds)
+        if job is None:
+            return  # 이미 끝났거나 다른 워커가 임대 중
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            status_code, payload = await self.handler(job)
+        finally:
+            heartbeat.cancel()
+        if status_code == 200:
+            stored = self.db.update_job(job_id, JOB_DONE, result_data=payload, status_code=200, owner=self.owner)
+        else:
+            stored = self.db.update_job(job_id, JOB_ERROR, status_code=status_code, error_message=payload, owner=self.owner)
+        if not stored:
+            logger.warning("discarded result of job %s (lease taken over)", job_id)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# =============================================================================
+# loadtest.py - /api/analyze 엔드투엔드 부하 테스트 (gemini_stub.py 와 함께 사용)
+# =============================================================================
+# 목표 RPS 로 요청을 보내는 open-loop 부하 생성기 (응답이 느려져도 발송 간격 유지)
+# 앱(markdown_export_service.dart)과 같은 형식의 가계부 마크다운 / 구조화 budget 페이로드 생성
+# 결과: 처리량, 지연 백분위, 상태 코드/예외별 에러 분류 + 저장된 기준선(baseline)과 비교
+#
+# 예시:
+#   # 1) 스텁 + 앱을 이 프로세스 안에서 실행 (가장 간단)
+#   python loadtest.py --spawn-stub --stub-args="--latency lognormal:0.8,0.3 --error-rate 0.02" \
+#       --rps 20 --duration 30 --save-baseline baseline.json
+#   # 2) 이미 실행 중인 서버 대상
+#   python loadtest.py --url http://127.0.0.1:3000 --rps 20 --duration 30 --baseline baseline.json
+#
+# in-process 모드는 usage.db 에 로그를 남기고, 부하 생성기와 앱이 같은 이벤트 루프를 공유함
+# (절대 수치보다 같은 조건에서의 기준선 비교 용도)
+# 요청마다 새 device_id 를 보내므로 in-process 모드는 분당 제한/기기 교체 감지를 기본으로 끔
+# (환경변수로 직접 지정하면 그 값 사용, --url 대상 서버는 서버 설정 그대로 → --spread-ips 권장)
+# =============================================================================
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BUDGET_NAMES = ["식비", "교통", "쇼핑", "문화생활", "카페", "생활용품", "월세", "통신비", "보험", "구독"]
+SUB_BUDGET_NAMES = {"식비": ["외식", "장보기", "배달"], "쇼핑": ["의류", "전자기기"], "교통": ["대중교통", "택시"]}
+MEMOS = ["점심", "저녁", "커피", "지하철", "택시", "마트", "편의점", "영화", "넷플릭스", "배달", "-"]
+FIXED = {"월세", "통신비", "보험", "구독"}
+TONES = ["gentle", "praise", "factual", "coach", "humorous"]
+
+
+# =============================================================================
+# 페이로드 생성
+# =============================================================================
+def _won(amount: int) -> str:
+    return f"{amount:,}원"
+
+
+def make_budget(rng: random.Random, expense_count: int, today: date) -> Dict[str, Any]:
+    """구조화 budget 페이로드 (BudgetPayload 형식)"""
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    names = rng.sample(BUDGET_NAMES, rng.randint(4, len(BUDGET_NAMES)))
+    budgets = [
+        {"id": f"b{i}", "name": name, "amount": rng.randrange(50_000, 800_000, 10_000),
+         "isRecurring": name in FIXED, "order": i}
+        for i, name in enumerate(names)
+    ]
+    sub_budgets = [
+        {"id": f"{budget['id']}s{j}", "budgetId": budget["id"], "name": sub,
+         "amount": budget["amount"] // len(SUB_BUDGET_NAMES[budget["name"]])}
+        for budget in budgets if budget["name"] in SUB_BUDGET_NAMES
+        for j, sub in enumerate(SUB_BUDGET_NAMES[budget["name"]])
+    ]
+    days = max(1, (today - start).days + 1)
+    expenses = []
+    for _ in range(expense_count):
+        budget = rng.choice(budgets)
+        subs = [sub for sub in sub_budgets if sub["budgetId"] == budget["id"]]
+        expenses.append({
+            "budgetId": budget["id"],
+            "subBudgetId": rng.choice(subs)["id"] if subs and rng.random() < 0.7 else None,
+            "amount": rng.randrange(1_000, 80_000, 100),
+            "date": str(start + timedelta(days=rng.randrange(days))),
+            "memo": rng.choice(MEMOS),
+        })
+    return {"startDate": str(start), "endDate": str(end), "today": str(today), "currency": "₩",
+            "budgets": budgets, "subBudgets": sub_budgets, "expenses": expenses}
+
+
+def render_markdown(budget: Dict[str, Any]) -> str:
+    """앱 MarkdownExportService 와 같은 형식의 마크다운"""
+    by_budget = Counter()
+    by_sub = Counter()
+    for expense in budget["expenses"]:
+        by_budget[expense["budgetId"]] += expense["amount"]
+        if expense["subBudgetId"]:
+            by_sub[expense["subBudgetId"]] += expense["amount"]
+    names = {b["id"]: b["name"] for b in budget["budgets"]}
+    sub_names = {s["id"]: s["name"] for s in budget["subBudgets"]}
+    total_budget = sum(b["amount"] for b in budget["budgets"])
+    total_expense = sum(by_budget.values())
+
+    lines = [f"## 가계부 분석 데이터 ({budget['startDate']} ~ {budget['endDate']})", "",
+             "### 예산 요약", "| 예산명 | 유형 | 예산 | 사용 | 잔여 | 사용률 |", "|------|------|------|------|------|--------|"]
+    for b in budget["budgets"]:
+        used = by_budget[b["id"]]
+        kind = "고정지출" if b["isRecurring"] else "변동지출"
+        lines.append(f"| {b['name']} | {kind} | {_won(b['amount'])} | {_won(used)} | "
+                     f"{_won(b['amount'] - used)} | {used / b['amount'] * 100:.1f}% |")
+    lines += [f"| **합계** | - | **{_won(total_budget)}** | **{_won(total_expense)}** | "
+              f"**{_won(total_budget - total_expense)}** | **{total_expense / total_budget * 100:.1f}%** |", ""]
+    if budget["subBudgets"]:
+        lines += ["### 세부예산 요약", "| 예산 | 세부예산 | 예산 | 사용 | 잔여 |", "|------|------|------|------|------|"]
+        for s in budget["subBudgets"]:
+            used = by_sub[s["id"]]
+            lines.append(f"| {names[s['budgetId']]} | {s['name']} | {_won(s['amount'])} | {_won(used)} | {_won(s['amount'] - used)} |")
+        lines.append("")
+    lines += ["### 지출 내역", "| 날짜 | 예산 | 유형 | 세부예산 | 내용 | 금액 |", "|------|------|------|------|------|------|"]
+    for e in sorted(budget["expenses"], key=lambda e: e["date"], reverse=True):
+        kind = "고정지출" if names[e["budgetId"]] in FIXED else "변동지출"
+        lines.append(f"| {e['date']} | {names[e['budgetId']]} | {kind} | {sub_names.get(e['subBudgetId'], '-')} | "
+                     f"{e['memo']} | {_won(e['amount'])} |")
+    lines += ["", "### 요약 통계", f"- 총 예산: {_won(total_budget)}", f"- 총 지출: {_won(total_expense)}",
+              f"- 총 잔여: {_won(total_budget - total_expense)}", f"- 지출 건수: {len(budget['expenses'])}건"]
+    return "\n".join(lines)
+
+
+def make_request(rng: random.Random, args: argparse.Namespace) -> Dict[str, Any]:
+    budget = make_budget(rng, rng.randint(args.min_expenses, args.max_expenses), date.today())
+    body: Dict[str, Any] = {
+        "language": rng.choice(args.languages),
+        "tone": rng.choice(TONES),
+        "device_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),  # 요청마다 새 기기 (일일 제한 회피)
+    }
+    if rng.random() < args.structured_ratio:
+        body["budget"] = budget
+    else:
+        body["data"] = render_markdown(budget)
+    return body
+
+
+# =============================================================================
+# 부하 실행
+# =============================================================================
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_load(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    # 요청 본문은 미리 생성 (생성 비용이 측정에 섞이지 않도록)
+    pool = [make_request(rng, args) for _ in range(min(args.payload_pool, int(args.rps * args.duration) + 1))]
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    tasks = []
+    dropped = 0
+
+    async def one(body: Dict[str, Any], ip: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/analyze", json=body, headers={"X-Forwarded-For": ip},
+                                         timeout=args.timeout)
+            outcomes[f"HTTP {response.status_code}"] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+        except httpx.HTTPError as e:
+            outcomes[type(e).__name__] += 1
+        finally:
+            in_flight.release()
+
+    total = int(args.rps * args.duration)
+    started = time.perf_counter()
+    target = started
+    for index in range(total):
+        # open-loop: 목표 시각까지 대기 (고정 간격 또는 Poisson 도착)
+        target += rng.expovariate(args.rps) if args.poisson else (1 / args.rps if index else 0.0)
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight.locked():
+            dropped += 1  # 동시 요청 상한 초과 → 발송하지 않고 기록
+            continue
+        await in_flight.acquire()
+        body = dict(pool[index % len(pool)], device_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)))
+        ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" if args.spread_ips else "10.0.0.1"
+        tasks.append(asyncio.ensure_future(one(body, ip)))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    ok = outcomes.get("HTTP 200", 0)
+    return {
+        "config": {"rps": args.rps, "duration": args.duration, "max_in_flight": args.max_in_flight,
+                   "expenses": [args.min_expenses, args.max_expenses], "structured_ratio": args.structured_ratio},
+        "sent": len(tasks),
+        "dropped": dropped,
+        "elapsed": round(elapsed, 2),
+        "throughput": round(ok / elapsed, 2) if elapsed else 0.0,
+        "success_rate": round(ok / len(tasks), 4) if tasks else 0.0,
+        "latency": {f"p{p}": round(v, 4) for p in (50, 90, 95, 99) if (v := percentile(latencies, p)) is not None},
+        "latency_max": round(max(latencies), 4) if latencies else None,
+        "outcomes": dict(outcomes.most_common()),
+    }
+
+
+# =============================================================================
+# 리포트 / 기준선 비교
+# =============================================================================
+def print_report(report: Dict[str, Any]) -> None:
+    print("\n=== Load Test Report ===")
+    print(f"sent: {report['sent']}  dropped: {report['dropped']}  elapsed: {report['elapsed']}s")
+    print(f"throughput (2xx/s): {report['throughput']}  success rate: {report['success_rate'] * 100:.2f}%")
+    print("latency: " + "  ".join(f"{k}={v * 1000:.0f}ms" for k, v in report["latency"].items())
+          + (f"  max={report['latency_max'] * 1000:.0f}ms" if report["latency_max"] else ""))
+    print("outcomes:")
+    for outcome, count in report["outcomes"].items():
+        print(f"  {outcome}: {count}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """기준선 대비 변화 출력, 허용치를 넘는 악화 항목 목록 반환"""
+    regressions = []
+    print(f"\n=== Baseline Comparison (tolerance {tolerance * 100:.0f}%) ===")
+    rows = [("throughput", report["throughput"], baseline.get("throughput"), True),
+            ("success_rate", report["success_rate"], baseline.get("success_rate"), True)]
+    rows += [(f"latency {k}", v, baseline.get("latency", {}).get(k), False) for k, v in report["latency"].items()]
+    for name, current, base, higher_is_better in rows:
+        if not base:
+            print(f"  {name}: {current} (no baseline)")
+            continue
+        change = (current - base) / base
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ("improved" if worse < -tolerance else "ok")
+        print(f"  {name}: {base} -> {current} ({change * 100:+.1f}%) {flag}")
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+# =============================================================================
+# 실행
+# =============================================================================
+def spawn_stub(port: int, stub_args: str) -> subprocess.Popen:
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "gemini_stub.py"),
+               "--port", str(port), *shlex.split(stub_args)]
+    process = subprocess.Popen(command)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stub/config", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Gemini stub did not start")
+
+
+# in-process 앱 기본 설정: 부하 생성기가 한 주소에서 요청마다 새 기기로 보내므로
+# 요청 제한/기기 교체 감지를 끄지 않으면 분석 파이프라인 대신 429 를 측정하게 됨
+IN_PROCESS_ENV = {
+    "GEMINI_API_KEY": "stub-key",
+    "IP_RATE_LIMIT_PER_MINUTE": "1000000",
+    "DEVICE_RATE_LIMIT_PER_MINUTE": "1000000",
+    "DEVICE_ROTATION_IP_THROTTLE": "0",
+    "DEVICE_ROTATION_NETWORK_THROTTLE": "0",
+}
+
+
+def configure_in_process_env(stub_url: str) -> None:
+    """main import 전에 호출 (이미 설정된 환경변수는 유지)"""
+    for key, value in IN_PROCESS_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["GEMINI_API_BASE"] = stub_url
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url) as client:
+            return await run_load(client, args)
+
+    # in-process: 실제 FastAPI 앱을 ASGI 로 직접 호출 (Gemini 호출은 스텁으로)
+    configure_in_process_env(args.stub_url)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main import app
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await run_load(client, args)
+    finally:
+        await app.router.shutdown()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end load test for /api/analyze")
+    target = parser.add_argument_group("target")
+    target.add_argument("--url", help="running server base URL (default: in-process app)")
+    target.add_argument("--stub-url", default="http://127.0.0.1:8090/v1beta", help="Gemini stub base (in-process mode)")
+    target.add_argument("--spawn-stub", action="store_true", help="start gemini_stub.py as a subprocess")
+    target.add_argument("--stub-args", default="", help="extra arguments for gemini_stub.py")
+    load = parser.add_argument_group("load")
+    load.add_argument("--rps", type=float, default=10.0)
+    load.add_argument("--duration", type=float, default=30.0, help="seconds")
+    load.add_argument("--max-in-flight", type=int, default=200)
+    load.add_argument("--timeout", type=float, default=120.0)
+    load.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of fixed spacing")
+    load.add_argument("--spread-ips", action="store_true", help="random X-Forwarded-For per request")
+    payload = parser.add_argument_group("payload")
+    payload.add_argument("--min-expenses", type=int, default=20)
+    payload.add_argument("--max-expenses", type=int, default=300)
+    payload.add_argument("--structured-ratio", type=float, default=0.3, help="share of structured budget payloads")
+    payload.add_argument("--languages", nargs="+", default=["ko", "en", "ja"])
+    payload.add_argument("--payload-pool", type=int, default=200)
+    payload.add_argument("--seed", type=int, default=42)
+    report = parser.add_argument_group("report")
+    report.add_argument("--save-baseline", help="write this run's report as the baseline")
+    report.add_argument("--baseline", help="compare against a stored baseline (exit 1 on regression)")
+    report.add_argument("--tolerance", type=float, default=0.10)
+    report.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    stub = None
+    if args.spawn_stub:
+        port = httpx.URL(args.stub_url).port or 8090
+        stub = spawn_stub(port, args.stub_args)
+    try:
+        result = asyncio.run(main_async(args))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait(timeout=5)
+
+    print_report(result)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] Baseline saved: {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n[FAIL] Regressions: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,411 @@
+# =============================================================================
+# local_insights.py - 규칙 기반 로컬 분석 (Gemini 없이 계산 가능한 부분)
+# =============================================================================
+# AnalyzeResponse 중 산술로 결정되는 값을 가계부 데이터에서 직접 계산
+#   - pattern.mainCategory / spendingTrend / savingPotential / riskLevel
+#   - spendingPlan (남은 기간 하루 사용 가능 금액)
+# 용도
+#   1. Gemini 장애/서킷 open 시 성능 저하(degraded) 응답 (수 ms)
+#   2. (선택) 일일 분석 한도 초과 시 429 대신 로컬 분석 제공
+#   3. (선택) 숫자 필드를 미리 계산해 프롬프트에 전달 → LLM은 문장만 작성
+#
+# 입력 형식 3가지 모두 지원 (같은 데이터면 같은 결과)
+#   - 구조화된 BudgetPayload (budget_payload.py)
+#   - 앱 마크다운 (markdown_export_service.dart 의 예산 요약 표 / 지출 내역 표)
+#   - 서버 canonical 텍스트 (render_budget_payload 결과, 비동기 작업/재분석 시)
+# =============================================================================
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from budget_payload import BudgetPayload, aggregate_budget, is_fixed_budget
+from prompt_compactor import amount_formatter, parse_amount, parse_expense_rows
+
+# 지출 추세 판단: 경과 기간 후반/전반 일평균 비율
+TREND_UP_RATIO = 1.2
+TREND_DOWN_RATIO = 0.8
+TREND_MIN_DAYS = 6  # 경과 일수가 이보다 적으면 stable
+
+# 위험도: 기간 말 예상 지출 / 총 예산
+RISK_HIGH_RATIO = 1.0
+RISK_MEDIUM_RATIO = 0.9
+
+# 절약 가능액: 변동지출 예상액 중 줄일 수 있다고 보는 비율 (30일 기준으로 환산)
+SAVING_RATE = 0.1
+
+# 마크다운 예산 요약 표의 고정지출 표시 (markdown_export_service.dart _col('fixedExpense'))
+FIXED_TYPE_LABELS = {"고정지출", "Fixed", "固定費"}
+
+_MARKDOWN_PERIOD = re.compile(r"^##\s.*\((\d{4}-\d{2}-\d{2})\s*~\s*(\d{4}-\d{2}-\d{2})\)")
+_DATE_CELL = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_CANONICAL_PERIOD = re.compile(r"^period: (\d{4}-\d{2}-\d{2})~(\d{4}-\d{2}-\d{2}) \(\d+d, today (\d{4}-\d{2}-\d{2})")
+_CANONICAL_BUDGET = re.compile(r"^- (.+) \[(fixed|variable)\]: (-?[\d,]+) / (-?[\d,]+) / ")
+_CANONICAL_DAY = re.compile(r"^(\d{2})-(\d{2}) (-?[\d,]+)$")
+
+
+@dataclass
+class BudgetLine:
+    name: str
+    fixed: bool
+    amount: int
+    spent: int
+
+
+@dataclass
+class BudgetFacts:
+    """로컬 분석에 필요한 최소 정보 (입력 형식과 무관)"""
+    start: date
+    end: date
+    today: date  # 기간 안으로 보정된 기준일
+    budgets: List[BudgetLine]
+    by_day: Dict[date, int] = field(default_factory=dict)  # 날짜별 지출 (가능하면 변동지출만)
+    format_amount: Callable[[int], str] = lambda amount: f"{amount:,}"
+
+    @property
+    def total_budget(self) -> int:
+        return sum(line.amount for line in self.budgets)
+
+    @property
+    def total_spent(self) -> int:
+        return sum(line.spent for line in self.budgets)
+
+    @property
+    def days_total(self) -> int:
+        return (self.end - self.start).days + 1
+
+    @property
+    def days_elapsed(self) -> int:
+        """오늘 포함 경과 일수"""
+        return (self.today - self.start).days + 1
+
+    @property
+    def days_remaining(self) -> int:
+        """오늘 포함 남은 일수"""
+        return (self.end - self.today).days + 1
+
+
+def _clamp(day: date, start: date, end: date) -> date:
+    return min(max(day, start), end)
+
+
+# =============================================================================
+# 입력 → BudgetFacts
+# =============================================================================
+def facts_from_payload(payload: BudgetPayload, today: date) -> BudgetFacts:
+    """구조화된 가계부 데이터 (지출 일별 합계는 변동지출만)"""
+    agg = aggregate_budget(payload)
+    fixed_ids = {budget.id for budget in payload.budgets if is_fixed_budget(budget)}
+    by_day: Dict[date, int] = {}
+    for expense in payload.expenses:
+        if expense.budgetId not in fixed_ids:
+            by_day[expense.date] = by_day.get(expense.date, 0) + expense.amount
+    currency = payload.currency
+    return BudgetFacts(
+        start=payload.startDate,
+        end=payload.endDate,
+        today=_clamp(payload.today or today, payload.startDate, payload.endDate),
+        budgets=[
+            BudgetLine(budget.name, budget.id in fixed_ids, budget.amount, agg.by_budget.get(budget.id, 0))
+            for budget in sorted(payload.budgets, key=lambda b: (b.order, b.name))
+        ],
+        by_day=by_day,
+        format_amount=lambda amount: f"{currency}{amount:,}",
+    )
+
+
+def _facts_from_markdown(lines: List[str], today: date) -> Optional[BudgetFacts]:
+    period = next((m for m in map(_MARKDOWN_PERIOD.match, lines) if m), None)
+    if period is None:
+        return None
+    start, end = date.fromisoformat(period.group(1)), date.fromisoformat(period.group(2))
+    if start > end:
+        return None  # 뒤집힌 기간 → 경과/전체 일수가 0 이하
+
+    # 예산 요약 표: | 예산명 | 유형 | 예산 | 사용 | 잔여 | 사용률 | (합계 행 / 지출 내역 행 제외)
+    budgets: List[BudgetLine] = []
+    formatter = None
+    for line in lines:
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if len(cells) != 6 or cells[0].startswith("**") or _DATE_CELL.match(cells[0]):
+            continue
+        amount, spent = parse_amount(cells[2]), parse_amount(cells[3])
+        if amount is None or spent is None or not cells[5].endswith("%"):
+            continue
+        budgets.append(BudgetLine(cells[0], cells[1] in FIXED_TYPE_LABELS, amount, spent))
+        formatter = formatter or amount_formatter(cells[2])
+    if not budgets:
+        return None
+
+    fixed_names = {line.name for line in budgets if line.fixed}
+    by_day: Dict[date, int] = {}
+    for _, row in parse_expense_rows(lines):
+        if row.budget not in fixed_names:
+            by_day[row.day] = by_day.get(row.day, 0) + row.amount
+    return BudgetFacts(start, end, _clamp(today, start, end), budgets, by_day, formatter)
+
+
+def _facts_from_canonical(lines: List[str]) -> Optional[BudgetFacts]:
+    period = next((m for m in map(_CANONICAL_PERIOD.match, lines) if m), None)
+    if period is None:
+        return None
+    start, end, today = (date.fromisoformat(period.group(i)) for i in (1, 2, 3))
+    if start > end:
+        return None
+    currency = next((line[len("currency: "):] for line in lines if line.startswith("currency: ")), "")
+
+    budgets = []
+    by_day: Dict[date, int] = {}
+    for index, line in enumerate(lines):
+        match = _CANONICAL_BUDGET.match(line)
+        if match:
+            budgets.append(BudgetLine(
+                match.group(1), match.group(2) == "fixed",
+                int(match.group(3).replace(",", "")), int(match.group(4).replace(",", "")),
+            ))
+        elif line.startswith("daily spending") and index + 1 < len(lines):
+            # "MM-DD 12,000, MM-DD 3,000" (고정지출 포함 합계, 연도는 기간 시작 연도 기준)
+            for entry in lines[index + 1].split(", "):
+                day = _CANONICAL_DAY.match(entry)
+                if not day:
+                    continue
+                month, dom = int(day.group(1)), int(day.group(2))
+                year = start.year + (1 if month < start.month else 0)
+                try:
+                    by_day[date(year, month, dom)] = int(day.group(3).replace(",", ""))
+                except ValueError:
+                    continue
+    if not budgets:
+        return None
+    return BudgetFacts(start, end, _clamp(today, start, end), budgets, by_day,
+                       lambda amount: f"{currency}{amount:,}")
+
+
+def extract_facts(text: str, today: date) -> Optional[BudgetFacts]:
+    """마크다운 또는 canonical 텍스트 → BudgetFacts (예산 정보를 찾지 못하거나 기간이 뒤집혔으면 None)"""
+    lines = text.split("\n")
+    return _facts_from_canonical(lines) or _facts_from_markdown(lines, today)
+
+
+# =============================================================================
+# 계산
+# =============================================================================
+def _spending_trend(facts: BudgetFacts) -> str:
+    """경과 기간을 반으로 나눠 후반 일평균이 전반보다 크게 늘면 increasing"""
+    elapsed = facts.days_elapsed
+    if elapsed < TREND_MIN_DAYS:
+        return "stable"
+    half = elapsed // 2
+    first = sum(facts.by_day.get(facts.start + timedelta(days=i), 0) for i in range(half))
+    second = sum(facts.by_day.get(facts.start + timedelta(days=i), 0) for i in range(elapsed - half, elapsed))
+    if first <= 0:
+        return "increasing" if second > 0 else "stable"
+    ratio = second / first
+    if ratio >= TREND_UP_RATIO:
+        return "increasing"
+    if ratio <= TREND_DOWN_RATIO:
+        return "decreasing"
+    return "stable"
+
+
+def compute_figures(facts: BudgetFacts) -> Dict[str, Any]:
+    """pattern 필드 + 지출 계획/문장 생성용 수치"""
+    variable = [line for line in facts.budgets if not line.fixed]
+    fixed = [line for line in facts.budgets if line.fixed]
+    variable_spent = sum(line.spent for line in variable)
+    fixed_budget = sum(line.amount for line in fixed)
+    fixed_spent = sum(line.spent for line in fixed)
+    total_budget, total_spent = facts.total_budget, facts.total_spent
+
+    # 기간 말 예상 지출: 변동지출은 현재 속도 유지, 고정지출은 예산만큼 나간다고 가정
+    projected_variable = variable_spent / facts.days_elapsed * facts.days_total
+    projected = int(projected_variable + max(fixed_budget, fixed_spent))
+
+    if total_budget <= 0:
+        risk = "high" if total_spent > 0 else "low"
+    elif total_spent > total_budget or projected / total_budget > RISK_HIGH_RATIO:
+        risk = "high"
+    elif projected / total_budget > RISK_MEDIUM_RATIO:
+        risk = "medium"
+    else:
+        risk = "low"
+
+    # 가장 많이 쓴 변동지출 예산 (지출이 없으면 가장 큰 예산)
+    candidates = variable or facts.budgets
+    main = max(candidates, key=lambda line: (line.spent, line.amount)) if candidates else None
+
+    upcoming_fixed = max(0, fixed_budget - fixed_spent)
+    variable_left = total_budget - total_spent - upcoming_fixed
+    return {
+        "mainCategory": main.name if main else "",
+        "mainCategorySpent": main.spent if main else 0,
+        "spendingTrend": _spending_trend(facts),
+        "savingPotential": int(round(projected_variable * SAVING_RATE * 30 / facts.days_total)),
+        "riskLevel": risk,
+        "projected": projected,
+        "upcomingFixed": upcoming_fixed,
+        "fixedSpent": fixed_spent,
+        "variableLeft": variable_left,
+        "dailyAllowance": max(0, variable_left) // facts.days_remaining,
+        "overBudget": [line for line in facts.budgets if line.spent > line.amount],
+    }
+
+
+def compute_pattern(facts: BudgetFacts) -> Dict[str, Any]:
+    """AnalyzeResponse.pattern 형태"""
+    figures = compute_figures(facts)
+    return {key: figures[key] for key in ("mainCategory", "spendingTrend", "savingPotential", "riskLevel")}
+
+
+# =============================================================================
+# 문장 (다국어) - 톤과 무관한 사실 위주 문장
+# =============================================================================
+LOCAL_TEXTS = {
+    "ko": {
+        "one_liner": {
+            "low": "지금 페이스라면 이번 기간은 여유 있게 마무리할 수 있어요.",
+            "medium": "예산 한도에 가까워지고 있어요. 남은 기간은 조금만 아껴요.",
+            "high": "이대로면 예산 초과예요. 지금부터 지출을 줄여야 해요.",
+        },
+        "summary": "예산 {budget} 중 {spent}({usage})를 사용했고, 기간의 {elapsed}가 지났습니다. "
+                   "현재 속도라면 기간 말 예상 지출은 {projected}입니다.",
+        "main_category": "{category} 지출이 {amount}로 전체 지출의 {share}를 차지합니다.",
+        "trend": {
+            "increasing": "최근 지출 속도가 기간 초반보다 빨라졌습니다.",
+            "decreasing": "최근 지출 속도가 기간 초반보다 느려졌습니다.",
+            "stable": "지출 속도가 기간 내내 비슷하게 유지되고 있습니다.",
+        },
+        "fixed": "고정지출로 {amount}를 사용했습니다 (전체 지출의 {share}).",
+        "over_budget": "{name} 예산을 {amount} 초과했습니다.",
+        "projected_over": "현재 속도라면 기간 말에 예산을 {amount} 초과할 것으로 예상됩니다.",
+        "daily_suggestion": "남은 기간 하루 지출을 {amount} 이내로 유지해보세요.",
+        "cut_suggestion": "{category} 지출을 10% 줄이면 한 달에 약 {amount}를 아낄 수 있어요.",
+        "plan": "남은 {days}일 동안 하루 {daily} 이내로 쓰면 예산 안에서 마무리할 수 있어요 "
+                "(남은 예산 {left}, 예정된 고정지출 {fixed} 제외).",
+        "plan_over": "남은 예산이 없습니다. 남은 {days}일은 필수 지출만 하고, 초과분 {over}은 다음 예산에서 조정하세요.",
+    },
+    "en": {
+        "one_liner": {
+            "low": "At this pace, you'll finish the period comfortably within budget.",
+            "medium": "You're getting close to your limit. Ease off a little for the rest of the period.",
+            "high": "At this rate you'll overspend. Time to cut back now.",
+        },
+        "summary": "You've spent {spent} ({usage}) of your {budget} budget with {elapsed} of the period elapsed. "
+                   "At the current pace, you'll spend about {projected} by the end of the period.",
+        "main_category": "{category} is your largest category at {amount} ({share} of spending).",
+        "trend": {
+            "increasing": "Your recent spending pace is faster than earlier in the period.",
+            "decreasing": "Your recent spending pace is slower than earlier in the period.",
+            "stable": "Your spending pace has been steady throughout the period.",
+        },
+        "fixed": "Fixed expenses account for {amount} ({share} of spending).",
+        "over_budget": "{name} is over budget by {amount}.",
+        "projected_over": "At the current pace, you'll exceed your budget by about {amount}.",
+        "daily_suggestion": "Keep daily spending under {amount} for the rest of the period.",
+        "cut_suggestion": "Cutting {category} by 10% would save about {amount} a month.",
+        "plan": "Spend at most {daily} a day for the remaining {days} days to stay within budget "
+                "({left} left, excluding {fixed} in upcoming fixed expenses).",
+        "plan_over": "No budget left. Stick to essentials for the remaining {days} days "
+                     "and offset the {over} overage in your next budget.",
+    },
+    "ja": {
+        "one_liner": {
+            "low": "このペースなら今期は余裕を持って終えられそうです。",
+            "medium": "予算の上限が近づいています。残りの期間は少し控えめに。",
+            "high": "このままでは予算オーバーです。今から支出を減らしましょう。",
+        },
+        "summary": "予算{budget}のうち{spent}({usage})を使い、期間の{elapsed}が経過しました。"
+                   "現在のペースだと期末の予想支出は{projected}です。",
+        "main_category": "{category}の支出が{amount}で、全体の{share}を占めています。",
+        "trend": {
+            "increasing": "最近の支出ペースが期間の初めより速くなっています。",
+            "decreasing": "最近の支出ペースが期間の初めより遅くなっています。",
+            "stable": "支出ペースは期間を通して安定しています。",
+        },
+        "fixed": "固定費に{amount}を使いました (全体の{share})。",
+        "over_budget": "{name}の予算を{amount}超過しています。",
+        "projected_over": "現在のペースだと期末に予算を約{amount}超過する見込みです。",
+        "daily_suggestion": "残りの期間は1日の支出を{amount}以内に抑えましょう。",
+        "cut_suggestion": "{category}を10%減らすと月に約{amount}節約できます。",
+        "plan": "残り{days}日間、1日{daily}以内に抑えれば予算内で終えられます"
+                "(残り予算{left}、予定の固定費{fixed}を除く)。",
+        "plan_over": "残り予算がありません。残り{days}日は必要な支出だけにし、超過分{over}は次の予算で調整しましょう。",
+    },
+}
+
+
+def _pct(part: float, whole: float) -> str:
+    return f"{part / whole * 100:.0f}%" if whole else "0%"
+
+
+def build_local_analysis(facts: BudgetFacts, language: str = "ko") -> Dict[str, Any]:
+    """AnalysisResult 형태의 로컬 분석 결과 (remainingAnalyses 는 호출자가 채움)"""
+    texts = LOCAL_TEXTS.get(language, LOCAL_TEXTS["ko"])
+    fmt = facts.format_amount
+    figures = compute_figures(facts)
+    total_budget, total_spent = facts.total_budget, facts.total_spent
+
+    insights = []
+    if figures["mainCategory"] and figures["mainCategorySpent"] > 0:
+        insights.append(texts["main_category"].format(
+            category=figures["mainCategory"],
+            amount=fmt(figures["mainCategorySpent"]),
+            share=_pct(figures["mainCategorySpent"], total_spent),
+        ))
+    insights.append(texts["trend"][figures["spendingTrend"]])
+    if figures["fixedSpent"] > 0:
+        insights.append(texts["fixed"].format(amount=fmt(figures["fixedSpent"]),
+                                              share=_pct(figures["fixedSpent"], total_spent)))
+
+    warnings = [
+        texts["over_budget"].format(name=line.name, amount=fmt(line.spent - line.amount))
+        for line in sorted(figures["overBudget"], key=lambda line: line.amount - line.spent)
+    ][:4]
+    if figures["projected"] > total_budget:
+        warnings.append(texts["projected_over"].format(amount=fmt(figures["projected"] - total_budget)))
+
+    suggestions = []
+    if figures["dailyAllowance"] > 0:
+        suggestions.append(texts["daily_suggestion"].format(amount=fmt(figures["dailyAllowance"])))
+    if figures["mainCategory"] and figures["savingPotential"] > 0:
+        suggestions.append(texts["cut_suggestion"].format(category=figures["mainCategory"],
+                                                          amount=fmt(figures["savingPotential"])))
+
+    if figures["variableLeft"] > 0:
+        plan = texts["plan"].format(
+            days=facts.days_remaining,
+            daily=fmt(figures["dailyAllowance"]),
+            left=fmt(total_budget - total_spent),
+            fixed=fmt(figures["upcomingFixed"]),
+        )
+    else:
+        plan = texts["plan_over"].format(days=facts.days_remaining, over=fmt(-figures["variableLeft"]))
+
+    return {
+        "oneLiner": texts["one_liner"][figures["riskLevel"]],
+        "summary": texts["summary"].format(
+            budget=fmt(total_budget),
+            spent=fmt(total_spent),
+            usage=_pct(total_spent, total_budget),
+            elapsed=_pct(facts.days_elapsed, facts.days_total),
+            projected=fmt(figures["projected"]),
+        ),
+        "insights": insights,
+        "warnings": warnings,
+        "suggestions": suggestions,
+        "spendingPlan": plan,
+        "pattern": {key: figures[key] for key in ("mainCategory", "spendingTrend", "savingPotential", "riskLevel")},
+    }
+
+
+def render_prefill(facts: BudgetFacts) -> str:
+    """프롬프트에 덧붙일 사전 계산 수치 (LLM은 이 값을 그대로 쓰고 문장만 작성)"""
+    figures = compute_figures(facts)
+    return (
+        "precomputed figures (use these exact values for pattern and the spendingPlan amounts): "
+        f"mainCategory={figures['mainCategory']}, spendingTrend={figures['spendingTrend']}, "
+        f"savingPotential={figures['savingPotential']}, riskLevel={figures['riskLevel']}, "
+        f"projectedSpending={facts.format_amount(figures['projected'])}, "
+        f"dailyAllowance={facts.format_amount(figures['dailyAllowance'])} for {facts.days_remaining} days, "
+        f"upcomingFixed={facts.format_amount(figures['upcomingFixed'])}"
+    )
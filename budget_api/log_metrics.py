@@ -0,0 +1,62 @@
+# =============================================================================
+# log_metrics.py - 분석 로그 성능/토큰 메트릭 집계 (관리자 통계용)
+# =============================================================================
+# analysis_logs 에 요청마다 기록된 지연/토큰/페이로드 크기를 집계
+#   - 지연: total_ms(서버 전체) / upstream_ms(Gemini 호출) / ttfb_ms(첫 바이트) 백분위
+#   - 토큰: 언어별 / 톤별 prompt/output/cached 토큰 분포
+# 메트릭 컬럼이 추가되기 전 로그는 값이 NULL 이므로 집계에서 제외
+# =============================================================================
+from typing import Any, Dict, Iterable, List, Optional
+
+LATENCY_COLUMNS = ("total_ms", "upstream_ms", "ttfb_ms")
+TOKEN_COLUMNS = ("prompt_tokens", "output_tokens", "cached_tokens")
+SIZE_COLUMNS = ("request_bytes", "response_bytes")
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """정렬된 값 목록의 백분위 (nearest-rank, 값이 없으면 None)"""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def distribution(values: Iterable[Optional[int]]) -> Dict[str, Any]:
+    """count / avg / p50 / p95 / p99 / max"""
+    ordered = sorted(value for value in values if value is not None)
+    result: Dict[str, Any] = {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 1) if ordered else None,
+        "max": ordered[-1] if ordered else None,
+    }
+    for pct in PERCENTILES:
+        result[f"p{pct}"] = percentile(ordered, pct)
+    return result
+
+
+def _token_groups(rows: List[Dict[str, Any]], key: str) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(row.get(key) or "unknown", []).append(row)
+    return {
+        name: {
+            "requests": len(members),
+            **{column: distribution(row.get(column) for row in members) for column in TOKEN_COLUMNS},
+        }
+        for name, members in groups.items()
+    }
+
+
+def summarize_log_metrics(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """db.get_log_metrics() 결과 → 지연 백분위 + 언어/톤별 토큰 분포"""
+    succeeded = [row for row in rows if row.get("status_code") == 200]
+    return {
+        "requests": len(rows),
+        "succeeded": len(succeeded),
+        "latency_ms": {column: distribution(row.get(column) for row in rows) for column in LATENCY_COLUMNS},
+        "payload_bytes": {column: distribution(row.get(column) for row in rows) for column in SIZE_COLUMNS},
+        "tokens": {column: distribution(row.get(column) for row in succeeded) for column in TOKEN_COLUMNS},
+        "tokens_by_language": _token_groups(succeeded, "language"),
+        "tokens_by_tone": _token_groups(succeeded, "tone"),
+    }
@@ -7,14 +7,17 @@
 # =============================================================================
 from fastapi import FastAPI, HTTPException, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, field_validator
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 from typing import Optional
-from collections import defaultdict
+from collections import OrderedDict
+from functools import lru_cache
 import httpx
+import logging
 import os
-import re
-import json
+import orjson
 import uuid
+import tempfile
 import time
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -22,11 +25,50 @@ from dotenv import load_dotenv
 
 # 데이터베이스 추상화 레이어 import
 from database import create_database, get_today_kst
+# Gemini 호출 레이어 (재시도/백오프/헤지)
+from gemini_client import GeminiClient
+from context_cache import ContextCacheManager, is_cache_error
+from model_router import ModelRouter
+from response_parser import parse_analysis_text
+from response_schema import gemini_response_schema
+from log_metrics import summarize_log_metrics
+from local_insights import build_local_analysis, compute_pattern, extract_facts, facts_from_payload, render_prefill
+from spend_governor import LOCAL_ONLY, REDUCED, REJECT, SpendGovernor
+from nsfw_filter import compose_hangul
+from nsfw_lexicon import LexiconError, NsfwLexicon
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+# 큰 데이터 CPU 작업 스레드 풀 분리 / 요청 본문 크기 제한
+from offload import PayloadOffloader
+from middleware import (
+    BodySizeLimitMiddleware, IpAccessMiddleware, RateLimitMiddleware, client_ip_from_scope, get_header, is_allowlisted,
+)
+# IP / 기기별 요청 제한 (토큰 버킷)
+from rate_limiter import TokenBucketLimiter
+from shared_limiter import SharedTokenBucketLimiter
+from distributed_limiter import DistributedRateLimiter
+from ip_filter import AccessListError, IpAccessList, TrustedProxies
+from device_rotation import THROTTLE, DeviceRotationTracker
+# 구조화된 가계부 데이터 (선택적 요청 형식)
+from budget_payload import BudgetPayload, render_budget_payload
+# 토큰 예산 기반 프롬프트 데이터 압축
+from prompt_compactor import compact_budget_data
+# 비동기 분석 작업 워커 풀
+from jobs import JobWorkerPool, JOB_QUEUED, JOB_DONE, JOB_ERROR
+# 관리자 일괄 재분석 (백필)
+from reanalysis import ReanalysisRunner
 
 # 환경변수 로드
 load_dotenv()
 
-app = FastAPI(title="Budget AI API", version="2.1.0")
+# 모듈 로거 출력 (circuit_breaker, ip_filter 등은 logging.getLogger(__name__) 사용)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# 기본 응답 직렬화: orjson (stdlib json 대비 빠름, UTF-8 그대로 출력)
+app = FastAPI(title="Budget AI API", version="2.1.0", default_response_class=ORJSONResponse)
 
 # =============================================================================
 # CORS 설정 (보안 강화)
@@ -47,18 +89,86 @@ if not ALLOWED_ORIGINS:
         "http://127.0.0.1:8080",
     ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS,  # 특정 도메인만 허용
-    allow_credentials=True,
-    allow_methods=["GET", "POST"],  # 필요한 메서드만 허용
-    allow_headers=["Content-Type", "Authorization", "X-Admin-Key"],  # 필요한 헤더만 허용
-)
+# CORS 미들웨어는 요청 제한 설정 뒤에 등록 (아래 "요청 사전 차단" 참고)
 
 # Gemini API 설정
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = "gemini-2.5-flash-lite-preview-09-2025"
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+# 사용할 모델 목록 (쉼표 구분, 우선순위 순) - 지연/에러율에 따라 라우팅, 실패 시 다음 모델로 폴백
+GEMINI_MODELS = [
+    model.strip()
+    for model in os.getenv("GEMINI_MODELS", "gemini-2.5-flash-lite-preview-09-2025").split(",")
+    if model.strip()
+]
+GEMINI_MODEL = GEMINI_MODELS[0]  # 기본(1순위) 모델
+# API 기본 주소 (로컬 스텁 서버 테스트 시 변경, 예: http://127.0.0.1:8090/v1beta)
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+
+# Gemini 호출 안정화 설정 (재시도 / 백오프 / 헤지 요청)
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_RETRY_BUDGET = int(os.getenv("GEMINI_RETRY_BUDGET", "3"))  # 요청당 추가 호출 (재시도+헤지) 상한
+GEMINI_HEDGE_ENABLED = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() == "true"
+GEMINI_HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", "2"))
+
+# Gemini 서킷 브레이커 설정 (장애 시 60초 대기 대신 즉시 실패)
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))  # 롤링 윈도우 에러율 임계값
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "20"))  # 느린 호출 기준(초)
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))  # 판단에 필요한 최소 호출 수
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))  # open 유지 시간
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "2"))  # half_open 시험 요청 수
+
+def create_model_breaker(model: str) -> CircuitBreaker:
+    """모델별 서킷 브레이커 생성"""
+    return CircuitBreaker(
+        name=f"gemini:{model}",
+        min_calls=CIRCUIT_MIN_CALLS,
+        error_rate_threshold=CIRCUIT_ERROR_RATE,
+        slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+        cooldown_seconds=CIRCUIT_COOLDOWN_SECONDS,
+        half_open_max_calls=CIRCUIT_HALF_OPEN_CALLS,
+    )
+
+# 모델 라우터 (모델별 서킷 브레이커 + 지연 통계)
+model_router = ModelRouter(GEMINI_MODELS, GEMINI_API_BASE, create_model_breaker)
+
+gemini_client = GeminiClient(
+    GEMINI_API_KEY,
+    timeout=GEMINI_TIMEOUT_SECONDS,
+    max_retries=GEMINI_MAX_RETRIES,
+    retry_budget=GEMINI_RETRY_BUDGET,
+    hedge_enabled=GEMINI_HEDGE_ENABLED,
+    hedge_min_delay=GEMINI_HEDGE_MIN_DELAY,
+)
+
+@app.on_event("shutdown")
+async def close_gemini_client():
+    """서버 종료 시 공유 HTTP 클라이언트 정리"""
+    if context_cache:
+        await context_cache.stop()
+    await gemini_client.aclose()
+
+# Gemini 컨텍스트 캐시 (시스템 프롬프트 + 분석 지시문을 (언어, 톤)별로 캐시)
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true"
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+
+context_cache: Optional[ContextCacheManager] = None
+if GEMINI_CONTEXT_CACHE and GEMINI_API_KEY:
+    # build_cached_prefix는 아래 프롬프트 설정 이후 정의됨 (호출 시점에만 참조)
+    context_cache = ContextCacheManager(
+        gemini_client,
+        GEMINI_API_BASE,
+        GEMINI_MODEL,
+        lambda language, tone: build_cached_prefix(language, tone),
+        ttl_seconds=GEMINI_CACHE_TTL_SECONDS,
+    )
+
+@app.on_event("startup")
+async def warm_context_cache():
+    """서버 시작 시 모든 (언어, 톤) 조합의 캐시 생성"""
+    if context_cache:
+        await context_cache.start(
+            (language, tone) for language in SYSTEM_PROMPTS for tone in TONE_PROMPTS[language]
+        )
 
 # =============================================================================
 # 관리자 인증 설정
@@ -82,92 +192,264 @@ def verify_admin_key(x_admin_key: str = Header(None, alias="X-Admin-Key")) -> bo
         )
     return True
 
+# 프롬프트 데이터 토큰 예산 (초과 시 오래된 지출을 월별 합계로 압축, 0이면 비활성)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# 압축 시 원본 그대로 유지할 최근 지출 기간(일)
+PROMPT_RECENT_DAYS = int(os.getenv("PROMPT_RECENT_DAYS", "14"))
+
+# 이 길이(문자) 이상의 데이터는 입력 필터링/프롬프트 생성/응답 파싱을 스레드 풀에서 실행 (offload.py)
+PAYLOAD_OFFLOAD_THRESHOLD = int(os.getenv("PAYLOAD_OFFLOAD_THRESHOLD", "32768"))
+# 스레드 풀 크기 (동시에 스레드에서 처리할 최대 요청 수, 0이면 항상 이벤트 루프에서 실행)
+PAYLOAD_OFFLOAD_WORKERS = int(os.getenv("PAYLOAD_OFFLOAD_WORKERS", "2"))
+
+payload_offloader = PayloadOffloader(threshold=PAYLOAD_OFFLOAD_THRESHOLD, workers=PAYLOAD_OFFLOAD_WORKERS)
+
+@app.on_event("shutdown")
+async def stop_payload_offloader():
+    """서버 종료 시 스레드 풀 정리"""
+    payload_offloader.shutdown()
+
+# 규칙 기반 로컬 분석 (local_insights.py)
+# Gemini 장애/서킷 open/응답 오류 시 에러 대신 로컬 분석 제공
+LOCAL_INSIGHTS_FALLBACK = os.getenv("LOCAL_INSIGHTS_FALLBACK", "true").lower() == "true"
+# 일일 분석 한도 초과 시 429 대신 로컬 분석 제공
+LOCAL_INSIGHTS_ON_LIMIT = os.getenv("LOCAL_INSIGHTS_ON_LIMIT", "false").lower() == "true"
+# 숫자 필드(pattern/지출 계획 금액)를 미리 계산해 프롬프트에 전달하고 결과에 덮어씀
+LOCAL_INSIGHTS_PREFILL = os.getenv("LOCAL_INSIGHTS_PREFILL", "false").lower() == "true"
+# 로컬 분석 로그의 model 값
+LOCAL_MODEL = "local-insights"
+
 # #17: 일일 분석 횟수 제한
 DAILY_LIMIT = 3
 KST = ZoneInfo("Asia/Seoul")
 
+# =============================================================================
+# 데이터베이스 초기화 (SQLite 또는 PostgreSQL)
+# =============================================================================
+# DATABASE_URL 환경변수가 있으면 PostgreSQL, 없으면 SQLite 사용
+db = create_database()
+db.init_db()
+
 # =============================================================================
 # IP 기반 Rate Limiting (분당 요청 제한)
 # =============================================================================
-# 분당 최대 요청 수
+# 분당 최대 요청 수 (IP / 기기별, 0이면 비활성)
 IP_RATE_LIMIT_PER_MINUTE = int(os.getenv("IP_RATE_LIMIT_PER_MINUTE", "10"))
-# IP별 요청 기록 저장 (메모리 기반, 프로덕션에서는 Redis 권장)
-ip_request_times: dict[str, list[float]] = defaultdict(list)
+DEVICE_RATE_LIMIT_PER_MINUTE = int(os.getenv("DEVICE_RATE_LIMIT_PER_MINUTE", "10"))
+# 추적할 최대 키 수 (초과 시 가장 오래 사용하지 않은 키부터 제거 → 메모리 상한)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# 저장소: memory (프로세스별) / shared (같은 호스트의 uvicorn 워커가 메모리 맵 파일 공유)
+#         database (여러 노드가 DB 카운터 공유, PostgreSQL 권장)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# shared 백엔드 파일 위치 (기본: /dev/shm, 없으면 임시 디렉토리)
+RATE_LIMIT_SHM_DIR = os.getenv("RATE_LIMIT_SHM_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+# database 백엔드: 노드가 DB 에서 한 번에 가져가는 토큰 수 (DB 왕복 = 약 이 수의 요청마다 한 번)
+RATE_LIMIT_DB_BATCH = int(os.getenv("RATE_LIMIT_DB_BATCH", "5"))
+# database 백엔드: 노드 전체 초당 DB 선할당 상한 (초과분은 노드 로컬 버킷으로 판단, 0이면 제한 없음)
+RATE_LIMIT_DB_CLAIMS_PER_SECOND = int(os.getenv("RATE_LIMIT_DB_CLAIMS_PER_SECOND", "100"))
+
+def create_rate_limiter(name: str, rate_per_minute: int):
+    """RATE_LIMIT_BACKEND 에 맞는 요청 제한 생성 (키당 O(1), 메모리 상한)"""
+    if RATE_LIMIT_BACKEND == "database":
+        return DistributedRateLimiter(db, name, rate_per_minute, batch=RATE_LIMIT_DB_BATCH, max_keys=RATE_LIMIT_MAX_KEYS,
+                                      claims_per_second=RATE_LIMIT_DB_CLAIMS_PER_SECOND)
+    if RATE_LIMIT_BACKEND == "shared":
+        # 설정을 파일 이름에 포함 → 설정을 바꾼 롤링 재시작 중에도 이전 워커가 쓰는 파일은 그대로
+        path = os.path.join(RATE_LIMIT_SHM_DIR, f"budget_api_{name}_{RATE_LIMIT_MAX_KEYS}_{rate_per_minute}.ratelimit")
+        return SharedTokenBucketLimiter(path, rate_per_minute, slots=RATE_LIMIT_MAX_KEYS)
+    return TokenBucketLimiter(rate_per_minute, max_keys=RATE_LIMIT_MAX_KEYS)
+
+ip_rate_limiter = create_rate_limiter("ip", IP_RATE_LIMIT_PER_MINUTE)
+device_rate_limiter = create_rate_limiter("device", DEVICE_RATE_LIMIT_PER_MINUTE)
 
 def get_client_ip(request: Request) -> str:
-    """클라이언트 IP 추출 (프록시 고려)"""
-    # X-Forwarded-For 헤더 확인 (프록시/로드밸런서 뒤에 있는 경우)
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        # 첫 번째 IP가 실제 클라이언트 IP
-        return forwarded.split(",")[0].strip()
-    # X-Real-IP 헤더 확인
-    real_ip = request.headers.get("X-Real-IP")
-    if real_ip:
-        return real_ip
-    # 직접 연결된 클라이언트 IP
-    return request.client.host if request.client else "unknown"
+    """클라이언트 IP (IpAccessMiddleware 가 신뢰 프록시 기준으로 정한 값)"""
+    return client_ip_from_scope(request.scope)
 
 def check_ip_rate_limit(ip: str) -> bool:
-    """IP별 분당 요청 제한 확인"""
-    now = time.time()
-    minute_ago = now - 60
-    # 1분 이내 요청만 유지
-    ip_request_times[ip] = [t for t in ip_request_times[ip] if t > minute_ago]
-    # 제한 확인
-    if len(ip_request_times[ip]) >= IP_RATE_LIMIT_PER_MINUTE:
-        return False
-    # 현재 요청 기록
-    ip_request_times[ip].append(now)
-    return True
+    """IP별 분당 요청 제한 확인 (동기, 분석 엔드포인트는 RateLimitMiddleware 가 acquire 로 확인)"""
+    return ip_rate_limiter.allow(ip)
+
+async def enforce_device_rate_limit(device_id: str, request: Request) -> None:
+    """기기별 분당 요청 제한 확인 (초과 시 429, 다음 토큰까지의 Retry-After, 허용 대역은 면제)"""
+    if is_allowlisted(request.scope):
+        return
+    if not await device_rate_limiter.acquire(device_id):
+        raise HTTPException(
+            status_code=429,
+            detail=RateLimitMiddleware.DETAIL,
+            headers={"Retry-After": str(device_rate_limiter.retry_after(device_id))}
+        )
 
-def cleanup_ip_records():
-    """오래된 IP 기록 정리 (메모리 관리)"""
-    now = time.time()
-    minute_ago = now - 60
-    # 빈 기록 제거
-    empty_ips = [ip for ip, times in ip_request_times.items() if not times or all(t <= minute_ago for t in times)]
-    for ip in empty_ips:
-        del ip_request_times[ip]
+# 오늘 일일 한도를 다 쓴 기기 (device_id → KST 날짜), 이 워커에서 check_daily_limit 이 확인한 것만
+# → 같은 기기의 다음 요청은 미들웨어가 본문을 읽기 전에 거부 (최종 판단은 항상 check_daily_limit)
+quota_exhausted_devices: "OrderedDict[str, str]" = OrderedDict()
+
+def mark_quota_exhausted(device_id: str) -> None:
+    quota_exhausted_devices[device_id] = get_today_kst()
+    quota_exhausted_devices.move_to_end(device_id)
+    if len(quota_exhausted_devices) > RATE_LIMIT_MAX_KEYS:
+        quota_exhausted_devices.popitem(last=False)
+
+# 기기 ID 교체 감지 (device_rotation.py) - IP / 네트워크(IPv4 /24, IPv6 /64)별 오늘 본 고유 기기 수
+# flag: 로그/관리자 화면에 표시, throttle: 해당 IP/네트워크의 Gemini 분석 요청을 자정(KST)까지 429 (0이면 비활성)
+# 키는 신뢰 프록시 기준 클라이언트 IP, 집계는 워커별 (--workers N 이면 워커마다 따로 셈)
+DEVICE_ROTATION_IP_FLAG = int(os.getenv("DEVICE_ROTATION_IP_FLAG", "10"))
+DEVICE_ROTATION_IP_THROTTLE = int(os.getenv("DEVICE_ROTATION_IP_THROTTLE", "50"))
+DEVICE_ROTATION_NETWORK_FLAG = int(os.getenv("DEVICE_ROTATION_NETWORK_FLAG", "50"))
+DEVICE_ROTATION_NETWORK_THROTTLE = int(os.getenv("DEVICE_ROTATION_NETWORK_THROTTLE", "0"))
+# HyperLogLog 정밀도 (키당 2^p 바이트, 표준 오차 약 1.04/√(2^p)) 와 추적할 최대 키 수
+DEVICE_ROTATION_PRECISION = int(os.getenv("DEVICE_ROTATION_PRECISION", "8"))
+DEVICE_ROTATION_MAX_KEYS = int(os.getenv("DEVICE_ROTATION_MAX_KEYS", "50000"))
+
+device_rotation = DeviceRotationTracker(
+    thresholds={
+        "ip": (DEVICE_ROTATION_IP_FLAG, DEVICE_ROTATION_IP_THROTTLE),
+        "network": (DEVICE_ROTATION_NETWORK_FLAG, DEVICE_ROTATION_NETWORK_THROTTLE),
+    },
+    precision=DEVICE_ROTATION_PRECISION,
+    max_keys=DEVICE_ROTATION_MAX_KEYS,
+)
 
 # =============================================================================
-# 데이터베이스 초기화 (SQLite 또는 PostgreSQL)
+# 요청 사전 차단 (순수 ASGI 미들웨어, middleware.py)
 # =============================================================================
-# DATABASE_URL 환경변수가 있으면 PostgreSQL, 없으면 SQLite 사용
-db = create_database()
-db.init_db()
+# 분석 엔드포인트는 본문(JSON) 파싱/AnalyzeRequest 검증 전에 IP 제한과 기기 사전 확인
+RATE_LIMITED_PATHS = ["/api/analyze", "/api/analyze/local", "/api/analyze/jobs"]
+# 일일 한도를 쓰지 않는 경로 (기기 한도 사전 확인 제외)
+QUOTA_FREE_PATHS = {"/api/analyze/local"}
+# 요청 본문 최대 크기 (바이트, 0이면 비활성) - 초과 시 Pydantic 파싱 전에 413
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", "1048576"))
+
+# CIDR 허용/차단 목록 (ip_filter.py) - 모든 요청에 요청 제한보다 먼저 적용
+#   차단: 403 (라우팅/본문 읽기 없음), 허용: IP/기기 분당 제한 면제 (일일 한도/기기 교체 감지는 그대로)
+IP_ALLOW_CIDRS = [cidr for cidr in os.getenv("IP_ALLOW_CIDRS", "").split(",") if cidr.strip()]
+IP_DENY_CIDRS = [cidr for cidr in os.getenv("IP_DENY_CIDRS", "").split(",") if cidr.strip()]
+# 핫 리로드되는 목록 파일 (JSON, 선택) 과 변경 확인 주기(초)
+IP_ACCESS_LIST_PATH = os.getenv("IP_ACCESS_LIST_PATH") or None
+IP_ACCESS_POLL_SECONDS = float(os.getenv("IP_ACCESS_POLL_SECONDS", "5"))
+# X-Forwarded-For / X-Real-IP 를 믿을 직접 연결 상대 (리버스 프록시, 기본: 같은 호스트의 nginx)
+#   이 대역에서 온 요청만 헤더를 보고, 그 외에는 직접 연결 주소를 클라이언트 IP 로 사용
+TRUSTED_PROXIES = [cidr for cidr in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if cidr.strip()]
+
+trusted_proxies = TrustedProxies(TRUSTED_PROXIES)
+ip_access_list = IpAccessList(IP_ACCESS_LIST_PATH, IP_ALLOW_CIDRS, IP_DENY_CIDRS, IP_ACCESS_POLL_SECONDS)
+try:
+    ip_access_list.load()
+except AccessListError as e:
+    logger.warning("IP access list unavailable, using IP_ALLOW_CIDRS/IP_DENY_CIDRS only: %s", e)
+
+@app.on_event("startup")
+async def start_ip_access_list():
+    """목록 파일 변경 감시 시작 (변경 시 트리 핫 리로드)"""
+    await ip_access_list.start()
+
+@app.on_event("shutdown")
+async def stop_ip_access_list():
+    await ip_access_list.stop()
+
+# 분당 제한 초과 429 응답 본문 (미리 직렬화)
+RATE_LIMIT_BODY = orjson.dumps({"detail": RateLimitMiddleware.DETAIL})
+
+@lru_cache(maxsize=None)
+def quota_rejection_body(language: str) -> bytes:
+    """일일 한도 초과 429 응답 본문 (언어별로 한 번만 직렬화)"""
+    return orjson.dumps({"detail": get_error_message("rate_limit", language, count=DAILY_LIMIT, limit=DAILY_LIMIT)})
+
+def seconds_until_kst_midnight() -> int:
+    now = datetime.now(KST)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((midnight - now).total_seconds()))
+
+def precheck_device(device_id: str, scope: dict) -> Optional[tuple[int, bytes]]:
+    """
+    X-Device-Id 헤더 기기 사전 확인 (토큰 소비/DB 조회 없음) → 거부 시 (Retry-After, 응답 본문)
+
+    본문의 device_id 와 달라도 엔드포인트가 본문 기준으로 다시 확인하므로 우회되지 않음
+    """
+    device_id = device_id.lower()
+    if device_rate_limiter.is_limited(device_id):
+        return device_rate_limiter.retry_after(device_id), RATE_LIMIT_BODY
+    if (not LOCAL_INSIGHTS_ON_LIMIT and scope["path"] not in QUOTA_FREE_PATHS
+            and quota_exhausted_devices.get(device_id) == get_today_kst()):
+        language = (get_header(scope, b"accept-language") or "ko")[:2].lower()
+        return seconds_until_kst_midnight(), quota_rejection_body(language if language in ERROR_MESSAGES else "ko")
+    return None
+
+# 등록 역순으로 바깥쪽: CORS → IP 허용/차단 → 요청 제한 → 본문 크기 제한 → 앱 (거부 응답에도 CORS 헤더)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_REQUEST_BODY_BYTES)
+app.add_middleware(
+    RateLimitMiddleware,
+    paths=RATE_LIMITED_PATHS,
+    ip_limiter=ip_rate_limiter,
+    device_check=precheck_device,
+)
+app.add_middleware(IpAccessMiddleware, access_list=ip_access_list, trusted_proxies=trusted_proxies)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=ALLOWED_ORIGINS,  # 특정 도메인만 허용
+    allow_credentials=True,
+    allow_methods=["GET", "POST"],  # 필요한 메서드만 허용
+    allow_headers=["Content-Type", "Authorization", "X-Admin-Key", "X-Device-Id"],  # 필요한 헤더만 허용
+)
+
+# =============================================================================
+# 전역 Gemini 토큰 예산 (spend_governor.py)
+# =============================================================================
+# 모든 기기 합산 토큰 사용량 상한 (0이면 무제한)
+GEMINI_HOURLY_TOKEN_BUDGET = int(os.getenv("GEMINI_HOURLY_TOKEN_BUDGET", "0"))
+GEMINI_DAILY_TOKEN_BUDGET = int(os.getenv("GEMINI_DAILY_TOKEN_BUDGET", "0"))
+# 사용률이 이 값 이상이면 maxOutputTokens 축소 / 로컬 분석만 (1.0 이상이면 거부)
+SPEND_REDUCE_AT = float(os.getenv("SPEND_REDUCE_AT", "0.8"))
+SPEND_LOCAL_ONLY_AT = float(os.getenv("SPEND_LOCAL_ONLY_AT", "0.95"))
+SPEND_REDUCED_MAX_OUTPUT_TOKENS = int(os.getenv("SPEND_REDUCED_MAX_OUTPUT_TOKENS", "1024"))
+# 사용량을 DB에 반영하는 주기(초)
+SPEND_CHECKPOINT_SECONDS = float(os.getenv("SPEND_CHECKPOINT_SECONDS", "30"))
+
+spend_governor = SpendGovernor(
+    db,
+    hourly_budget=GEMINI_HOURLY_TOKEN_BUDGET,
+    daily_budget=GEMINI_DAILY_TOKEN_BUDGET,
+    reduce_at=SPEND_REDUCE_AT,
+    local_at=SPEND_LOCAL_ONLY_AT,
+    checkpoint_seconds=SPEND_CHECKPOINT_SECONDS,
+)
+
+@app.on_event("startup")
+async def start_spend_governor():
+    """서버 시작 시 DB 누적 사용량 로드 + 체크포인트 루프 시작"""
+    if spend_governor.enabled:
+        await spend_governor.start()
+
+@app.on_event("shutdown")
+async def stop_spend_governor():
+    """서버 종료 시 남은 사용량 반영"""
+    if spend_governor.enabled:
+        await spend_governor.stop()
 
 # =============================================================================
 # NSFW 필터 설정 (강화된 버전)
 # =============================================================================
 import unicodedata
 
-NSFW_KEYWORDS = [
-    # 욕설/비속어 (한국어)
-    "시발", "씨발", "병신", "지랄", "새끼", "개새끼", "미친", "존나", "좆",
-    # 욕설/비속어 (영어)
-    "fuck", "shit", "bitch", "asshole", "bastard", "damn",
-    # 욕설/비속어 (일본어)
-    "くそ", "ちくしょう", "馬鹿",
-]
+# 키워드 사전은 파일(버전 포함)에서 읽고 변경 시 핫 리로드 (nsfw_lexicon.py)
+NSFW_LEXICON_PATH = os.getenv("NSFW_LEXICON_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "nsfw_lexicon.json")
+NSFW_LEXICON_POLL_SECONDS = float(os.getenv("NSFW_LEXICON_POLL_SECONDS", "5"))
 
-# 한글 자모 분리 변형 패턴 (예: "시ㅂ발" → "시발")
-KOREAN_JAMO_VARIANTS = {
-    "ㅅㅣㅂㅏㄹ": "시발", "ㅆㅣㅂㅏㄹ": "씨발",
-    "ㅂㅕㅇㅅㅣㄴ": "병신", "ㅈㅣㄹㅏㄹ": "지랄",
-    "ㅅㅐㄲㅣ": "새끼", "ㅈㅗㄴㄴㅏ": "존나",
-}
+nsfw_lexicon = NsfwLexicon(NSFW_LEXICON_PATH, NSFW_LEXICON_POLL_SECONDS)
+try:
+    nsfw_lexicon.load()
+except LexiconError as e:
+    logger.warning("NSFW lexicon unavailable, using built-in keywords: %s", e)
 
-# 공백/특수문자 삽입 우회 탐지용 정규식 패턴
-def _create_spaced_pattern(word: str) -> str:
-    """단어 사이에 공백/특수문자가 삽입된 패턴 생성"""
-    # 각 글자 사이에 선택적 공백/특수문자 허용
-    chars = list(word)
-    pattern = r"[\s\.\-_]*".join(re.escape(c) for c in chars)
-    return pattern
+@app.on_event("startup")
+async def start_nsfw_lexicon():
+    """사전 파일 변경 감시 시작 (변경 시 매처 핫 리로드)"""
+    await nsfw_lexicon.start()
 
-# 정규화된 NSFW 패턴 (공백 삽입 우회 탐지)
-NSFW_PATTERNS = [re.compile(_create_spaced_pattern(kw), re.IGNORECASE) for kw in NSFW_KEYWORDS]
+@app.on_event("shutdown")
+async def stop_nsfw_lexicon():
+    await nsfw_lexicon.stop()
 
 def _normalize_text(text: str) -> str:
     """텍스트 정규화 (유니코드 정규화 + 공백 제거)"""
@@ -175,35 +457,21 @@ def _normalize_text(text: str) -> str:
     normalized = unicodedata.normalize("NFC", text)
     return normalized
 
-def _normalize_korean_jamo(text: str) -> str:
-    """한글 자모 분리 변형 복원"""
-    result = text
-    for variant, original in KOREAN_JAMO_VARIANTS.items():
-        result = result.replace(variant, original)
-    return result
-
 def filter_nsfw_input(text: str) -> str:
     """입력 텍스트에서 NSFW 콘텐츠 필터링 (강화 버전)"""
     # 1. 유니코드 정규화
     filtered = _normalize_text(text)
-    # 2. 한글 자모 변형 복원
-    filtered = _normalize_korean_jamo(filtered)
-    # 3. 기본 키워드 필터링
-    for keyword in NSFW_KEYWORDS:
-        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-        filtered = pattern.sub("***", filtered)
-    # 4. 공백 삽입 우회 패턴 필터링
-    for pattern in NSFW_PATTERNS:
-        filtered = pattern.sub("***", filtered)
-    return filtered
+    # 2. 분리된 한글 자모를 음절로 조합 (예: "ㅅㅣㅂㅏㄹ" → "시발", 단일 순회)
+    filtered = compose_hangul(filtered)
+    # 3. 키워드 + 공백/특수문자 삽입 우회 필터링 (현재 사전의 매처, 사전 순서대로)
+    return nsfw_lexicon.matcher.mask(filtered)
 
 def filter_nsfw_output(result: dict) -> dict:
     """출력 결과에서 NSFW 콘텐츠 필터링"""
+    matcher = nsfw_lexicon.matcher  # 필드마다 같은 사전 버전으로 (도중에 리로드돼도)
+
     def filter_text(text: str) -> str:
-        for keyword in NSFW_KEYWORDS:
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            text = pattern.sub("***", text)
-        return text
+        return matcher.mask(text, spaced=False)  # 출력은 키워드 그대로만 (기존 필터와 동일)
 
     def filter_list(items: list) -> list:
         return [filter_text(item) if isinstance(item, str) else item for item in items]
@@ -320,71 +588,34 @@ Focus on spending patterns, potential savings, and financial health.
 # #13: 잔여 기간 지출 계획 조언을 포함한 분석 템플릿
 ANALYSIS_TEMPLATES = {
 
-    "ko": """다음 가계부 데이터를 분석하고 JSON 형식으로 응답해주세요:
+    "ko": """다음 가계부 데이터를 분석해주세요:
 
 {data}
 
 [중요] oneLiner는 반드시 다음 스타일로 작성하세요: {one_liner_tone}
+spendingPlan에는 남은 기간 동안의 구체적인 지출 계획을 금액과 함께 제시하세요.""",
 
-아래의 JSON 구조로 응답해주세요:
-{{
-  "oneLiner": "한 마디 요약 - 위 스타일을 극단적으로 반영한 짧고 강렬한 한 문장",
-  "summary": "전체 재정 상태 요약 (2-3문장)",
-  "insights": ["핵심 인사이트 1", "핵심 인사이트 2", "핵심 인사이트 3"],
-  "warnings": ["과소비나 우려 사항에 대한 경고"],
-  "suggestions": ["구체적인 개선 제안 1", "제안 2"],
-  "spendingPlan": "남은 기간 동안의 구체적인 지출 계획 조언 (예: '남은 15일간 하루 평균 3만원 이내로 지출하면 예산 내 유지 가능합니다. 식비는 2만원, 기타 1만원으로 배분하세요.')",
-  "pattern": {{
-    "mainCategory": "가장 지출이 많은 카테고리",
-    "spendingTrend": "increasing/decreasing/stable",
-    "savingPotential": 10000,
-    "riskLevel": "low/medium/high"
-  }}
-}}""",
-
-    "en": """Please analyze the following budget data and respond in JSON format:
+    "en": """Please analyze the following budget data:
 
 {data}
 
 [IMPORTANT] The oneLiner MUST be written in this style: {one_liner_tone}
+In spendingPlan, give a concrete spending plan with amounts for the remaining period.""",
 
-Respond with this exact JSON structure:
-{{
-  "oneLiner": "One-liner summary - A short, punchy sentence that STRONGLY reflects the above style",
-  "summary": "Overall financial status summary in 2-3 sentences",
-  "insights": ["Key insight 1", "Key insight 2", "Key insight 3"],
-  "warnings": ["Warning about overspending or concerns"],
-  "suggestions": ["Specific actionable suggestion 1", "Suggestion 2"],
-  "spendingPlan": "Specific spending plan advice for the remaining period (e.g., 'For the remaining 15 days, keep daily spending under $30 to stay within budget. Allocate $20 for food and $10 for other expenses.')",
-  "pattern": {{
-    "mainCategory": "Category with highest spending",
-    "spendingTrend": "increasing/decreasing/stable",
-    "savingPotential": 10000,
-    "riskLevel": "low/medium/high"
-  }}
-}}""",
-
-    "ja": """以下の家計簿データを分析し、JSON形式で回答してください：
+    "ja": """以下の家計簿データを分析してください：
 
 {data}
 
 [重要] oneLinerは必ず次のスタイルで書いてください：{one_liner_tone}
+spendingPlanには残りの期間の具体的な支出計画を金額とともに示してください。"""
+}
 
-以下のJSON構造で回答してください：
-{{
-  "oneLiner": "一言まとめ - 上記のスタイルを極端に反映した短くてインパクトのある一文",
-  "summary": "全体的な財務状況の要約（2-3文）",
-  "insights": ["重要な洞察1", "重要な洞察2", "重要な洞察3"],
-  "warnings": ["過支出や懸念事項についての警告"],
-  "suggestions": ["具体的な改善提案1", "提案2"],
-  "spendingPlan": "残りの期間の具体的な支出計画アドバイス（例：'残り15日間、1日平均3万円以内に抑えれば予算内で収まります。食費2万円、その他1万円に配分してください。'）",
-  "pattern": {{
-    "mainCategory": "最も支出が多いカテゴリー",
-    "spendingTrend": "increasing/decreasing/stable",
-    "savingPotential": 10000,
-    "riskLevel": "low/medium/high"
-  }}
-}}"""
+# 컨텍스트 캐시 사용 시 분석 템플릿의 {data} 자리에 들어가는 안내문
+# (데이터는 캐시된 접두부 뒤에 별도 메시지로 전송)
+CACHED_DATA_NOTES = {
+    "ko": "(가계부 데이터는 다음 메시지로 제공됩니다)",
+    "en": "(The budget data is provided in the next message)",
+    "ja": "(家計簿データは次のメッセージで提供されます)",
 }
 
 # =============================================================================
@@ -398,6 +629,9 @@ ERROR_MESSAGES = {
         "gemini_error": "AI 분석 중 오류가 발생했습니다: {detail}",
         "parse_error": "AI 응답을 처리하는 중 오류가 발생했습니다.",
         "network_error": "네트워크 오류: {detail}",
+        "circuit_open": "AI 서비스가 일시적으로 불안정합니다. 잠시 후 다시 시도해주세요.",
+        "server_busy": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+        "network_limit": "이 네트워크에서 오늘 분석 요청이 너무 많습니다. 내일 다시 시도해주세요.",
     },
     "en": {
         "rate_limit": "You've used all analysis attempts for today ({count}/{limit}). Please try again tomorrow.",
@@ -406,6 +640,9 @@ ERROR_MESSAGES = {
         "gemini_error": "Error during AI analysis: {detail}",
         "parse_error": "Error processing AI response.",
         "network_error": "Network error: {detail}",
+        "circuit_open": "The AI service is temporarily unavailable. Please try again shortly.",
+        "server_busy": "The server is busy. Please try again shortly.",
+        "network_limit": "Too many analysis requests from this network today. Please try again tomorrow.",
     },
     "ja": {
         "rate_limit": "本日の分析回数({count}/{limit})を使い切りました。明日もう一度お試しください。",
@@ -414,6 +651,9 @@ ERROR_MESSAGES = {
         "gemini_error": "AI分析中にエラーが発生しました：{detail}",
         "parse_error": "AI応答の処理中にエラーが発生しました。",
         "network_error": "ネットワークエラー：{detail}",
+        "circuit_open": "AIサービスが一時的に不安定です。しばらくしてからもう一度お試しください。",
+        "server_busy": "混み合っているため処理できません。しばらくしてからもう一度お試しください。",
+        "network_limit": "このネットワークからの本日の分析リクエストが多すぎます。明日もう一度お試しください。",
     },
 }
 
@@ -441,7 +681,8 @@ def validate_device_id(device_id: str) -> bool:
 # 요청/응답 모델
 # =============================================================================
 class AnalyzeRequest(BaseModel):
-    data: str
+    data: Optional[str] = None  # 앱에서 렌더링한 마크다운 (기존 형식)
+    budget: Optional[BudgetPayload] = None  # 구조화된 가계부 데이터 (서버에서 집계/렌더링)
     language: str = "ko"
     tone: str = "gentle"  # gentle, praise, factual, coach, humorous
     device_id: str  # #17: 기기 고유 식별자 (필수, UUID v4 형식)
@@ -454,22 +695,93 @@ class AnalyzeRequest(BaseModel):
             raise ValueError('Invalid device_id format. Must be UUID v4.')
         return v.lower()  # 소문자로 정규화
 
+    # data / budget 중 하나 필수, budget은 canonical 텍스트로 렌더링하여 data에 저장
+    # (이후 파이프라인/로그/작업은 모두 data 텍스트만 사용)
+    @model_validator(mode='after')
+    def render_structured_budget(self) -> "AnalyzeRequest":
+        if self.budget is not None:
+            self.data = render_budget_payload(self.budget, datetime.now(KST).date())
+        elif self.data is None:
+            raise ValueError('Either data or budget is required.')
+        return self
+
+# 분석 결과 모델 - Gemini responseSchema 로도 사용 (description/enum 이 그대로 전달됨)
+# enum 은 스키마에만 넣고 검증은 str 로 유지 (기존 로그/응답 호환)
 class PatternResponse(BaseModel):
-    mainCategory: str
-    spendingTrend: str
-    savingPotential: int
-    riskLevel: str
-
-class AnalyzeResponse(BaseModel):
-    oneLiner: str  # 한 마디 요약 (톤 강하게 반영)
-    summary: str
-    insights: list[str]
-    warnings: list[str]
-    suggestions: list[str]
-    spendingPlan: str  # #13: 잔여 기간 지출 계획 조언
+    mainCategory: str = Field(description="Category with the highest spending")
+    spendingTrend: str = Field(json_schema_extra={"enum": ["increasing", "decreasing", "stable"]})
+    savingPotential: int = Field(description="Estimated monthly saving potential as an amount")
+    riskLevel: str = Field(json_schema_extra={"enum": ["low", "medium", "high"]})
+
+class AnalysisResult(BaseModel):
+    oneLiner: str = Field(description="Short, punchy one-sentence summary in the requested style")  # 한 마디 요약 (톤 강하게 반영)
+    summary: str = Field(description="Overall financial status in 2-3 sentences")
+    insights: list[str] = Field(description="Key insights", json_schema_extra={"maxItems": 5})
+    warnings: list[str] = Field(description="Warnings about overspending or concerns", json_schema_extra={"maxItems": 5})
+    suggestions: list[str] = Field(description="Specific actionable suggestions", json_schema_extra={"maxItems": 5})
+    # #13: 잔여 기간 지출 계획 조언
+    spendingPlan: str = Field(description="Concrete spending plan for the remaining period, e.g. daily limit and allocation")
     pattern: PatternResponse
+
+class AnalyzeResponse(AnalysisResult):
     remainingAnalyses: int  # #17: 남은 분석 횟수
 
+# Gemini 생성 설정 / 안전 설정 (모든 요청 공통)
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 2048,
+    "responseMimeType": "application/json",
+    "responseSchema": gemini_response_schema(AnalysisResult)
+}
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+# 요청 본문의 고정 부분 (generationConfig / safetySettings / responseSchema) 은 한 번만 인코딩
+# reduced: 토큰 예산 사용률이 높을 때 maxOutputTokens 를 줄인 버전
+def _encode_body_tail(generation_config: dict) -> bytes:
+    return (
+        b',"generationConfig":' + orjson.dumps(generation_config)
+        + b',"safetySettings":' + orjson.dumps(SAFETY_SETTINGS)
+        + b'}'
+    )
+
+_GEMINI_BODY_TAIL = _encode_body_tail(GENERATION_CONFIG)
+_GEMINI_BODY_TAIL_REDUCED = _encode_body_tail({
+    **GENERATION_CONFIG,
+    "maxOutputTokens": min(GENERATION_CONFIG["maxOutputTokens"], SPEND_REDUCED_MAX_OUTPUT_TOKENS)
+})
+
+
+def encode_gemini_body(contents: list, cached_content: Optional[str] = None, reduced: bool = False) -> bytes:
+    """generateContent 요청 본문 (가변 부분만 인코딩 후 고정 부분과 연결)"""
+    head = (b'{"cachedContent":' + orjson.dumps(cached_content) + b',') if cached_content else b'{'
+    tail = _GEMINI_BODY_TAIL_REDUCED if reduced else _GEMINI_BODY_TAIL
+    return head + b'"contents":' + orjson.dumps(contents) + tail
+
+
+# 비동기 분석 작업 응답
+class JobResponse(BaseModel):
+    job_id: str
+    status: str  # queued / running / done / error
+    result: Optional[AnalyzeResponse] = None  # status=done 일 때
+    error: Optional[str] = None  # status=error 일 때 (사용자용 메시지)
+    status_code: Optional[int] = None
+
+# 관리자 일괄 재분석 요청 (log_ids 또는 created_at 범위 지정)
+class ReanalyzeRequest(BaseModel):
+    log_ids: Optional[list[int]] = None
+    start: Optional[str] = None  # created_at 이상 (예: "2025-01-01" 또는 "2025-01-01 09:00:00")
+    end: Optional[str] = None  # created_at 미만
+    status_code: Optional[int] = 200  # 원본 로그 상태 필터 (None이면 전체)
+    limit: int = 1000
+    concurrency: Optional[int] = None  # 미지정 시 REANALYSIS_CONCURRENCY
+
 # #17: 사용량 조회 응답
 class UsageResponse(BaseModel):
     device_id: str
@@ -478,6 +790,465 @@ class UsageResponse(BaseModel):
     limit: int
     remaining: int
 
+# =============================================================================
+# 분석 파이프라인 (동기 API / 비동기 작업 공용)
+# =============================================================================
+def build_prompts(language: str, tone: str, data: str) -> tuple[str, str]:
+    """언어/톤별 (시스템 프롬프트, 분석 프롬프트) 생성"""
+    # 언어별 톤 프롬프트 가져오기
+    tone_prompts = TONE_PROMPTS.get(language, TONE_PROMPTS["ko"])
+    tone_text = tone_prompts.get(tone, tone_prompts["gentle"])
+
+    # 한 마디 요약용 강한 톤 프롬프트 가져오기
+    one_liner_prompts = ONE_LINER_TONE_PROMPTS.get(language, ONE_LINER_TONE_PROMPTS["ko"])
+    one_liner_tone = one_liner_prompts.get(tone, one_liner_prompts["gentle"])
+
+    # 언어별 프롬프트 생성
+    system_prompt = SYSTEM_PROMPTS.get(language, SYSTEM_PROMPTS["ko"]).format(tone=tone_text)
+    analysis_prompt = ANALYSIS_TEMPLATES.get(language, ANALYSIS_TEMPLATES["ko"]).format(
+        data=data,
+        one_liner_tone=one_liner_tone
+    )
+    return system_prompt, analysis_prompt
+
+
+def build_cached_prefix(language: str, tone: str) -> tuple[str, str]:
+    """컨텍스트 캐시용 고정 접두부 (데이터 자리에는 안내문)"""
+    return build_prompts(language, tone, CACHED_DATA_NOTES.get(language, CACHED_DATA_NOTES["ko"]))
+
+
+class AnalysisError(Exception):
+    """분석 실패 - 사용자 응답 정보와 로그 기록 정보를 함께 보관"""
+
+    def __init__(
+        self,
+        status_code: int,
+        detail: str,
+        log_message: Optional[str] = None,  # None이면 로그를 남기지 않음
+        log_status: Optional[int] = None,  # 로그에 기록할 상태 코드 (기본: status_code)
+        response_data: Optional[str] = None,
+        headers: Optional[dict] = None,
+        model: Optional[str] = None,  # 응답한 모델 (업스트림 호출 전 실패면 None)
+        metrics: Optional[dict] = None,  # 업스트림 메트릭 (analysis_logs 컬럼명 → 값)
+        local_fallback: bool = True,  # False면 로컬 분석으로 대체하지 않음 (예: 토큰 예산 소진)
+    ):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.log_message = log_message
+        self.log_status = log_status if log_status is not None else status_code
+        self.response_data = response_data
+        self.headers = headers
+        self.model = model
+        self.metrics = metrics or {}
+        self.local_fallback = local_fallback
+
+
+def prepare_prompts(data: str, language: str, tone: str) -> tuple:
+    """
+    입력 NSFW 필터링 → 압축 → (선택) 숫자 필드 사전 계산 → 프롬프트 생성
+
+    (필터링된 데이터, 사전 계산 facts 또는 None, 시스템 프롬프트, 분석 프롬프트) 반환
+    동기 함수 (큰 데이터는 payload_offloader 가 스레드 풀에서 실행)
+    """
+    # NSFW 필터링 (입력)
+    filtered_data = filter_nsfw_input(data)
+
+    # 토큰 예산 초과 시 데이터 압축 (오래된 지출 → 월별 합계, 구조화 budget 은 최근/일별 내역 축소)
+    filtered_data = compact_budget_data(filtered_data, PROMPT_TOKEN_BUDGET, PROMPT_RECENT_DAYS, language)
+
+    # 숫자 필드 사전 계산 (원본 데이터 기준) → 프롬프트에 전달, 결과에 덮어씀
+    facts = extract_facts(data, datetime.now(KST).date()) if LOCAL_INSIGHTS_PREFILL else None
+    if facts is not None:
+        filtered_data += "\n\n" + render_prefill(facts)
+
+    system_prompt, analysis_prompt = build_prompts(language, tone, filtered_data)
+    return filtered_data, facts, system_prompt, analysis_prompt
+
+
+def parse_analysis_response(text: str, facts) -> tuple[Optional[dict], bool]:
+    """
+    Gemini 응답 텍스트 → (분석 결과 또는 None, 복구 여부), 출력 NSFW 필터링 포함
+
+    동기 함수 (큰 응답은 payload_offloader 가 스레드 풀에서 실행)
+    """
+    # JSON 파싱: responseSchema 덕분에 대부분 한 번의 검증으로 끝남 (fast path)
+    # 실패 시 관대한 파서로 복구 (코드 펜스/뒤따르는 설명/잘린 JSON, 누락 필드 기본값)
+    try:
+        analysis_result, repaired = AnalysisResult.model_validate_json(text).model_dump(), False
+    except ValidationError:
+        analysis_result, repaired = parse_analysis_text(text)
+    if analysis_result is None:
+        return None, repaired
+    if facts is not None:
+        analysis_result["pattern"] = compute_pattern(facts)
+
+    # NSFW 필터링 (출력)
+    return filter_nsfw_output(analysis_result), repaired
+
+
+async def generate_analysis(data: str, language: str, tone: str) -> tuple[dict, str, dict]:
+    """
+    프롬프트 생성 → Gemini 호출 → JSON 파싱 → NSFW 필터링
+
+    (분석 결과, 응답한 모델, 업스트림 메트릭) 반환
+    메트릭: upstream_ms / ttfb_ms / 토큰 수 / 요청·응답 크기 (analysis_logs 컬럼명)
+    사용량/로그는 다루지 않음 (호출자가 처리). 실패 시 AnalysisError 발생
+    """
+    # API 키 확인
+    if not GEMINI_API_KEY:
+        raise AnalysisError(500, get_error_message("api_key_missing", language))
+
+    # 입력 필터링 + 프롬프트 생성 (큰 데이터는 이벤트 루프를 막지 않도록 스레드 풀에서)
+    filtered_data, facts, system_prompt, analysis_prompt = await payload_offloader.run(
+        len(data), prepare_prompts, data, language, tone
+    )
+
+    # 전역 토큰 예산 확인 + 예상 토큰 예약 (문자 수 기반 근사 + 최대 출력 토큰, O(1))
+    estimate = (len(system_prompt) + len(analysis_prompt)) // 2 + GENERATION_CONFIG["maxOutputTokens"]
+    spend_level = spend_governor.reserve(estimate)
+    if spend_level in (LOCAL_ONLY, REJECT):
+        raise AnalysisError(
+            503,
+            get_error_message("server_busy", language),
+            headers={"Retry-After": str(spend_governor.retry_after())},
+            local_fallback=spend_level == LOCAL_ONLY
+        )
+    reduced = spend_level == REDUCED
+
+    full_payload = encode_gemini_body([{
+        "role": "user",
+        "parts": [
+            {"text": system_prompt},
+            {"text": analysis_prompt}
+        ]
+    }], reduced=reduced)
+
+    # 컨텍스트 캐시가 있으면 캐시 이름 + 데이터(가변 접미부)만 전송
+    # (cachedContents는 모델별이므로 캐시를 만든 모델로 라우팅된 경우에만 사용)
+    used_cache = []
+    metrics = {}
+
+    def build_payload(model: str) -> bytes:
+        cache_name = context_cache.get(language, tone) if context_cache and model == context_cache.model else None
+        body = full_payload
+        if cache_name:
+            used_cache.append(model)
+            body = encode_gemini_body(
+                [{"role": "user", "parts": [{"text": filtered_data}]}],
+                cached_content=cache_name,
+                reduced=reduced
+            )
+        metrics["request_bytes"] = len(body)
+        return body
+
+    # Gemini API 호출 (모델 라우팅 + 일시적 오류 재시도 + 선택적 헤지 요청)
+    upstream_started = time.monotonic()
+    try:
+        model, response = await model_router.generate(gemini_client, build_payload)
+        if used_cache and model in used_cache and is_cache_error(response):
+            # 캐시 만료/삭제 → 전체 프롬프트로 투명하게 폴백
+            context_cache.invalidate(language, tone)
+            metrics["request_bytes"] = len(full_payload)
+            model, response = await model_router.generate(gemini_client, lambda _: full_payload)
+    except CircuitOpenError as e:
+        # 서킷 open: 업스트림 호출/DB 로그 없이 즉시 실패 (fast-fail)
+        raise AnalysisError(
+            503,
+            get_error_message("circuit_open", language),
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    except httpx.RequestError as e:
+        # 네트워크 에러 - 상세 에러는 로그에만 저장, 사용자에게는 일반화된 메시지만 반환 (보안)
+        raise AnalysisError(
+            503,  # Service Unavailable
+            get_error_message("network_error", language, detail="서비스 연결 실패"),
+            log_message=f"Network error: {str(e)}",
+            log_status=500,
+            metrics={**metrics, "upstream_ms": (time.monotonic() - upstream_started) * 1000}
+        )
+    finally:
+        spend_governor.release(estimate)
+
+    timing = response.extensions.get("timing", {})
+    metrics["upstream_ms"] = (time.monotonic() - upstream_started) * 1000
+    metrics["ttfb_ms"] = timing["ttfb"] * 1000 if "ttfb" in timing else None
+    metrics["response_bytes"] = len(response.content)
+
+    if response.status_code != 200:
+        error_data = response.json()
+        # 상세 에러는 로그에만 저장 (보안: 사용자에게 노출하지 않음)
+        internal_detail = error_data.get("error", {}).get("message", "Unknown error")
+        raise AnalysisError(
+            502,  # Bad Gateway (외부 API 에러)
+            get_error_message("gemini_error", language, detail="AI 서비스 일시 오류"),
+            log_message=f"Gemini API error: {internal_detail}",
+            log_status=response.status_code,
+            model=model,
+            metrics=metrics
+        )
+
+    result = orjson.loads(response.content)
+    usage = result.get("usageMetadata", {})
+    metrics["prompt_tokens"] = usage.get("promptTokenCount")
+    metrics["output_tokens"] = usage.get("candidatesTokenCount")
+    metrics["cached_tokens"] = usage.get("cachedContentTokenCount")
+    spend_governor.record(usage.get("totalTokenCount") or 0)
+    text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+
+    if not text:
+        raise AnalysisError(
+            500,
+            get_error_message("parse_error", language),
+            log_message="Empty response from Gemini API",
+            model=model,
+            metrics=metrics
+        )
+
+    # JSON 파싱 + 출력 NSFW 필터링 (큰 응답은 스레드 풀에서)
+    analysis_result, repaired = await payload_offloader.run(len(text), parse_analysis_response, text, facts)
+    if analysis_result is None:
+        raise AnalysisError(
+            500,
+            get_error_message("parse_error", language),
+            log_message="JSON parse error",
+            response_data=text,  # raw 응답 저장
+            model=model,
+            metrics=metrics
+        )
+    if repaired:
+        logger.warning("Salvaged malformed/truncated response from %s", model)
+
+    return analysis_result, model, metrics
+
+
+def check_daily_limit(req: AnalyzeRequest) -> None:
+    """#17: 일일 사용량 확인 (초과 시 로그 저장 후 429)"""
+    current_count = db.get_usage_count(req.device_id)
+    if current_count >= DAILY_LIMIT:
+        mark_quota_exhausted(req.device_id)
+        # 요청 로그 저장 (Rate Limit)
+        db.save_analysis_log(
+            device_id=req.device_id,
+            language=req.language,
+            tone=req.tone,
+            request_data=req.data,
+            status_code=429,
+            error_message=f"Rate limit exceeded: {current_count}/{DAILY_LIMIT}"
+        )
+        raise HTTPException(
+            status_code=429,  # Too Many Requests
+            detail=get_error_message("rate_limit", req.language, count=current_count, limit=DAILY_LIMIT)
+        )
+
+
+def check_device_rotation(req: AnalyzeRequest, request: Request) -> None:
+    """
+    기기 ID 교체 감지 (Gemini 분석 경로만): IP/네트워크의 오늘 고유 기기 수가 throttle 기준 이상이면 429
+
+    허용 대역도 감지/제한 (허용 대역은 분당 제한만 면제, 일일 한도 우회 방지는 그대로)
+    """
+    status, key, devices = device_rotation.observe(get_client_ip(request), req.device_id, get_today_kst())
+    if status != THROTTLE:
+        return
+    db.save_analysis_log(
+        device_id=req.device_id,
+        language=req.language,
+        tone=req.tone,
+        request_data=req.data,
+        status_code=429,
+        error_message=f"Device rotation throttled: {key} ~{devices} devices today"
+    )
+    raise HTTPException(
+        status_code=429,
+        detail=get_error_message("network_limit", req.language),
+        headers={"Retry-After": str(seconds_until_kst_midnight())}
+    )
+
+
+def run_local_analysis(req: AnalyzeRequest, reason: str, started: float) -> Optional[bytes]:
+    """
+    규칙 기반 로컬 분석 → 로그 저장 후 JSON bytes 반환 (사용량 미차감)
+
+    가계부 데이터에서 예산 정보를 찾지 못하면 None
+    """
+    today = datetime.now(KST).date()
+    facts = facts_from_payload(req.budget, today) if req.budget is not None else extract_facts(req.data, today)
+    if facts is None:
+        return None
+
+    analysis_result = filter_nsfw_output(build_local_analysis(facts, req.language))
+    analysis_result["remainingAnalyses"] = max(0, DAILY_LIMIT - db.get_usage_count(req.device_id))
+    body = orjson.dumps(analysis_result)
+
+    db.save_analysis_log(
+        device_id=req.device_id,
+        language=req.language,
+        tone=req.tone,
+        request_data=req.data,
+        response_data=body.decode(),
+        status_code=200,
+        error_message=f"Local insights: {reason}",
+        model=LOCAL_MODEL,
+        metrics={"total_ms": (time.monotonic() - started) * 1000, "response_bytes": len(body)}
+    )
+    return body
+
+
+async def run_analysis(req: AnalyzeRequest) -> bytes:
+    """
+    일일 제한 확인 → 분석 → 사용량 증가 → 로그 저장 (실패 시 HTTPException)
+    Gemini 실패(또는 설정 시 한도 초과) 시 로컬 분석으로 대체
+
+    결과는 한 번만 직렬화하여 (JSON bytes) HTTP 응답/로그/작업 결과에 그대로 사용
+    """
+    started = time.monotonic()
+    try:
+        check_daily_limit(req)
+    except HTTPException:
+        body = run_local_analysis(req, "daily limit reached", started) if LOCAL_INSIGHTS_ON_LIMIT else None
+        if body is None:
+            raise
+        return body
+
+    try:
+        analysis_result, model, metrics = await generate_analysis(req.data, req.language, req.tone)
+    except AnalysisError as e:
+        if e.log_message:
+            db.save_analysis_log(
+                device_id=req.device_id,
+                language=req.language,
+                tone=req.tone,
+                request_data=req.data,
+                response_data=e.response_data,
+                status_code=e.log_status,
+                error_message=e.log_message,
+                model=e.model,
+                metrics={**e.metrics, "total_ms": (time.monotonic() - started) * 1000}
+            )
+        # Gemini 를 쓸 수 없으면 에러 대신 로컬 분석 (사용량 미차감)
+        use_local = LOCAL_INSIGHTS_FALLBACK and e.local_fallback
+        body = run_local_analysis(req, f"fallback after {e.status_code}", started) if use_local else None
+        if body is None:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+        return body
+
+    # #17: 사용량 증가 (성공한 경우에만)
+    new_count = db.increment_usage(req.device_id)
+
+    # #17: 남은 분석 횟수 추가
+    analysis_result["remainingAnalyses"] = max(0, DAILY_LIMIT - new_count)
+
+    body = orjson.dumps(analysis_result)
+
+    # 요청/응답 로그 저장 (성공)
+    db.save_analysis_log(
+        device_id=req.device_id,
+        language=req.language,
+        tone=req.tone,
+        request_data=req.data,
+        response_data=body.decode(),
+        status_code=200,
+        model=model,
+        metrics={**metrics, "total_ms": (time.monotonic() - started) * 1000}
+    )
+
+    # 주기적으로 오래된 데이터 정리
+    db.cleanup_old_data()
+
+    return body
+
+
+# =============================================================================
+# 비동기 분석 작업 (워커 풀)
+# =============================================================================
+# 느린 분석이 HTTP 연결(nginx proxy_read_timeout 120s)을 점유하지 않도록
+# 작업을 큐에 넣고 즉시 job_id를 반환, 클라이언트는 상태를 폴링
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+ANALYSIS_JOB_QUEUE_SIZE = int(os.getenv("ANALYSIS_JOB_QUEUE_SIZE", "100"))
+# 작업 임대 시간(초) - 실행 중 워커가 주기적으로 연장, 프로세스가 죽으면 만료 후 다른 워커가 재실행
+ANALYSIS_JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "120"))
+
+
+def job_request_body(req: AnalyzeRequest) -> str:
+    """작업에 저장할 원본 요청 JSON (구조화된 budget 은 렌더링된 data 대신 원본 그대로)"""
+    return req.model_dump_json(exclude={"data"} if req.budget is not None else None, exclude_none=True)
+
+
+async def run_analysis_job(job: dict) -> tuple[int, str]:
+    """워커에서 실행되는 작업 핸들러 (동기 API와 동일한 파이프라인)"""
+    if job.get("request_body"):
+        req = AnalyzeRequest.model_validate_json(job["request_body"])
+    else:  # request_body 컬럼 추가 전에 등록된 작업
+        req = AnalyzeRequest(
+            data=job["request_data"],
+            language=job["language"],
+            tone=job["tone"],
+            device_id=job["device_id"],
+        )
+    try:
+        body = await run_analysis(req)
+    except HTTPException as e:
+        return e.status_code, str(e.detail)
+    return 200, body.decode()
+
+
+job_pool = JobWorkerPool(
+    db,
+    run_analysis_job,
+    workers=ANALYSIS_JOB_WORKERS,
+    max_queue=ANALYSIS_JOB_QUEUE_SIZE,
+    lease_seconds=ANALYSIS_JOB_LEASE_SECONDS,
+)
+
+@app.on_event("startup")
+async def start_job_pool():
+    """서버 시작 시 워커 시작 (미완료 작업 복구)"""
+    await job_pool.start()
+
+@app.on_event("shutdown")
+async def stop_job_pool():
+    """서버 종료 시 워커 정리"""
+    await job_pool.stop()
+
+
+# =============================================================================
+# 관리자 일괄 재분석 (백필)
+# =============================================================================
+# 템플릿/모델 변경 후 저장된 request_data 를 재분석 (사용자 usage 소모 없음)
+REANALYSIS_CONCURRENCY = int(os.getenv("REANALYSIS_CONCURRENCY", "2"))
+REANALYSIS_MAX_CONCURRENCY = int(os.getenv("REANALYSIS_MAX_CONCURRENCY", "8"))
+REANALYSIS_MIN_INTERVAL = float(os.getenv("REANALYSIS_MIN_INTERVAL", "0.5"))  # 요청 시작 간 최소 간격(초)
+
+
+async def reanalyze_log_data(data: str, language: str, tone: str) -> tuple[int, str, Optional[str]]:
+    """재분석 실행 함수 (분석 파이프라인만 실행, 사용량/로그 미기록) → 실제 응답한 모델 포함"""
+    try:
+        analysis_result, model, _ = await generate_analysis(data, language, tone)
+    except AnalysisError as e:
+        return e.status_code, e.log_message or e.detail, e.model
+    return 200, orjson.dumps(analysis_result).decode(), model
+
+
+reanalysis_runner = ReanalysisRunner(db, reanalyze_log_data, min_interval=REANALYSIS_MIN_INTERVAL)
+
+@app.on_event("startup")
+async def resume_reanalysis():
+    """서버 시작 시 미완료 재분석 배치 재개"""
+    await reanalysis_runner.resume_unfinished()
+
+@app.on_event("shutdown")
+async def stop_reanalysis():
+    """서버 종료 시 재분석 태스크 정리"""
+    await reanalysis_runner.stop()
+
+
+def _batch_summary(batch: dict) -> dict:
+    """재분석 배치 응답 (대상 ID 목록은 제외)"""
+    summary = {k: v for k, v in batch.items() if k != "log_ids"}
+    summary["remaining"] = batch["total"] - batch["succeeded"] - batch["failed"]
+    return summary
+
 # =============================================================================
 # API 엔드포인트
 # =============================================================================
@@ -485,7 +1256,8 @@ class UsageResponse(BaseModel):
 async def health_check():
     """헬스 체크"""
     # API 키 존재 여부는 노출하지 않음 (보안)
-    return {"status": "ok"}
+    # 업스트림 서킷 상태만 공개 (closed / open / half_open)
+    return {"status": "ok", "gemini": model_router.state()}
 
 @app.get("/api/tones")
 async def get_tones():
@@ -520,195 +1292,72 @@ async def analyze(req: AnalyzeRequest, request: Request):
     """AI 가계부 분석 (#17: 일일 3회 제한 적용, IP Rate Limiting 추가)"""
     # device_id 형식은 Pydantic에서 자동 검증 (UUID v4)
 
-    # IP 기반 분당 요청 제한 확인
-    client_ip = get_client_ip(request)
-    if not check_ip_rate_limit(client_ip):
-        raise HTTPException(
-            status_code=429,
-            detail="Too many requests. Please wait a moment.",
-            headers={"Retry-After": "60"}
-        )
-
-    # 주기적으로 IP 기록 정리 (매 요청마다 실행, 가벼운 작업)
-    cleanup_ip_records()
+    # 기기별 분당 요청 제한 확인 (IP 제한은 RateLimitMiddleware 가 본문 읽기 전에 처리)
+    await enforce_device_rate_limit(req.device_id, request)
 
-    # #17: 일일 사용량 확인
-    current_count = db.get_usage_count(req.device_id)
-    if current_count >= DAILY_LIMIT:
-        # 요청 로그 저장 (Rate Limit)
-        db.save_analysis_log(
-            device_id=req.device_id,
-            language=req.language,
-            tone=req.tone,
-            request_data=req.data,
-            status_code=429,
-            error_message=f"Rate limit exceeded: {current_count}/{DAILY_LIMIT}"
-        )
-        raise HTTPException(
-            status_code=429,  # Too Many Requests
-            detail=get_error_message("rate_limit", req.language, count=current_count, limit=DAILY_LIMIT)
-        )
-
-    # API 키 확인
-    if not GEMINI_API_KEY:
+    # 기기 ID 를 바꿔가며 일일 한도를 우회하는 IP/네트워크 제한 (설정 시 로컬 분석으로 대체)
+    try:
+        check_device_rotation(req, request)
+    except HTTPException:
+        body = run_local_analysis(req, "device rotation throttled", time.monotonic()) if LOCAL_INSIGHTS_ON_LIMIT else None
+        if body is None:
+            raise
+        return Response(content=body, media_type="application/json")
+
+    # 이미 직렬화된 결과를 그대로 응답 (response_model 재검증/재인코딩 생략, 스키마 문서화용으로만 유지)
+    return Response(content=await run_analysis(req), media_type="application/json")
+
+@app.post("/api/analyze/local", response_model=AnalyzeResponse)
+async def analyze_local(req: AnalyzeRequest, request: Request):
+    """규칙 기반 로컬 분석 (Gemini 미사용, 일일 분석 횟수 미차감)"""
+    await enforce_device_rate_limit(req.device_id, request)
+
+    body = run_local_analysis(req, "requested", time.monotonic())
+    if body is None:
+        raise HTTPException(status_code=422, detail="Budget summary not found in data")
+    return Response(content=body, media_type="application/json")
+
+@app.post("/api/analyze/jobs", response_model=JobResponse, status_code=202)
+async def create_analysis_job(req: AnalyzeRequest, request: Request):
+    """비동기 AI 가계부 분석 작업 등록 (job_id 즉시 반환)"""
+    # 기기별 분당 요청 제한 확인 (IP 제한은 RateLimitMiddleware 에서)
+    await enforce_device_rate_limit(req.device_id, request)
+    check_device_rotation(req, request)
+
+    # 일일 한도는 등록 시점에 먼저 확인 (워커 실행 시 다시 확인, 한도 초과 시 로컬 분석이면 워커에서 처리)
+    if not LOCAL_INSIGHTS_ON_LIMIT:
+        check_daily_limit(req)
+
+    job_id = str(uuid.uuid4())
+    db.create_job(job_id, req.device_id, req.language, req.tone, req.data, job_request_body(req))
+    if not job_pool.submit(job_id):
+        db.update_job(job_id, JOB_ERROR, status_code=503, error_message="Job queue full")
         raise HTTPException(
-            status_code=500,
-            detail=get_error_message("api_key_missing", req.language)
+            status_code=503,
+            detail=get_error_message("server_busy", req.language),
+            headers={"Retry-After": "10"}
         )
-
-    # NSFW 필터링 (입력)
-    filtered_data = filter_nsfw_input(req.data)
-
-    # 언어별 톤 프롬프트 가져오기
-    tone_prompts = TONE_PROMPTS.get(req.language, TONE_PROMPTS["ko"])
-    tone_text = tone_prompts.get(req.tone, tone_prompts["gentle"])
-
-    # 한 마디 요약용 강한 톤 프롬프트 가져오기
-    one_liner_prompts = ONE_LINER_TONE_PROMPTS.get(req.language, ONE_LINER_TONE_PROMPTS["ko"])
-    one_liner_tone = one_liner_prompts.get(req.tone, one_liner_prompts["gentle"])
-
-    # 언어별 프롬프트 생성
-    system_prompt = SYSTEM_PROMPTS.get(req.language, SYSTEM_PROMPTS["ko"]).format(tone=tone_text)
-    analysis_prompt = ANALYSIS_TEMPLATES.get(req.language, ANALYSIS_TEMPLATES["ko"]).format(
-        data=filtered_data,
-        one_liner_tone=one_liner_tone
+    return JobResponse(job_id=job_id, status=JOB_QUEUED)
+
+
+@app.get("/api/analyze/jobs/{job_id}", response_model=JobResponse)
+async def get_analysis_job(job_id: str):
+    """비동기 분석 작업 상태/결과 조회"""
+    job = db.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = orjson.loads(job["result_data"]) if job["status"] == JOB_DONE and job["result_data"] else None
+    return Response(
+        content=orjson.dumps({
+            "job_id": job_id,
+            "status": job["status"],
+            "error": job["error_message"] if job["status"] == JOB_ERROR else None,
+            "status_code": job["status_code"],
+            "result": result,
+        }),
+        media_type="application/json",
     )
 
-    # Gemini API 호출
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(
-                GEMINI_URL,  # URL에서 API 키 제거
-                headers={"x-goog-api-key": GEMINI_API_KEY},  # 헤더로 API 키 전송 (보안 강화)
-                json={
-                    "contents": [{
-                        "role": "user",
-                        "parts": [
-                            {"text": system_prompt},
-                            {"text": analysis_prompt}
-                        ]
-                    }],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "topK": 40,
-                        "topP": 0.95,
-                        "maxOutputTokens": 2048,
-                        "responseMimeType": "application/json"
-                    },
-                    "safetySettings": [
-                        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                    ]
-                }
-            )
-
-            if response.status_code != 200:
-                error_data = response.json()
-                # 상세 에러는 로그에만 저장 (보안: 사용자에게 노출하지 않음)
-                internal_detail = error_data.get("error", {}).get("message", "Unknown error")
-                # 요청 로그 저장 (Gemini API 에러)
-                db.save_analysis_log(
-                    device_id=req.device_id,
-                    language=req.language,
-                    tone=req.tone,
-                    request_data=req.data,
-                    status_code=response.status_code,
-                    error_message=f"Gemini API error: {internal_detail}"
-                )
-                # 사용자에게는 일반화된 에러 메시지만 반환
-                raise HTTPException(
-                    status_code=502,  # Bad Gateway (외부 API 에러)
-                    detail=get_error_message("gemini_error", req.language, detail="AI 서비스 일시 오류")
-                )
-
-            result = response.json()
-            text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-
-            if not text:
-                # 요청 로그 저장 (빈 응답)
-                db.save_analysis_log(
-                    device_id=req.device_id,
-                    language=req.language,
-                    tone=req.tone,
-                    request_data=req.data,
-                    status_code=500,
-                    error_message="Empty response from Gemini API"
-                )
-                raise HTTPException(
-                    status_code=500,
-                    detail=get_error_message("parse_error", req.language)
-                )
-
-            # JSON 파싱
-            try:
-                analysis_result = json.loads(text)
-            except json.JSONDecodeError:
-                # JSON 추출 시도
-                json_match = re.search(r'\{[\s\S]*\}', text)
-                if json_match:
-                    analysis_result = json.loads(json_match.group())
-                else:
-                    # 요청 로그 저장 (JSON 파싱 에러)
-                    db.save_analysis_log(
-                        device_id=req.device_id,
-                        language=req.language,
-                        tone=req.tone,
-                        request_data=req.data,
-                        response_data=text,  # raw 응답 저장
-                        status_code=500,
-                        error_message="JSON parse error"
-                    )
-                    raise HTTPException(
-                        status_code=500,
-                        detail=get_error_message("parse_error", req.language)
-                    )
-
-            # NSFW 필터링 (출력)
-            analysis_result = filter_nsfw_output(analysis_result)
-
-            # #17: 사용량 증가 (성공한 경우에만)
-            new_count = db.increment_usage(req.device_id)
-
-            # #13: spendingPlan 필드 기본값 처리
-            if "spendingPlan" not in analysis_result:
-                analysis_result["spendingPlan"] = ""
-
-            # #17: 남은 분석 횟수 추가
-            analysis_result["remainingAnalyses"] = max(0, DAILY_LIMIT - new_count)
-
-            # 요청/응답 로그 저장 (성공)
-            db.save_analysis_log(
-                device_id=req.device_id,
-                language=req.language,
-                tone=req.tone,
-                request_data=req.data,
-                response_data=json.dumps(analysis_result, ensure_ascii=False),
-                status_code=200
-            )
-
-            # 주기적으로 오래된 데이터 정리
-            db.cleanup_old_data()
-
-            return analysis_result
-
-        except httpx.RequestError as e:
-            # 요청/응답 로그 저장 (네트워크 에러) - 상세 에러는 로그에만 저장
-            db.save_analysis_log(
-                device_id=req.device_id,
-                language=req.language,
-                tone=req.tone,
-                request_data=req.data,
-                status_code=500,
-                error_message=f"Network error: {str(e)}"
-            )
-            # 사용자에게는 일반화된 메시지만 반환 (보안)
-            raise HTTPException(
-                status_code=503,  # Service Unavailable
-                detail=get_error_message("network_error", req.language, detail="서비스 연결 실패")
-            )
-
 # =============================================================================
 # 로그 조회 API (관리자 인증 필요)
 # =============================================================================
@@ -720,18 +1369,138 @@ async def get_logs_endpoint(
 ):
     """분석 요청/응답 로그 조회 (관리자 전용)"""
     logs = db.get_logs(limit=limit, device_id=device_id)
-    return {
+    # 대량 로그는 jsonable_encoder 를 거치지 않고 orjson 으로 바로 직렬화
+    return ORJSONResponse({
         "count": len(logs),
         "logs": logs
-    }
+    })
 
 
 @app.get("/api/logs/stats")
 async def get_logs_stats_endpoint(
+    days: int = 1,
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """로그 통계 조회 (관리자 전용, performance: 최근 days 일 지연 백분위 / 토큰 분포)"""
+    days = max(1, min(days, 30))
+    since = (datetime.now(KST) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    stats = db.get_logs_stats()
+    stats["performance"] = {"days": days, **summarize_log_metrics(db.get_log_metrics(since))}
+    return ORJSONResponse(stats)
+
+
+@app.post("/api/admin/reanalyze")
+async def create_reanalysis_batch(
+    body: ReanalyzeRequest,
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """저장된 요청 일괄 재분석 시작 (관리자 전용, 결과는 reanalysis_results)"""
+    if not body.log_ids and not body.start and not body.end:
+        raise HTTPException(status_code=400, detail="Specify log_ids or a start/end range")
+    log_ids = db.get_logs_for_reanalysis(
+        log_ids=body.log_ids,
+        start=body.start,
+        end=body.end,
+        status_code=body.status_code,
+        limit=body.limit
+    )
+    if not log_ids:
+        raise HTTPException(status_code=404, detail="No logs matched")
+
+    concurrency = max(1, min(body.concurrency or REANALYSIS_CONCURRENCY, REANALYSIS_MAX_CONCURRENCY))
+    batch_id = str(uuid.uuid4())
+    # 배치에는 기본 모델을 기록, 결과마다 실제 응답한 모델은 reanalysis_results.model
+    db.create_reanalysis_batch(batch_id, log_ids, GEMINI_MODEL, concurrency)
+    reanalysis_runner.start(batch_id)
+    return _batch_summary(db.get_reanalysis_batch(batch_id))
+
+
+@app.get("/api/admin/reanalyze/{batch_id}")
+async def get_reanalysis_batch(
+    batch_id: str,
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """재분석 배치 진행 상황 조회 (관리자 전용)"""
+    batch = db.get_reanalysis_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_summary(batch)
+
+
+@app.post("/api/admin/reanalyze/{batch_id}/cancel")
+async def cancel_reanalysis_batch(
+    batch_id: str,
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """실행 중인 재분석 배치 취소 (관리자 전용, 저장된 결과는 유지)"""
+    if not reanalysis_runner.cancel(batch_id):
+        raise HTTPException(status_code=409, detail="Batch is not running")
+    return {"batch_id": batch_id, "status": "cancelling"}
+
+
+@app.post("/api/admin/nsfw-lexicon/reload")
+async def reload_nsfw_lexicon_endpoint(
     _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
 ):
-    """로그 통계 조회 (관리자 전용)"""
-    return db.get_logs_stats()
+    """NSFW 사전 파일 즉시 다시 읽기 (관리자 전용, 진행 중 요청은 이전 매처로 처리)"""
+    try:
+        return await nsfw_lexicon.reload()
+    except LexiconError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid lexicon, previous version kept: {e}")
+
+
+@app.post("/api/admin/ip-access/reload")
+async def reload_ip_access_endpoint(
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """CIDR 허용/차단 목록 파일 즉시 다시 읽기 (관리자 전용, 실패 시 기존 규칙 유지)"""
+    try:
+        return await ip_access_list.reload()
+    except AccessListError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid access list, previous rules kept: {e}")
+
+
+@app.get("/api/admin/device-rotation")
+async def get_device_rotation_endpoint(
+    limit: int = 20,
+    level: Optional[str] = None,
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """오늘 고유 기기 수가 많은 IP/네트워크 (관리자 전용, level: ip / network, 이 워커 기준 추정치)"""
+    if level is not None and level not in ("ip", "network"):
+        raise HTTPException(status_code=422, detail="level must be 'ip' or 'network'")
+    return {
+        **device_rotation.snapshot(),
+        "top": device_rotation.top(max(1, min(limit, 500)), level),
+    }
+
+
+@app.get("/api/metrics")
+async def get_metrics_endpoint(
+    _: bool = Depends(verify_admin_key)  # 관리자 인증 필수
+):
+    """업스트림 호출 메트릭 조회 (관리자 전용)"""
+    return {
+        "gemini": {
+            "models": model_router.snapshot(),
+            "latency_p50": gemini_client.latency.percentile(50),
+            "latency_p95": gemini_client.latency.percentile(95),
+            "context_cache": context_cache.snapshot() if context_cache else None,
+            "spend": spend_governor.snapshot(),
+        },
+        "nsfw_lexicon": nsfw_lexicon.snapshot(),
+        "offload": payload_offloader.snapshot(),
+        "ip_access": ip_access_list.snapshot(),
+        "device_rotation": device_rotation.snapshot(),
+        "rate_limits": {
+            "ip": ip_rate_limiter.snapshot(),
+            "device": device_rate_limiter.snapshot(),
+        },
+        "jobs": {
+            "workers": ANALYSIS_JOB_WORKERS,
+            "queued": job_pool.queue_size,
+        }
+    }
 
 
 # =============================================================================
@@ -0,0 +1,222 @@
+# =============================================================================
+# middleware.py - 순수 ASGI 미들웨어 (IP 허용/차단 / 요청 제한 / 본문 크기 제한)
+# =============================================================================
+# BaseHTTPMiddleware 는 요청마다 태스크/스트림을 추가로 만들고 응답을 한 번 더 감싸므로
+# 본문을 읽기 전에 끝나는 검사는 ASGI 레벨에서 직접 처리
+#
+# IpAccessMiddleware: 모든 요청의 클라이언트 IP 를 정하고 CIDR 목록에서 조회 (ip_filter.py)
+#   클라이언트 IP 는 신뢰 프록시 기준으로 한 번만 계산해 scope["state"] 에 저장
+#   (X-Forwarded-For 첫 값은 클라이언트가 위조 가능 → ip_filter.TrustedProxies)
+#   차단 대역은 라우팅/요청 제한/본문 읽기 없이 바로 403
+#   허용 대역은 scope["state"] 에 표시 → 안쪽 요청 제한을 건너뜀
+#
+# RateLimitMiddleware: 분석 엔드포인트의 IP 제한 + 기기 사전 확인 (X-Device-Id 헤더)
+#   본문을 한 바이트도 읽기 전에 429 (본문은 미리 직렬화, Retry-After 헤더만 요청마다)
+#   → 남용 요청은 JSON 파싱 / AnalyzeRequest 검증 / UUID 검사 비용 없이 거부
+#
+# BodySizeLimitMiddleware:
+#   Content-Length 가 한도를 넘으면 본문을 읽지 않고 바로 413 (미리 직렬화한 응답)
+#   Content-Length 가 없거나(chunked) 거짓이면 receive 를 감싸 읽은 바이트를 세다가
+#   한도를 넘는 순간 413 HTTPException → Pydantic 이 AnalyzeRequest 를 파싱하기 전에 중단
+# =============================================================================
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from starlette.exceptions import HTTPException
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+def json_error(status: int, detail: str, headers: Optional[Dict[str, str]] = None) -> tuple:
+    """미리 직렬화한 JSON 에러 응답 → (response.start 메시지, response.body 메시지)"""
+    body = orjson.dumps({"detail": detail})
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return (
+        {"type": "http.response.start", "status": status, "headers": raw_headers},
+        {"type": "http.response.body", "body": body},
+    )
+
+
+def get_header(scope: Scope, name: bytes) -> Optional[str]:
+    """ASGI scope 에서 헤더 값 (name 은 소문자 bytes)"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+ACCESS_STATE_KEY = "ip_access"  # scope["state"] 키 (request.state.ip_access 로도 읽힘)
+CLIENT_IP_STATE_KEY = "client_ip"  # IpAccessMiddleware 가 정한 클라이언트 IP
+
+
+def client_ip_from_scope(scope: Scope, trusted_proxies: Any = None) -> str:
+    """
+    클라이언트 IP (IpAccessMiddleware 가 이미 정했으면 그 값)
+
+    trusted_proxies(ip_filter.TrustedProxies)가 있으면 직접 연결한 상대가 신뢰 프록시일 때만
+    X-Forwarded-For / X-Real-IP 를 사용, 없으면 헤더는 보지 않고 직접 연결 주소
+    """
+    state = scope.get("state")
+    if state is not None and CLIENT_IP_STATE_KEY in state:
+        return state[CLIENT_IP_STATE_KEY]
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if trusted_proxies is None:
+        return peer
+    return trusted_proxies.client_ip(peer, get_header(scope, b"x-forwarded-for"), get_header(scope, b"x-real-ip"))
+
+
+def is_allowlisted(scope: Scope) -> bool:
+    """IpAccessMiddleware 가 허용 대역으로 표시한 요청인지"""
+    state = scope.get("state")
+    return state is not None and state.get(ACCESS_STATE_KEY) == "allow"
+
+
+class IpAccessMiddleware:
+    """
+    클라이언트 IP 결정 + CIDR 허용/차단 목록 적용 (요청 제한보다 바깥에 등록)
+
+    사용법:
+        app.add_middleware(IpAccessMiddleware, access_list=access, trusted_proxies=proxies)
+
+    access_list 는 lookup(ip) → "allow" / "deny" / None 을 가진 객체 (ip_filter.IpAccessList)
+    trusted_proxies 는 ip_filter.TrustedProxies (없으면 직접 연결 주소만 사용)
+    """
+
+    DETAIL = "Access denied."
+
+    def __init__(self, app: ASGIApp, access_list: Any, trusted_proxies: Any = None):
+        self.app = app
+        self.access_list = access_list
+        self.trusted_proxies = trusted_proxies
+        self._rejection = json_error(403, self.DETAIL)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ip = client_ip_from_scope(scope, self.trusted_proxies)
+        action = self.access_list.lookup(ip)
+        if action == "deny":
+            for message in self._rejection:
+                await send(message)
+            return
+        state = scope.setdefault("state", {})
+        state[CLIENT_IP_STATE_KEY] = ip  # 안쪽 요청 제한/엔드포인트가 같은 주소를 사용
+        if action is not None:
+            state[ACCESS_STATE_KEY] = action
+        await self.app(scope, receive, send)
+
+
+# 기기 사전 확인: (device_id, scope) → 거부 시 (Retry-After 초, 응답 본문), 통과면 None
+DeviceCheck = Callable[[str, Scope], Optional[Tuple[int, bytes]]]
+
+
+class RateLimitMiddleware:
+    """
+    지정 경로(POST)의 IP 제한 + 기기 사전 확인을 본문 읽기 전에 처리
+
+    사용법:
+        app.add_middleware(RateLimitMiddleware, paths=["/api/analyze"], ip_limiter=limiter,
+                           device_check=precheck)
+
+    ip_limiter 는 await acquire(key) / retry_after(key) 를 가진 제한기 (rate_limiter 등)
+    device_check 는 X-Device-Id 헤더가 있을 때만 호출 (본문의 device_id 제한은 엔드포인트에서)
+    IpAccessMiddleware 가 허용 대역으로 표시한 요청은 검사하지 않음
+    """
+
+    DETAIL = "Too many requests. Please wait a moment."
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Iterable[str],
+        ip_limiter: Any,
+        device_check: Optional[DeviceCheck] = None,
+    ):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.ip_limiter = ip_limiter
+        self.device_check = device_check
+        self.body = orjson.dumps({"detail": self.DETAIL})
+
+    async def _reject(self, send: Send, retry_after: int, body: bytes) -> None:
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths
+                or is_allowlisted(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        ip = client_ip_from_scope(scope)
+        if not await self.ip_limiter.acquire(ip):
+            await self._reject(send, self.ip_limiter.retry_after(ip), self.body)
+            return
+
+        if self.device_check is not None:
+            device_id = get_header(scope, b"x-device-id")
+            rejection = self.device_check(device_id, scope) if device_id else None
+            if rejection is not None:
+                await self._reject(send, *rejection)
+                return
+
+        await self.app(scope, receive, send)
+
+
+class BodySizeLimitMiddleware:
+    """
+    요청 본문 크기 제한 (max_bytes <= 0 이면 비활성)
+
+    사용법:
+        app.add_middleware(BodySizeLimitMiddleware, max_bytes=1_048_576)
+    """
+
+    DETAIL = "Request body too large."
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+        self._rejection = json_error(413, self.DETAIL)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    for message in self._rejection:
+                        await send(message)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI 는 본문 읽기 중 HTTPException 을 그대로 전달 → 예외 핸들러가 413 응답
+                    raise HTTPException(status_code=413, detail=self.DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
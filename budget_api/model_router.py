@@ -0,0 +1,148 @@
+# =============================================================================
+# model_router.py - 다중 Gemini 모델 라우팅 (지연 기반 선택 + 폴백)
+# =============================================================================
+# GEMINI_MODELS 에 설정된 모델 목록(우선순위 순) 중 요청마다
+#   1. 서킷이 열린 모델 제외
+#   2. 롤링 에러율이 높은 모델은 뒤로
+#   3. 나머지는 최근 p50 지연이 낮은 순 (샘플 부족 모델은 설정 순서대로 뒤에)
+# 으로 후보를 정하고, 429/5xx/네트워크 오류 시 다음 모델로 폴백
+#
+# 모델별로 CircuitBreaker / LatencyTracker 를 따로 유지
+# 느려진 모델도 회복 여부를 알 수 있도록 일부 요청은 다른 모델로 탐색(explore)
+# =============================================================================
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from gemini_client import RETRYABLE_STATUS_CODES, GeminiClient, LatencyTracker, Payload
+
+# 모델명 → generateContent 요청 본문 (모델별로 다를 수 있음, 예: 컨텍스트 캐시)
+PayloadBuilder = Callable[[str], Payload]
+
+
+@dataclass
+class ModelRoute:
+    model: str
+    url: str
+    breaker: CircuitBreaker
+    latency: LatencyTracker = field(default_factory=lambda: LatencyTracker(window=100))
+    requests: int = 0
+    fallbacks: int = 0  # 이 모델 실패 후 다음 모델로 넘어간 횟수
+
+    def is_open(self) -> bool:
+        """cooldown 중인 open 상태 (cooldown이 끝났으면 시험 요청 허용)"""
+        return self.breaker.state == OPEN and self.breaker.retry_after() > 0
+
+
+class ModelRouter:
+    """
+    모델 목록 기반 라우터
+
+    사용법:
+        router = ModelRouter(["model-a", "model-b"], api_base, breaker_factory)
+        model, response = await router.generate(client, lambda model: payload)
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        api_base: str,
+        breaker_factory: Callable[[str], CircuitBreaker],
+        min_samples: int = 10,
+        degraded_error_rate: float = 0.25,
+        explore_rate: float = 0.05,
+    ):
+        if not models:
+            raise ValueError("At least one model is required")
+        api_base = api_base.rstrip("/")
+        self.routes = [
+            ModelRoute(model, f"{api_base}/models/{model}:generateContent", breaker_factory(model))
+            for model in models
+        ]
+        self.min_samples = min_samples
+        self.degraded_error_rate = degraded_error_rate
+        self.explore_rate = explore_rate
+
+    @property
+    def primary(self) -> str:
+        return self.routes[0].model
+
+    def _score(self, index: int, route: ModelRoute) -> Tuple[int, float, int]:
+        """정렬 키: (에러율 높음 여부, p50 지연, 설정 순서)"""
+        stats = route.breaker.snapshot()
+        degraded = int(stats["window_calls"] >= self.min_samples
+                       and stats["error_rate"] >= self.degraded_error_rate)
+        if len(route.latency) >= self.min_samples:
+            return degraded, route.latency.percentile(50), index
+        return degraded, float("inf"), index
+
+    def candidates(self) -> List[ModelRoute]:
+        """이번 요청에서 시도할 모델 순서 (open 상태 모델 제외)"""
+        healthy = [(index, route) for index, route in enumerate(self.routes) if not route.is_open()]
+        ordered = [route for _, route in sorted(healthy, key=lambda item: self._score(*item))]
+        # 탐색: 가끔 1순위가 아닌 모델을 먼저 시도해 지연 통계를 갱신
+        if len(ordered) > 1 and random.random() < self.explore_rate:
+            ordered.insert(0, ordered.pop(random.randrange(1, len(ordered))))
+        return ordered
+
+    async def generate(self, client: GeminiClient, build_payload: PayloadBuilder) -> Tuple[str, httpx.Response]:
+        """
+        후보 모델을 순서대로 호출하여 (모델명, 응답) 반환
+
+        - 200 또는 재시도 불가 응답(4xx 등)은 즉시 반환 (요청 자체의 문제)
+        - 429/5xx/네트워크 오류는 다음 모델로 폴백
+        - 모든 모델이 실패하면 마지막 응답 반환 또는 마지막 오류 발생
+        - 모든 모델의 서킷이 열려 있으면 CircuitOpenError
+        """
+        last_response: Optional[Tuple[str, httpx.Response]] = None
+        last_error: Optional[httpx.RequestError] = None
+
+        for route in self.candidates():
+            route.requests += 1
+            started = time.monotonic()
+            try:
+                response = await client.generate(route.url, build_payload(route.model), breaker=route.breaker)
+            except CircuitOpenError:
+                continue  # 후보 선정 이후 열린 경우
+            except httpx.RequestError as e:
+                last_error = e
+                route.fallbacks += 1
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                if response.status_code == 200:
+                    route.latency.record(time.monotonic() - started)
+                return route.model, response
+            last_response = (route.model, response)
+            route.fallbacks += 1
+
+        if last_response is not None:
+            return last_response
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(min(route.breaker.retry_after() for route in self.routes))
+
+    def state(self) -> str:
+        """헬스체크용: 하나라도 호출 가능하면 그 중 가장 좋은 상태"""
+        states = {route.breaker.snapshot()["state"] for route in self.routes}
+        for state in (CLOSED, HALF_OPEN):
+            if state in states:
+                return state
+        return OPEN
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 모델별 상태"""
+        return {
+            route.model: {
+                "circuit": route.breaker.snapshot(),
+                "latency_p50": route.latency.percentile(50),
+                "latency_p95": route.latency.percentile(95),
+                "requests": route.requests,
+                "fallbacks": route.fallbacks,
+            }
+            for route in self.routes
+        }
@@ -0,0 +1,270 @@
+# =============================================================================
+# nsfw_filter.py - 다중 키워드 NSFW 필터 (단일 오토마톤 사전 검사 + 기존 순서대로 마스킹)
+# =============================================================================
+# 키워드마다 정규식을 컴파일/적용하면 호출당 (키워드 수 × 2)번 본문을 훑게 됨
+# → 모듈 로드 시 키워드 전체를 접두사 트라이로 묶고, 트라이를 정규식 하나로 컴파일
+#   (공통 접두사는 한 번만 비교, 스캔은 re 엔진(C)이 텍스트를 한 번만 순회)
+#
+#   - 대소문자 무시: re.IGNORECASE (키워드는 소문자로 정규화)
+#   - 우회 탐지: 키워드 글자 사이의 공백/'.'/'-'/'_' 는 건너뜀 ("시 발", "f.u.c.k")
+#   - 마스킹: 매치 구간(사이의 구분자 포함)을 "***" 로 치환
+#
+# 마스킹 결과는 기존 필터(키워드별 re.sub 를 사전 순서대로)와 같아야 함
+#   1. 키워드 그대로의 매치를 사전 순서대로  2. (입력만) 구분자 삽입 매치를 사전 순서대로
+#   겹치면 사전에서 앞선 키워드가 이김 (예: "새끼" 가 "개새끼" 보다 앞 → "개새끼" → "개***")
+# 가장 왼쪽·가장 긴 매치 하나로는 이 순서를 낼 수 없으므로
+#   - 트라이 정규식 한 번의 스캔으로 키워드가 시작하는 위치만 찾고 (대부분의 텍스트는 여기서 끝)
+#   - 매치가 있으면 그 위치에서 실제로 매치되는 키워드만 골라 기존 순서대로 구간을 표시
+#     (마스킹한 구간은 다음 키워드가 건너뜀 = 기존 필터가 "***" 로 바꾼 뒤 다시 찾던 것과 동일)
+#
+# 입력은 먼저 compose_hangul() 로 분리된 자모("ㅅㅣㅂㅏㄹ")를 음절로 조합한 뒤 검사
+#
+# 순수 파이썬 Aho-Corasick 은 글자마다 인터프리터를 거쳐 C 정규식 다중 패스보다도 느려서
+# 같은 트라이를 정규식으로 내려 re 엔진이 실행하도록 함
+# =============================================================================
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MASK = "***"
+SEPARATOR_PATTERN = r"[\s.\-_]*"  # 키워드 글자 사이에 허용하는 구분자
+_SEPARATOR = re.compile(SEPARATOR_PATTERN)
+_END = ""  # 트라이 노드에서 키워드 끝 표시
+
+
+def fold_keyword(keyword: str) -> str:
+    """키워드 정규화 (소문자, 구분자 제거) - 스캔 시 구분자를 건너뛰므로 키워드에도 없어야 함"""
+    return _SEPARATOR.sub("", keyword.lower())
+
+
+def spaced_pattern(keyword: str) -> str:
+    """키워드 글자 사이에 구분자를 허용하는 정규식 소스 (기존 _create_spaced_pattern 과 동일)"""
+    return SEPARATOR_PATTERN.join(re.escape(ch) for ch in keyword)
+
+
+def _build_trie(keywords: Iterable[str]) -> Dict[str, Any]:
+    root: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+    return root
+
+
+def _trie_pattern(node: Dict[str, Any]) -> str:
+    """
+    트라이 → 정규식 (공통 접두사 인수분해)
+
+    키워드 끝이면서 더 긴 키워드가 이어지는 노드는 (?:...)? 로 확장
+    """
+    branches = []
+    for ch in sorted(key for key in node if key != _END):
+        child = node[ch]
+        if not any(key != _END for key in child):
+            branches.append(re.escape(ch))
+        elif _END in child:
+            branches.append(f"{re.escape(ch)}(?:{SEPARATOR_PATTERN}{_trie_pattern(child)})?")
+        else:
+            branches.append(f"{re.escape(ch)}{SEPARATOR_PATTERN}{_trie_pattern(child)}")
+    return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+
+PATTERN_FLAGS = re.IGNORECASE
+
+
+def fold_keywords(keywords: Iterable[str]) -> List[str]:
+    """정규화 + 중복/빈 키워드 제거 (사전 순서 유지 - 겹치는 매치의 우선순위)"""
+    return list(dict.fromkeys(folded for folded in map(fold_keyword, keywords) if folded))
+
+
+def build_pattern_source(keywords: Iterable[str]) -> Optional[str]:
+    """
+    키워드 → 정규식 소스 (키워드가 없으면 None)
+
+    폭이 0인 전방 탐색이라 finditer 가 키워드가 시작하는 모든 위치를 돌려줌
+    (겹치는 키워드, 다른 매치 안에서 시작하는 키워드 포함)
+    """
+    trie = _build_trie(fold_keywords(keywords))
+    return f"(?={_trie_pattern(trie)})" if trie else None
+
+
+def _scan_gaps(pattern: "re.Pattern[str]", text: str, spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """이미 표시된 구간 사이에서만 pattern 매치를 찾아 구간 목록에 합침 (시작 순 유지)"""
+    found: List[Tuple[int, int]] = []
+    position = 0
+    for start, end in spans:
+        found.extend(match.span() for match in pattern.finditer(text, position, start))
+        found.append((start, end))
+        position = end
+    found.extend(match.span() for match in pattern.finditer(text, position))
+    return found
+
+
+class NsfwMatcher:
+    """
+    키워드 집합 → 단일 정규식 오토마톤 + 키워드별 정규식 (처음 쓸 때 컴파일)
+
+    사용법:
+        matcher = NsfwMatcher(["badword", ...])
+        matcher.mask("text")                # 마스킹된 텍스트 (입력: 키워드 그대로 + 구분자 삽입)
+        matcher.mask("text", spaced=False)  # 키워드 그대로만 (출력)
+        matcher.find("text")                # [(시작, 끝)] 원본 인덱스, 끝은 미포함
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = fold_keywords(keywords)
+        self.pattern = re.compile(build_pattern_source(self.keywords), PATTERN_FLAGS) if self.keywords else None
+        self._by_first: Dict[str, List[int]] = {}
+        for index, keyword in enumerate(self.keywords):
+            self._by_first.setdefault(keyword[0], []).append(index)
+        self._exact: Dict[int, "re.Pattern[str]"] = {}
+        self._spaced: Dict[int, "re.Pattern[str]"] = {}
+
+    def _exact_pattern(self, index: int) -> "re.Pattern[str]":
+        pattern = self._exact.get(index)
+        if pattern is None:
+            pattern = self._exact[index] = re.compile(re.escape(self.keywords[index]), PATTERN_FLAGS)
+        return pattern
+
+    def _spaced_pattern(self, index: int) -> "re.Pattern[str]":
+        pattern = self._spaced.get(index)
+        if pattern is None:
+            pattern = self._spaced[index] = re.compile(spaced_pattern(self.keywords[index]), PATTERN_FLAGS)
+        return pattern
+
+    def _candidates(self, text: str) -> List[int]:
+        """텍스트에 (구분자 삽입 포함) 나타나는 키워드 인덱스 (사전 순서)"""
+        found = set()
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            # 대소문자 변환이 lower() 와 다른 글자(예: 'ſ')면 모든 키워드를 확인
+            for index in self._by_first.get(text[start].lower(), range(len(self.keywords))):
+                if index not in found and self._spaced_pattern(index).match(text, start):
+                    found.add(index)
+        return sorted(found)
+
+    def find(self, text: str, spaced: bool = True) -> List[Tuple[int, int]]:
+        """마스킹할 구간 목록 (원본 인덱스, 겹치지 않음, 시작 순)"""
+        if self.pattern is None:
+            return []
+        candidates = self._candidates(text)
+        spans: List[Tuple[int, int]] = []
+        passes = (self._exact_pattern, self._spaced_pattern) if spaced else (self._exact_pattern,)
+        for keyword_pattern in passes:
+            for index in candidates:
+                spans = _scan_gaps(keyword_pattern(index), text, spans)
+        return spans
+
+    def mask(self, text: str, mask: str = MASK, spaced: bool = True) -> str:
+        """매치 구간을 각각 mask 로 치환"""
+        spans = self.find(text, spaced)
+        if not spans:
+            return text
+        out: List[str] = []
+        position = 0
+        for start, end in spans:
+            out.append(text[position:start])
+            out.append(mask)
+            position = end
+        out.append(text[position:])
+        return "".join(out)
+
+
+# =============================================================================
+# 한글 자모 조합 (분리된 자모로 키워드를 우회하는 경우 대응)
+# =============================================================================
+# 호환용 자모(ㄱ, ㅏ, U+3131~318E)와 조합형 자모(U+1100~11FF)를 입력기처럼 한 번의 순회로
+# 음절로 조합: 초성+중성(+종성), 겹모음(ㅗ+ㅏ→ㅘ), 겹받침(ㄹ+ㄱ→ㄺ),
+# 뒤에 모음이 오면 받침을 다음 음절 초성으로 이동 ("ㅅㅣㅂㅏㄹ" → "십" + "ㅏ" → "시발")
+# 음절을 이루지 못하는 자모("ㅋㅋ", "ㅠㅠ")는 그대로 유지
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = "ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"  # 종성 인덱스 1부터
+
+_LEAD_INDEX = {ch: index for index, ch in enumerate(_CHOSEONG)}
+_VOWEL_INDEX = {ch: index for index, ch in enumerate(_JUNGSEONG)}
+_FINAL_INDEX = {ch: index for index, ch in enumerate(_JONGSEONG, 1)}
+
+_VOWEL_PAIRS = {
+    ("ㅗ", "ㅏ"): "ㅘ", ("ㅗ", "ㅐ"): "ㅙ", ("ㅗ", "ㅣ"): "ㅚ",
+    ("ㅜ", "ㅓ"): "ㅝ", ("ㅜ", "ㅔ"): "ㅞ", ("ㅜ", "ㅣ"): "ㅟ", ("ㅡ", "ㅣ"): "ㅢ",
+}
+_FINAL_PAIRS = {
+    ("ㄱ", "ㅅ"): "ㄳ", ("ㄴ", "ㅈ"): "ㄵ", ("ㄴ", "ㅎ"): "ㄶ", ("ㄹ", "ㄱ"): "ㄺ", ("ㄹ", "ㅁ"): "ㄻ",
+    ("ㄹ", "ㅂ"): "ㄼ", ("ㄹ", "ㅅ"): "ㄽ", ("ㄹ", "ㅌ"): "ㄾ", ("ㄹ", "ㅍ"): "ㄿ", ("ㄹ", "ㅎ"): "ㅀ",
+    ("ㅂ", "ㅅ"): "ㅄ",
+}
+_FINAL_SPLIT = {pair: first_second for first_second, pair in _FINAL_PAIRS.items()}
+
+# 조합형 자모 → 호환용 자모 (현대 한글 범위)
+_CONJOINING = {
+    **{chr(0x1100 + index): ch for index, ch in enumerate(_CHOSEONG)},
+    **{chr(0x1161 + index): ch for index, ch in enumerate(_JUNGSEONG)},
+    **{chr(0x11A8 + index): ch for index, ch in enumerate(_JONGSEONG)},
+}
+_JAMO = re.compile("[\u1100-\u11ff\u3131-\u318e]")
+
+
+def _syllable(lead: str, vowel: str, final: str) -> str:
+    return chr(0xAC00 + (_LEAD_INDEX[lead] * 21 + _VOWEL_INDEX[vowel]) * 28 + _FINAL_INDEX.get(final, 0))
+
+
+def compose_hangul(text: str) -> str:
+    """분리된 한글 자모를 음절로 조합 (자모가 없으면 원본 그대로, 길이에 선형)"""
+    if not _JAMO.search(text):
+        return text
+
+    out: List[str] = []
+    lead = vowel = final = ""  # 조합 중인 음절 (호환용 자모)
+    raw: List[str] = []  # 조합 중인 원본 글자 (음절이 완성되지 않으면 그대로 출력)
+
+    def flush() -> None:
+        nonlocal lead, vowel, final
+        if lead and vowel:
+            out.append(_syllable(lead, vowel, final))
+        else:
+            out.extend(raw)
+        lead = vowel = final = ""
+        raw.clear()
+
+    for ch in text:
+        jamo = _CONJOINING.get(ch, ch)
+        if jamo in _VOWEL_INDEX:
+            if lead and not vowel:
+                vowel = jamo
+                raw.append(ch)
+                continue
+            if lead and not final and (vowel, jamo) in _VOWEL_PAIRS:
+                vowel = _VOWEL_PAIRS[(vowel, jamo)]
+                raw.append(ch)
+                continue
+            if lead and final:
+                # 받침(겹받침이면 뒤쪽 자음)을 다음 음절 초성으로
+                keep, moved = _FINAL_SPLIT.get(final, ("", final))
+                out.append(_syllable(lead, vowel, keep))
+                lead, vowel, final = moved, jamo, ""
+                raw[:] = [moved, ch]
+                continue
+            flush()
+            out.append(ch)
+        elif jamo in _LEAD_INDEX or jamo in _FINAL_INDEX:
+            if lead and vowel:
+                if not final and jamo in _FINAL_INDEX:
+                    final = jamo
+                    raw.append(ch)
+                    continue
+                if final and (final, jamo) in _FINAL_PAIRS:
+                    final = _FINAL_PAIRS[(final, jamo)]
+                    raw.append(ch)
+                    continue
+            flush()
+            if jamo in _LEAD_INDEX:
+                lead = jamo
+                raw.append(ch)
+            else:
+                out.append(ch)
+        else:
+            flush()
+            out.append(ch)
+    flush()
+    return "".join(out)
@@ -0,0 +1,176 @@
+# =============================================================================
+# nsfw_lexicon.py - NSFW 키워드 사전 파일 + 핫 리로드
+# =============================================================================
+# 키워드를 코드에 박아두면 사전 수정마다 배포가 필요함
+#
+#   사전 파일 (nsfw_lexicon.json, 버전 포함)
+#     {"format": 1, "version": "...", "keywords": {"ko": [...], "en": [...], ...}}
+#
+#   매처는 로드할 때마다 워커별로 새로 만듦 (트라이 정규식 구성 + re.compile)
+#     한글 키워드 5000개 기준 0.2~0.3초, 대부분 re.compile (트라이 구성은 수십 ms)
+#     컴파일된 패턴은 프로세스 간 공유/직렬화가 안 되므로 캐시 파일을 두지 않음
+#     (정규식 소스만 캐시하면 트라이 구성 시간만 줄어듦)
+#
+#   핫 리로드
+#     사전 파일의 (mtime, 크기)를 주기적으로 확인하거나 관리자 API 로 강제 리로드
+#     새 매처를 스레드에서 완전히 만든 뒤 참조 하나만 교체 → 진행 중 요청은 이전 매처로 끝까지 처리
+#     사전이 깨져 있으면 기존 매처 유지 (필터가 꺼지는 일 없음)
+# =============================================================================
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from nsfw_filter import NsfwMatcher, fold_keywords
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FORMAT = 1
+
+# 사전 파일을 읽을 수 없을 때의 기본 키워드 (필터가 비지 않도록)
+DEFAULT_KEYWORDS = [
+    # 한국어
+    "시발", "씨발", "병신", "지랄", "새끼", "개새끼", "미친", "존나", "좆",
+    # 영어
+    "fuck", "shit", "bitch", "asshole", "bastard", "damn",
+    # 일본어
+    "くそ", "ちくしょう", "馬鹿",
+]
+
+
+class LexiconError(ValueError):
+    """사전 파일 형식 오류"""
+
+
+def read_lexicon(path: str) -> Tuple[str, List[str]]:
+    """사전 파일 → (버전, 정규화된 키워드 목록)"""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        raise LexiconError(f"Cannot read lexicon {path}: {e}") from e
+
+    if not isinstance(data, dict) or data.get("format") != LEXICON_FORMAT:
+        raise LexiconError(f"Unsupported lexicon format (expected format={LEXICON_FORMAT})")
+    groups = data.get("keywords")
+    if not isinstance(groups, dict):
+        raise LexiconError("'keywords' must be an object of language → list")
+
+    keywords: List[str] = []
+    for language, words in groups.items():
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+            raise LexiconError(f"'keywords.{language}' must be a list of strings")
+        keywords.extend(words)
+    keywords = fold_keywords(keywords)
+    if not keywords:
+        raise LexiconError("Lexicon has no keywords")
+    return str(data.get("version", "")), keywords
+
+
+# =============================================================================
+# 사전 관리 (현재 매처 + 핫 리로드)
+# =============================================================================
+class NsfwLexicon:
+    """
+    사전 파일 → 현재 매처 (원자적 교체)
+
+    사용법:
+        lexicon = NsfwLexicon(path)
+        lexicon.load()                      # 시작 시 (실패하면 DEFAULT_KEYWORDS)
+        lexicon.matcher.mask(text)          # 요청마다 (호출 중 교체돼도 잡아둔 매처로 처리)
+        await lexicon.start()               # 파일 변경 감시 루프
+        await lexicon.reload()              # 관리자 강제 리로드
+    """
+
+    def __init__(self, path: str, poll_seconds: float = 5.0):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.matcher = NsfwMatcher(DEFAULT_KEYWORDS)
+        self.version = "builtin"
+        self.source = "builtin"  # file / builtin
+        self.load_ms = 0.0
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> Dict[str, Any]:
+        """사전 파일을 읽어 매처 교체 (형식 오류 시 LexiconError, 기존 매처 유지)"""
+        started = time.perf_counter()
+        file_stat = self._file_stat()
+        try:
+            version, keywords = read_lexicon(self.path)
+        except LexiconError as e:
+            self._stat = file_stat  # 같은 깨진 파일로 반복 시도하지 않음
+            self.errors += 1
+            self.last_error = str(e)
+            raise
+
+        matcher = NsfwMatcher(keywords)
+        # 완성된 매처로 참조만 교체 (진행 중인 요청은 이전 매처를 계속 사용)
+        self.matcher = matcher
+        self.version, self.source = version, "file"
+        self.load_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.loaded_at = time.time()
+        self.reloads += 1
+        self.last_error = None
+        self._stat = file_stat
+        return self.snapshot()
+
+    def changed(self) -> bool:
+        """마지막 로드 이후 사전 파일이 바뀌었는지 (mtime, 크기)"""
+        file_stat = self._file_stat()
+        return file_stat is not None and file_stat != self._stat
+
+    async def reload(self) -> Dict[str, Any]:
+        """사전 다시 읽기 (컴파일은 스레드에서, 동시 리로드는 하나씩)"""
+        async with self._lock:
+            return await asyncio.to_thread(self.load)
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            if not self.changed():
+                continue
+            try:
+                info = await self.reload()
+                logger.info("Reloaded version=%s keywords=%d (%s, %sms)",
+                            info["version"], info["keywords"], info["source"], info["load_ms"])
+            except LexiconError as e:
+                logger.warning("Reload failed, keeping previous matcher: %s", e)
+
+    async def start(self) -> None:
+        """파일 변경 감시 시작 (poll_seconds <= 0 이면 관리자 리로드만)"""
+        if self.poll_seconds > 0:
+            self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭/관리자 API 용 상태 요약"""
+        return {
+            "version": self.version,
+            "keywords": len(self.matcher.keywords),
+            "source": self.source,
+            "load_ms": self.load_ms,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,95 @@
+# =============================================================================
+# offload.py - 큰 가계부 데이터의 CPU 작업을 스레드 풀로 분리
+# =============================================================================
+# NSFW 필터(정규화 + 자모 조합 + 정규식), 프롬프트 압축/생성, 응답 JSON 파싱은 모두 동기 함수
+# → 큰 데이터는 이벤트 루프를 수~수십 ms 막아 그동안 다른 요청이 멈춤
+#
+#   크기 < threshold : 이벤트 루프에서 바로 실행 (스레드 전환 비용이 더 큼)
+#   크기 ≥ threshold : 제한된 스레드 풀에서 실행, 동시 실행 수는 workers 로 제한
+#                      (빈 자리가 없으면 루프에서 기다림 → 실행기 내부 큐가 무한히 쌓이지 않음)
+#
+# 스레드 풀인 이유: 작업 함수가 현재 NSFW 매처(핫 리로드) 등 프로세스 상태를 그대로 사용
+# (프로세스 풀은 상태 복제/피클링 필요). GIL 때문에 처리량이 늘지는 않지만
+# 인터프리터가 주기적으로 GIL 을 넘겨 루프가 다른 요청을 계속 처리함
+# =============================================================================
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class PayloadOffloader:
+    """
+    크기 기반 동기 작업 분배 (루프 / 스레드 풀)
+
+    사용법:
+        offloader = PayloadOffloader(threshold=32768, workers=2)
+        result = await offloader.run(len(data), filter_fn, data)
+        offloader.shutdown()        # 서버 종료 시
+
+    workers 가 0 이면 항상 루프에서 실행
+    """
+
+    def __init__(self, threshold: int = 32768, workers: int = 2):
+        self.threshold = threshold
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.inline = {"count": 0, "ms": 0.0}  # 루프에서 실행한 작업
+        self.offloaded = {"count": 0, "ms": 0.0, "wait_ms": 0.0}  # ms = 루프 대신 스레드에서 쓴 시간
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # 이벤트 루프 안에서 처음 쓸 때 생성 (모듈 로드 시점에는 루프가 없을 수 있음)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="payload")
+        return self._slots
+
+    async def run(self, size: int, fn: Callable[..., T], *args: Any) -> T:
+        """size 가 임계값 이상이면 스레드 풀에서, 아니면 바로 fn(*args) 실행"""
+        if self.workers <= 0 or size < self.threshold:
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.inline["count"] += 1
+                self.inline["ms"] += (time.perf_counter() - started) * 1000
+
+        queued = time.perf_counter()
+        async with self._get_slots():
+            self.offloaded["wait_ms"] += (time.perf_counter() - queued) * 1000
+            elapsed = [0.0]
+
+            def timed() -> T:
+                started = time.perf_counter()
+                try:
+                    return fn(*args)
+                finally:
+                    elapsed[0] = (time.perf_counter() - started) * 1000
+
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+            finally:
+                self.offloaded["count"] += 1
+                self.offloaded["ms"] += elapsed[0]
+
+    def shutdown(self) -> None:
+        """스레드 풀 종료 (진행 중 작업은 끝까지 실행)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor, self._slots = None, None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약 (loop_ms_saved: 스레드로 옮겨 루프를 막지 않은 시간)"""
+        return {
+            "threshold": self.threshold,
+            "workers": self.workers,
+            "inline": {"count": self.inline["count"], "ms": round(self.inline["ms"], 1)},
+            "offloaded": {
+                "count": self.offloaded["count"],
+                "queue_wait_ms": round(self.offloaded["wait_ms"], 1),
+            },
+            "loop_ms_saved": round(self.offloaded["ms"], 1),
+        }
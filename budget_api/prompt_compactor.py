@@ -0,0 +1,276 @@
+# =============================================================================
+# prompt_compactor.py - 토큰 예산 기반 가계부 데이터 압축
+# =============================================================================
+# 앱(markdown_export_service.dart)이 보내는 마크다운 중 '지출 내역' 표는
+# 기간이 길수록 무한히 커짐 → 토큰 예산을 넘으면 오래된 지출을
+# (월 × 예산 × 세부예산) 단위 합계로 묶고, 최근 N일 내역만 원본으로 유지
+#
+# 지출 행 형식: | yyyy-MM-dd | 예산 | 유형 | 세부예산 | 내용 | 금액 |
+# 예산 요약/세부예산 요약/요약 통계 등 나머지 줄은 그대로 유지
+#
+# 구조화된 budget 요청의 canonical 텍스트(budget_payload.render_budget_payload)는
+# 최근 지출 → 일별 지출 → 세부예산 줄 순으로 줄임
+#
+# 위 단계로도 예산을 넘으면 (예: 수년치 월별 합계) 합계를 월×예산 → 월 단위로 더 묶고,
+# 마지막으로 줄 단위로 잘라 결과가 항상 예산 이하가 되도록 보장
+# =============================================================================
+import math
+import re
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+# 지출 내역 행 (첫 번째 셀이 날짜인 표 행)
+_EXPENSE_ROW = re.compile(r"^\|\s*(\d{4})-(\d{2})-(\d{2})\s*\|(.*)\|\s*$")
+_DIGITS = re.compile(r"[^\d\-]")
+
+# 압축 요약 섹션 제목 / 컬럼명 / 합쳐진 셀 표시 (다국어)
+_SUMMARY_LABELS = {
+    "ko": ("### 이전 지출 요약 (월별·예산별 합계)", "| 월 | 예산 | 세부예산 | 건수 | 합계 |", "전체"),
+    "en": ("### Earlier Expenses (monthly totals by budget)", "| Month | Budget | Sub-budget | Count | Total |", "All"),
+    "ja": ("### 過去の支出まとめ (月別・予算別合計)", "| 月 | 予算 | サブ予算 | 件数 | 合計 |", "全体"),
+}
+
+# 요약 묶음 단위: 0 = 월×예산×세부예산, 1 = 월×예산, 2 = 월
+_GROUPINGS = (0, 1, 2)
+
+# 줄 단위로 잘랐을 때 끝에 붙이는 표시 (다국어)
+_TRUNCATED_LABELS = {
+    "ko": "(이하 생략: 데이터가 너무 김)",
+    "en": "(truncated: data too long)",
+    "ja": "(以下省略: データが長すぎます)",
+}
+
+# canonical 텍스트 섹션 (budget_payload.render_budget_payload 와 같은 형식)
+_CANONICAL_DAILY = "daily spending (date amount):"
+_CANONICAL_RECENT = re.compile(r"^recent expenses \(latest \d+\):$")
+_CANONICAL_SUB_BUDGET = "  - "
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (보수적 근사)
+
+    영문/숫자/기호는 약 4자당 1토큰, 한글/일본어 등 비ASCII는 1자당 약 1토큰
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+def parse_amount(cell: str) -> Optional[int]:
+    """'12,000원' / '$1,234' / '1,234¥' → 정수 금액"""
+    digits = _DIGITS.sub("", cell)
+    if not digits or digits == "-":
+        return None
+    try:
+        return int(digits)
+    except ValueError:
+        return None
+
+
+def amount_formatter(sample: str):
+    """원본 금액 셀의 통화 표기(접두/접미)를 유지하는 포맷터"""
+    sample = sample.strip()
+    match = re.match(r"^([^\d\-]*)[\d,\-]+(.*)$", sample)
+    prefix, suffix = (match.group(1), match.group(2)) if match else ("", "")
+    return lambda amount: f"{prefix}{amount:,}{suffix}"
+
+
+class ExpenseRow:
+    __slots__ = ("line", "day", "budget", "sub_budget", "amount_cell", "amount")
+
+    def __init__(self, line: str, day: date, cells: List[str]):
+        self.line = line
+        self.day = day
+        # cells: 예산 | 유형 | 세부예산 | 내용 | 금액
+        self.budget = cells[0] if len(cells) > 0 else "-"
+        self.sub_budget = cells[2] if len(cells) > 2 else "-"
+        self.amount_cell = cells[-1] if cells else ""
+        self.amount = parse_amount(self.amount_cell)
+
+
+def parse_expense_rows(lines: List[str]) -> List[Tuple[int, ExpenseRow]]:
+    """지출 행 (줄 번호, 행) 목록"""
+    rows = []
+    for index, line in enumerate(lines):
+        match = _EXPENSE_ROW.match(line.strip())
+        if not match:
+            continue
+        try:
+            day = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            continue
+        cells = [cell.strip() for cell in match.group(4).split("|")]
+        row = ExpenseRow(line, day, cells)
+        if row.amount is not None:
+            rows.append((index, row))
+    return rows
+
+
+def _render(
+    lines: List[str],
+    rows: List[Tuple[int, ExpenseRow]],
+    cutoff: Optional[date],
+    language: str,
+    grouping: int = 0,
+) -> str:
+    """cutoff 이전 지출은 월별 합계로 (grouping 단위), 이후 지출은 원본 그대로 렌더링"""
+    title, header, merged = _SUMMARY_LABELS.get(language, _SUMMARY_LABELS["ko"])
+    old_indexes = set()
+    groups: "OrderedDict[Tuple[str, str, str], List[int]]" = OrderedDict()
+    for index, row in rows:
+        if cutoff is not None and row.day >= cutoff:
+            continue
+        old_indexes.add(index)
+        key = (
+            row.day.strftime("%Y-%m"),
+            row.budget if grouping < 2 else merged,
+            row.sub_budget if grouping < 1 else merged,
+        )
+        group = groups.setdefault(key, [0, 0])
+        group[0] += 1
+        group[1] += row.amount
+
+    if not old_indexes:
+        return "\n".join(lines)
+
+    fmt = amount_formatter(rows[0][1].amount_cell)
+    summary = [title, header, "|------|------|------|------|------|"]
+    for (month, budget, sub_budget), (count, total) in groups.items():
+        summary.append(f"| {month} | {budget} | {sub_budget} | {count} | {fmt(total)} |")
+    summary.append("")
+
+    # 지출 표 범위 (제목 + 헤더 + 구분선 + 행)
+    table_start = min(index for index, _ in rows)
+    while table_start > 0 and lines[table_start - 1].strip().startswith("|"):
+        table_start -= 1
+    if table_start > 0 and lines[table_start - 1].startswith("#"):
+        table_start -= 1
+    table_end = max(index for index, _ in rows) + 1
+
+    # 요약 섹션은 지출 표 바로 앞에 삽입, 요약된 행은 제거 (남은 행이 없으면 표 자체 제거)
+    kept = [line for index, line in enumerate(lines[table_start:table_end], table_start) if index not in old_indexes]
+    if len(old_indexes) == len(rows):
+        kept = []
+        summary.pop()  # 표 뒤의 빈 줄을 그대로 사용
+    return "\n".join(lines[:table_start] + summary + kept + lines[table_end:])
+
+
+def _markdown_candidates(
+    lines: List[str], rows: List[Tuple[int, ExpenseRow]], recent_days: int, language: str
+) -> Iterator[str]:
+    """마크다운 압축 후보 (덜 줄인 것부터)"""
+    latest = max(row.day for _, row in rows)
+    days = recent_days
+    while days > 0:
+        yield _render(lines, rows, latest - timedelta(days=days - 1), language)
+        days //= 2
+    for grouping in _GROUPINGS:
+        yield _render(lines, rows, None, language, grouping)
+
+
+def _parse_canonical(lines: List[str]) -> Optional[Tuple[List[str], List[str], List[str]]]:
+    """canonical 텍스트 → (기간/예산 줄, 일별 지출 항목, 최근 지출 줄), 형식이 다르면 None"""
+    if not lines or not lines[0].startswith("period: "):
+        return None
+    end = len(lines)
+    recent: List[str] = []
+    for index, line in enumerate(lines):
+        if _CANONICAL_RECENT.match(line):
+            recent, end = lines[index + 1:], index
+            break
+    daily: List[str] = []
+    if _CANONICAL_DAILY in lines[:end]:
+        at = lines.index(_CANONICAL_DAILY)
+        daily = lines[at + 1].split(", ") if at + 1 < end else []
+        end = at
+    return lines[:end], daily, recent
+
+
+def _render_canonical(
+    head: List[str],
+    daily: List[str],
+    recent: List[str],
+    recent_count: int,
+    daily_days: Optional[int] = None,
+    sub_budgets: bool = True,
+) -> str:
+    """최근 지출 recent_count 건, 일별 지출은 최근 daily_days 일만 (이전은 합계 한 줄)"""
+    out = [line for line in head if sub_budgets or not line.startswith(_CANONICAL_SUB_BUDGET)]
+    if daily:
+        if daily_days is None or daily_days >= len(daily):
+            out += [_CANONICAL_DAILY, ", ".join(daily)]
+        else:
+            earlier = daily[:len(daily) - daily_days]
+            total = sum(parse_amount(entry.rpartition(" ")[2]) or 0 for entry in earlier)
+            out.append(f"daily spending (date amount, {len(earlier)} earlier days total {total:,}):")
+            if daily_days:
+                out.append(", ".join(daily[-daily_days:]))
+    if recent_count:
+        out.append(f"recent expenses (latest {recent_count}):")
+        out += recent[:recent_count]
+    return "\n".join(out)
+
+
+def _canonical_candidates(
+    head: List[str], daily: List[str], recent: List[str], recent_days: int
+) -> Iterator[str]:
+    """canonical 압축 후보: 최근 지출 건수 → 일별 지출 기간 → 세부예산 줄 순으로 줄임"""
+    count = len(recent)
+    while count > 0:
+        count //= 2
+        yield _render_canonical(head, daily, recent, count)
+    days = recent_days
+    while days > 0:
+        yield _render_canonical(head, daily, recent, 0, days)
+        days //= 2
+    yield _render_canonical(head, daily, recent, 0, 0)
+    yield _render_canonical(head, daily, recent, 0, 0, sub_budgets=False)
+
+
+def truncate_to_budget(text: str, token_budget: int, language: str = "ko") -> str:
+    """줄 단위로 앞에서부터 token_budget 까지만 남기고 생략 표시를 붙임 (결과 추정 토큰 ≤ 예산)"""
+    marker = _TRUNCATED_LABELS.get(language, _TRUNCATED_LABELS["ko"])
+    remaining = token_budget - estimate_tokens(marker)
+    if remaining < 0:
+        marker, remaining = None, token_budget
+    kept = []
+    for line in text.split("\n"):
+        # 줄 + 줄바꿈 단위로 더해도 전체 추정치보다 작아지지 않음 (올림은 합에 대해 준가법적)
+        cost = estimate_tokens(line + "\n")
+        if cost > remaining:
+            break
+        kept.append(line)
+        remaining -= cost
+    return "\n".join(kept + ([marker] if marker else []))
+
+
+def compact_budget_data(text: str, token_budget: int, recent_days: int = 14, language: str = "ko") -> str:
+    """
+    토큰 예산 초과 시 가계부 데이터 압축 (결과는 항상 예산 이하)
+
+    마크다운:
+    1. 최근 recent_days 일의 지출은 원본 유지, 그 이전은 월별 합계
+    2. 그래도 초과하면 유지 기간을 절반씩 줄임
+    3. 모든 지출을 월별 합계로 요약, 초과하면 월×예산 → 월 단위로 더 묶음
+    canonical 텍스트: 최근 지출 건수 → 일별 지출 기간 → 세부예산 줄 순으로 줄임
+    마지막 후보도 초과하면 (또는 어느 형식도 아니면) 줄 단위로 자름
+    """
+    if token_budget <= 0 or estimate_tokens(text) <= token_budget:
+        return text
+
+    lines = text.split("\n")
+    rows = parse_expense_rows(lines)
+    canonical = None if rows else _parse_canonical(lines)
+    if rows:
+        candidates = _markdown_candidates(lines, rows, recent_days, language)
+    elif canonical:
+        candidates = _canonical_candidates(*canonical, recent_days)
+    else:
+        candidates = iter(())
+
+    compacted = text
+    for compacted in candidates:
+        if estimate_tokens(compacted) <= token_budget:
+            return compacted
+    return truncate_to_budget(compacted, token_budget, language)
@@ -0,0 +1,149 @@
+# =============================================================================
+# rate_limiter.py - 토큰 버킷 요청 제한 (키당 O(1), 메모리 상한)
+# =============================================================================
+# 키(IP / device_id)마다 토큰 버킷 하나: [남은 토큰, 마지막 갱신 시각, 만료 틱]
+#   - 분당 rate 개씩 연속으로 채워지고 최대 burst 개까지 저장
+#   - 요청마다 경과 시간만큼 채운 뒤 1개 소비 (타임스탬프 목록/전체 순회 없음)
+#
+# 만료 (타이머 휠):
+#   버킷이 가득 차는 시각이 지나면 처음 보는 키와 구별되지 않으므로 삭제해도 됨
+#   → 1초 단위 슬롯의 원형 배열에 "가득 차는 시각"으로 키를 등록해 두고
+#     호출 시 지나간 슬롯만 비움 (키는 항상 한 슬롯에만 있음, 상각 O(1))
+#
+# 메모리 상한:
+#   max_keys 를 넘으면 가장 오래 사용하지 않은 키부터 제거 (OrderedDict LRU)
+#   → X-Forwarded-For 위조로 키가 무한히 늘어도 메모리는 고정
+#   (제거된 키는 가득 찬 버킷으로 다시 시작하므로 상한은 실제 활성 키보다 넉넉하게)
+# =============================================================================
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Set
+
+_TOKENS, _UPDATED, _TICK = 0, 1, 2
+
+
+class TokenBucketLimiter:
+    """
+    키별 토큰 버킷 (단일 이벤트 루프 전제)
+
+    사용법:
+        limiter = TokenBucketLimiter(rate_per_minute=10)
+        if not limiter.allow(ip):
+            retry = limiter.retry_after(ip)     # 다음 토큰까지 남은 초
+
+    rate_per_minute 가 0 이하이면 항상 허용
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int = 0,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate_per_minute / 60.0  # 초당 채워지는 토큰
+        self.burst = burst or max(1, int(rate_per_minute))  # 기본: 분당 한도만큼 한 번에 허용
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        # 빈 버킷이 가득 차는 데 걸리는 시간 + 여유 1초 만큼의 슬롯
+        self._wheel: List[Set[str]] = [set() for _ in range(self._wheel_size())]
+        self._tick = int(self.clock())  # 마지막으로 비운 슬롯의 틱 (초)
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _wheel_size(self) -> int:
+        return math.ceil(self.burst / self.rate) + 2 if self.rate > 0 else 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _advance(self, now: float) -> None:
+        """지나간 슬롯의 키 삭제 (가득 찬 버킷 = 기록이 없는 것과 같음)"""
+        tick = int(now)
+        if tick <= self._tick:
+            return
+        size = len(self._wheel)
+        for t in range(self._tick + 1, min(tick, self._tick + size) + 1):
+            slot = self._wheel[t % size]
+            for key in slot:
+                self._buckets.pop(key, None)
+            slot.clear()
+        self._tick = tick
+
+    def _schedule(self, key: str, bucket: List[float], now: float) -> None:
+        """버킷이 가득 차는 시각의 슬롯으로 키 이동"""
+        size = len(self._wheel)
+        full_at = now + (self.burst - bucket[_TOKENS]) / self.rate
+        tick = max(int(full_at) + 1, self._tick + 1)  # 해당 초가 끝난 뒤 삭제
+        if tick != bucket[_TICK]:
+            self._wheel[int(bucket[_TICK]) % size].discard(key)
+            self._wheel[tick % size].add(key)
+            bucket[_TICK] = tick
+
+    def _refill(self, key: str, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                old_key, old = self._buckets.popitem(last=False)
+                self._wheel[int(old[_TICK]) % len(self._wheel)].discard(old_key)
+                self.evicted += 1
+            bucket = self._buckets[key] = [float(self.burst), now, -1]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[_TOKENS] = min(self.burst, bucket[_TOKENS] + (now - bucket[_UPDATED]) * self.rate)
+            bucket[_UPDATED] = now
+        return bucket
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """토큰이 있으면 소비하고 True, 없으면 False"""
+        if self.rate <= 0:
+            return True
+        now = self.clock()
+        self._advance(now)
+        bucket = self._refill(key, now)
+        if bucket[_TOKENS] < cost:
+            self.limited += 1
+            return False
+        bucket[_TOKENS] -= cost
+        self._schedule(key, bucket, now)
+        self.allowed += 1
+        return True
+
+    async def acquire(self, key: str, cost: float = 1.0) -> bool:
+        """이벤트 루프용 allow (DistributedRateLimiter 와 같은 호출 방식, 블로킹 I/O 없음)"""
+        return self.allow(key, cost)
+
+    def is_limited(self, key: str, cost: float = 1.0) -> bool:
+        """토큰을 소비하지 않고 지금 거부될지 확인 (사전 확인용)"""
+        bucket = self._buckets.get(key)
+        if self.rate <= 0 or bucket is None:
+            return False
+        return min(self.burst, bucket[_TOKENS] + (self.clock() - bucket[_UPDATED]) * self.rate) < cost
+
+    def retry_after(self, key: str, cost: float = 1.0) -> int:
+        """다음 요청이 허용될 때까지 남은 시간(초, 최소 1)"""
+        bucket = self._buckets.get(key)
+        if self.rate <= 0 or bucket is None:
+            return 1
+        tokens = min(self.burst, bucket[_TOKENS] + (self.clock() - bucket[_UPDATED]) * self.rate)
+        return max(1, math.ceil((cost - tokens) / self.rate))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약"""
+        return {
+            "backend": "memory",
+            "rate_per_minute": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,184 @@
+# =============================================================================
+# reanalysis.py - 관리자용 일괄 재분석 (백필)
+# =============================================================================
+# ANALYSIS_TEMPLATES 또는 모델 변경 후 analysis_logs.request_data 를 다시 분석
+# - 동시 실행 수 제한 (워커 N개가 공유 큐에서 로그 ID를 꺼냄)
+# - 요청 간 최소 간격 + 429/503 응답 시 배치 전체 일시 정지 (Rate Limit 대응)
+# - 결과는 reanalysis_results 에 건별 저장 → 그 자체가 체크포인트 (재시작 시 이어서 실행)
+#   같은 로그 결과가 이미 있으면(다른 uvicorn 워커가 같은 배치를 재개한 경우 등) 완료로 간주,
+#   진행 수는 저장된 결과에서 다시 세므로 프로세스 간에도 일치
+# - 사용자 usage / analysis_logs 는 건드리지 않음
+# =============================================================================
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from database import DatabaseInterface
+
+logger = logging.getLogger(__name__)
+
+BATCH_RUNNING = "running"
+BATCH_DONE = "done"
+BATCH_CANCELLED = "cancelled"
+
+# 업스트림 과부하로 간주하여 재시도하는 상태 코드
+THROTTLE_STATUS_CODES = {429, 503}
+
+# 분석 함수: (data, language, tone) → (status_code, 결과 JSON 문자열 또는 에러 메시지, 응답한 모델)
+# 모델 라우팅으로 배치의 기본 모델이 아닌 모델이 응답할 수 있으므로 결과마다 실제 모델을 기록
+# (업스트림 호출 전 실패면 None)
+Analyzer = Callable[[str, str, str], Awaitable[Tuple[int, str, Optional[str]]]]
+
+
+class _Pacer:
+    """요청 시작 간 최소 간격 보장 + 스로틀 시 전체 일시 정지"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """모든 워커의 다음 시작을 seconds 뒤로 미룸"""
+        self._next_start = max(self._next_start, time.monotonic() + seconds)
+
+
+class ReanalysisRunner:
+    """
+    재분석 배치 실행기
+
+    사용법:
+        runner = ReanalysisRunner(db, analyzer, min_interval=0.5)
+        runner.start(batch_id)      # 배치 생성 후 백그라운드 실행
+        runner.cancel(batch_id)
+        await runner.resume_unfinished()  # 서버 시작 시
+    """
+
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        analyzer: Analyzer,
+        min_interval: float = 0.5,
+        max_attempts: int = 3,
+        throttle_pause: float = 10.0,
+    ):
+        self.db = db
+        self.analyzer = analyzer
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.throttle_pause = throttle_pause
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()  # 관리자 취소 (서버 종료와 구분)
+
+    def is_running(self, batch_id: str) -> bool:
+        task = self._tasks.get(batch_id)
+        return task is not None and not task.done()
+
+    def start(self, batch_id: str) -> None:
+        """배치를 백그라운드 태스크로 실행 (이미 실행 중이면 무시)"""
+        if self.is_running(batch_id):
+            return
+        self._tasks[batch_id] = asyncio.create_task(self._run(batch_id))
+
+    def cancel(self, batch_id: str) -> bool:
+        """실행 중인 배치 취소 (저장된 결과는 유지)"""
+        task = self._tasks.get(batch_id)
+        if task is None or task.done():
+            return False
+        self._cancelled.add(batch_id)
+        task.cancel()
+        return True
+
+    async def resume_unfinished(self) -> None:
+        """재시작 전 실행 중이던 배치를 체크포인트부터 재개"""
+        for batch_id in self.db.get_unfinished_reanalysis_batches():
+            self.start(batch_id)
+
+    async def stop(self) -> None:
+        """서버 종료 시 태스크 정리 (배치는 running 상태로 남아 다음 시작 시 재개)"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, batch_id: str) -> None:
+        batch = self.db.get_reanalysis_batch(batch_id)
+        if batch is None:
+            return
+
+        # 체크포인트: 이미 결과가 있는 로그는 건너뜀
+        done_ids = set(self.db.get_reanalyzed_log_ids(batch_id))
+        pending = [log_id for log_id in json.loads(batch["log_ids"]) if log_id not in done_ids]
+        counts = {"succeeded": batch["succeeded"], "failed": batch["failed"]}
+        logger.info("%s: %d pending (done: %d)", batch_id, len(pending), len(done_ids))
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for log_id in pending:
+            queue.put_nowait(log_id)
+        pacer = _Pacer(self.min_interval)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    log_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    status_code, payload, model = await self._process(log_id, pacer)
+                except Exception as e:
+                    # 한 건의 예외로 배치 전체가 멈추지 않도록 실패로 기록
+                    status_code, payload, model = 500, f"Internal error: {e}", None
+                ok = status_code == 200
+                try:
+                    saved = self.db.save_reanalysis_result(
+                        batch_id,
+                        log_id,
+                        model,
+                        status_code,
+                        response_data=payload if ok else None,
+                        error_message=None if ok else payload,
+                    )
+                    if not saved:
+                        logger.info("%s: log %s already has a result, skipped", batch_id, log_id)
+                    counts.update(self.db.count_reanalysis_results(batch_id))
+                    self.db.update_reanalysis_batch(batch_id, BATCH_RUNNING, counts["succeeded"], counts["failed"])
+                except Exception:
+                    # 저장 실패도 배치를 멈추지 않음 (결과가 없으므로 재개 시 다시 시도)
+                    logger.exception("%s: failed to save result of log %s", batch_id, log_id)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, batch["concurrency"]))))
+        except asyncio.CancelledError:
+            if batch_id in self._cancelled:
+                self._cancelled.discard(batch_id)
+                self.db.update_reanalysis_batch(batch_id, BATCH_CANCELLED, counts["succeeded"], counts["failed"])
+            raise
+        self.db.update_reanalysis_batch(batch_id, BATCH_DONE, counts["succeeded"], counts["failed"])
+        logger.info("%s: done (%d ok / %d failed)", batch_id, counts["succeeded"], counts["failed"])
+
+    async def _process(self, log_id: int, pacer: _Pacer) -> Tuple[int, Optional[str], Optional[str]]:
+        """로그 1건 재분석 (스로틀 응답은 일시 정지 후 재시도) → (상태 코드, 결과/에러, 응답한 모델)"""
+        log = self.db.get_log_request(log_id)
+        if log is None or not log["request_data"]:
+            return 404, "Log not found", None
+
+        status_code, payload, model = 500, None, None
+        for attempt in range(self.max_attempts):
+            await pacer.wait()
+            status_code, payload, model = await self.analyzer(
+                log["request_data"], log["language"] or "ko", log["tone"] or "gentle"
+            )
+            if status_code not in THROTTLE_STATUS_CODES:
+                break
+            pacer.pause(self.throttle_pause * (2 ** attempt))
+        return status_code, payload, model
@@ -0,0 +1,194 @@
+# =============================================================================
+# response_parser.py - Gemini 분석 응답 관대한(tolerant) JSON 파서
+# =============================================================================
+# Gemini 응답이 코드 펜스(```json)로 감싸져 있거나, 뒤에 설명문이 붙거나,
+# maxOutputTokens 에서 잘려 JSON이 닫히지 않은 경우에도
+# 완성된 필드는 모두 살리고 나머지는 기본값으로 채움 → 재요청(추가 과금) 감소
+#
+# 텍스트를 한 번만 순회하며 (괄호 스택 / 문자열 상태 / 마지막 안전 지점) 추적
+#   - 첫 번째 '{' 부터 시작 (앞의 코드 펜스/설명 무시)
+#   - 최상위 객체가 닫히면 종료 (뒤의 코드 펜스/설명 무시)
+#   - 잘린 경우: 값 문자열은 닫아서 살리고, 불완전한 키/값은 마지막 안전 지점까지 버린 뒤
+#     열린 배열/객체를 순서대로 닫음
+# =============================================================================
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# AnalyzeResponse 형태의 기본값 (remainingAnalyses 는 서버가 채움)
+ANALYSIS_DEFAULTS: Dict[str, Any] = {
+    "oneLiner": "",
+    "summary": "",
+    "insights": [],
+    "warnings": [],
+    "suggestions": [],
+    "spendingPlan": "",
+}
+PATTERN_DEFAULTS: Dict[str, Any] = {
+    "mainCategory": "",
+    "spendingTrend": "",
+    "savingPotential": 0,
+    "riskLevel": "",
+}
+
+_CLOSERS = {"{": "}", "[": "]"}
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _close(stack: List[List[Any]]) -> str:
+    return "".join(_CLOSERS[frame[0]] for frame in reversed(stack))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    첫 번째 JSON 객체를 추출/복구하여 파싱 (복구 불가 시 None)
+
+    - '{' 이전 텍스트와 최상위 객체 이후 텍스트는 무시
+    - 잘린 문자열 값은 닫고, 열린 배열/객체는 닫음
+    - 값이 없는 키, 잘린 키/리터럴은 직전 완전한 멤버까지 버림
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    # frame: [여는 괄호, 객체에서 다음 문자열이 키인지 여부]
+    stack: List[List[Any]] = []
+    in_string = False
+    escape = False
+    string_is_key = False
+    safe_end = start  # 여기까지 자르고 safe_closers 를 붙이면 유효한 JSON
+    safe_closers = ""
+
+    i = start
+    length = len(text)
+    while i < length:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_closers = i + 1, _close(stack)
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            frame = stack[-1] if stack else None
+            string_is_key = bool(frame and frame[0] == "{" and frame[1])
+            if string_is_key:
+                frame[1] = False
+        elif ch in "{[":
+            stack.append([ch, ch == "{"])
+            safe_end, safe_closers = i + 1, _close(stack)
+        elif ch in "}]":
+            if not stack or _CLOSERS[stack[-1][0]] != ch:
+                break  # 괄호 불일치 → 여기까지를 잘린 것으로 처리
+            stack.pop()
+            safe_end, safe_closers = i + 1, _close(stack)
+            if not stack:
+                return _loads(text[start:i + 1])  # 최상위 객체 완성 (뒤의 텍스트 무시)
+        elif ch == ",":
+            # 직전 멤버(숫자/리터럴 포함) 완성 → 쉼표 앞이 안전 지점
+            safe_end, safe_closers = i, _close(stack)
+            if stack and stack[-1][0] == "{":
+                stack[-1][1] = True
+        i += 1
+
+    # 여기부터는 잘린 텍스트: 1) 현재 상태 그대로 닫기 2) 마지막 안전 지점으로 되돌려 닫기
+    if in_string and not string_is_key:
+        head = text[start:]
+        if escape:
+            head = head[:-1]  # 잘린 이스케이프 제거
+        head = re.sub(r"\\u[0-9a-fA-F]{0,3}$", "", head)
+        result = _loads(head + '"' + _close(stack))
+        if result is not None:
+            return result
+    elif not in_string:
+        head = text[start:].rstrip()
+        if head.endswith(","):
+            head = head[:-1]
+        result = _loads(head + _close(stack))
+        if result is not None:
+            return result
+
+    return _loads(text[start:safe_end] + safe_closers)
+
+
+def _loads(candidate: str) -> Optional[Any]:
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+
+
+# =============================================================================
+# AnalyzeResponse 형태 정규화
+# =============================================================================
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _as_text_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [_as_text(item) for item in value if item is not None and _as_text(item)]
+    return [_as_text(value)]
+
+
+def _as_int(value: Any) -> int:
+    """'15%' / '15.5' / 15 → 정수 (실패 시 0)"""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _NUMBER.search(_as_text(value))
+    return int(float(match.group())) if match else 0
+
+
+def normalize_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+    """누락 필드는 기본값으로 채우고 타입을 AnalyzeResponse 에 맞춤 (추가 필드는 유지)"""
+    result = dict(data)
+    for key in ("oneLiner", "summary", "spendingPlan"):
+        result[key] = _as_text(data.get(key, ANALYSIS_DEFAULTS[key]))
+    for key in ("insights", "warnings", "suggestions"):
+        result[key] = _as_text_list(data.get(key))
+
+    pattern = data.get("pattern")
+    pattern = pattern if isinstance(pattern, dict) else {}
+    result["pattern"] = {
+        "mainCategory": _as_text(pattern.get("mainCategory", PATTERN_DEFAULTS["mainCategory"])),
+        "spendingTrend": _as_text(pattern.get("spendingTrend", PATTERN_DEFAULTS["spendingTrend"])),
+        "savingPotential": _as_int(pattern.get("savingPotential", PATTERN_DEFAULTS["savingPotential"])),
+        "riskLevel": _as_text(pattern.get("riskLevel", PATTERN_DEFAULTS["riskLevel"])),
+    }
+    return result
+
+
+def parse_analysis_text(text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Gemini 응답 텍스트 → (정규화된 분석 결과, 복구 여부)
+
+    정상 JSON은 json.loads 한 번으로 처리하고, 실패 시에만 복구 시도
+    한 마디 요약/요약이 모두 비어 있으면 쓸 수 없는 응답으로 보고 None 반환
+    """
+    repaired = False
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = repair_json(text)
+        repaired = True
+
+    if not isinstance(data, dict):
+        return None, repaired
+
+    result = normalize_analysis(data)
+    if not result["oneLiner"] and not result["summary"]:
+        return None, repaired
+    return result, repaired
@@ -0,0 +1,69 @@
+# =============================================================================
+# response_schema.py - Pydantic 모델 → Gemini responseSchema 변환
+# =============================================================================
+# Gemini 구조화 출력(generationConfig.responseSchema)은 OpenAPI 3.0 스키마의 부분집합만 지원
+#   - $ref / $defs 미지원 → 참조를 모두 인라인 (allOf: [$ref] 포함)
+#   - title / default / additionalProperties 등 미지원 키워드 제거
+#   - Optional[X] (anyOf + null) → X + nullable: true
+#   - 필드 선언 순서를 propertyOrdering 으로 고정 (출력 순서 안정)
+# 응답 모델이 바뀌면 스키마도 자동으로 따라감 (프롬프트에 JSON 구조를 적을 필요 없음)
+# =============================================================================
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+# Gemini Schema 에서 지원하는 키워드 (그 외는 제거)
+_SUPPORTED_KEYS = {
+    "type", "format", "description", "nullable", "enum", "items",
+    "properties", "required", "minItems", "maxItems", "minimum", "maximum",
+}
+
+
+def _resolve(schema: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """$ref 인라인 + Optional 처리 + 미지원 키워드 제거 (재귀)"""
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        resolved = dict(defs[name])
+        if "description" in schema:
+            resolved["description"] = schema["description"]
+        return _resolve(resolved, defs)
+
+    if "allOf" in schema:
+        # Pydantic 은 설명이 붙은 모델 참조를 allOf: [$ref] 로 감쌈 → 단일 항목만 병합
+        if len(schema["allOf"]) != 1:
+            raise ValueError("allOf with multiple schemas is not supported by Gemini responseSchema")
+        merged = {**schema["allOf"][0], **{k: v for k, v in schema.items() if k != "allOf"}}
+        return _resolve(merged, defs)
+
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        if len(options) != 1:
+            raise ValueError("Union types are not supported by Gemini responseSchema")
+        merged = {**{k: v for k, v in schema.items() if k != "anyOf"}, **options[0]}
+        result = _resolve(merged, defs)
+        if len(options) < len(schema["anyOf"]):
+            result["nullable"] = True
+        return result
+
+    result: Dict[str, Any] = {}
+    for key, value in schema.items():
+        if key not in _SUPPORTED_KEYS:
+            continue
+        if key == "type":
+            result["type"] = value.upper()
+        elif key == "items":
+            result["items"] = _resolve(value, defs)
+        elif key == "properties":
+            result["properties"] = {name: _resolve(prop, defs) for name, prop in value.items()}
+            result["propertyOrdering"] = list(value)
+        else:
+            result[key] = value
+    if "enum" in result and result.get("type") == "STRING":
+        result["format"] = "enum"
+    return result
+
+
+def gemini_response_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Pydantic 모델 → Gemini responseSchema (dict, JSON 직렬화 가능)"""
+    schema = model.model_json_schema()
+    return _resolve(schema, schema.get("$defs", {}))
@@ -0,0 +1,225 @@
+# =============================================================================
+# shared_limiter.py - 워커 간 공유 토큰 버킷 (메모리 맵 파일 + 스트라이프 잠금)
+# =============================================================================
+# rate_limiter.TokenBucketLimiter 는 프로세스 메모리라 uvicorn --workers N 이면 한도가 N배
+# → 같은 호스트의 모든 워커가 하나의 메모리 맵 파일(/dev/shm 권장)을 공유
+#
+# 레이아웃:
+#   [0, 4096)      헤더 (magic, 슬롯 수, 스트라이프 수, rate, burst) + 잠금용 바이트
+#   [4096, ...)    슬롯 배열, 슬롯 = (키 해시 u64, 남은 토큰 f64, 갱신 시각 f64) 24바이트
+#
+# 슬롯 배열은 스트라이프(기본 64개)로 나뉘고 키는 해시로 한 스트라이프에만 들어감
+#   - 잠금: 스트라이프마다 fcntl 바이트 범위 잠금 하나 (다른 스트라이프의 키는 동시에 처리)
+#   - 탐색: 스트라이프 안에서 최대 PROBES 칸 선형 탐색 (O(1))
+#   - 만료/상한: 가득 찬 버킷(= 기록 없음과 같음)이나 빈 칸을 재사용, 없으면 가장 오래된 칸을 덮어씀
+#     → 파일 크기(슬롯 수)가 고정이라 키가 아무리 늘어도 메모리 일정
+#
+# 시각은 time.time() (프로세스 간 공통), 뒤로 가면 경과 시간 0으로 처리
+# 파일은 처음 만들 때만 초기화, 다른 설정(슬롯/스트라이프/rate/burst)으로 만든 파일을 열면 ValueError
+#   → 다른 워커가 매핑 중인 파일을 줄이거나 덮어쓰지 않음 (매핑 밖 접근 = SIGBUS)
+#   설정이 바뀌면 새 파일을 쓰도록 호출자가 파일 이름에 설정을 넣음 (main.create_rate_limiter)
+# =============================================================================
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 공유 백엔드 사용 불가 (memory 백엔드 사용)
+    fcntl = None
+
+_MAGIC = b"RLSHM001"
+_HEADER = struct.Struct("<8sIIdd")
+_SLOT = struct.Struct("<Qdd")
+_TABLE_OFFSET = 4096
+_INIT_LOCK = 0  # 초기화 잠금 바이트
+_STRIPE_LOCK = 1024  # 스트라이프 i 의 잠금 바이트 = 1024 + i
+_MAX_STRIPES = _TABLE_OFFSET - _STRIPE_LOCK
+PROBES = 8
+
+
+def _key_hash(key: str) -> int:
+    """프로세스 간 동일한 64비트 해시 (0은 빈 칸 표시용이라 제외)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedTokenBucketLimiter:
+    """
+    메모리 맵 파일에 저장하는 키별 토큰 버킷 (TokenBucketLimiter 와 같은 인터페이스)
+
+    사용법:
+        limiter = SharedTokenBucketLimiter("/dev/shm/budget_api_ip.ratelimit", rate_per_minute=10)
+        if not limiter.allow(ip):
+            retry = limiter.retry_after(ip)
+
+    allowed/limited/evicted 는 이 워커에서 센 값
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rate_per_minute: float,
+        burst: int = 0,
+        slots: int = 65536,
+        stripes: int = 64,
+    ):
+        if fcntl is None:
+            raise RuntimeError("Shared rate limiter requires fcntl (POSIX)")
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst or max(1, int(rate_per_minute))
+        self.stripes = max(1, min(stripes, _MAX_STRIPES))
+        self.per_stripe = max(PROBES, slots // self.stripes)
+        self.slots = self.per_stripe * self.stripes
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        if self.rate > 0:
+            self._open()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _open(self) -> None:
+        size = _TABLE_OFFSET + self.slots * _SLOT.size
+        header = _HEADER.pack(_MAGIC, self.slots, self.stripes, self.rate, float(self.burst))
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, _INIT_LOCK)
+            try:
+                existing = os.pread(fd, _HEADER.size, 0)
+                if not existing.startswith(_MAGIC):
+                    # 새 파일 (또는 초기화 도중 중단된 파일 - 헤더 검사 전이라 매핑한 워커 없음)
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)  # 0으로 채워진 빈 슬롯
+                    os.pwrite(fd, header, 0)  # 헤더는 마지막에 (있으면 초기화 완료)
+                elif existing != header or os.fstat(fd).st_size != size:
+                    raise ValueError(f"{self.path} was created with different settings (slots/stripes/rate/burst)")
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, _INIT_LOCK)
+            self._mm = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._mm, self._fd = None, None
+
+    def _locate(self, key_hash: int) -> Tuple[int, int]:
+        """키 해시 → (스트라이프, 스트라이프 안 시작 위치)"""
+        return key_hash % self.stripes, (key_hash // self.stripes) % self.per_stripe
+
+    def _find(self, key_hash: int, stripe: int, start: int, now: float) -> Tuple[int, Optional[Tuple[float, float]]]:
+        """
+        키의 슬롯 오프셋과 (토큰, 갱신 시각) 반환 - 잠금을 잡은 상태에서 호출
+
+        키가 없으면 (재사용할 슬롯 오프셋, None): 빈 칸/가득 찬 버킷 우선, 없으면 가장 오래된 칸
+        """
+        base = stripe * self.per_stripe
+        victim, victim_updated = -1, math.inf
+        for i in range(PROBES):
+            offset = _TABLE_OFFSET + (base + (start + i) % self.per_stripe) * _SLOT.size
+            slot_hash, tokens, updated = _SLOT.unpack_from(self._mm, offset)
+            if slot_hash == key_hash:
+                return offset, (tokens, updated)
+            if victim_updated == -math.inf:
+                continue  # 이미 재사용 가능한 칸을 찾음 (키가 뒤에 있는지만 확인)
+            if slot_hash == 0 or tokens + (now - updated) * self.rate >= self.burst:
+                victim, victim_updated = offset, -math.inf
+            elif updated < victim_updated:
+                victim, victim_updated = offset, updated
+        if victim_updated != -math.inf:
+            self.evicted += 1  # 활성 키를 밀어냄 (그 키는 가득 찬 버킷으로 다시 시작)
+        return victim, None
+
+    def _refilled(self, state: Optional[Tuple[float, float]], now: float) -> float:
+        if state is None:
+            return float(self.burst)
+        tokens, updated = state
+        return min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """토큰이 있으면 소비하고 True, 없으면 False (모든 워커 합산)"""
+        if self.rate <= 0:
+            return True
+        key_hash = _key_hash(key)
+        stripe, start = self._locate(key_hash)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, _STRIPE_LOCK + stripe)
+        try:
+            now = time.time()
+            offset, state = self._find(key_hash, stripe, start, now)
+            tokens = self._refilled(state, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            _SLOT.pack_into(self._mm, offset, key_hash, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, _STRIPE_LOCK + stripe)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed
+
+    async def acquire(self, key: str, cost: float = 1.0) -> bool:
+        """이벤트 루프용 allow (DistributedRateLimiter 와 같은 호출 방식, 블로킹 I/O 없음)"""
+        return self.allow(key, cost)
+
+    def _peek(self, key: str) -> Optional[float]:
+        """키의 현재 토큰 수 (없으면 None) - 읽기만 하므로 잠금 없이 (근사값이면 충분)"""
+        key_hash = _key_hash(key)
+        stripe, start = self._locate(key_hash)
+        base = stripe * self.per_stripe
+        for i in range(PROBES):
+            offset = _TABLE_OFFSET + (base + (start + i) % self.per_stripe) * _SLOT.size
+            slot_hash, tokens, updated = _SLOT.unpack_from(self._mm, offset)
+            if slot_hash == key_hash:
+                return self._refilled((tokens, updated), time.time())
+        return None
+
+    def is_limited(self, key: str, cost: float = 1.0) -> bool:
+        """토큰을 소비하지 않고 지금 거부될지 확인 (사전 확인용)"""
+        if self.rate <= 0:
+            return False
+        tokens = self._peek(key)
+        return tokens is not None and tokens < cost
+
+    def retry_after(self, key: str, cost: float = 1.0) -> int:
+        """다음 요청이 허용될 때까지 남은 시간(초, 최소 1)"""
+        if self.rate <= 0:
+            return 1
+        tokens = self._peek(key)
+        return 1 if tokens is None else max(1, math.ceil((cost - tokens) / self.rate))
+
+    def __len__(self) -> int:
+        """사용 중인 슬롯 수 (전체 스캔 - 메트릭용)"""
+        if self._mm is None:
+            return 0
+        with memoryview(self._mm) as view, view[_TABLE_OFFSET:] as table, table.cast("Q") as words, \
+                words[::3] as hashes:
+            return len(hashes) - hashes.tolist().count(0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약"""
+        return {
+            "backend": "shared",
+            "path": self.path,
+            "rate_per_minute": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "keys": len(self),
+            "max_keys": self.slots,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,199 @@
+# =============================================================================
+# spend_governor.py - 전역 Gemini 토큰 사용량 제한 (시간/일 예산)
+# =============================================================================
+# 기기별 DAILY_LIMIT 만으로는 새 device_id 가 대량으로 들어올 때 전체 비용을 막을 수 없음
+# → 모든 기기의 토큰 사용량을 메모리에서 집계하고 시간/일 예산 대비 사용률로 단계적 제한
+#
+#   사용률 < reduce_at            : normal     (제한 없음)
+#   reduce_at  ≤ 사용률 < local_at : reduced    (maxOutputTokens 축소)
+#   local_at   ≤ 사용률 < 1.0      : local_only (Gemini 미호출, 로컬 분석만)
+#   1.0 ≤ 사용률                   : reject     (거부)
+#
+# - 사용률 = (DB 누적 + 미반영 증분 + 진행 중 요청 예상치) / 예산, 시간/일 중 큰 값
+# - 판단은 카운터 몇 개만 보는 O(1) (윈도우 경계 시각도 미리 계산)
+# - 주기적으로 증분을 DB(spend_counters)에 더하고 누적값을 받아옴 → 여러 워커/재시작에도 합산 유지
+# =============================================================================
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+KST = ZoneInfo("Asia/Seoul")
+
+NORMAL = "normal"
+REDUCED = "reduced"
+LOCAL_ONLY = "local_only"
+REJECT = "reject"
+
+
+class _Window:
+    """시간 또는 일 단위 사용량 윈도우"""
+
+    __slots__ = ("kind", "budget", "key", "ends_at", "base", "delta")
+
+    def __init__(self, kind: str, budget: int):
+        self.kind = kind  # "hour" / "day"
+        self.budget = budget  # 0이면 무제한
+        self.key = ""
+        self.ends_at = 0.0  # time.time() 기준 윈도우 종료 시각
+        self.base = 0  # 마지막 체크포인트 시점의 DB 누적값 (다른 워커 포함)
+        self.delta = 0  # 아직 DB에 반영하지 않은 이 프로세스의 사용량
+
+    def used(self) -> int:
+        return self.base + self.delta
+
+
+def _window_bounds(kind: str, now: float) -> Tuple[str, float]:
+    """KST 기준 현재 윈도우 (키, 종료 시각)"""
+    local = datetime.fromtimestamp(now, KST)
+    if kind == "hour":
+        start = local.replace(minute=0, second=0, microsecond=0)
+        return f"hour:{start.strftime('%Y-%m-%dT%H')}", (start + timedelta(hours=1)).timestamp()
+    start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return f"day:{start.strftime('%Y-%m-%d')}", (start + timedelta(days=1)).timestamp()
+
+
+class SpendGovernor:
+    """
+    전역 토큰 예산 관리 (단일 이벤트 루프 전제)
+
+    사용법:
+        level = governor.reserve(estimate)        # 호출 전 (예상 토큰 예약)
+        if level in (LOCAL_ONLY, REJECT): ...     # 호출하지 않음 (예약도 안 됨)
+        ...
+        governor.release(estimate)                # 호출 종료 후 (성공/실패 무관) 예약 해제
+        governor.record(actual_tokens)            # 응답의 usageMetadata 토큰 수 반영
+    """
+
+    def __init__(
+        self,
+        db,
+        hourly_budget: int = 0,
+        daily_budget: int = 0,
+        reduce_at: float = 0.8,
+        local_at: float = 0.95,
+        checkpoint_seconds: float = 30.0,
+    ):
+        self.db = db
+        self.reduce_at = reduce_at
+        self.local_at = local_at
+        self.checkpoint_seconds = checkpoint_seconds
+        self._windows = [_Window("hour", hourly_budget), _Window("day", daily_budget)]
+        self._roll_at = 0.0  # 가장 먼저 끝나는 윈도우의 종료 시각
+        self._unflushed: List[Tuple[str, int]] = []  # 지난 윈도우의 미반영 증분
+        self._pending = 0  # 진행 중 요청의 예상 토큰 합계
+        self._checkpointer: Optional[asyncio.Task] = None
+        self.decisions = {NORMAL: 0, REDUCED: 0, LOCAL_ONLY: 0, REJECT: 0}
+        self._roll(time.time())
+
+    @property
+    def enabled(self) -> bool:
+        return any(window.budget > 0 for window in self._windows)
+
+    def _roll(self, now: float) -> None:
+        """윈도우 경계를 넘었으면 새 윈도우로 (지난 증분은 다음 체크포인트에 반영)"""
+        for window in self._windows:
+            key, ends_at = _window_bounds(window.kind, now)
+            if key != window.key:
+                if window.key and window.delta:
+                    self._unflushed.append((window.key, window.delta))
+                window.key, window.ends_at, window.base, window.delta = key, ends_at, 0, 0
+        self._roll_at = min(window.ends_at for window in self._windows)
+
+    def usage_ratio(self) -> float:
+        """시간/일 예산 중 더 많이 쓴 쪽의 사용률 (진행 중 요청 포함)"""
+        now = time.time()
+        if now >= self._roll_at:
+            self._roll(now)
+        return max(
+            ((window.used() + self._pending) / window.budget for window in self._windows if window.budget > 0),
+            default=0.0,
+        )
+
+    def level(self) -> str:
+        ratio = self.usage_ratio()
+        if ratio >= 1.0:
+            return REJECT
+        if ratio >= self.local_at:
+            return LOCAL_ONLY
+        if ratio >= self.reduce_at:
+            return REDUCED
+        return NORMAL
+
+    def reserve(self, estimate: int) -> str:
+        """호출 전 판단 + 예상 토큰 예약 (normal/reduced 일 때만 예약)"""
+        level = self.level()
+        self.decisions[level] += 1
+        if level in (NORMAL, REDUCED):
+            self._pending += estimate
+        return level
+
+    def release(self, estimate: int) -> None:
+        """예약 해제 (업스트림 호출 종료 시)"""
+        self._pending = max(0, self._pending - estimate)
+
+    def record(self, tokens: int) -> None:
+        """실제 사용 토큰 반영"""
+        if tokens > 0:
+            for window in self._windows:
+                window.delta += tokens
+
+    def retry_after(self) -> int:
+        """예산이 소진된 윈도우가 끝날 때까지 남은 시간(초)"""
+        now = time.time()
+        exhausted = [window.ends_at for window in self._windows
+                     if window.budget > 0 and window.used() + self._pending >= window.budget]
+        return max(1, int(min(exhausted, default=self._roll_at) - now))
+
+    # -------------------------------------------------------------------------
+    # DB 체크포인트
+    # -------------------------------------------------------------------------
+    def checkpoint(self) -> None:
+        """미반영 증분을 DB에 더하고 (다른 워커 포함) 누적값으로 동기화"""
+        if time.time() >= self._roll_at:
+            self._roll(time.time())
+        # DB 반영에 성공한 뒤에만 증분을 비움 (실패 시 다음 체크포인트에 재시도)
+        while self._unflushed:
+            key, delta = self._unflushed[0]
+            self.db.add_spend_tokens(key, delta)
+            self._unflushed.pop(0)
+        for window in self._windows:
+            delta = window.delta
+            window.base = self.db.add_spend_tokens(window.key, delta)
+            window.delta -= delta
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_seconds)
+            try:
+                self.checkpoint()
+            except Exception as e:  # DB 일시 오류: 증분은 메모리에 남아 다음 주기에 반영
+                logger.warning("Checkpoint failed: %s", e)
+
+    async def start(self) -> None:
+        """DB 누적값 로드 + 체크포인트 루프 시작"""
+        self.checkpoint()
+        self._checkpointer = asyncio.create_task(self._checkpoint_loop())
+
+    async def stop(self) -> None:
+        """체크포인트 루프 종료 + 마지막 증분 반영"""
+        if self._checkpointer is not None:
+            self._checkpointer.cancel()
+            await asyncio.gather(self._checkpointer, return_exceptions=True)
+        self.checkpoint()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """메트릭용 상태 요약"""
+        return {
+            "level": self.level(),
+            "pending_tokens": self._pending,
+            "windows": {
+                window.kind: {"key": window.key, "used": window.used(), "budget": window.budget}
+                for window in self._windows
+            },
+            "decisions": dict(self.decisions),
+        }
@@ -0,0 +1,97 @@
+"""budget_payload.py 테스트 (집계 / canonical 렌더링 / 구조화 요청)"""
+import random
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+import main
+from budget_payload import BudgetPayload, aggregate_budget, is_fixed_budget, render_budget_payload
+from conftest import new_device_id
+from loadtest import make_budget
+
+TODAY = date(2026, 10, 19)
+
+PAYLOAD = {
+    "startDate": "2026-10-01",
+    "endDate": "2026-10-31",
+    "today": "2026-10-10",
+    "budgets": [
+        {"id": "food", "name": "식비", "amount": 300000, "order": 0},
+        {"id": "rent", "name": "월세", "amount": 500000, "order": 1},
+    ],
+    "subBudgets": [{"id": "out", "budgetId": "food", "name": "외식", "amount": 100000}],
+    "expenses": [
+        {"budgetId": "food", "subBudgetId": "out", "amount": 12000, "date": "2026-10-02", "memo": "점심"},
+        {"budgetId": "food", "amount": 30000, "date": "2026-10-05"},
+        {"budgetId": "rent", "amount": 500000, "date": "2026-10-01"},
+        {"budgetId": "unknown", "amount": 999, "date": "2026-10-03"},
+    ],
+}
+
+
+def test_aggregate_single_pass():
+    agg = aggregate_budget(BudgetPayload.model_validate(PAYLOAD))
+    assert agg.total_budget == 800000
+    assert agg.by_budget == {"food": 42000, "rent": 500000}
+    assert agg.by_sub_budget == {"out": 12000}
+    assert agg.total_expense == 542000  # 알 수 없는 예산의 지출은 합계에서 제외
+    assert list(agg.by_day) == sorted(agg.by_day)
+    assert agg.expense_count == 4
+    assert agg.recent[0].date == date(2026, 10, 5)
+
+
+def test_fixed_budget_detection():
+    payload = BudgetPayload.model_validate(PAYLOAD)
+    assert [is_fixed_budget(budget) for budget in payload.budgets] == [False, True]
+
+
+def test_render_is_canonical():
+    payload = BudgetPayload.model_validate(PAYLOAD)
+    text = render_budget_payload(payload, TODAY)
+    assert text.split("\n")[:3] == [
+        "period: 2026-10-01~2026-10-31 (31d, today 2026-10-10, 21d left)",
+        "currency: ₩",
+        "total: budget 800,000 / spent 542,000 / left 258,000 (67.8%), 4 expenses",
+    ]
+    assert "- 식비 [variable]: 300,000 / 42,000 / 258,000 / 14.0%" in text
+    assert "  - 외식: 100,000 / 12,000 / 88,000" in text
+    assert "- 2026-10-02 식비/외식 점심: 12,000" in text
+
+    # 입력 순서가 달라도 같은 텍스트 (캐시 키 안정)
+    shuffled = dict(PAYLOAD, expenses=list(reversed(PAYLOAD["expenses"])), budgets=list(reversed(PAYLOAD["budgets"])))
+    assert render_budget_payload(BudgetPayload.model_validate(shuffled), TODAY) == text
+
+
+def test_render_large_payload_keeps_recent_count():
+    payload = BudgetPayload.model_validate(make_budget(random.Random(3), 5000, TODAY))
+    text = render_budget_payload(payload, TODAY)
+    assert "recent expenses (latest 20):" in text
+    assert "5000 expenses" in text
+
+
+def test_analyze_request_renders_budget_into_data():
+    req = main.AnalyzeRequest(budget=PAYLOAD, device_id=new_device_id())
+    assert req.data.startswith("period: 2026-10-01~2026-10-31")
+
+
+def test_analyze_request_requires_data_or_budget():
+    with pytest.raises(ValidationError):
+        main.AnalyzeRequest(device_id=new_device_id())
+
+
+def test_reversed_period_is_rejected(client):
+    reversed_period = {**PAYLOAD, "startDate": "2026-10-31", "endDate": "2026-10-01"}
+    with pytest.raises(ValidationError):
+        BudgetPayload.model_validate(reversed_period)
+    assert BudgetPayload.model_validate({**PAYLOAD, "endDate": "2026-10-01"}).endDate == date(2026, 10, 1)
+    for path in ("/api/analyze", "/api/analyze/local"):
+        response = client.post(path, json={"budget": reversed_period, "device_id": new_device_id()})
+        assert response.status_code == 422
+
+
+def test_analyze_endpoint_accepts_structured_budget(client, mock_gemini):
+    calls = mock_gemini()
+    response = client.post("/api/analyze", json={"budget": PAYLOAD, "device_id": new_device_id()})
+    assert response.status_code == 200
+    assert "period: 2026-10-01~2026-10-31" in calls[0].content.decode()
@@ -0,0 +1,131 @@
+"""circuit_breaker.py 테스트 (closed → open → half_open → closed/open 전이)"""
+import asyncio
+
+import httpx
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from gemini_client import GeminiClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = dict(min_calls=4, error_rate_threshold=0.5, slow_call_seconds=5.0,
+                   cooldown_seconds=30.0, half_open_max_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_opens_on_error_rate_after_min_calls(clock):
+    breaker = make_breaker()
+    for success in (True, False, False):
+        breaker.record(success=success, latency=0.1)
+    assert breaker.state == CLOSED  # 최소 호출 수 미만
+    breaker.record(success=True, latency=0.1)
+    assert breaker.state == OPEN  # 2/4 실패
+    assert not breaker.allow_request()
+    assert breaker.retry_after() == pytest.approx(30.0)
+
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = make_breaker(slow_rate_threshold=0.75)
+    for _ in range(4):
+        breaker.record(success=True, latency=6.0)
+    assert breaker.state == OPEN
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = make_breaker(window_seconds=60)
+    breaker.record(success=False, latency=0.1)
+    breaker.record(success=False, latency=0.1)
+    clock.now += 61
+    for _ in range(3):
+        breaker.record(success=True, latency=0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window_calls"] == 3
+
+
+def test_half_open_closes_after_successful_trials(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock.now += 30
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # 시험 요청 슬롯 2개 모두 사용 중
+    breaker.record(success=True, latency=0.1)
+    breaker.record(success=True, latency=0.1)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["window_calls"] == 0  # 새 윈도우로 시작
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record(success=False, latency=0.1)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(30.0)
+
+
+def test_release_returns_half_open_slot(clock):
+    breaker = make_breaker(half_open_max_calls=1)
+    for _ in range(4):
+        breaker.record(success=False, latency=0.1)
+    clock.now += 30
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_client_fails_fast_when_open():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, json={})
+
+    breaker = make_breaker(min_calls=1, cooldown_seconds=60)
+    client = GeminiClient("key", max_retries=0, breaker=breaker)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert asyncio.run(client.generate("https://gemini.test", {})).status_code == 503
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate("https://gemini.test", {}))
+    assert len(calls) == 1
+
+
+def test_analyze_fast_fails_with_503_when_all_circuits_open(client, mock_gemini, monkeypatch):
+    import main
+    from conftest import new_device_id
+
+    for route in main.model_router.routes:
+        opened = make_breaker(min_calls=1, cooldown_seconds=60)
+        opened.record(success=False, latency=0.1)
+        monkeypatch.setattr(route, "breaker", opened)
+    calls = mock_gemini()
+
+    response = client.post("/api/analyze", json={"data": "hello", "device_id": new_device_id()})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert calls == []
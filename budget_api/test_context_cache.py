@@ -0,0 +1,157 @@
+"""context_cache.py 테스트 (생성 / 실패 백오프 / 갱신 / 캐시 오류 판별)"""
+import asyncio
+import json
+
+import httpx
+
+import main
+from conftest import gemini_body, new_device_id
+from context_cache import ContextCacheManager, is_cache_error
+from gemini_client import GeminiClient
+
+API = "https://gemini.test/v1beta"
+KEYS = [("ko", "gentle"), ("en", "coach")]
+
+
+def make_cache(handler, **kwargs) -> ContextCacheManager:
+    client = GeminiClient("key", backoff_base=0.001, backoff_max=0.001)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return ContextCacheManager(client, API, "m", lambda language, tone: (f"system {language}", f"do {tone}"), **kwargs)
+
+
+def test_start_creates_every_prefix():
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json={"name": f"cachedContents/{body['displayName']}"})
+
+    async def run():
+        cache = make_cache(handler)
+        await cache.start(KEYS)
+        names = [cache.get(*key) for key in KEYS]
+        await cache.stop()
+        return cache, names
+
+    cache, names = asyncio.run(run())
+    assert names == ["cachedContents/budget-analysis-ko-gentle", "cachedContents/budget-analysis-en-coach"]
+    assert bodies[0]["systemInstruction"]["parts"][0]["text"] == "system ko"
+    assert bodies[0]["ttl"] == "3600s"
+    assert cache.snapshot() == {"cached": 2, "keys": 2, "hits": 2, "misses": 0}
+
+
+def test_rejected_create_backs_off():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"message": "too few tokens"}})
+
+    async def run():
+        cache = make_cache(handler)
+        await cache.start(KEYS[:1])
+        assert cache.get(*KEYS[0]) is None
+        await asyncio.sleep(0)  # 백오프 중이므로 재생성 예약 없음
+        await cache.stop()
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_unknown_key_creates_nothing():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"name": f"cachedContents/{len(calls)}"})
+
+    async def run():
+        cache = make_cache(handler)
+        await cache.start(KEYS[:1])
+        for index in range(20):
+            assert cache.get("ko", f"tone-{index}") is None
+        cache.invalidate("xx", "gentle")
+        await asyncio.sleep(0.01)
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(run())
+    assert len(calls) == 1  # 시작 시 설정된 조합 하나만
+    assert (len(cache._entries), len(cache._failed_until), len(cache._creating)) == (1, 0, 0)
+    assert cache.snapshot()["misses"] == 0
+
+
+def test_expiring_entry_is_a_miss_and_recreated():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"name": f"cachedContents/{len(calls)}"})
+
+    async def run():
+        cache = make_cache(handler, ttl_seconds=100, refresh_margin=300)
+        await cache.start(KEYS[:1])
+        assert cache.get(*KEYS[0]) is None  # 남은 TTL < refresh_margin/2
+        await asyncio.sleep(0.01)
+        await cache.stop()
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.misses == 1
+    assert [request.method for request in calls] == ["POST", "POST", "DELETE"]
+    assert calls[-1].url.path.endswith("cachedContents/1")
+
+
+def test_failed_extend_recreates():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "PATCH":
+            return httpx.Response(404, json={})
+        return httpx.Response(200, json={"name": f"cachedContents/{len(calls)}"})
+
+    async def run():
+        cache = make_cache(handler)
+        await cache.start(KEYS[:1])
+        await cache._extend(KEYS[0], cache._entries[KEYS[0]])
+        await cache.stop()
+        return cache.get(*KEYS[0])
+
+    assert asyncio.run(run()) == "cachedContents/3"
+    assert calls == ["POST", "PATCH", "POST"]
+
+
+def test_is_cache_error():
+    assert is_cache_error(httpx.Response(404, json={"error": {"message": "CachedContent not found"}}))
+    assert not is_cache_error(httpx.Response(404, json={"error": {"message": "model not found"}}))
+    assert not is_cache_error(httpx.Response(500, json={"error": {"message": "cache"}}))
+    assert not is_cache_error(httpx.Response(403, content=b"not json"))
+
+
+def test_analyze_falls_back_to_full_prompt_on_cache_error(client, mock_gemini, monkeypatch):
+    class FakeCache:
+        model = main.GEMINI_MODEL
+
+        def __init__(self):
+            self.invalidated = []
+
+        def get(self, language, tone):
+            return "cachedContents/gone"
+
+        def invalidate(self, language, tone):
+            self.invalidated.append((language, tone))
+
+    def handler(request):
+        if b"cachedContent" in request.content:
+            return httpx.Response(404, json={"error": {"message": "CachedContent not found"}})
+        return httpx.Response(200, json=gemini_body())
+
+    fake = FakeCache()
+    monkeypatch.setattr(main, "context_cache", fake)
+    calls = mock_gemini(handler)
+    response = client.post("/api/analyze", json={"data": "식비 100,000원", "device_id": new_device_id()})
+    assert response.status_code == 200
+    assert fake.invalidated == [("ko", "gentle")]
+    assert [b"cachedContent" in request.content for request in calls] == [True, False]
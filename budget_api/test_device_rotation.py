@@ -0,0 +1,139 @@
+"""device_rotation.py 테스트 (HyperLogLog 추정 / 임계값 / 날짜 초기화 / 신뢰 프록시 기준 키 / 허용 대역)"""
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import new_device_id
+from device_rotation import FLAG, THROTTLE, DeviceRotationTracker, HyperLogLog, device_hash, network_keys
+from ip_filter import AccessRules, parse_networks
+
+DAY = "2026-01-01"
+
+
+@pytest.mark.parametrize("count", [1, 30, 1000, 20000])
+def test_estimate_is_close(count):
+    sketch = HyperLogLog(precision=10)
+    for index in range(count):
+        sketch.add(device_hash(f"device-{index}"))
+    assert abs(sketch.estimate() - count) <= max(1, count * 0.1)
+
+
+def test_same_device_does_not_change_estimate():
+    sketch = HyperLogLog()
+    assert sketch.add(device_hash("a"))
+    assert not sketch.add(device_hash("a"))
+    assert sketch.estimate() == 1
+
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=3)
+
+
+@pytest.mark.parametrize("ip, expected", [
+    ("203.0.113.9", [("ip", "ip:203.0.113.9"), ("network", "net:203.0.113.0/24")]),
+    ("::ffff:203.0.113.9", [("ip", "ip:203.0.113.9"), ("network", "net:203.0.113.0/24")]),
+    ("2001:db8::1:2", [("ip", "ip:2001:db8::1:2"), ("network", "net:2001:db8::/64")]),
+    ("testclient", []),
+])
+def test_network_keys(ip, expected):
+    assert network_keys(ip) == expected
+
+
+def test_flag_then_throttle_is_logged_once(caplog):
+    tracker = DeviceRotationTracker({"ip": (2, 4), "network": (0, 0)})
+    with caplog.at_level(logging.WARNING, logger="device_rotation"):
+        results = [tracker.observe("203.0.113.9", f"device-{index}", DAY) for index in range(5)]
+    assert [status for status, _, _ in results] == [None, FLAG, FLAG, THROTTLE, THROTTLE]
+    assert results[3] == (THROTTLE, "ip:203.0.113.9", 4)
+    assert (tracker.flagged, tracker.throttled) == (1, 1)
+    assert len(caplog.records) == 2
+
+
+def test_network_level_catches_rotating_addresses():
+    tracker = DeviceRotationTracker({"ip": (0, 5), "network": (0, 3)})
+    statuses = [tracker.observe(f"203.0.113.{index}", f"device-{index}", DAY)[0] for index in range(3)]
+    assert statuses == [None, None, THROTTLE]
+    assert tracker.top(1, "network")[0] == {
+        "key": "net:203.0.113.0/24", "level": "network", "devices": 3, "status": THROTTLE,
+    }
+
+
+def test_new_day_resets_counts():
+    tracker = DeviceRotationTracker({"ip": (0, 2), "network": (0, 0)})
+    tracker.observe("203.0.113.9", "a", DAY)
+    assert tracker.observe("203.0.113.9", "b", DAY)[0] == THROTTLE
+    assert tracker.observe("203.0.113.9", "c", "2026-01-02")[0] is None
+    assert len(tracker) == 2
+
+
+def test_max_keys_evicts_least_recently_used():
+    tracker = DeviceRotationTracker({"ip": (0, 10), "network": (0, 0)}, max_keys=4)
+    for index in range(4):
+        tracker.observe(f"198.51.{index}.1", "a", DAY)  # 주소마다 IP + 네트워크 키
+    assert len(tracker) == 4 and tracker.evicted == 4
+    assert {entry["key"] for entry in tracker.top(10, "ip")} == {"ip:198.51.2.1", "ip:198.51.3.1"}
+
+
+def test_disabled_tracker_does_nothing():
+    tracker = DeviceRotationTracker({"ip": (0, 0), "network": (0, 0)})
+    assert tracker.observe("203.0.113.9", "a", DAY) == (None, None, 0)
+    assert len(tracker) == 0
+
+
+def test_snapshot_is_per_worker():
+    tracker = DeviceRotationTracker({"ip": (10, 50)}, precision=6)
+    tracker.observe("203.0.113.9", "a", DAY)
+    snapshot = tracker.snapshot()
+    assert snapshot["scope"] == "worker"
+    assert (snapshot["keys"], snapshot["bytes_per_key"], snapshot["observed"]) == (2, 64, 1)
+
+
+# 앱 경로: TestClient 의 접속 주소(peer)를 지정하는 ASGI 래퍼
+def with_peer(peer):
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            scope = {**scope, "client": (peer, 1)}
+        await main.app(scope, receive, send)
+
+    return app
+
+
+@pytest.fixture
+def rotation(monkeypatch, mock_gemini):
+    mock_gemini()
+    tracker = DeviceRotationTracker({"ip": (0, 3), "network": (0, 0)})
+    monkeypatch.setattr(main, "device_rotation", tracker)
+    monkeypatch.setattr(main, "LOCAL_INSIGHTS_ON_LIMIT", False)
+    return tracker
+
+
+def analyze_with_new_devices(peer, forwarded_for, count=4):
+    with TestClient(with_peer(peer)) as test_client:
+        return [
+            test_client.post("/api/analyze", json={"data": "식비 10,000원", "device_id": new_device_id()},
+                             headers={"X-Forwarded-For": forwarded_for(index)}).status_code
+            for index in range(count)
+        ]
+
+
+def test_spoofed_forwarded_for_does_not_change_key(rotation):
+    statuses = analyze_with_new_devices("198.51.100.7", lambda index: f"192.0.2.{index}")
+    assert statuses == [200, 200, 429, 429]
+    assert [entry["key"] for entry in rotation.top(5, "ip")] == ["ip:198.51.100.7"]
+
+
+def test_client_behind_trusted_proxy_is_keyed_on_real_address(rotation):
+    statuses = analyze_with_new_devices("127.0.0.1", lambda index: "203.0.113.9")
+    assert statuses == [200, 200, 429, 429]
+    assert rotation.top(1, "ip")[0]["key"] == "ip:203.0.113.9"
+
+
+def test_allowlisted_client_is_still_observed(rotation, monkeypatch):
+    allow = AccessRules(parse_networks(["203.0.113.0/24"], "allow"), parse_networks([], "deny"))
+    monkeypatch.setattr(main.ip_access_list, "rules", allow)
+    statuses = analyze_with_new_devices("127.0.0.1", lambda index: "203.0.113.9")
+    assert statuses == [200, 200, 429, 429]
+    assert rotation.throttled == 1
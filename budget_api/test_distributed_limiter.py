@@ -0,0 +1,128 @@
+"""distributed_limiter.py 테스트 (DB 선할당 / 노드 간 공유 / 스레드 실행 / 로컬 버킷 사전 확인)"""
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from database import SQLiteDatabase
+from distributed_limiter import DistributedRateLimiter
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "limits.db"))
+    database.init_db()
+    return database
+
+
+class FakeDb:
+    """claim_rate_tokens 호출 기록 (항상 요청한 만큼 허용, delay 초 동안 블로킹)"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def claim_rate_tokens(self, limit_key, window_start, count, limit):
+        self.calls.append((limit_key, threading.current_thread().name))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return count
+
+
+def acquire_all(limiter, keys):
+    async def run():
+        return [await limiter.acquire(key) for key in keys]
+
+    return asyncio.run(run())
+
+
+def test_claims_are_batched(db):
+    limiter = DistributedRateLimiter(db, "ip", rate_per_minute=10, batch=5)
+    assert acquire_all(limiter, ["a"] * 11) == [True] * 10 + [False]
+    assert limiter.db_claims == 2  # 11번째는 노드 로컬 버킷이 DB 없이 거부
+    assert limiter.is_limited("a")
+
+
+def test_exhausted_window_is_not_claimed_again(db):
+    other = DistributedRateLimiter(db, "ip", rate_per_minute=10, batch=8)
+    acquire_all(other, ["a"])  # 다른 노드가 8개 선할당
+    limiter = DistributedRateLimiter(db, "ip", rate_per_minute=10, batch=5)
+    assert acquire_all(limiter, ["a"] * 4) == [True, True, False, False]
+    assert limiter.db_claims == 1  # 2개만 받음 → 소진 확인, 이후 DB 를 묻지 않음
+
+
+def test_nodes_share_the_window(db):
+    first = DistributedRateLimiter(db, "ip", rate_per_minute=6, batch=2)
+    second = DistributedRateLimiter(db, "ip", rate_per_minute=6, batch=2)
+    results = acquire_all(first, ["a"] * 4) + acquire_all(second, ["a"] * 4)
+    assert results.count(True) == 6
+
+
+def test_claim_runs_off_the_event_loop():
+    fake = FakeDb(delay=0.05)
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=10, batch=5)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def run():
+        return await asyncio.gather(limiter.acquire("a"), ticker())
+
+    allowed, _ = asyncio.run(run())
+    assert allowed is True
+    assert fake.calls[0][1] != threading.main_thread().name
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.05  # 선할당 중에도 루프가 계속 돎
+
+
+def test_concurrent_requests_share_one_claim():
+    fake = FakeDb(delay=0.02)
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=10, batch=5)
+
+    async def run():
+        return await asyncio.gather(*(limiter.acquire("a") for _ in range(5)))
+
+    assert asyncio.run(run()) == [True] * 5
+    assert len(fake.calls) == 1
+
+
+def test_unknown_keys_cannot_force_db_writes():
+    fake = FakeDb()
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=10, batch=5, claims_per_second=3)
+    assert acquire_all(limiter, [f"spoofed-{index}" for index in range(50)]) == [True] * 50
+    assert len(fake.calls) == 3
+    assert limiter.snapshot()["local_decisions"] == 47
+
+
+def test_local_bucket_rejects_before_db():
+    fake = FakeDb()
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=2, batch=2)
+    assert acquire_all(limiter, ["a"] * 5) == [True, True, False, False, False]
+    assert len(fake.calls) == 1
+
+
+def test_db_error_falls_back_to_local_bucket(caplog):
+    fake = FakeDb(error=RuntimeError("db down"))
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=2, batch=1)
+    with caplog.at_level(logging.WARNING, logger="distributed_limiter"):
+        assert acquire_all(limiter, ["a"] * 3) == [True, True, False]
+    assert limiter.db_errors == 2
+    assert "db down" in caplog.text
+
+
+def test_sync_allow_matches_acquire(db):
+    limiter = DistributedRateLimiter(db, "device", rate_per_minute=3, batch=2)
+    assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+
+
+def test_disabled_limiter_never_touches_db():
+    fake = FakeDb()
+    limiter = DistributedRateLimiter(fake, "ip", rate_per_minute=0)
+    assert acquire_all(limiter, ["a"] * 3) == [True] * 3
+    assert fake.calls == [] and not limiter.is_limited("a")
@@ -0,0 +1,136 @@
+"""gemini_client.py 테스트 (재시도 / 백오프 / Retry-After / 헤지 요청)"""
+import asyncio
+
+import httpx
+import pytest
+
+from gemini_client import GeminiClient, LatencyTracker, parse_retry_after
+
+URL = "https://gemini.test/v1beta/models/m:generateContent"
+
+
+def make_client(handler, **kwargs) -> GeminiClient:
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_max", 0.001)
+    client = GeminiClient("key", **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_retries_transient_status_then_succeeds():
+    statuses = [503, 429, 200]
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(statuses[len(calls) - 1], json={})
+
+    client = make_client(handler, max_retries=2, retry_budget=3)
+    response = asyncio.run(client.generate(URL, {"contents": []}))
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert calls[0].headers["x-goog-api-key"] == "key"
+
+
+def test_non_retryable_status_is_returned_immediately():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={})
+
+    response = asyncio.run(make_client(handler).generate(URL, {}))
+    assert response.status_code == 400
+    assert len(calls) == 1
+
+
+def test_retry_budget_caps_extra_calls():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, json={})
+
+    response = asyncio.run(make_client(handler, max_retries=5, retry_budget=1).generate(URL, {}))
+    assert response.status_code == 503
+    assert len(calls) == 2  # 첫 호출 + 예산 1
+
+
+def test_long_retry_after_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "120"}, json={})
+
+    response = asyncio.run(make_client(handler, retry_after_max=20).generate(URL, {}))
+    assert response.status_code == 429
+    assert len(calls) == 1
+
+
+def test_network_errors_are_retried_then_raised():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("down", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(make_client(handler, max_retries=2, retry_budget=3).generate(URL, {}))
+    assert len(calls) == 3
+
+
+def test_prencoded_bytes_payload_is_sent_as_is():
+    bodies = []
+
+    def handler(request):
+        bodies.append((request.headers["content-type"], request.content))
+        return httpx.Response(200, json={})
+
+    asyncio.run(make_client(handler).generate(URL, b'{"a":1}'))
+    assert bodies == [("application/json", b'{"a":1}')]
+
+
+def test_parse_retry_after_header_and_retry_info():
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    body = {"error": {"details": [{"@type": "RetryInfo", "retryDelay": "13s"}]}}
+    assert parse_retry_after(httpx.Response(429, json=body)) == 13.0
+    assert parse_retry_after(httpx.Response(429, json={})) is None
+
+
+def test_hedged_request_wins_when_first_is_slow():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)  # 첫 요청은 느림 → 헤지 요청이 먼저 끝남
+        return httpx.Response(200, json={"call": len(calls)})
+
+    client = make_client(handler, hedge_enabled=True, hedge_min_delay=0.05, hedge_min_samples=1, retry_budget=1)
+    client.latency.record(0.01)
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        response = await client.generate(URL, {})
+        return response, asyncio.get_running_loop().time() - started
+
+    response, elapsed = asyncio.run(run())
+    assert response.json() == {"call": 2}
+    assert len(calls) == 2
+    assert elapsed < 0.5
+
+
+def test_hedge_disabled_without_enough_samples():
+    client = GeminiClient("key", hedge_enabled=True, hedge_min_samples=3)
+    client.latency.record(1.0)
+    assert client.hedge_delay() is None
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
+    for value in range(1, 101):
+        tracker.record(float(value))
+    assert tracker.percentile(50) == 51.0
+    assert tracker.percentile(95) == 95.0
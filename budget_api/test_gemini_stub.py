@@ -0,0 +1,75 @@
+"""gemini_stub.py 테스트 (응답 형식 / 장애 주입 / 캐시 흉내)"""
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from gemini_stub import SAMPLE_RESULT, StubConfig, create_app, sample_latency
+from response_parser import parse_analysis_text
+
+URL = "/v1beta/models/stub-model:generateContent"
+BODY = {"contents": [{"role": "user", "parts": [{"text": "data"}]}]}
+
+
+def stub(**kwargs) -> TestClient:
+    kwargs.setdefault("latency", "fixed:0")
+    kwargs.setdefault("seed", 1)
+    return TestClient(create_app(StubConfig(**kwargs)))
+
+
+def test_sample_latency_distributions():
+    rng = random.Random(0)
+    assert sample_latency("fixed:0.5", rng) == 0.5
+    assert 1.0 <= sample_latency("uniform:1,2", rng) <= 2.0
+    assert sample_latency("lognormal:1.0,0.3", rng) > 0
+    with pytest.raises(ValueError):
+        sample_latency("gamma:1", rng)
+
+
+def test_generate_content_returns_analysis():
+    response = stub().post(URL, json=BODY)
+    assert response.status_code == 200
+    body = response.json()
+    assert json.loads(body["candidates"][0]["content"]["parts"][0]["text"]) == SAMPLE_RESULT
+    assert body["usageMetadata"]["totalTokenCount"] > 0
+    assert body["modelVersion"] == "stub-model"
+
+
+def test_fault_injection_rates():
+    client = stub(error_rate=1.0)
+    assert client.post(URL, json=BODY).status_code in (500, 503)
+    client = stub(rate_limit_rate=1.0, retry_delay=7)
+    response = client.post(URL, json=BODY)
+    assert response.status_code == 429
+    assert response.json()["error"]["details"][0]["retryDelay"] == "7s"
+    assert client.get("/stub/config").json()["stats"]["rate_limited"] == 1
+
+
+def test_malformed_output_is_salvageable():
+    client = stub(malformed_rate=1.0)
+    for _ in range(10):
+        text = client.post(URL, json=BODY).json()["candidates"][0]["content"]["parts"][0]["text"]
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(text)
+        result, repaired = parse_analysis_text(text)
+        assert repaired and result is not None
+
+
+def test_cached_content_lifecycle():
+    client = stub()
+    name = client.post("/v1beta/cachedContents", json=BODY).json()["name"]
+    body = client.post(URL, json={**BODY, "cachedContent": name}).json()
+    assert body["usageMetadata"]["cachedContentTokenCount"] > 0
+    assert client.patch(f"/v1beta/{name}", json={"ttl": "60s"}).status_code == 200
+    client.delete(f"/v1beta/{name}")
+    assert client.post(URL, json={**BODY, "cachedContent": name}).status_code == 403
+
+
+def test_runtime_config_update_and_reset():
+    client = stub()
+    client.post(URL, json=BODY)
+    client.post("/stub/config", json={"error_rate": 1.0, "reset": True})
+    state = client.get("/stub/config").json()
+    assert state["config"]["error_rate"] == 1.0
+    assert state["stats"]["requests"] == 0
@@ -0,0 +1,137 @@
+"""ip_filter.py 테스트 (최장 접두사 매칭 / 목록 파일 / 신뢰 프록시 기준 클라이언트 IP / 위조 헤더)"""
+import asyncio
+import json
+
+import pytest
+
+import main
+from conftest import new_device_id
+from ip_filter import AccessListError, AccessRules, IpAccessList, TrustedProxies, parse_networks
+from middleware import IpAccessMiddleware, RateLimitMiddleware, client_ip_from_scope
+from rate_limiter import TokenBucketLimiter
+
+NGINX = "127.0.0.1"
+PROXIES = TrustedProxies(["127.0.0.1", "::1", "10.9.0.0/16"])
+
+
+def rules(allow=(), deny=()):
+    return AccessRules(parse_networks(allow, "allow"), parse_networks(deny, "deny"))
+
+
+def test_longest_prefix_wins():
+    access = rules(allow=["10.1.2.0/24"], deny=["10.0.0.0/8"])
+    assert access.lookup("10.1.2.3") == "allow"
+    assert access.lookup("10.1.3.3") == "deny"
+    assert access.lookup("192.0.2.1") is None
+
+
+def test_same_network_on_both_sides_is_denied():
+    assert rules(allow=["192.0.2.0/24"], deny=["192.0.2.0/24"]).lookup("192.0.2.7") == "deny"
+
+
+def test_ipv6_and_mapped_ipv4():
+    access = rules(allow=["2001:db8::/32"], deny=["203.0.113.0/24"])
+    assert access.lookup("2001:db8::1") == "allow"
+    assert access.lookup("::ffff:203.0.113.5") == "deny"
+    assert access.lookup("not-an-ip") is None
+
+
+def test_invalid_cidr_is_rejected():
+    with pytest.raises(AccessListError):
+        parse_networks(["10.0.0.0/33"], "allow")
+
+
+def test_list_file_is_merged_and_broken_file_keeps_rules(tmp_path):
+    path = tmp_path / "access.json"
+    path.write_text(json.dumps({"format": 1, "version": "v1", "deny": ["198.51.100.0/24"]}), encoding="utf-8")
+    access = IpAccessList(str(path), allow=["10.0.0.0/8"])
+    assert access.load()["version"] == "v1"
+    assert (access.lookup("10.2.3.4"), access.lookup("198.51.100.9")) == ("allow", "deny")
+    path.write_text("{broken", encoding="utf-8")
+    with pytest.raises(AccessListError):
+        access.load()
+    assert access.lookup("198.51.100.9") == "deny"
+    assert (access.allowed, access.denied, access.errors) == (1, 2, 1)
+
+
+@pytest.mark.parametrize("peer, forwarded, real_ip, expected", [
+    ("203.0.113.9", "10.0.0.5", None, "203.0.113.9"),            # 직접 연결: 헤더 무시
+    ("203.0.113.9", None, "10.0.0.5", "203.0.113.9"),
+    (NGINX, "10.0.0.5, 203.0.113.9", None, "203.0.113.9"),       # nginx 가 실제 주소를 뒤에 덧붙임
+    (NGINX, "198.51.100.1, 10.9.1.1", None, "198.51.100.1"),     # 신뢰 프록시 두 단계
+    (NGINX, "10.9.1.1, 127.0.0.1", None, "10.9.1.1"),            # 모두 신뢰 프록시 → 가장 왼쪽
+    (NGINX, None, "198.51.100.1", "198.51.100.1"),               # 헤더 없으면 X-Real-IP
+    (NGINX, " , ", None, NGINX),
+])
+def test_client_ip_is_trusted_proxy_aware(peer, forwarded, real_ip, expected):
+    assert PROXIES.client_ip(peer, forwarded, real_ip) == expected
+
+
+def test_without_trusted_proxies_headers_are_ignored():
+    scope = {"headers": [(b"x-forwarded-for", b"10.0.0.5")], "client": (NGINX, 1)}
+    assert client_ip_from_scope(scope) == NGINX
+    assert client_ip_from_scope(scope, PROXIES) == "10.0.0.5"
+
+
+# 허용 10.0.0.0/8, 차단 203.0.113.0/24 인 미들웨어 체인 (IP 접근 → 분당 1회 제한 → 앱)
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": client_ip_from_scope(scope).encode()})
+
+
+def make_stack():
+    access = IpAccessList(allow=["10.0.0.0/8"], deny=["203.0.113.0/24"])
+    limited = RateLimitMiddleware(ok_app, paths=["/api/analyze"], ip_limiter=TokenBucketLimiter(1))
+    return IpAccessMiddleware(limited, access_list=access, trusted_proxies=PROXIES)
+
+
+def send(app, peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {"type": "http", "method": "POST", "path": "/api/analyze", "headers": headers, "client": (peer, 1)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def record(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, record))
+    return messages[0]["status"], messages[1]["body"].decode()
+
+
+def test_real_allowlisted_client_skips_rate_limit():
+    app = make_stack()
+    assert [send(app, NGINX, "10.0.0.5") for _ in range(3)] == [(200, "10.0.0.5")] * 3
+
+
+@pytest.mark.parametrize("peer, forwarded", [
+    ("198.51.100.7", "10.0.0.5"),                   # 직접 연결하며 헤더 위조
+    (NGINX, "10.0.0.5, 198.51.100.7"),              # nginx 뒤에서 헤더 위조 (nginx 가 실제 주소를 덧붙임)
+])
+def test_spoofed_forwarded_for_is_not_allowlisted(peer, forwarded):
+    app = make_stack()
+    assert send(app, peer, forwarded) == (200, "198.51.100.7")
+    assert send(app, peer, forwarded)[0] == 429  # 허용 대역이 아니므로 분당 제한 적용
+
+
+@pytest.mark.parametrize("peer, forwarded", [
+    ("203.0.113.9", "192.0.2.1"),
+    (NGINX, "192.0.2.1, 203.0.113.9"),
+    (NGINX, "10.0.0.5, 203.0.113.9"),
+])
+def test_spoofed_forwarded_for_does_not_bypass_deny(peer, forwarded):
+    assert send(make_stack(), peer, forwarded)[0] == 403
+
+
+def test_spoofed_header_on_app_does_not_skip_device_limit(client, mock_gemini, monkeypatch):
+    mock_gemini()
+    monkeypatch.setattr(main.ip_access_list, "rules", rules(allow=["10.0.0.0/8"]))
+    monkeypatch.setattr(main, "device_rate_limiter", TokenBucketLimiter(1))
+    device_id = new_device_id()
+    statuses = [
+        client.post("/api/analyze", json={"data": "식비 10,000원", "device_id": device_id},
+                    headers={"X-Forwarded-For": "10.0.0.5", "X-Real-IP": "10.0.0.5"}).status_code
+        for _ in range(2)
+    ]
+    assert statuses == [200, 429]  # TestClient 는 신뢰 프록시가 아님 → 헤더 무시, 허용 대역 아님
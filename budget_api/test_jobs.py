@@ -0,0 +1,167 @@
+"""jobs.py 테스트 (원자적 작업 임대 / 임대 만료 복구 / 원본 요청 재생)"""
+import asyncio
+import json
+import time
+
+import pytest
+
+import main
+from conftest import ANALYSIS, new_device_id
+from database import SQLiteDatabase
+from jobs import JobWorkerPool, JOB_DONE, JOB_QUEUED, JOB_RUNNING
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "jobs.db"))
+    database.init_db()
+    return database
+
+
+def create_job(db, job_id="job-1", request_body=None):
+    db.create_job(job_id, new_device_id(), "ko", "gentle", "data", request_body)
+    return job_id
+
+
+async def run_until_finished(db, pools, job_id, timeout=2.0):
+    for pool in pools:
+        await pool.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while db.get_job(job_id)["status"] in (JOB_QUEUED, JOB_RUNNING):
+            assert time.monotonic() < deadline, "job did not finish"
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)  # 다른 풀이 뒤늦게 실행하지 않는지 확인
+    finally:
+        for pool in pools:
+            await pool.stop()
+
+
+def test_claim_is_atomic(db):
+    job_id = create_job(db)
+    assert db.claim_job(job_id, "a", 60)["owner"] == "a"
+    assert db.claim_job(job_id, "b", 60) is None
+    assert db.update_job(job_id, JOB_DONE, result_data="{}", status_code=200, owner="b") is False
+    assert db.update_job(job_id, JOB_DONE, result_data="{}", status_code=200, owner="a") is True
+    assert db.claim_job(job_id, "b", 60) is None
+    assert db.get_claimable_jobs() == []
+
+
+def test_two_pools_run_a_job_once(db):
+    job_id = create_job(db)
+    runs = []
+
+    async def handler(job):
+        runs.append(job["owner"])
+        await asyncio.sleep(0.05)
+        return 200, "{}"
+
+    pools = [JobWorkerPool(db, handler, workers=2) for _ in range(3)]
+    asyncio.run(run_until_finished(db, pools, job_id))
+    assert len(runs) == 1
+    assert db.get_job(job_id)["status"] == JOB_DONE
+
+
+def test_running_job_with_live_lease_is_not_recovered(db):
+    job_id = create_job(db)
+    db.claim_job(job_id, "other-worker", 60)
+    assert db.get_claimable_jobs() == []
+
+    async def handler(job):
+        raise AssertionError("job re-run while another worker holds the lease")
+
+    async def run():
+        pool = JobWorkerPool(db, handler)
+        await pool.start()
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+    asyncio.run(run())
+    assert db.get_job(job_id)["owner"] == "other-worker"
+
+
+def test_expired_lease_is_recovered(db):
+    job_id = create_job(db)
+    db.claim_job(job_id, "dead-worker", -1)  # 이미 만료된 임대
+    assert db.get_claimable_jobs() == [job_id]
+    runs = []
+
+    async def handler(job):
+        runs.append(job_id)
+        return 200, "{}"
+
+    pool = JobWorkerPool(db, handler)
+    asyncio.run(run_until_finished(db, [pool], job_id))
+    job = db.get_job(job_id)
+    assert runs == [job_id]
+    assert job["status"] == JOB_DONE
+    assert job["owner"] == pool.owner
+
+
+def test_heartbeat_renews_lease(db):
+    job_id = create_job(db)
+
+    async def handler(job):
+        before = db.get_job(job_id)["lease_until"]
+        await asyncio.sleep(0.1)
+        assert db.get_job(job_id)["lease_until"] > before
+        return 200, "{}"
+
+    pool = JobWorkerPool(db, handler, lease_seconds=0.09)
+    asyncio.run(run_until_finished(db, [pool], job_id))
+    assert db.get_job(job_id)["status"] == JOB_DONE
+
+
+def test_structured_budget_job_replays_original_request(monkeypatch):
+    seen = []
+
+    async def fake_run_analysis(req):
+        seen.append(req)
+        return b"{}"
+
+    monkeypatch.setattr(main, "run_analysis", fake_run_analysis)
+    req = main.AnalyzeRequest(
+        budget={"startDate": "2026-10-01", "endDate": "2026-10-31", "today": "2026-10-15",
+                "budgets": [{"id": "b1", "name": "식비", "amount": 300000}],
+                "expenses": [{"budgetId": "b1", "amount": 12000, "date": "2026-10-01"}]},
+        tone="coach",
+        device_id=new_device_id(),
+    )
+    body = main.job_request_body(req)
+    assert "data" not in json.loads(body)
+
+    job = {"request_body": body, "request_data": req.data, "language": "ko", "tone": "coach",
+           "device_id": req.device_id}
+    assert asyncio.run(main.run_analysis_job(job)) == (200, "{}")
+    assert seen[0].budget == req.budget
+    assert seen[0].tone == "coach"
+
+
+def poll_job(client, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(f"/api/analyze/jobs/{job_id}")
+        if response.json()["status"] not in (JOB_QUEUED, JOB_RUNNING) or time.monotonic() > deadline:
+            return response
+        time.sleep(0.02)
+
+
+def test_job_endpoint_returns_result_as_json(client, mock_gemini):
+    mock_gemini()
+    created = client.post("/api/analyze/jobs", json={"data": "식비 100,000원", "device_id": new_device_id()})
+    assert created.status_code == 202
+    response = poll_job(client, created.json()["job_id"])
+    body = json.loads(response.content)
+    assert response.headers["content-type"] == "application/json"
+    assert body["status"] == JOB_DONE
+    assert body["error"] is None
+    assert body["result"]["oneLiner"] == ANALYSIS["oneLiner"]
+    assert body["result"]["pattern"]["riskLevel"] == "low"
+
+
+def test_job_endpoint_error_and_missing(client):
+    job_id = create_job(main.db, job_id=f"job-{new_device_id()}")
+    main.db.update_job(job_id, "error", status_code=502, error_message="upstream failed")
+    body = client.get(f"/api/analyze/jobs/{job_id}").json()
+    assert body == {"job_id": job_id, "status": "error", "error": "upstream failed", "status_code": 502, "result": None}
+    assert client.get("/api/analyze/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,41 @@
+"""loadtest.py 테스트 (in-process 기본 설정으로 한 주소에서 많은 기기를 보내도 429 없음)"""
+import json
+import os
+import subprocess
+import sys
+
+import loadtest
+
+# 새 인터프리터에서 실행 (main 은 import 시점에 환경변수를 읽음), Gemini 는 스텁 앱을 ASGI 로 직접 호출
+SCRIPT = """
+import asyncio, json, httpx, loadtest
+from gemini_stub import StubConfig, create_app
+loadtest.configure_in_process_env("http://stub.test/v1beta")
+import main
+stub = create_app(StubConfig(latency="fixed:0", seed=1))
+main.gemini_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+args = loadtest.parse_args(["--rps", "200", "--duration", "0.6", "--min-expenses", "3", "--max-expenses", "5",
+                            "--payload-pool", "5"])
+print(json.dumps(asyncio.run(loadtest.main_async(args))["outcomes"]))
+"""
+
+
+def test_in_process_defaults_do_not_throttle_single_address(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key not in loadtest.IN_PROCESS_ENV}
+    env["SQLITE_PATH"] = str(tmp_path / "usage.db")
+    completed = subprocess.run([sys.executable, "-c", SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               env=env, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    outcomes = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert outcomes == {"HTTP 200": 120}  # 기기 교체 감지 기본값(50대)을 넘는 새 기기 수
+
+
+def test_explicit_settings_are_kept(monkeypatch):
+    monkeypatch.setenv("DEVICE_ROTATION_IP_THROTTLE", "30")
+    monkeypatch.setenv("DEVICE_ROTATION_NETWORK_THROTTLE", "")
+    monkeypatch.delenv("DEVICE_ROTATION_NETWORK_THROTTLE")  # 테스트 후 원래 상태로 복원
+    monkeypatch.setenv("GEMINI_API_BASE", "http://old")
+    loadtest.configure_in_process_env("http://stub.test/v1beta")
+    assert os.environ["DEVICE_ROTATION_IP_THROTTLE"] == "30"
+    assert os.environ["DEVICE_ROTATION_NETWORK_THROTTLE"] == "0"
+    assert os.environ["GEMINI_API_BASE"] == "http://stub.test/v1beta"
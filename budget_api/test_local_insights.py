@@ -0,0 +1,109 @@
+"""local_insights.py 테스트 (입력 형식별 동일 결과 / 위험도·추세 / 로컬 폴백)"""
+import random
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+import main
+from budget_payload import BudgetPayload, render_budget_payload
+from conftest import new_device_id
+from loadtest import make_budget, render_markdown
+from local_insights import (
+    BudgetFacts, BudgetLine, build_local_analysis, compute_figures, compute_pattern, extract_facts,
+    facts_from_payload, render_prefill,
+)
+
+TODAY = date(2026, 10, 19)
+
+
+def facts(spent_by_day, budget=310_000, fixed=None, today=TODAY):
+    """10월 한 달, 변동지출 예산 하나 (+ 고정지출)"""
+    start, end = date(2026, 10, 1), date(2026, 10, 31)
+    by_day = {start + timedelta(days=offset): amount for offset, amount in spent_by_day.items()}
+    budgets = [BudgetLine("식비", False, budget, sum(by_day.values()))]
+    if fixed:
+        budgets.append(BudgetLine("월세", True, fixed[0], fixed[1]))
+    return BudgetFacts(start, end, today, budgets, by_day)
+
+
+def test_payload_markdown_and_canonical_give_same_pattern():
+    raw = make_budget(random.Random(5), 120, TODAY)
+    payload = BudgetPayload.model_validate(raw)
+    from_payload = facts_from_payload(payload, TODAY)
+    from_markdown = extract_facts(render_markdown(raw), TODAY)
+    from_canonical = extract_facts(render_budget_payload(payload, TODAY), TODAY)
+    assert compute_pattern(from_payload) == compute_pattern(from_markdown)
+    assert from_canonical.total_budget == from_payload.total_budget
+    assert from_canonical.total_spent == from_payload.total_spent
+    assert compute_pattern(from_canonical)["riskLevel"] == compute_pattern(from_payload)["riskLevel"]
+
+
+def test_unrecognised_text_has_no_facts():
+    assert extract_facts("그냥 메모", TODAY) is None
+
+
+def test_reversed_period_has_no_facts():
+    raw = make_budget(random.Random(5), 20, TODAY)
+    markdown = render_markdown({**raw, "startDate": raw["endDate"], "endDate": raw["startDate"]})
+    canonical = render_budget_payload(BudgetPayload.model_validate(raw), TODAY).replace(
+        f"period: {raw['startDate']}~{raw['endDate']}", f"period: {raw['endDate']}~{raw['startDate']}")
+    assert extract_facts(markdown, TODAY) is None
+    assert extract_facts(canonical, TODAY) is None
+
+
+def test_reversed_markdown_period_is_not_a_server_error(client, mock_gemini):
+    raw = make_budget(random.Random(9), 40, TODAY)
+    data = render_markdown({**raw, "startDate": raw["endDate"], "endDate": raw["startDate"]})
+    local = client.post("/api/analyze/local", json={"data": data, "device_id": new_device_id()})
+    assert local.status_code == 422
+    mock_gemini(lambda request: httpx.Response(400, json={"error": {"message": "bad request"}}))
+    fallback = client.post("/api/analyze", json={"data": data, "device_id": new_device_id()})
+    assert fallback.status_code == 502  # 로컬 분석 불가 → Gemini 오류 응답 그대로
+
+
+@pytest.mark.parametrize("daily, risk", [(5_000, "low"), (9_500, "medium"), (12_000, "high")])
+def test_risk_level_follows_projection(daily, risk):
+    result = facts({offset: daily for offset in range(19)})
+    assert compute_figures(result)["riskLevel"] == risk
+
+
+def test_spending_trend():
+    assert compute_pattern(facts({offset: 1_000 for offset in range(19)}))["spendingTrend"] == "stable"
+    assert compute_pattern(facts({offset: 1_000 * (offset + 1) for offset in range(19)}))["spendingTrend"] == "increasing"
+    assert compute_pattern(facts({offset: 20_000 - 1_000 * offset for offset in range(19)}))["spendingTrend"] == "decreasing"
+    assert compute_pattern(facts({0: 1_000}, today=date(2026, 10, 3)))["spendingTrend"] == "stable"  # 경과 일수 부족
+
+
+def test_upcoming_fixed_expenses_reduce_daily_allowance():
+    figures = compute_figures(facts({0: 10_000}, budget=200_000, fixed=(500_000, 0)))
+    assert figures["upcomingFixed"] == 500_000
+    assert figures["variableLeft"] == 200_000 - 10_000
+    assert figures["dailyAllowance"] == (200_000 - 10_000) // 13
+
+
+@pytest.mark.parametrize("language", ["ko", "en", "ja"])
+def test_local_analysis_shape(language):
+    result = build_local_analysis(facts({offset: 20_000 for offset in range(19)}), language)
+    assert set(result) == {"oneLiner", "summary", "insights", "warnings", "suggestions", "spendingPlan", "pattern"}
+    assert result["pattern"]["riskLevel"] == "high"
+    assert result["warnings"]  # 식비 예산 초과
+    main.AnalysisResult.model_validate(result)
+
+
+def test_prefill_mentions_figures():
+    text = render_prefill(facts({offset: 5_000 for offset in range(19)}))
+    assert "riskLevel=low" in text
+    assert "for 13 days" in text
+
+
+def test_analyze_falls_back_to_local_insights(client, mock_gemini):
+    raw = make_budget(random.Random(9), 40, TODAY)
+    calls = mock_gemini(lambda request: httpx.Response(400, json={"error": {"message": "bad request"}}))
+    device_id = new_device_id()
+    response = client.post("/api/analyze", json={"budget": raw, "device_id": device_id})
+    assert response.status_code == 200
+    assert calls
+    assert response.json()["pattern"] == compute_pattern(facts_from_payload(BudgetPayload.model_validate(raw), TODAY))
+    models = [log["model"] for log in main.db.get_logs(limit=10, device_id=device_id)]
+    assert main.LOCAL_MODEL in models  # 실패 로그 + 로컬 분석 로그
@@ -0,0 +1,51 @@
+"""log_metrics.py 테스트 (백분위 / 분포 / 언어·톤별 토큰 집계)"""
+import os
+
+from conftest import new_device_id
+from database import SQLiteDatabase
+from log_metrics import distribution, percentile, summarize_log_metrics
+
+
+def test_percentile_nearest_rank():
+    ordered = list(range(1, 101))
+    assert percentile(ordered, 50) == 51
+    assert percentile(ordered, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_distribution_skips_missing_values():
+    assert distribution([None, 10, 30, None, 20]) == {"count": 3, "avg": 20.0, "max": 30, "p50": 20, "p95": 30, "p99": 30}
+    assert distribution([None])["avg"] is None
+
+
+def test_summary_groups_successful_tokens():
+    rows = [
+        {"status_code": 200, "language": "ko", "tone": "gentle", "total_ms": 100, "prompt_tokens": 500, "output_tokens": 200},
+        {"status_code": 200, "language": "en", "tone": "gentle", "total_ms": 300, "prompt_tokens": 700, "output_tokens": 100},
+        {"status_code": 502, "language": "ko", "tone": "coach", "total_ms": 900, "prompt_tokens": 999},
+        {"status_code": 200, "language": None, "tone": "coach"},  # 메트릭 컬럼 추가 전 로그
+    ]
+    summary = summarize_log_metrics(rows)
+    assert (summary["requests"], summary["succeeded"]) == (4, 3)
+    assert summary["latency_ms"]["total_ms"]["max"] == 900  # 지연은 실패 포함
+    assert summary["tokens"]["prompt_tokens"]["max"] == 700  # 토큰은 성공만
+    assert set(summary["tokens_by_language"]) == {"ko", "en", "unknown"}
+    assert summary["tokens_by_tone"]["gentle"]["requests"] == 2
+    assert summary["tokens_by_tone"]["coach"]["prompt_tokens"]["count"] == 0
+
+
+def test_metrics_round_trip_through_database(tmp_path):
+    db = SQLiteDatabase(os.path.join(tmp_path, "metrics.db"))
+    db.init_db()
+    db.save_analysis_log(new_device_id(), "ko", "gentle", "data", "{}", 200, model="m",
+                         metrics={"total_ms": 120, "prompt_tokens": 400, "unknown_column": 1})
+    rows = db.get_log_metrics("2000-01-01 00:00:00")
+    assert rows[0]["total_ms"] == 120
+    assert rows[0]["prompt_tokens"] == 400
+    assert summarize_log_metrics(rows)["tokens_by_language"]["ko"]["prompt_tokens"]["avg"] == 400.0
+
+
+def test_stats_endpoint_includes_performance(client):
+    response = client.get("/api/logs/stats?days=1", headers={"X-Admin-Key": os.environ["ADMIN_API_KEY"]})
+    assert response.status_code == 200
+    assert response.json()["performance"]["days"] == 1
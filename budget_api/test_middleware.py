@@ -0,0 +1,214 @@
+"""middleware.py 테스트 (본문 크기 제한 / 본문 읽기 전 요청 제한)"""
+import asyncio
+
+import orjson
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+import main
+from conftest import new_device_id
+from middleware import ACCESS_STATE_KEY, BodySizeLimitMiddleware, RateLimitMiddleware
+from rate_limiter import TokenBucketLimiter
+
+
+class Item(BaseModel):
+    data: str
+
+
+def make_app(max_bytes=100):
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/items")
+    async def create(item: Item):
+        parsed.append(item)
+        return {"size": len(item.data)}
+
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=max_bytes)
+    return app, parsed
+
+
+def call(app, chunks, headers=()):
+    """ASGI 직접 호출 (본문을 chunks 로 나눠 전달) → (상태 코드, 응답 본문, 읽힌 청크 수)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/items", "raw_path": b"/items", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), *headers],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    pending = list(chunks)
+    messages = []
+    read = [0]
+
+    async def receive():
+        if not pending:
+            return {"type": "http.disconnect"}
+        read[0] += 1
+        body = pending.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(pending)}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = messages[0]["status"]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return status, body, read[0]
+
+
+def body_chunks(size, chunk=16):
+    body = orjson.dumps({"data": "x" * size})
+    return [body[index:index + chunk] for index in range(0, len(body), chunk)]
+
+
+def test_small_body_is_parsed():
+    app, parsed = make_app()
+    status, body, _ = call(app, body_chunks(10))
+    assert (status, orjson.loads(body)) == (200, {"size": 10})
+    assert len(parsed) == 1
+
+
+def test_declared_oversize_is_rejected_without_reading():
+    app, parsed = make_app()
+    status, body, read = call(app, body_chunks(500), headers=[(b"content-length", b"512")])
+    assert (status, orjson.loads(body), read) == (413, {"detail": BodySizeLimitMiddleware.DETAIL}, 0)
+    assert parsed == []
+
+
+def test_chunked_body_without_content_length_is_rejected():
+    app, parsed = make_app()
+    chunks = body_chunks(500)
+    status, body, read = call(app, chunks)
+    assert (status, orjson.loads(body)) == (413, {"detail": BodySizeLimitMiddleware.DETAIL})
+    assert read < len(chunks)  # 한도를 넘는 순간 읽기 중단
+    assert parsed == []
+
+
+def test_understated_content_length_is_rejected():
+    app, parsed = make_app()
+    status, body, _ = call(app, body_chunks(500), headers=[(b"content-length", b"20")])
+    assert (status, orjson.loads(body)) == (413, {"detail": BodySizeLimitMiddleware.DETAIL})
+    assert parsed == []
+
+
+def test_disabled_limit_passes_everything():
+    app, parsed = make_app(max_bytes=0)
+    status, _, _ = call(app, body_chunks(500))
+    assert status == 200 and len(parsed) == 1
+
+
+def test_analyze_rejects_chunked_oversize_body(client, mock_gemini):
+    calls = mock_gemini()
+    body = orjson.dumps({"data": "식비 " * (main.MAX_REQUEST_BODY_BYTES // 2), "device_id": new_device_id()})
+
+    def stream():
+        for index in range(0, len(body), 65536):
+            yield body[index:index + 65536]
+
+    response = client.post("/api/analyze", content=stream(), headers={"content-type": "application/json"})
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert response.json() == {"detail": BodySizeLimitMiddleware.DETAIL}
+    assert calls == []
+
+
+async def ok_app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def send_request(app, path="/api/analyze", method="POST", headers=(), client=("10.0.0.1", 1234), state=None):
+    """ASGI 직접 호출 → (상태 코드, 헤더 dict, 본문, 본문을 읽었는지)"""
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers), "client": client}
+    if state is not None:
+        scope["state"] = state
+    messages = []
+    read = []
+
+    async def receive():
+        read.append(True)
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in messages[0].get("headers", [])}
+    return messages[0]["status"], headers, messages[1]["body"], bool(read)
+
+
+def rate_limited(rate=2, device_check=None):
+    limiter = TokenBucketLimiter(rate)
+    return RateLimitMiddleware(ok_app, paths=["/api/analyze"], ip_limiter=limiter, device_check=device_check), limiter
+
+
+def test_ip_limit_rejects_before_reading_body():
+    app, _ = rate_limited(rate=2)
+    assert [send_request(app)[0] for _ in range(2)] == [200, 200]
+    status, headers, body, read = send_request(app)
+    assert (status, read) == (429, False)
+    assert orjson.loads(body) == {"detail": RateLimitMiddleware.DETAIL}
+    assert int(headers["retry-after"]) >= 1
+    assert send_request(app, client=("10.0.0.2", 1234))[0] == 200  # 다른 IP
+
+
+def test_unlimited_paths_and_methods_pass_through():
+    app, limiter = rate_limited(rate=1)
+    for _ in range(3):
+        assert send_request(app, path="/api/usage")[0] == 200
+        assert send_request(app, method="GET")[0] == 200
+    assert len(limiter) == 0
+
+
+def test_allowlisted_request_skips_limits():
+    app, limiter = rate_limited(rate=1)
+    for _ in range(3):
+        assert send_request(app, state={ACCESS_STATE_KEY: "allow"})[0] == 200
+    assert len(limiter) == 0
+
+
+def test_device_precheck_uses_header():
+    checked = []
+
+    def device_check(device_id, scope):
+        checked.append(device_id)
+        return (30, b'{"detail":"quota"}') if device_id == "blocked" else None
+
+    app, _ = rate_limited(rate=10, device_check=device_check)
+    status, headers, body, read = send_request(app, headers=[(b"x-device-id", b"blocked")])
+    assert (status, headers["retry-after"], body, read) == (429, "30", b'{"detail":"quota"}', False)
+    assert send_request(app, headers=[(b"x-device-id", b"fine")])[0] == 200
+    assert send_request(app)[0] == 200  # 헤더가 없으면 엔드포인트에서 확인
+    assert checked == ["blocked", "fine"]
+
+
+def test_exhausted_quota_is_rejected_before_parsing(client, mock_gemini, monkeypatch):
+    calls = mock_gemini()
+    device_id = new_device_id()
+    monkeypatch.setattr(main, "LOCAL_INSIGHTS_ON_LIMIT", False)
+    main.mark_quota_exhausted(device_id)
+    # 본문은 JSON 이 아님 → 파싱까지 갔다면 422
+    response = client.post("/api/analyze", content=b"not json", headers={
+        "content-type": "application/json", "x-device-id": device_id.upper(), "accept-language": "en-US",
+    })
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json()["detail"] == main.get_error_message("rate_limit", "en", count=main.DAILY_LIMIT, limit=main.DAILY_LIMIT)
+    assert calls == []
+    # 한도를 쓰지 않는 로컬 분석 경로는 통과 (본문 검증에서 422)
+    assert client.post("/api/analyze/local", content=b"not json", headers={
+        "content-type": "application/json", "x-device-id": device_id,
+    }).status_code == 422
+
+
+def test_device_rate_limit_precheck(client, monkeypatch):
+    limiter = TokenBucketLimiter(1)
+    monkeypatch.setattr(main, "device_rate_limiter", limiter)
+    device_id = new_device_id()
+    limiter.allow(device_id)
+    response = client.post("/api/analyze", content=b"not json", headers={
+        "content-type": "application/json", "x-device-id": device_id,
+    })
+    assert response.status_code == 429
+    assert response.json() == {"detail": RateLimitMiddleware.DETAIL}
@@ -0,0 +1,120 @@
+"""model_router.py 테스트 (지연 기반 선택 / 폴백 / 서킷 open 모델 제외)"""
+import asyncio
+
+import httpx
+import pytest
+
+from circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from gemini_client import GeminiClient
+from model_router import ModelRouter
+
+API = "https://gemini.test/v1beta"
+
+
+def make_router(models=("a", "b", "c"), **kwargs) -> ModelRouter:
+    kwargs.setdefault("explore_rate", 0.0)
+    kwargs.setdefault("min_samples", 2)
+    return ModelRouter(list(models), API, lambda model: CircuitBreaker(name=model, min_calls=2, cooldown_seconds=60), **kwargs)
+
+
+def make_client(statuses):
+    """모델명 → 상태 코드 (또는 예외) 로 응답하는 클라이언트, 호출된 모델 목록 반환"""
+    calls = []
+
+    def handler(request):
+        model = request.url.path.rsplit("/", 1)[-1].split(":")[0]
+        calls.append(model)
+        status = statuses.get(model, 200)
+        if isinstance(status, Exception):
+            raise status
+        return httpx.Response(status, json={"model": model})
+
+    client = GeminiClient("key", max_retries=0, backoff_base=0.001, backoff_max=0.001)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, calls
+
+
+def generate(router, client):
+    return asyncio.run(router.generate(client, lambda model: {"model": model}))
+
+
+def test_primary_is_used_first():
+    router = make_router()
+    client, calls = make_client({})
+    model, response = generate(router, client)
+    assert (model, response.status_code, calls) == ("a", 200, ["a"])
+    assert router.primary == "a"
+
+
+def test_falls_back_on_retryable_status_and_network_error():
+    router = make_router()
+    client, calls = make_client({"a": 503, "b": httpx.ConnectError("down")})
+    model, response = generate(router, client)
+    assert (model, response.status_code) == ("c", 200)
+    assert calls == ["a", "b", "c"]
+    snapshot = router.snapshot()
+    assert (snapshot["a"]["fallbacks"], snapshot["b"]["fallbacks"], snapshot["c"]["fallbacks"]) == (1, 1, 0)
+
+
+def test_non_retryable_status_is_returned_without_fallback():
+    router = make_router()
+    client, calls = make_client({"a": 400})
+    model, response = generate(router, client)
+    assert (model, response.status_code, calls) == ("a", 400, ["a"])
+
+
+def test_all_failing_returns_last_response():
+    router = make_router(models=("a", "b"))
+    client, _ = make_client({"a": 503, "b": 429})
+    model, response = generate(router, client)
+    assert (model, response.status_code) == ("b", 429)
+
+
+def test_all_network_errors_raise_last_error():
+    router = make_router(models=("a",))
+    client, _ = make_client({"a": httpx.ConnectError("down")})
+    with pytest.raises(httpx.ConnectError):
+        generate(router, client)
+
+
+def test_faster_model_is_preferred_once_sampled():
+    router = make_router(models=("a", "b"))
+    for _ in range(2):
+        router.routes[0].latency.record(2.0)
+        router.routes[1].latency.record(0.5)
+    assert [route.model for route in router.candidates()] == ["b", "a"]
+
+
+def test_degraded_error_rate_moves_model_back():
+    router = make_router(models=("a", "b"), degraded_error_rate=0.5)
+    breaker = router.routes[0].breaker
+    breaker.min_calls = 100  # 서킷은 열지 않고 에러율만 높임
+    for success in (False, False, True):
+        breaker.record(success=success, latency=0.1)
+    assert [route.model for route in router.candidates()] == ["b", "a"]
+
+
+def test_open_circuit_is_skipped_and_all_open_raises():
+    router = make_router(models=("a", "b"))
+    for route in router.routes:
+        for _ in range(2):
+            route.breaker.record(success=False, latency=0.1)
+    assert router.routes[0].breaker.state == OPEN
+    assert router.candidates() == []
+    assert router.state() == OPEN
+    client, calls = make_client({})
+    with pytest.raises(CircuitOpenError):
+        generate(router, client)
+    assert calls == []
+
+
+def test_explore_sometimes_tries_another_model(monkeypatch):
+    router = make_router(explore_rate=1.0)
+    monkeypatch.setattr("model_router.random.random", lambda: 0.0)
+    monkeypatch.setattr("model_router.random.randrange", lambda start, stop: 2)
+    assert [route.model for route in router.candidates()] == ["c", "a", "b"]
+
+
+def test_requires_a_model():
+    with pytest.raises(ValueError):
+        ModelRouter([], API, lambda model: CircuitBreaker())
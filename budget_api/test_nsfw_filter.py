@@ -0,0 +1,119 @@
+"""nsfw_filter.py 테스트 (기존 키워드별 re.sub 필터와 같은 마스킹 결과 / 한글 자모 조합)"""
+import random
+import re
+
+import pytest
+
+import main
+from nsfw_filter import NsfwMatcher, compose_hangul
+from nsfw_lexicon import DEFAULT_KEYWORDS
+
+
+# 기존 main.py 의 필터 (키워드별 re.sub, 사전 순서대로) - 결과 비교 기준
+def _baseline_spaced_pattern(word):
+    return r"[\s\.\-_]*".join(re.escape(c) for c in word)
+
+
+_BASELINE_PATTERNS = [re.compile(_baseline_spaced_pattern(kw), re.IGNORECASE) for kw in DEFAULT_KEYWORDS]
+
+
+def baseline_input(text):
+    for keyword in DEFAULT_KEYWORDS:
+        text = re.compile(re.escape(keyword), re.IGNORECASE).sub("***", text)
+    for pattern in _BASELINE_PATTERNS:
+        text = pattern.sub("***", text)
+    return text
+
+
+def baseline_output(text):
+    for keyword in DEFAULT_KEYWORDS:
+        text = re.compile(re.escape(keyword), re.IGNORECASE).sub("***", text)
+    return text
+
+
+MATCHER = NsfwMatcher(DEFAULT_KEYWORDS)
+
+
+def sample_texts():
+    texts = []
+    for keyword in DEFAULT_KEYWORDS:
+        spaced = " ".join(keyword)
+        texts += [keyword, keyword.upper(), f"이번 달 {keyword} 식비", spaced, ".".join(keyword), f"a{spaced}b", keyword * 2]
+        for other in DEFAULT_KEYWORDS:
+            texts += [keyword + other, f"{keyword} {other}", f"{keyword[:-1]}-{other}"]
+    # 키워드 글자 + 구분자 + 일반 글자를 섞은 무작위 문자열 (겹침/우회 조합)
+    rng = random.Random(41)
+    alphabet = "".join(sorted(set("".join(DEFAULT_KEYWORDS)))) + "SHIT  .-_x가"
+    texts += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 30))) for _ in range(3000)]
+    return texts
+
+
+@pytest.mark.parametrize("text", ["개새끼", "개 새끼", "새끼개새끼", "fuckshit", "f.u.c.k you", "미친 존나"])
+def test_known_overlaps(text):
+    assert MATCHER.mask(text) == baseline_input(text)
+
+
+def test_overlap_keeps_earlier_keyword():
+    assert MATCHER.mask("개새끼") == "개***"  # "새끼" 가 "개새끼" 보다 사전에서 앞
+    assert MATCHER.mask("시 발 새끼") == "*** ***"
+    assert MATCHER.mask("새끼새끼") == "******"  # 연속 매치도 각각 마스킹
+
+
+def test_input_masking_matches_baseline_over_keyword_list():
+    mismatches = [text for text in sample_texts() if MATCHER.mask(text) != baseline_input(text)]
+    assert mismatches == []
+
+
+def test_output_masking_matches_baseline_over_keyword_list():
+    mismatches = [text for text in sample_texts() if MATCHER.mask(text, spaced=False) != baseline_output(text)]
+    assert mismatches == []
+
+
+def test_find_returns_original_spans():
+    assert MATCHER.find("a 시.발 b 개새끼") == [(2, 5), (9, 11)]
+    assert MATCHER.find("깨끗한 가계부") == []
+
+
+def test_empty_lexicon_is_a_no_op():
+    matcher = NsfwMatcher(["", " . "])
+    assert matcher.keywords == []
+    assert matcher.mask("anything") == "anything"
+
+
+def test_filter_nsfw_output_skips_spaced_variants():
+    result = main.filter_nsfw_output({"oneLiner": "f u c k fuck", "insights": ["개새끼", 3]})
+    assert result["oneLiner"] == "f u c k ***"
+    assert result["insights"] == ["개***", 3]
+    assert main.filter_nsfw_input("f u c k") == "***"
+
+
+# 기존 main.py 가 str.replace 로 복원하던 자모 분리 변형
+BASELINE_JAMO_VARIANTS = {
+    "ㅅㅣㅂㅏㄹ": "시발", "ㅆㅣㅂㅏㄹ": "씨발",
+    "ㅂㅕㅇㅅㅣㄴ": "병신", "ㅈㅣㄹㅏㄹ": "지랄",
+    "ㅅㅐㄲㅣ": "새끼", "ㅈㅗㄴㄴㅏ": "존나",
+}
+
+
+@pytest.mark.parametrize("variant, word", BASELINE_JAMO_VARIANTS.items())
+def test_compose_covers_baseline_variants(variant, word):
+    assert compose_hangul(f"이번 달 {variant}!") == f"이번 달 {word}!"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ㄱㅗㅏㄴ", "관"),            # 겹모음
+    ("ㄷㅏㄹㄱ", "닭"),            # 겹받침
+    ("ㄷㅏㄹㄱㅏ", "달가"),        # 겹받침 뒤쪽 자음이 다음 음절 초성으로
+    ("ㅂㅏㅂㅗ", "바보"),          # 받침이 다음 음절 초성으로
+    ("\u1109\u1175\u1107\u1161\u11af", "시발"),  # 조합형 자모
+    ("ㅋㅋㅋ ㅠㅠ", "ㅋㅋㅋ ㅠㅠ"),  # 음절이 안 되는 자모는 그대로
+    ("ㅏㅅ", "ㅏㅅ"),
+    ("식비 100,000원", "식비 100,000원"),
+])
+def test_compose_hangul(text, expected):
+    assert compose_hangul(text) == expected
+
+
+def test_composed_jamo_is_masked():
+    assert main.filter_nsfw_input("ㄱㅐㅅㅐㄲㅣ 같은") == "개*** 같은"
+    assert main.filter_nsfw_input("ㅁㅣㅊㅣㄴ") == "***"  # 기존 변형 목록에 없던 키워드
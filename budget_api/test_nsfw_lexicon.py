@@ -0,0 +1,91 @@
+"""nsfw_lexicon.py 테스트 (사전 파일 / 핫 리로드 / 내장 키워드)"""
+import asyncio
+import json
+import os
+
+import pytest
+
+from nsfw_lexicon import LexiconError, NsfwLexicon, read_lexicon
+
+
+def write_lexicon(path, keywords, version="v1"):
+    path.write_text(json.dumps({"format": 1, "version": version, "keywords": keywords}), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def lexicon_path(tmp_path):
+    return write_lexicon(tmp_path / "lexicon.json", {"ko": ["새끼", "개새끼"], "en": ["Bad Word"]})
+
+
+def test_read_lexicon_folds_and_keeps_order(lexicon_path):
+    assert read_lexicon(lexicon_path) == ("v1", ["새끼", "개새끼", "badword"])
+
+
+@pytest.mark.parametrize("body", [
+    "not json",
+    json.dumps({"format": 2, "keywords": {"ko": ["a"]}}),
+    json.dumps({"format": 1, "keywords": ["a"]}),
+    json.dumps({"format": 1, "keywords": {"ko": [1]}}),
+    json.dumps({"format": 1, "keywords": {"ko": [" "]}}),
+])
+def test_read_lexicon_rejects_bad_files(tmp_path, body):
+    path = tmp_path / "lexicon.json"
+    path.write_text(body, encoding="utf-8")
+    with pytest.raises(LexiconError):
+        read_lexicon(str(path))
+
+
+def test_load_builds_matcher_from_file(lexicon_path):
+    lexicon = NsfwLexicon(lexicon_path, poll_seconds=0)
+    info = lexicon.load()
+    assert (info["source"], info["version"], info["keywords"]) == ("file", "v1", 3)
+    assert lexicon.matcher.mask("개새끼 bad word") == "개*** ***"
+
+
+def test_broken_file_keeps_previous_matcher(lexicon_path):
+    lexicon = NsfwLexicon(lexicon_path, poll_seconds=0)
+    lexicon.load()
+    previous = lexicon.matcher
+    with open(lexicon_path, "w", encoding="utf-8") as f:
+        f.write("{broken")
+    with pytest.raises(LexiconError):
+        lexicon.load()
+    assert lexicon.matcher is previous
+    assert (lexicon.errors, lexicon.changed()) == (1, False)  # 같은 깨진 파일로 반복 시도하지 않음
+
+
+def test_missing_file_uses_builtin_keywords(tmp_path):
+    lexicon = NsfwLexicon(str(tmp_path / "none.json"), poll_seconds=0)
+    with pytest.raises(LexiconError):
+        lexicon.load()
+    assert lexicon.snapshot()["source"] == "builtin"
+    assert lexicon.matcher.mask("fuck") == "***"
+
+
+def test_changed_file_is_hot_reloaded(lexicon_path, tmp_path):
+    async def run():
+        lexicon = NsfwLexicon(lexicon_path, poll_seconds=0.01)
+        lexicon.load()
+        held = lexicon.matcher  # 진행 중인 요청이 잡아둔 매처
+        await lexicon.start()
+        write_lexicon(tmp_path / "lexicon.json", {"en": ["money"]}, version="v2")
+        os.utime(lexicon_path, ns=(0, 0))  # mtime 해상도와 무관하게 변경 감지
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if lexicon.version == "v2":
+                break
+        await lexicon.stop()
+        return lexicon, held
+
+    lexicon, held = asyncio.run(run())
+    assert (lexicon.version, lexicon.reloads) == ("v2", 2)
+    assert lexicon.matcher.mask("money 새끼") == "*** 새끼"
+    assert held.mask("money 새끼") == "money ***"
+
+
+def test_admin_reload_endpoint(client):
+    response = client.post("/api/admin/nsfw-lexicon/reload", headers={"X-Admin-Key": os.environ["ADMIN_API_KEY"]})
+    assert response.status_code == 200
+    assert response.json()["keywords"] == 18
+    assert client.post("/api/admin/nsfw-lexicon/reload").status_code in (401, 403)
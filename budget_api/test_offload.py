@@ -0,0 +1,90 @@
+"""offload.py 테스트 (크기 기반 분배 / 동시 실행 제한 / 분석 요청의 큰 데이터)"""
+import asyncio
+import threading
+
+import main
+from conftest import new_device_id
+from offload import PayloadOffloader
+
+
+def current_thread_name():
+    return threading.current_thread().name
+
+
+def test_small_payload_runs_inline():
+    offloader = PayloadOffloader(threshold=100, workers=2)
+    assert asyncio.run(offloader.run(99, current_thread_name)) == threading.current_thread().name
+    assert offloader.snapshot()["inline"]["count"] == 1
+    assert offloader.snapshot()["offloaded"]["count"] == 0
+
+
+def test_large_payload_runs_in_pool():
+    offloader = PayloadOffloader(threshold=100, workers=2)
+    name = asyncio.run(offloader.run(100, current_thread_name))
+    offloader.shutdown()
+    assert name.startswith("payload")
+    assert offloader.snapshot()["offloaded"]["count"] == 1
+
+
+def test_zero_workers_always_inline():
+    offloader = PayloadOffloader(threshold=0, workers=0)
+    assert asyncio.run(offloader.run(10 ** 9, current_thread_name)) == threading.current_thread().name
+
+
+def test_concurrency_is_bounded_by_workers():
+    offloader = PayloadOffloader(threshold=0, workers=2)
+    lock = threading.Lock()
+    running = [0, 0]  # 현재, 최대
+
+    def work():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        threading.Event().wait(0.02)
+        with lock:
+            running[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(offloader.run(1, work) for _ in range(6)))
+
+    asyncio.run(run())
+    offloader.shutdown()
+    assert running[1] == 2
+    assert offloader.snapshot()["offloaded"]["count"] == 6
+
+
+def test_exception_propagates_and_is_counted():
+    offloader = PayloadOffloader(threshold=0, workers=1)
+
+    def fail():
+        raise ValueError("bad")
+
+    async def run():
+        try:
+            await offloader.run(1, fail)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(run()) == "bad"
+    offloader.shutdown()
+    assert offloader.snapshot()["offloaded"]["count"] == 1
+
+
+def test_analyze_offloads_large_payload(client, mock_gemini, monkeypatch):
+    mock_gemini()
+    threads = []
+    prepare_prompts = main.prepare_prompts
+
+    def recording_prepare(*args):
+        threads.append(threading.current_thread().name)
+        return prepare_prompts(*args)
+
+    monkeypatch.setattr(main, "prepare_prompts", recording_prepare)
+    before = main.payload_offloader.snapshot()["offloaded"]["count"]
+    data = "식비 12,000원 점심\n" * (main.PAYLOAD_OFFLOAD_THRESHOLD // 10)
+    assert len(data) >= main.PAYLOAD_OFFLOAD_THRESHOLD
+
+    response = client.post("/api/analyze", json={"data": data, "device_id": new_device_id()})
+    assert response.status_code == 200
+    assert threads and threads[0].startswith("payload")
+    assert main.payload_offloader.snapshot()["offloaded"]["count"] > before
@@ -0,0 +1,90 @@
+"""prompt_compactor.py 테스트 (마크다운 / canonical 텍스트 압축, 예산 상한 보장)"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from budget_payload import BudgetPayload, render_budget_payload
+from loadtest import make_budget, render_markdown
+from prompt_compactor import compact_budget_data, estimate_tokens, truncate_to_budget
+
+TODAY = date(2026, 10, 19)
+
+
+def markdown_over(days: int, budgets: int = 3) -> str:
+    """days 일 동안 매일 예산별 지출 1건씩 있는 마크다운 지출 표"""
+    lines = ["## 가계부 분석 데이터", "", "### 지출 내역",
+             "| 날짜 | 예산 | 유형 | 세부예산 | 내용 | 금액 |", "|------|------|------|------|------|------|"]
+    for offset in range(days):
+        day = TODAY - timedelta(days=offset)
+        for index in range(budgets):
+            lines.append(f"| {day} | 예산{index} | 변동지출 | 세부{index} | 메모 | 1,000원 |")
+    lines += ["", "### 요약 통계", "- 지출 건수: many"]
+    return "\n".join(lines)
+
+
+def test_under_budget_is_unchanged():
+    text = markdown_over(3)
+    assert compact_budget_data(text, 10_000) == text
+
+
+def test_old_expenses_become_monthly_totals():
+    text = render_markdown(make_budget(random.Random(1), 300, TODAY))
+    compacted = compact_budget_data(text, estimate_tokens(text) // 2)
+    assert estimate_tokens(compacted) <= estimate_tokens(text) // 2
+    assert "### 이전 지출 요약 (월별·예산별 합계)" in compacted
+    assert "### 요약 통계" in compacted
+
+
+def test_monthly_summary_is_aggregated_further_when_too_long():
+    text = markdown_over(365 * 4, budgets=20)
+    budget = 3000
+    compacted = compact_budget_data(text, budget)
+    assert estimate_tokens(compacted) <= budget
+    assert "| 전체 |" in compacted  # 월 × 예산 단위로는 초과 → 더 묶임
+    assert "생략" not in compacted
+
+
+@pytest.mark.parametrize("budget", [50, 200, 600])
+def test_output_never_exceeds_budget(budget):
+    text = markdown_over(365 * 5, budgets=4)
+    compacted = compact_budget_data(text, budget, language="en")
+    assert estimate_tokens(compacted) <= budget
+    assert compacted.endswith("(truncated: data too long)")
+
+
+def test_unknown_format_is_truncated():
+    text = "\n".join(f"줄 {index} 가계부 메모" for index in range(2000))
+    compacted = compact_budget_data(text, 100)
+    assert estimate_tokens(compacted) <= 100
+    assert compacted.startswith("줄 0 가계부 메모")
+
+
+def test_truncate_keeps_whole_lines():
+    assert truncate_to_budget("aaaa\nbbbb\ncccc", 1000) == "aaaa\nbbbb\ncccc\n(이하 생략: 데이터가 너무 김)"
+    assert truncate_to_budget("a" * 400, 5) == ""
+
+
+def canonical_text(expense_count: int) -> str:
+    payload = BudgetPayload.model_validate(make_budget(random.Random(7), expense_count, TODAY))
+    return render_budget_payload(payload, TODAY)
+
+
+def test_structured_budget_text_is_compacted():
+    text = canonical_text(2000)
+    budget = estimate_tokens(text) - 50
+    compacted = compact_budget_data(text, budget)
+    assert estimate_tokens(compacted) <= budget
+    assert compacted.startswith("period: ")
+    assert "recent expenses (latest 10):" in compacted  # 최근 지출 20건 → 10건
+
+
+def test_structured_budget_daily_spending_is_summarised():
+    text = canonical_text(2000)
+    head_only = text.split("daily spending")[0]
+    budget = estimate_tokens(head_only) + 40
+    compacted = compact_budget_data(text, budget, recent_days=14)
+    assert estimate_tokens(compacted) <= budget
+    assert "recent expenses" not in compacted
+    assert "earlier days total" in compacted
+    assert "budgets (name [type]: budget / spent / left / usage):" in compacted
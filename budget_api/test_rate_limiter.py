@@ -0,0 +1,122 @@
+"""rate_limiter.py 테스트 (토큰 버킷 / 타이머 휠 만료 / LRU 상한 / 기기별 제한)"""
+import pytest
+
+import main
+from conftest import new_device_id
+from rate_limiter import TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(rate=60, **kwargs):
+    clock = FakeClock()
+    return TokenBucketLimiter(rate, clock=clock, **kwargs), clock
+
+
+def test_burst_then_limited():
+    limiter, _ = make_limiter(rate=3)
+    assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("b")  # 키마다 별도 버킷
+    assert (limiter.allowed, limiter.limited) == (4, 1)
+
+
+def test_tokens_refill_over_time():
+    limiter, clock = make_limiter(rate=60, burst=1)  # 초당 1개
+    assert limiter.allow("a") and not limiter.allow("a")
+    assert limiter.retry_after("a") == 1
+    clock.now += 0.5
+    assert not limiter.allow("a")
+    clock.now += 0.5
+    assert limiter.allow("a")
+
+
+def test_retry_after_counts_missing_tokens():
+    limiter, _ = make_limiter(rate=6, burst=1)  # 10초마다 1개
+    limiter.allow("a")
+    assert limiter.retry_after("a") == 10
+    assert limiter.retry_after("unknown") == 1
+
+
+def test_is_limited_does_not_consume():
+    limiter, _ = make_limiter(rate=1)
+    assert not limiter.is_limited("a")
+    assert limiter.allow("a")
+    assert limiter.is_limited("a")
+    assert limiter.is_limited("a")  # 확인만으로는 상태가 바뀌지 않음
+    assert limiter.limited == 0
+
+
+def test_full_buckets_expire_from_wheel():
+    limiter, clock = make_limiter(rate=60, burst=2)
+    limiter.allow("a")
+    limiter.allow("b")
+    assert len(limiter) == 2
+    clock.now += 1.5  # 아직 가득 차기 전 (a, b 모두 1초 뒤 가득 참 → 다음 초에 삭제)
+    limiter.allow("c")
+    assert len(limiter) == 3
+    clock.now += 10
+    limiter.allow("d")
+    assert len(limiter) == 1  # 가득 찬 a, b, c 는 지나간 슬롯에서 삭제
+
+
+def test_expired_key_starts_full():
+    limiter, clock = make_limiter(rate=60, burst=2)
+    assert limiter.allow("a") and limiter.allow("a") and not limiter.allow("a")
+    clock.now += 100
+    assert limiter.allow("a") and limiter.allow("a") and not limiter.allow("a")
+
+
+def test_max_keys_evicts_least_recently_used():
+    limiter, _ = make_limiter(rate=1, max_keys=2)
+    limiter.allow("a")
+    limiter.allow("b")
+    limiter.is_limited("a")  # 확인은 사용 순서를 바꾸지 않음
+    limiter.allow("a")  # 거부되지만 a 가 최근 사용
+    limiter.allow("c")  # b 제거
+    assert len(limiter) == 2 and limiter.evicted == 1
+    assert limiter.is_limited("a")  # a 는 남아 있음
+    assert limiter.allow("b")  # 제거된 키는 가득 찬 버킷으로 다시 시작
+
+
+def test_many_keys_keep_memory_bounded():
+    limiter, clock = make_limiter(rate=10, max_keys=100)
+    for index in range(10_000):
+        clock.now += 0.001
+        limiter.allow(f"spoofed-{index}")
+    assert len(limiter) == 100
+    assert sum(len(slot) for slot in limiter._wheel) == 100  # 제거된 키는 휠에도 없음
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_disabled_limiter_always_allows(rate):
+    limiter, _ = make_limiter(rate=rate)
+    assert not limiter.enabled
+    assert all(limiter.allow("a") for _ in range(100))
+    assert not limiter.is_limited("a")
+    assert len(limiter) == 0
+
+
+def test_snapshot():
+    limiter, _ = make_limiter(rate=30, max_keys=5)
+    limiter.allow("a")
+    assert limiter.snapshot() == {
+        "backend": "memory", "rate_per_minute": 30.0, "burst": 30, "keys": 1, "max_keys": 5,
+        "allowed": 1, "limited": 0, "evicted": 0,
+    }
+
+
+def test_device_limit_applies_to_body_device_id(client, mock_gemini, monkeypatch):
+    mock_gemini()
+    monkeypatch.setattr(main, "device_rate_limiter", TokenBucketLimiter(1))
+    device_id = new_device_id()
+    first = client.post("/api/analyze", json={"data": "식비 10,000원", "device_id": device_id})
+    second = client.post("/api/analyze", json={"data": "식비 10,000원", "device_id": device_id})
+    other = client.post("/api/analyze", json={"data": "식비 10,000원", "device_id": new_device_id()})
+    assert (first.status_code, second.status_code, other.status_code) == (200, 429, 200)
+    assert int(second.headers["retry-after"]) >= 1
@@ -0,0 +1,125 @@
+"""reanalysis.py 테스트 (체크포인트 / 중복 결과 / 저장 실패 / 스로틀 재시도)"""
+import asyncio
+
+import pytest
+
+import main
+from conftest import new_device_id
+from database import SQLiteDatabase
+from reanalysis import ReanalysisRunner, BATCH_DONE
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "reanalysis.db"))
+    database.init_db()
+    return database
+
+
+def create_batch(db, count=3, batch_id="batch-1"):
+    for index in range(count):
+        db.save_analysis_log(new_device_id(), "ko", "gentle", f"data {index}")
+    log_ids = [log["id"] for log in db.get_logs(limit=count)]
+    db.create_reanalysis_batch(batch_id, log_ids, "model-a", 2)
+    return batch_id, log_ids
+
+
+def run_batch(runner, batch_id):
+    async def run():
+        runner.start(batch_id)
+        await runner._tasks[batch_id]
+
+    asyncio.run(run())
+
+
+def test_batch_saves_every_log(db):
+    batch_id, log_ids = create_batch(db)
+    seen = []
+
+    async def analyzer(data, language, tone):
+        seen.append(data)
+        return 200, "{}", "model-a"
+
+    run_batch(ReanalysisRunner(db, analyzer, min_interval=0), batch_id)
+    batch = db.get_reanalysis_batch(batch_id)
+    assert sorted(seen) == ["data 0", "data 1", "data 2"]
+    assert (batch["status"], batch["succeeded"], batch["failed"]) == (BATCH_DONE, 3, 0)
+    assert sorted(db.get_reanalyzed_log_ids(batch_id)) == sorted(log_ids)
+
+
+def test_duplicate_result_is_treated_as_done(db):
+    batch_id, log_ids = create_batch(db)
+
+    async def analyzer(data, language, tone):
+        # 다른 프로세스가 같은 배치를 먼저 저장한 상황
+        for log_id in log_ids:
+            db.save_reanalysis_result(batch_id, log_id, "model-a", 500, error_message="other worker")
+        return 200, "{}", "model-a"
+
+    run_batch(ReanalysisRunner(db, analyzer, min_interval=0), batch_id)
+    batch = db.get_reanalysis_batch(batch_id)
+    assert (batch["status"], batch["succeeded"], batch["failed"]) == (BATCH_DONE, 0, 3)
+    assert db.save_reanalysis_result(batch_id, log_ids[0], "model-a", 200) is False
+
+
+def test_save_failure_does_not_stop_batch(db, monkeypatch):
+    batch_id, log_ids = create_batch(db)
+    save = db.save_reanalysis_result
+
+    def flaky_save(batch, log_id, *args, **kwargs):
+        if log_id == log_ids[0]:
+            raise RuntimeError("db down")
+        return save(batch, log_id, *args, **kwargs)
+
+    monkeypatch.setattr(db, "save_reanalysis_result", flaky_save)
+
+    async def analyzer(data, language, tone):
+        return 200, "{}", "model-a"
+
+    run_batch(ReanalysisRunner(db, analyzer, min_interval=0), batch_id)
+    batch = db.get_reanalysis_batch(batch_id)
+    assert (batch["status"], batch["succeeded"]) == (BATCH_DONE, 2)
+    assert log_ids[0] not in db.get_reanalyzed_log_ids(batch_id)
+
+
+def test_throttled_log_is_retried(db):
+    batch_id, _ = create_batch(db, count=1)
+    statuses = [429, 200]
+
+    async def analyzer(data, language, tone):
+        return statuses.pop(0), "{}", "model-a"
+
+    run_batch(ReanalysisRunner(db, analyzer, min_interval=0, throttle_pause=0.001), batch_id)
+    assert db.get_reanalysis_batch(batch_id)["succeeded"] == 1
+    assert statuses == []
+
+
+def result_models(db, batch_id):
+    conn = db._get_connection()
+    rows = conn.execute("SELECT log_id, model FROM reanalysis_results WHERE batch_id = ?", (batch_id,)).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def test_result_records_the_model_that_served_it(db):
+    batch_id, log_ids = create_batch(db, count=2)
+
+    async def analyzer(data, language, tone):
+        # 첫 로그는 기본 모델, 두 번째는 폴백 모델이 응답
+        return 200, "{}", "model-a" if data == "data 0" else "model-fallback"
+
+    run_batch(ReanalysisRunner(db, analyzer, min_interval=0), batch_id)
+    assert sorted(result_models(db, batch_id).values()) == ["model-a", "model-fallback"]
+
+
+def test_reanalyze_log_data_returns_served_model(monkeypatch):
+    async def served_by_fallback(data, language, tone):
+        return {"oneLiner": "ok"}, "gemini-fallback", {}
+
+    async def failed_upstream(data, language, tone):
+        raise main.AnalysisError(502, "bad gateway", model="gemini-fallback")
+
+    monkeypatch.setattr(main, "generate_analysis", served_by_fallback)
+    assert asyncio.run(main.reanalyze_log_data("data", "ko", "gentle")) == (200, '{"oneLiner":"ok"}', "gemini-fallback")
+    monkeypatch.setattr(main, "generate_analysis", failed_upstream)
+    assert asyncio.run(main.reanalyze_log_data("data", "ko", "gentle")) == (502, "bad gateway", "gemini-fallback")
@@ -0,0 +1,83 @@
+"""response_parser.py 테스트 (코드 펜스 / 뒤따르는 설명 / 잘린 JSON 복구, 필드 정규화)"""
+import json
+
+import httpx
+import pytest
+
+from conftest import ANALYSIS, gemini_body, new_device_id
+from response_parser import normalize_analysis, parse_analysis_text, repair_json
+
+FULL = json.dumps(ANALYSIS, ensure_ascii=False)
+
+
+def test_valid_json_is_not_repaired():
+    result, repaired = parse_analysis_text(FULL)
+    assert not repaired
+    assert result["oneLiner"] == ANALYSIS["oneLiner"]
+
+
+@pytest.mark.parametrize("text", [
+    f"```json\n{FULL}\n```",
+    f"분석 결과입니다:\n{FULL}\n위 결과를 참고하세요.",
+    FULL + "}",
+])
+def test_wrapped_json_is_extracted(text):
+    result, repaired = parse_analysis_text(text)
+    assert repaired
+    assert result["suggestions"] == ANALYSIS["suggestions"]
+    assert result["pattern"]["riskLevel"] == "low"
+
+
+def test_truncated_string_value_is_closed():
+    text = '{"oneLiner": "식비가 많아요", "summary": "이번 달 지출이 예산의 8'
+    assert repair_json(text) == {"oneLiner": "식비가 많아요", "summary": "이번 달 지출이 예산의 8"}
+
+
+def test_truncated_key_is_dropped():
+    assert repair_json('{"oneLiner": "요약", "insights": ["a", "b"], "warn') == {"oneLiner": "요약", "insights": ["a", "b"]}
+    assert repair_json('{"oneLiner": "요약", "summary":') == {"oneLiner": "요약"}
+
+
+def test_truncated_nested_object_and_literal():
+    text = '{"oneLiner": "요약", "pattern": {"mainCategory": "식비", "savingPotential": 12'
+    assert repair_json(text) == {"oneLiner": "요약", "pattern": {"mainCategory": "식비", "savingPotential": 12}}
+    assert repair_json('{"oneLiner": "요약", "flag": tr') == {"oneLiner": "요약"}
+
+
+def test_truncated_escape_is_removed():
+    assert repair_json('{"oneLiner": "a\\') == {"oneLiner": "a"}
+    assert repair_json('{"oneLiner": "a\\u00') == {"oneLiner": "a"}
+
+
+def test_unusable_text_returns_none():
+    assert parse_analysis_text("죄송합니다, 분석할 수 없습니다.") == (None, True)
+    assert parse_analysis_text('{"insights": ["a"]}') == (None, False)  # 요약이 모두 비어 있음
+
+
+def test_normalize_fills_defaults_and_coerces_types():
+    result = normalize_analysis({
+        "oneLiner": "요약",
+        "insights": "하나뿐인 인사이트",
+        "warnings": None,
+        "suggestions": ["a", None, ""],
+        "pattern": {"savingPotential": "15%", "riskLevel": "high"},
+        "extra": 1,
+    })
+    assert result["summary"] == ""
+    assert result["insights"] == ["하나뿐인 인사이트"]
+    assert result["warnings"] == []
+    assert result["suggestions"] == ["a"]
+    assert result["pattern"] == {"mainCategory": "", "spendingTrend": "", "savingPotential": 15, "riskLevel": "high"}
+    assert result["extra"] == 1
+
+
+def test_analyze_salvages_truncated_response(client, mock_gemini, caplog):
+    truncated = FULL[:FULL.index('"suggestions"') + 20]
+    body = gemini_body()
+    body["candidates"][0]["content"]["parts"][0]["text"] = truncated
+    mock_gemini(lambda request: httpx.Response(200, json=body))
+    with caplog.at_level("WARNING", logger="main"):
+        response = client.post("/api/analyze", json={"data": "식비 100,000원", "device_id": new_device_id()})
+    assert response.status_code == 200
+    assert response.json()["oneLiner"] == ANALYSIS["oneLiner"]
+    assert "Salvaged malformed/truncated response" in caplog.text
@@ -0,0 +1,50 @@
+"""response_schema.py 테스트 (Pydantic → Gemini responseSchema 변환)"""
+from typing import List, Optional, Union
+
+import orjson
+import pytest
+from pydantic import BaseModel, Field
+
+import main
+from response_schema import gemini_response_schema
+
+
+class Inner(BaseModel):
+    level: str = Field(json_schema_extra={"enum": ["low", "high"]})
+
+
+class Outer(BaseModel):
+    title: str = Field(default="x", description="Title")
+    inner: Inner = Field(description="Nested")
+    tags: List[str] = Field(json_schema_extra={"maxItems": 3})
+    note: Optional[int] = None
+
+
+def test_refs_are_inlined_and_keywords_filtered():
+    schema = gemini_response_schema(Outer)
+    assert schema["type"] == "OBJECT"
+    assert schema["propertyOrdering"] == ["title", "inner", "tags", "note"]
+    assert schema["required"] == ["inner", "tags"]
+    assert schema["properties"]["title"] == {"type": "STRING", "description": "Title"}  # title/default 제거
+    assert schema["properties"]["inner"]["description"] == "Nested"
+    assert schema["properties"]["inner"]["properties"]["level"] == {"type": "STRING", "enum": ["low", "high"], "format": "enum"}
+    assert schema["properties"]["tags"] == {"type": "ARRAY", "items": {"type": "STRING"}, "maxItems": 3}
+    assert schema["properties"]["note"] == {"type": "INTEGER", "nullable": True}
+    assert "$ref" not in orjson.dumps(schema).decode()
+
+
+def test_union_types_are_rejected():
+    class Mixed(BaseModel):
+        value: Union[int, str]
+
+    with pytest.raises(ValueError):
+        gemini_response_schema(Mixed)
+
+
+def test_analysis_schema_is_sent_with_every_request():
+    body = orjson.loads(main.encode_gemini_body([{"role": "user", "parts": [{"text": "data"}]}]))
+    schema = body["generationConfig"]["responseSchema"]
+    assert body["generationConfig"]["responseMimeType"] == "application/json"
+    assert schema["propertyOrdering"][:2] == ["oneLiner", "summary"]
+    assert schema["properties"]["pattern"]["properties"]["spendingTrend"]["enum"] == ["increasing", "decreasing", "stable"]
+    assert schema["properties"]["insights"]["maxItems"] == 5
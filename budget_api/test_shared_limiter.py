@@ -0,0 +1,112 @@
+"""shared_limiter.py 테스트 (워커 간 공유 / 다른 설정의 파일은 건드리지 않음 / 슬롯 재사용)"""
+import multiprocessing
+import os
+
+import pytest
+
+import shared_limiter
+from shared_limiter import SharedTokenBucketLimiter
+
+pytestmark = pytest.mark.skipif(shared_limiter.fcntl is None, reason="requires fcntl (POSIX)")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "ip.ratelimit")
+
+
+def test_instances_share_one_budget(path):
+    first = SharedTokenBucketLimiter(path, rate_per_minute=3)
+    second = SharedTokenBucketLimiter(path, rate_per_minute=3)  # 다른 워커
+    assert [first.allow("a"), second.allow("a"), first.allow("a"), second.allow("a")] == [True, True, True, False]
+    assert first.is_limited("a") and second.is_limited("a")
+    assert second.retry_after("a") >= 1
+    assert (second.allowed, second.limited) == (1, 1)  # 카운터는 워커별
+    first.close()
+    second.close()
+
+
+def _hammer(path, count, results):
+    limiter = SharedTokenBucketLimiter(path, rate_per_minute=20)
+    results.put(sum(limiter.allow("shared-key") for _ in range(count)))
+    limiter.close()
+
+
+def test_processes_do_not_multiply_the_limit(path):
+    SharedTokenBucketLimiter(path, rate_per_minute=20).close()  # 파일 생성
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_hammer, args=(path, 15, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+    assert sum(results.get(timeout=5) for _ in workers) == 20
+
+
+@pytest.mark.parametrize("settings", [{"slots": 1024}, {"rate_per_minute": 2}, {"burst": 5}])
+def test_different_settings_never_resize_a_mapped_file(path, settings):
+    mapped = SharedTokenBucketLimiter(path, rate_per_minute=1, slots=65536)
+    size = os.path.getsize(path)
+    assert mapped.allow("a")
+    with pytest.raises(ValueError):
+        SharedTokenBucketLimiter(path, **{"rate_per_minute": 1, "slots": 65536, **settings})
+    assert os.path.getsize(path) == size
+    assert not mapped.allow("a")  # 카운터 유지, 매핑 영역 접근도 정상 (SIGBUS 없음)
+    mapped.close()
+
+
+def test_same_settings_reuse_the_file(path):
+    first = SharedTokenBucketLimiter(path, rate_per_minute=2)
+    assert first.allow("a")
+    same = SharedTokenBucketLimiter(path, rate_per_minute=2)
+    assert same.allow("a") and not same.allow("a")
+    first.close()
+    same.close()
+
+
+def test_interrupted_initialisation_is_redone(path):
+    with open(path, "wb") as f:
+        f.write(b"\0" * 100)  # 헤더를 쓰기 전에 중단된 파일
+    limiter = SharedTokenBucketLimiter(path, rate_per_minute=1)
+    assert limiter.allow("a") and not limiter.allow("a")
+    limiter.close()
+
+
+def test_app_puts_settings_in_file_name(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "RATE_LIMIT_BACKEND", "shared")
+    monkeypatch.setattr(main, "RATE_LIMIT_SHM_DIR", str(tmp_path))
+    limiters = [main.create_rate_limiter("ip", 10)]
+    monkeypatch.setattr(main, "RATE_LIMIT_MAX_KEYS", 1024)
+    limiters += [main.create_rate_limiter("ip", 10), main.create_rate_limiter("ip", 20)]
+    assert len({limiter.path for limiter in limiters}) == 3
+    for limiter in limiters:
+        limiter.close()
+
+
+def test_full_stripe_reuses_oldest_slot(path):
+    limiter = SharedTokenBucketLimiter(path, rate_per_minute=1, slots=8, stripes=1)
+    for index in range(20):
+        limiter.allow(f"key-{index}")
+    assert len(limiter) == 8
+    assert limiter.evicted == 12
+    limiter.close()
+
+
+def test_disabled_limiter_creates_no_file(path):
+    limiter = SharedTokenBucketLimiter(path, rate_per_minute=0)
+    assert not limiter.enabled
+    assert limiter.allow("a") and not limiter.is_limited("a")
+    assert len(limiter) == 0
+    assert limiter.retry_after("a") == 1
+    assert not os.path.exists(path)
+
+
+def test_snapshot(path):
+    limiter = SharedTokenBucketLimiter(path, rate_per_minute=10, slots=128, stripes=4)
+    limiter.allow("a")
+    snapshot = limiter.snapshot()
+    assert (snapshot["backend"], snapshot["keys"], snapshot["max_keys"], snapshot["allowed"]) == ("shared", 1, 128, 1)
+    limiter.close()
@@ -0,0 +1,115 @@
+"""spend_governor.py 테스트 (사용률 단계 / 예약 / 윈도우 전환 / DB 체크포인트)"""
+from datetime import datetime
+
+import pytest
+
+import main
+import spend_governor
+from conftest import new_device_id
+from database import SQLiteDatabase
+from spend_governor import KST, LOCAL_ONLY, NORMAL, REDUCED, REJECT, SpendGovernor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 10, 19, 10, 30, tzinfo=KST).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(spend_governor.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "spend.db"))
+    database.init_db()
+    return database
+
+
+def test_disabled_without_budgets(clock, db):
+    governor = SpendGovernor(db)
+    assert not governor.enabled
+    governor.record(10 ** 9)
+    assert governor.level() == NORMAL
+
+
+def test_levels_follow_usage_ratio(clock, db):
+    governor = SpendGovernor(db, hourly_budget=1000, reduce_at=0.8, local_at=0.95)
+    assert governor.reserve(100) == NORMAL
+    governor.release(100)
+    for used, level in ((800, REDUCED), (150, LOCAL_ONLY), (50, REJECT)):
+        governor.record(used)
+        assert governor.level() == level
+    assert governor.snapshot()["decisions"][NORMAL] == 1
+
+
+def test_pending_reservations_count_until_released(clock, db):
+    governor = SpendGovernor(db, daily_budget=1000)
+    assert governor.reserve(900) == NORMAL
+    assert governor.reserve(100) == REDUCED  # 진행 중 900 포함 → 90%
+    assert governor.reserve(10) == REJECT
+    governor.release(900)
+    governor.release(100)
+    assert governor.level() == NORMAL
+
+
+def test_retry_after_points_to_exhausted_window_end(clock, db):
+    governor = SpendGovernor(db, hourly_budget=100, daily_budget=10_000)
+    governor.record(100)
+    assert governor.level() == REJECT
+    assert governor.retry_after() == 30 * 60
+
+
+def test_hour_rollover_resets_hourly_usage(clock, db):
+    governor = SpendGovernor(db, hourly_budget=100, daily_budget=1000)
+    governor.record(100)
+    assert governor.level() == REJECT
+    clock.now += 31 * 60
+    assert governor.level() == NORMAL
+    assert governor.snapshot()["windows"]["day"]["used"] == 100
+    governor.checkpoint()  # 지난 시간 증분도 DB에 반영
+    assert db.add_spend_tokens("hour:2026-10-19T10", 0) == 100
+
+
+def test_checkpoint_shares_usage_between_workers(clock, db):
+    first = SpendGovernor(db, daily_budget=1000)
+    second = SpendGovernor(db, daily_budget=1000)
+    first.record(300)
+    second.record(400)
+    first.checkpoint()
+    second.checkpoint()
+    first.checkpoint()
+    assert first.snapshot()["windows"]["day"]["used"] == 700
+    assert second.snapshot()["windows"]["day"]["used"] == 700
+
+
+def test_failed_checkpoint_keeps_delta(clock, db, monkeypatch):
+    governor = SpendGovernor(db, daily_budget=1000)
+    governor.record(300)
+
+    def broken(key, tokens):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(db, "add_spend_tokens", broken)
+    with pytest.raises(RuntimeError):
+        governor.checkpoint()
+    monkeypatch.undo()
+    governor.checkpoint()
+    assert db.add_spend_tokens(governor.snapshot()["windows"]["day"]["key"], 0) == 300
+
+
+def test_analyze_is_rejected_when_budget_is_spent(client, mock_gemini, monkeypatch):
+    governor = SpendGovernor(main.db, hourly_budget=10)
+    governor.record(10)
+    monkeypatch.setattr(main, "spend_governor", governor)
+    calls = mock_gemini()
+    response = client.post("/api/analyze", json={"data": "메모", "device_id": new_device_id()})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert calls == []